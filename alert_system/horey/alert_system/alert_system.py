@@ -36,6 +36,7 @@ from horey.aws_api.aws_services_entities.event_bridge_target import EventBridgeT
 from horey.aws_api.aws_services_entities.event_bridge_rule import EventBridgeRule
 from horey.aws_api.aws_services_entities.cloud_watch_log_group import CloudWatchLogGroup
 from horey.alert_system.alert_system_configuration_policy import AlertSystemConfigurationPolicy
+from horey.alert_system.metric_data_fetcher import MetricDataFetcher
 from horey.pip_api.pip_api import PipAPI
 from horey.pip_api.pip_api_configuration_policy import PipAPIConfigurationPolicy
 
@@ -66,6 +67,7 @@ class AlertSystem:
             pass
 
         self._pip_api = None
+        self._metric_data_fetcher = None
 
         self._lambda_arn = None
         if self.configuration.routing_tags is None:
@@ -89,6 +91,19 @@ class AlertSystem:
             self._pip_api = PipAPI(configuration=pip_api_configuration)
         return self._pip_api
 
+    @property
+    def metric_data_fetcher(self):
+        """
+        Batched GetMetricData fetcher, cached in configuration's metric_data_cache_dir_path.
+
+        :return:
+        """
+
+        if self._metric_data_fetcher is None:
+            self._metric_data_fetcher = MetricDataFetcher(self.aws_api.cloud_watch_client, self.region,
+                                                          cache_dir_path=self.configuration.metric_data_cache_dir_path)
+        return self._metric_data_fetcher
+
     @property
     def lambda_arn(self):
         if self._lambda_arn is None:
@@ -1109,12 +1124,11 @@ class AlertSystem:
         lst_ret = []
         lst_del = []
 
-        for i, metric_raw in enumerate(metrics):
+        all_metrics_values = self.get_metrics_statistics(metrics, start_time=metric_data_start_time,
+                                                         end_time=metric_data_end_time)
+        for i, (metric_raw, all_metric_values) in enumerate(zip(metrics, all_metrics_values)):
             logger.info(f"Generated alarms for {i}/{len(metrics)} metrics")
 
-            all_metric_values = self.get_metric_statistics(metric_raw, start_time=metric_data_start_time,
-                                                           end_time=metric_data_end_time)
-
             min_value, max_value = resource_alarms_builder.generate_metric_alarm_limits(metric_raw, all_metric_values)
             slug = resource_alarms_builder.generate_metric_alarm_slug(metric_raw)
 
@@ -1194,6 +1208,25 @@ class AlertSystem:
         :return:
         """
 
+        start_time, end_time = self.get_metric_data_window(start_time=start_time, end_time=end_time)
+        seconds = int((end_time - start_time).total_seconds())
+
+        statistics = ["SampleCount", "Average", "Sum", "Minimum", "Maximum"]
+        period = 60
+        all_metric_values = self.get_metric_statistics_helper(metric_raw, statistics, end_time, seconds, period)
+
+        return all_metric_values
+
+    @staticmethod
+    def get_metric_data_window(start_time=None, end_time=None):
+        """
+        Validate the window and set the defaults - last 15 days.
+
+        :param start_time:
+        :param end_time:
+        :return:
+        """
+
         now = datetime.datetime.now(datetime.timezone.utc)
         if end_time and end_time > now:
             raise ValueError("Maximal end time can be now or less")
@@ -1206,14 +1239,27 @@ class AlertSystem:
         if end_time < minimal_possible_time:
             raise ValueError("Maximal end time must be greater then 15 days from now")
 
-        start_time = start_time or minimal_possible_time
-        seconds = int((end_time - start_time).total_seconds())
+        return start_time or minimal_possible_time, end_time
 
-        statistics = ["SampleCount", "Average", "Sum", "Minimum", "Maximum"]
-        period = 60
-        all_metric_values = self.get_metric_statistics_helper(metric_raw, statistics, end_time, seconds, period)
+    def get_metrics_statistics(self, metrics, start_time=None, end_time=None):
+        """
+        Batched get_metric_statistics for all the metrics - GetMetricData requests, cached on disk.
+        Default window is aligned to full hours, so reruns during the same hour use the cache.
 
-        return all_metric_values
+        :param metrics:
+        :param start_time:
+        :param end_time:
+        :return: List of datapoints lists - same order as metrics.
+        """
+
+        now = datetime.datetime.now(datetime.timezone.utc).replace(minute=0, second=0, microsecond=0)
+        if end_time is None:
+            end_time = now
+        if start_time is None:
+            start_time = now - datetime.timedelta(days=15) + datetime.timedelta(hours=1)
+
+        start_time, end_time = self.get_metric_data_window(start_time=start_time, end_time=end_time)
+        return self.metric_data_fetcher.get_metrics_statistics(metrics, start_time, end_time)
 
     def get_metric_statistics_helper(self, metric_raw, statistics, end_time, seconds, period):
         """
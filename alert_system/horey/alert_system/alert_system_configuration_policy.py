@@ -41,6 +41,7 @@ class AlertSystemConfigurationPolicy(ConfigurationPolicy):
         self._ses_configuration_set_name = None
         self._dynamodb_table_name = None
         self._do_not_send_ses_suppressed_bounce_notifications = False
+        self._metric_data_cache_dir_path = None
 
     @property
     def do_not_send_ses_suppressed_bounce_notifications(self):
@@ -67,6 +68,16 @@ class AlertSystemConfigurationPolicy(ConfigurationPolicy):
     def deployment_directory_path(self):
         return f"/tmp/alert_system/{self.deployment_datetime}"
 
+    @property
+    def metric_data_cache_dir_path(self):
+        if self._metric_data_cache_dir_path is None:
+            return "/tmp/alert_system/metric_data_cache"
+        return self._metric_data_cache_dir_path
+
+    @metric_data_cache_dir_path.setter
+    def metric_data_cache_dir_path(self, value):
+        self._metric_data_cache_dir_path = value
+
     @property
     def deployment_venv_path(self):
         return os.path.join(self.deployment_directory_path, "_venv")
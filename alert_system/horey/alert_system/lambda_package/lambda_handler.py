@@ -4,6 +4,7 @@ Entry point for the receiver lambda.
 """
 
 import json
+import os
 import traceback
 
 from horey.alert_system.lambda_package.event_handler import EventHandler
@@ -12,6 +13,30 @@ from horey.alert_system.alert_system_configuration_policy import AlertSystemConf
 from horey.h_logger import get_logger
 logger = get_logger(add_handler=False)
 
+# Survives between warm invocations of the same lambda container.
+# configuration file path: (configuration file signature, EventHandler)
+EVENT_HANDLERS_CACHE = {}
+
+
+def get_event_handler(configuration_file_path):
+    """
+    Cached EventHandler - rebuilt when the configuration file changes.
+
+    :param configuration_file_path:
+    :return:
+    """
+
+    file_stat = os.stat(configuration_file_path)
+    signature = (file_stat.st_mtime_ns, file_stat.st_size)
+    cached = EVENT_HANDLERS_CACHE.get(configuration_file_path)
+    if cached is not None and cached[0] == signature:
+        return cached[1]
+
+    logger.info(f"Initializing event handler from configuration file: {configuration_file_path}")
+    event_handler = EventHandler(configuration_file_path)
+    EVENT_HANDLERS_CACHE[configuration_file_path] = (signature, event_handler)
+    return event_handler
+
 
 def handler(event, _):
     """
@@ -29,7 +54,7 @@ def handler(event, _):
         "ALERT_SYSTEM_SELF_MONITORING_LOG_TIMEOUT_FILTER_PATTERN")
     logger.info(f"Handling event: '{logger_string}'")
 
-    event_handler = EventHandler(AlertSystemConfigurationPolicy.ALERT_SYSTEM_CONFIGURATION_FILE_PATH)
+    event_handler = get_event_handler(AlertSystemConfigurationPolicy.ALERT_SYSTEM_CONFIGURATION_FILE_PATH)
     try:
         event_handler.handle_event(event)
     except Exception as error_inst:
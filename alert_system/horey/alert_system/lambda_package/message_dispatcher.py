@@ -7,6 +7,7 @@ Sends the notification to the channels.
 import datetime
 import json
 import traceback
+from concurrent.futures import ThreadPoolExecutor
 
 from horey.alert_system.notification_channels.notification_channel_factory import \
     NotificationChannelFactory
@@ -28,13 +29,58 @@ class MessageDispatcher:
 
     """
 
+    SET_ALARM_STATE_MAX_WORKERS = 16
+
     def __init__(self, configuration):
         self.configuration = configuration
         self.notification_channels = []
         self.region = Region.get_region(self.configuration.region)
+        self._dynamodb_client = None
+        self._dynamodb_table = None
+        self._cloud_watch_client = None
         if not self.init_notification_channels():
             raise RuntimeError("No notification channels configured")
 
+    @property
+    def dynamodb_client(self):
+        """
+        DynamoDB client, created once - reused across warm lambda invocations.
+
+        :return:
+        """
+
+        if self._dynamodb_client is None:
+            self._dynamodb_client = DynamoDBClient()
+        return self._dynamodb_client
+
+    @property
+    def dynamodb_table(self):
+        """
+        Alarms table, described once - reused across warm lambda invocations.
+
+        :return:
+        """
+
+        if self._dynamodb_table is None:
+            table = DynamoDBTable({})
+            table.name = self.configuration.dynamodb_table_name
+            table.region = self.region
+            self.dynamodb_client.update_table_information(table, raise_if_not_found=True)
+            self._dynamodb_table = table
+        return self._dynamodb_table
+
+    @property
+    def cloud_watch_client(self):
+        """
+        CloudWatch client, created once - reused across warm lambda invocations.
+
+        :return:
+        """
+
+        if self._cloud_watch_client is None:
+            self._cloud_watch_client = CloudWatchClient()
+        return self._cloud_watch_client
+
     def init_notification_channels(self):
         """
         i
@@ -112,12 +158,7 @@ class MessageDispatcher:
         :return:
         """
 
-        dynamodb_client = DynamoDBClient()
-        table = DynamoDBTable({})
-        table.name = self.configuration.dynamodb_table_name
-        table.region = Region.get_region(self.configuration.region)
-        dynamodb_client.update_table_information(table, raise_if_not_found=True)
-        for item in dynamodb_client.scan(table):
+        for item in self.dynamodb_client.scan(self.dynamodb_table):
             item["alarm_state"]["epoch_triggered"] = float(item["alarm_state"]["epoch_triggered"])
             yield item
 
@@ -130,18 +171,24 @@ class MessageDispatcher:
         :return:
         """
 
-        dynamodb_client = DynamoDBClient()
-        table = DynamoDBTable({})
-        table.name = self.configuration.dynamodb_table_name
-        table.region = self.region
-        dynamodb_client.update_table_information(table, raise_if_not_found=True)
-        dict_key = {"alarm_name": alarm_name,
-                    "alarm_state":
-                        {"cooldown_time": 300,
-                         "epoch_triggered": str(alarm_epoch_utc)}}
-
         logger.info(f"Updating time triggered time: {alarm_name=} {alarm_epoch_utc=}")
-        return dynamodb_client.put_item(table, dict_key)
+        return self.dynamodb_client.put_item(self.dynamodb_table,
+                                             self.generate_dynamodb_alarm_item(alarm_name, alarm_epoch_utc))
+
+    @staticmethod
+    def generate_dynamodb_alarm_item(alarm_name: str, alarm_epoch_utc: float):
+        """
+        Alarm cooldown item.
+
+        :param alarm_name:
+        :param alarm_epoch_utc:
+        :return:
+        """
+
+        return {"alarm_name": alarm_name,
+                "alarm_state":
+                    {"cooldown_time": 300,
+                     "epoch_triggered": str(alarm_epoch_utc)}}
 
     def delete_dynamodb_alarm(self, alarm_name: str):
         """
@@ -151,29 +198,35 @@ class MessageDispatcher:
         :return:
         """
 
-        dynamodb_client = DynamoDBClient()
-        table = DynamoDBTable({})
-        table.name = self.configuration.dynamodb_table_name
-        table.region = self.region
-        dynamodb_client.update_table_information(table, raise_if_not_found=True)
         dict_key = {"alarm_name": alarm_name}
-        return dynamodb_client.delete_item(table, dict_key)
+        return self.dynamodb_client.delete_item(self.dynamodb_table, dict_key)
 
     def run_dynamodb_update_routine(self):
         """
+        Reset to OK the alarms which cooldown time passed.
+        Alarms are described in batches, states are reset concurrently and the table is updated
+        with batched writes.
 
         :return:
         """
-        client = CloudWatchClient()
+
+        client = self.cloud_watch_client
         time_now = datetime.datetime.now(datetime.timezone.utc)
         timestamp_now = time_now.timestamp()
-        for item in self.yield_dynamodb_items():
+        items = list(self.yield_dynamodb_items())
 
-            alarm = CloudWatchAlarm({"AlarmName": item["alarm_name"]})
+        alarms = {}
+        for dict_src in client.yield_alarms_by_names(self.region, [item["alarm_name"] for item in items]):
+            alarm = CloudWatchAlarm(dict_src)
             alarm.region = self.region
-
-            if not client.update_alarm_information(alarm):
-                self.delete_dynamodb_alarm(item["alarm_name"])
+            alarms[alarm.name] = alarm
+
+        delete_keys = []
+        expired_alarms = []
+        for item in items:
+            alarm = alarms.get(item["alarm_name"])
+            if alarm is None:
+                delete_keys.append({"alarm_name": item["alarm_name"]})
                 continue
             if alarm.state_value != "ALARM":
                 continue
@@ -183,14 +236,38 @@ class MessageDispatcher:
             #    logger.warning(f"Unhandled state for alarm {alarm.name}: {alarm.state_updated_timestamp=} {alarm.state_transitioned_timestamp=}")
             if timestamp_now - alarm.state_transitioned_timestamp.timestamp() < item["alarm_state"]["cooldown_time"]:
                 continue
+            expired_alarms.append(alarm)
+
+        put_items = []
+        errors = []
+        with ThreadPoolExecutor(max_workers=self.SET_ALARM_STATE_MAX_WORKERS) as executor:
+            for alarm, error_inst in zip(expired_alarms, executor.map(self.set_alarm_ok, expired_alarms)):
+                if error_inst is None:
+                    put_items.append(self.generate_dynamodb_alarm_item(
+                        alarm.name, alarm.state_transitioned_timestamp.timestamp()))
+                elif "ResourceNotFound" in repr(error_inst):
+                    delete_keys.append({"alarm_name": alarm.name})
+                else:
+                    errors.append(error_inst)
+
+        logger.info(f"Cooldown sweep: {len(items)} items, {len(put_items)} alarms reset to OK, "
+                    f"{len(delete_keys)} items deleted")
+        self.dynamodb_client.batch_write_items(self.dynamodb_table, put_items=put_items, delete_keys=delete_keys)
+
+        if errors:
+            raise errors[0]
+        return True
 
-            try:
-                client.set_alarm_ok(alarm)
-            except Exception as inst_error:
-                if "ResourceNotFound" not in repr(inst_error):
-                    raise
-                self.delete_dynamodb_alarm(item["alarm_name"])
-                continue
+    def set_alarm_ok(self, alarm):
+        """
+        Change alarm state to OK.
 
-            self.update_dynamodb_alarm(item["alarm_name"], alarm.state_transitioned_timestamp.timestamp())
-        return True
+        :param alarm:
+        :return: The exception if failed, None otherwise.
+        """
+
+        try:
+            self.cloud_watch_client.set_alarm_ok(alarm)
+        except Exception as inst_error:
+            return inst_error
+        return None
@@ -3,12 +3,10 @@ Message being received by the Alert System Lambda.
 
 """
 
+import importlib
+
 from horey.h_logger import get_logger
-from horey.alert_system.lambda_package.message_cloudwatch_default import MessageCloudwatchDefault
-from horey.alert_system.lambda_package.message_ses_default import MessageSESDefault
-from horey.alert_system.lambda_package.message_event_bridge_default import MessageEventBridgeDefault
 from horey.alert_system.lambda_package.message_base import MessageBase
-from horey.alert_system.lambda_package.message_raw import MessageRaw
 from horey.alert_system.alert_system_configuration_policy import AlertSystemConfigurationPolicy
 from horey.common_utils.common_utils import CommonUtils
 
@@ -18,12 +16,45 @@ logger = get_logger()
 class MessageFactory:
     """
     Main class.
+    Default message classes are imported on first use - in match order, so an event matching
+    an early class does not import the rest.
 
     """
 
+    DEFAULT_MESSAGE_CLASSES = [
+        ("horey.alert_system.lambda_package.message_event_bridge_default", "MessageEventBridgeDefault"),
+        ("horey.alert_system.lambda_package.message_cloudwatch_default", "MessageCloudwatchDefault"),
+        ("horey.alert_system.lambda_package.message_ses_default", "MessageSESDefault"),
+        ("horey.alert_system.lambda_package.message_raw", "MessageRaw"),
+    ]
+
     def __init__(self, configuration: AlertSystemConfigurationPolicy):
         self.configuration = configuration
-        self.message_classes = self.load_message_classes() + [MessageEventBridgeDefault,  MessageCloudwatchDefault, MessageSESDefault, MessageRaw]
+        self.explicit_message_classes = self.load_message_classes()
+        self.default_message_classes = [None] * len(self.DEFAULT_MESSAGE_CLASSES)
+
+    @property
+    def message_classes(self):
+        """
+        All message classes in matching order - imports all the default ones.
+
+        :return:
+        """
+
+        return list(self.yield_message_classes())
+
+    def yield_message_classes(self):
+        """
+        Explicitly set message classes, followed by the default ones - imported lazily.
+
+        :return:
+        """
+
+        yield from self.explicit_message_classes
+        for index, (module_name, class_name) in enumerate(self.DEFAULT_MESSAGE_CLASSES):
+            if self.default_message_classes[index] is None:
+                self.default_message_classes[index] = getattr(importlib.import_module(module_name), class_name)
+            yield self.default_message_classes[index]
 
     def load_message_classes(self):
         """
@@ -57,7 +88,7 @@ class MessageFactory:
         :return:
         """
 
-        for message_class in self.message_classes:
+        for message_class in self.yield_message_classes():
             try:
                 return message_class(dict_event, self.configuration)
             except MessageBase.NotAMatchError:
@@ -0,0 +1,240 @@
+"""
+Batched metric statistics fetching with GetMetricData.
+
+"""
+
+import datetime
+import hashlib
+import json
+import os
+import re
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from horey.h_logger import get_logger
+
+logger = get_logger()
+
+
+class MetricDataFetcher:
+    """
+    Fetch GetMetricStatistics-like datapoints for many metrics at once.
+    Metric statistic queries are packed into GetMetricData requests (up to 500 queries each),
+    the requests run concurrently and are paged by NextToken over the whole window.
+    Fetched series are cached on disk by metric, dimensions, statistics, period and window.
+    Cache files not used for CACHE_MAX_AGE seconds are evicted, then the least recently used ones
+    while the cache exceeds CACHE_MAX_SIZE bytes.
+
+    """
+
+    MAX_QUERIES_PER_REQUEST = 500
+    STATISTICS = ("SampleCount", "Average", "Sum", "Minimum", "Maximum")
+    CACHE_MAX_AGE = 7 * 24 * 60 * 60
+    CACHE_MAX_SIZE = 512 * 1024 * 1024
+
+    # pylint: disable= too-many-arguments, too-many-positional-arguments
+    def __init__(self, cloud_watch_client, region, cache_dir_path=None, max_workers=8, period=60,
+                 statistics=None):
+        self.cloud_watch_client = cloud_watch_client
+        self.region = region
+        self.cache_dir_path = cache_dir_path
+        self.max_workers = max_workers
+        self.period = period
+        self.statistics = tuple(statistics) if statistics is not None else self.STATISTICS
+
+    def get_metrics_statistics(self, metrics, start_time, end_time):
+        """
+        Datapoints per metric in get_metric_statistics format: [{"Timestamp": datetime, "Average": float, ...}]
+
+        :param metrics: Raw metrics: {"Namespace": str, "MetricName": str, "Dimensions": list}
+        :param start_time:
+        :param end_time:
+        :return: List of datapoints lists - same order as metrics.
+        """
+
+        ret = [None] * len(metrics)
+        missing = []
+        for index, metric_raw in enumerate(metrics):
+            ret[index] = self.load_from_cache(metric_raw, start_time, end_time)
+            if ret[index] is None:
+                missing.append(index)
+
+        logger.info(f"Metric data: {len(metrics) - len(missing)} metrics in cache, fetching {len(missing)}")
+        metrics_per_request = self.MAX_QUERIES_PER_REQUEST // len(self.statistics)
+        batches = [missing[start: start + metrics_per_request] for start in
+                   range(0, len(missing), metrics_per_request)]
+
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            for batch, datapoints_batch in zip(batches, executor.map(
+                    lambda batch: self.fetch_batch([metrics[index] for index in batch], start_time, end_time),
+                    batches)):
+                for index, datapoints in zip(batch, datapoints_batch):
+                    ret[index] = datapoints
+                    self.save_to_cache(metrics[index], start_time, end_time, datapoints)
+
+        if missing:
+            self.evict_cache()
+        return ret
+
+    def fetch_batch(self, metrics, start_time, end_time):
+        """
+        Single GetMetricData request - all its pages.
+
+        :param metrics:
+        :param start_time:
+        :param end_time:
+        :return: List of datapoints lists - same order as metrics.
+        """
+
+        queries = []
+        for metric_index, metric_raw in enumerate(metrics):
+            for statistic in self.statistics:
+                queries.append({"Id": self.generate_query_id(metric_index, statistic),
+                                "MetricStat": {"Metric": {"Namespace": metric_raw["Namespace"],
+                                                          "MetricName": metric_raw["MetricName"],
+                                                          "Dimensions": metric_raw["Dimensions"]},
+                                               "Period": self.period,
+                                               "Stat": statistic},
+                                "ReturnData": True})
+
+        request_dict = {"MetricDataQueries": queries,
+                        "StartTime": start_time,
+                        "EndTime": end_time,
+                        "ScanBy": "TimestampAscending"}
+
+        series = {}
+        for page in self.cloud_watch_client.get_metric_data_raw(self.region, request_dict):
+            for result in page["MetricDataResults"]:
+                timestamps, values = series.setdefault(result["Id"], ([], []))
+                timestamps.extend(result["Timestamps"])
+                values.extend(result["Values"])
+
+        return [self.build_datapoints(metric_index, series) for metric_index in range(len(metrics))]
+
+    def build_datapoints(self, metric_index, series):
+        """
+        Join per statistic series into datapoints. Timestamps missing any statistic are dropped.
+
+        :param metric_index:
+        :param series: Query id - (timestamps, values)
+        :return:
+        """
+
+        datapoints = {}
+        for statistic in self.statistics:
+            timestamps, values = series.get(self.generate_query_id(metric_index, statistic), ([], []))
+            for timestamp, value in zip(timestamps, values):
+                datapoints.setdefault(timestamp, {"Timestamp": timestamp})[statistic] = value
+
+        return [datapoint for _, datapoint in sorted(datapoints.items()) if len(datapoint) == len(self.statistics) + 1]
+
+    @staticmethod
+    def generate_query_id(metric_index, statistic):
+        """
+        Query id must start with a lowercase letter.
+
+        :param metric_index:
+        :param statistic:
+        :return:
+        """
+
+        return f"m{metric_index}_{statistic.lower()}"
+
+    def get_cache_file_path(self, metric_raw, start_time, end_time):
+        """
+        Cache file per metric, dimensions, statistics, period and window.
+
+        :param metric_raw:
+        :param start_time:
+        :param end_time:
+        :return:
+        """
+
+        key = json.dumps([str(self.region), metric_raw["Namespace"], metric_raw["MetricName"],
+                          sorted([dimension["Name"], dimension["Value"]] for dimension in metric_raw["Dimensions"]),
+                          self.statistics, self.period, start_time.isoformat(), end_time.isoformat()])
+        file_name = f"{re.sub(r'[^A-Za-z0-9_.-]', '_', metric_raw['MetricName'])}-" \
+                    f"{hashlib.sha256(key.encode('utf-8')).hexdigest()[:32]}.json"
+        return os.path.join(self.cache_dir_path, file_name)
+
+    def load_from_cache(self, metric_raw, start_time, end_time):
+        """
+        Cached datapoints or None.
+
+        :param metric_raw:
+        :param start_time:
+        :param end_time:
+        :return:
+        """
+
+        if self.cache_dir_path is None:
+            return None
+
+        file_path = self.get_cache_file_path(metric_raw, start_time, end_time)
+        if not os.path.exists(file_path):
+            return None
+
+        with open(file_path, encoding="utf-8") as file_handler:
+            datapoints = json.load(file_handler)
+        # Last use time - evicted by age and size from the least recently used.
+        os.utime(file_path)
+
+        for datapoint in datapoints:
+            datapoint["Timestamp"] = datetime.datetime.fromisoformat(datapoint["Timestamp"])
+        return datapoints
+
+    def save_to_cache(self, metric_raw, start_time, end_time, datapoints):
+        """
+        Write datapoints atomically.
+
+        :param metric_raw:
+        :param start_time:
+        :param end_time:
+        :param datapoints:
+        :return:
+        """
+
+        if self.cache_dir_path is None:
+            return
+
+        os.makedirs(self.cache_dir_path, exist_ok=True)
+        file_path = self.get_cache_file_path(metric_raw, start_time, end_time)
+        tmp_file_path = f"{file_path}.tmp"
+        with open(tmp_file_path, "w", encoding="utf-8") as file_handler:
+            json.dump([dict(datapoint, Timestamp=datapoint["Timestamp"].isoformat()) for datapoint in datapoints],
+                      file_handler)
+        os.replace(tmp_file_path, file_path)
+
+    def evict_cache(self):
+        """
+        Remove cache files older than CACHE_MAX_AGE, then the oldest ones over CACHE_MAX_SIZE.
+
+        :return: Removed files count.
+        """
+
+        if self.cache_dir_path is None or not os.path.isdir(self.cache_dir_path):
+            return 0
+
+        files = []
+        for dir_entry in os.scandir(self.cache_dir_path):
+            if dir_entry.is_file() and dir_entry.name.endswith(".json"):
+                file_stat = dir_entry.stat()
+                files.append((file_stat.st_mtime, file_stat.st_size, dir_entry.path))
+
+        files.sort()
+        min_mtime = time.time() - self.CACHE_MAX_AGE
+        total_size = sum(size for _, size, _ in files)
+        removed = 0
+        for mtime, size, file_path in files:
+            if mtime >= min_mtime and total_size <= self.CACHE_MAX_SIZE:
+                break
+            try:
+                os.remove(file_path)
+            except FileNotFoundError:
+                pass
+            total_size -= size
+            removed += 1
+
+        if removed:
+            logger.info(f"Metric data cache: evicted {removed} files, {total_size} bytes left")
+        return removed
@@ -0,0 +1,184 @@
+"""
+Statistics kernel for alarm limits generation.
+
+"""
+
+import math
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+
+class MetricStatistics:
+    """
+    Datapoints converted once to columns: one column per statistic (Minimum, Maximum, Average...).
+    Columns are numpy arrays when numpy is installed, plain float lists otherwise.
+    Sorted columns are cached, so medians and percentiles of a column cost a single sort.
+
+    """
+
+    COLUMNS = ("Minimum", "Maximum", "Average")
+
+    def __init__(self, datapoints, columns=None):
+        columns = columns or self.COLUMNS
+        self.timestamps = [datapoint["Timestamp"] for datapoint in datapoints if "Timestamp" in datapoint]
+        self.columns = {}
+        for column in columns:
+            values = [float(datapoint[column]) for datapoint in datapoints]
+            self.columns[column] = numpy.asarray(values, dtype=numpy.float64) if numpy is not None else values
+        self._sorted_columns = {}
+
+    def __len__(self):
+        return len(next(iter(self.columns.values()), []))
+
+    def get_sorted(self, column):
+        """
+        Sorted column values, cached.
+
+        :param column:
+        :return:
+        """
+
+        if column not in self._sorted_columns:
+            values = self.columns[column]
+            self._sorted_columns[column] = numpy.sort(values) if numpy is not None else sorted(values)
+        return self._sorted_columns[column]
+
+    def percentile(self, column, percent):
+        """
+        Linear interpolation between the closest ranks - numpy's default method.
+
+        :param column:
+        :param percent: 0 - 100
+        :return:
+        """
+
+        sorted_values = self.get_sorted(column)
+        if not len(sorted_values):
+            raise ValueError(f"No datapoints in column '{column}'")
+
+        position = (len(sorted_values) - 1) * percent / 100.0
+        lower = math.floor(position)
+        upper = math.ceil(position)
+        if lower == upper:
+            return float(sorted_values[lower])
+        return float(sorted_values[lower] + (sorted_values[upper] - sorted_values[lower]) * (position - lower))
+
+    def median(self, column):
+        """
+        Column median.
+
+        :param column:
+        :return:
+        """
+
+        return self.percentile(column, 50)
+
+    def mean(self, column):
+        """
+        Column arithmetic mean.
+
+        :param column:
+        :return:
+        """
+
+        values = self.columns[column]
+        if not len(values):
+            raise ValueError(f"No datapoints in column '{column}'")
+        if numpy is not None:
+            return float(values.mean())
+        return math.fsum(values) / len(values)
+
+    def min(self, column):
+        """
+        Column minimum.
+
+        :param column:
+        :return:
+        """
+
+        return float(self.get_sorted(column)[0])
+
+    def max(self, column):
+        """
+        Column maximum.
+
+        :param column:
+        :return:
+        """
+
+        return float(self.get_sorted(column)[-1])
+
+    def mad(self, column):
+        """
+        Median absolute deviation - spread measure robust to spikes.
+
+        :param column:
+        :return:
+        """
+
+        median_value = self.median(column)
+        if numpy is not None:
+            return float(numpy.median(numpy.abs(self.columns[column] - median_value)))
+        deviations = MetricStatistics([{column: abs(value - median_value)} for value in self.columns[column]],
+                                      columns=[column])
+        return deviations.median(column)
+
+    def ewma(self, column, alpha=0.1):
+        """
+        Exponentially weighted moving average of the column in datapoints order - the last value.
+
+        :param column:
+        :param alpha: Weight of the newest value.
+        :return:
+        """
+
+        values = self.columns[column]
+        if not len(values):
+            raise ValueError(f"No datapoints in column '{column}'")
+
+        ret = float(values[0])
+        for value in values[1:]:
+            ret = alpha * float(value) + (1 - alpha) * ret
+        return ret
+
+    def seasonal_baseline(self, column, season_seconds=24 * 60 * 60, bucket_seconds=60 * 60, percent=50):
+        """
+        Per bucket of the season (e.g. hour of the day) percentile of the column.
+
+        :param column:
+        :param season_seconds: Season length - a day by default.
+        :param bucket_seconds: Bucket length - an hour by default.
+        :param percent:
+        :return: {bucket index: value}
+        """
+
+        if len(self.timestamps) != len(self):
+            raise ValueError("Seasonal baseline requires timestamps in all datapoints")
+
+        buckets = {}
+        for timestamp, value in zip(self.timestamps, self.columns[column]):
+            bucket = int(timestamp.timestamp() % season_seconds) // bucket_seconds
+            buckets.setdefault(bucket, []).append(float(value))
+
+        return {bucket: MetricStatistics([{column: value} for value in values], columns=[column]).percentile(
+            column, percent) for bucket, values in sorted(buckets.items())}
+
+    def generate_limits_statistics(self):
+        """
+        The statistics alarm limits builders use.
+
+        :return:
+        """
+
+        return {"median_max": self.median("Maximum"),
+                "mean_max": self.mean("Maximum"),
+                "absolute_max_value": self.max("Maximum"),
+                "median_min": self.median("Minimum"),
+                "mean_min": self.mean("Minimum"),
+                "absolute_min_value": self.min("Minimum"),
+                "median_average": self.median("Average"),
+                "mean_average": self.mean("Average"),
+                "absolute_min_average": self.min("Average")}
@@ -6,7 +6,7 @@ from horey.common_utils.common_utils import CommonUtils
 from horey.aws_api.aws_services_entities.rds_db_cluster import RDSDBCluster
 from horey.aws_api.aws_services_entities.cloud_watch_alarm import CloudWatchAlarm
 from horey.h_logger import get_logger
-from statistics import median, mean
+from horey.alert_system.metric_statistics import MetricStatistics
 
 logger = get_logger()
 
@@ -237,17 +237,18 @@ class MysqlAlertBuilder:
         min_multiplier = 0.01
         max_multiplier = 10.0
 
-        median_max = median(x["Maximum"] for x in statistics_data)
-        mean_max = mean(x["Maximum"] for x in statistics_data)
-        absolute_max_value = max(x["Maximum"] for x in statistics_data)
+        limits_statistics = MetricStatistics(statistics_data).generate_limits_statistics()
+        median_max = limits_statistics["median_max"]
+        mean_max = limits_statistics["mean_max"]
+        absolute_max_value = limits_statistics["absolute_max_value"]
 
-        median_min = median(x["Minimum"] for x in statistics_data)
-        mean_min = mean(x["Minimum"] for x in statistics_data)
-        absolute_min_value = min(x["Minimum"] for x in statistics_data)
+        median_min = limits_statistics["median_min"]
+        mean_min = limits_statistics["mean_min"]
+        absolute_min_value = limits_statistics["absolute_min_value"]
 
-        median_average = median(x["Average"] for x in statistics_data)
-        mean_average = mean(x["Average"] for x in statistics_data)
-        absolute_min_average = min(x["Average"] for x in statistics_data)
+        median_average = limits_statistics["median_average"]
+        mean_average = limits_statistics["mean_average"]
+        absolute_min_average = limits_statistics["absolute_min_average"]
 
         if metric_raw["MetricName"] == "DiskQueueDepth":
             return None, absolute_max_value
@@ -3,8 +3,12 @@ Test lambda handler functionality.
 
 """
 
+import os
+import time
+
 import pytest
 from common import ses_events, cloudwatch_events, malformed_cloudwatch_events, self_monitoring_valid_events
+from horey.alert_system.lambda_package import lambda_handler
 from horey.alert_system.lambda_package.lambda_handler import handler
 from horey.alert_system.alert_system_configuration_policy import AlertSystemConfigurationPolicy
 
@@ -66,3 +70,36 @@ def test_lambda_handler_cloudwatch_message_message_override_notify_echo(cloudwat
     AlertSystemConfigurationPolicy.ALERT_SYSTEM_CONFIGURATION_FILE_PATH = alert_system_configuration_file_path_message_override_notify_echo
     event_handler = handler(cloudwatch_event, None)
     assert event_handler["statusCode"] == 200
+
+
+@pytest.mark.done
+def test_lambda_handler_reuses_event_handler(alert_system_configuration_file_path_with_echo):
+    AlertSystemConfigurationPolicy.ALERT_SYSTEM_CONFIGURATION_FILE_PATH = alert_system_configuration_file_path_with_echo
+    event_handler = lambda_handler.get_event_handler(alert_system_configuration_file_path_with_echo)
+    assert handler(ses_events[0], None)["statusCode"] == 200
+    assert lambda_handler.get_event_handler(alert_system_configuration_file_path_with_echo) is event_handler
+
+    file_stat = os.stat(alert_system_configuration_file_path_with_echo)
+    os.utime(alert_system_configuration_file_path_with_echo,
+             ns=(file_stat.st_atime_ns, file_stat.st_mtime_ns + 1000000000))
+    assert lambda_handler.get_event_handler(alert_system_configuration_file_path_with_echo) is not event_handler
+
+
+@pytest.mark.done
+def test_lambda_handler_cold_and_warm_start_benchmark(alert_system_configuration_file_path_with_echo):
+    AlertSystemConfigurationPolicy.ALERT_SYSTEM_CONFIGURATION_FILE_PATH = alert_system_configuration_file_path_with_echo
+    invocations_count = 20
+
+    start = time.perf_counter()
+    for index in range(invocations_count):
+        lambda_handler.EVENT_HANDLERS_CACHE.clear()
+        assert handler(ses_events[index % len(ses_events)], None)["statusCode"] == 200
+    cold_time = (time.perf_counter() - start) / invocations_count
+
+    start = time.perf_counter()
+    for index in range(invocations_count):
+        assert handler(ses_events[index % len(ses_events)], None)["statusCode"] == 200
+    warm_time = (time.perf_counter() - start) / invocations_count
+
+    print(f"\nCold start: {cold_time * 1000:.2f} ms/invocation, warm start: {warm_time * 1000:.2f} ms/invocation")
+    assert warm_time < cold_time
@@ -7,7 +7,7 @@ import sys
 import json
 import os
 import shutil
-from unittest.mock import patch
+from unittest.mock import patch, Mock
 
 import pytest
 from horey.common_utils.common_utils import CommonUtils
@@ -17,7 +17,7 @@ from horey.alert_system.alert_system_configuration_policy import AlertSystemConf
 from horey.alert_system.notification_channels.notification_channel_echo import NotificationChannelEcho
 
 
-# pylint: disable= missing-function-docstring
+# pylint: disable= missing-function-docstring, protected-access
 
 
 @pytest.fixture(name="lambda_package_tmp_dir_ses")
@@ -171,8 +171,32 @@ def test_run_dynamodb_update_routine(alert_system_configuration):
     with patch("horey.aws_api.aws_clients.cloud_watch_client.CloudWatchClient.set_alarm_ok") as mock_set_alarm_ok:
         assert message_dispatcher.run_dynamodb_update_routine()
         assert len(mock_set_alarm_ok.mock_calls) == 2
-        assert mock_set_alarm_ok.mock_calls[0].args[0].name == "alarm_name_expired_300"
-        assert mock_set_alarm_ok.mock_calls[1].args[0].name == "alarm_name_expired_3600"
+        assert sorted(mock_call.args[0].name for mock_call in mock_set_alarm_ok.mock_calls) == \
+               ["alarm_name_expired_300", "alarm_name_expired_3600"]
+
+
+@pytest.mark.done
+def test_run_dynamodb_update_routine_batched(alert_system_configuration):
+    message_dispatcher = MessageDispatcher(alert_system_configuration)
+    message_dispatcher.yield_dynamodb_items = yield_dynamodb_items_mock
+    time_now = datetime.datetime.now(datetime.timezone.utc)
+    alarms = [{"AlarmName": "alarm_name_expired_300", "StateValue": "ALARM",
+               "StateTransitionedTimestamp": time_now - datetime.timedelta(seconds=301)},
+              {"AlarmName": "alarm_name_not_expired_300", "StateValue": "ALARM",
+               "StateTransitionedTimestamp": time_now}]
+    message_dispatcher._cloud_watch_client = Mock()
+    message_dispatcher._cloud_watch_client.yield_alarms_by_names.return_value = alarms
+    message_dispatcher._dynamodb_client = Mock()
+    message_dispatcher._dynamodb_table = Mock()
+
+    assert message_dispatcher.run_dynamodb_update_routine()
+
+    message_dispatcher._cloud_watch_client.yield_alarms_by_names.assert_called_once()
+    assert message_dispatcher._cloud_watch_client.set_alarm_ok.call_count == 1
+    assert message_dispatcher._cloud_watch_client.set_alarm_ok.call_args.args[0].name == "alarm_name_expired_300"
+    batch_write_kwargs = message_dispatcher._dynamodb_client.batch_write_items.call_args.kwargs
+    assert [item["alarm_name"] for item in batch_write_kwargs["put_items"]] == ["alarm_name_expired_300"]
+    assert batch_write_kwargs["delete_keys"] == [{"alarm_name": "alarm_name_expired_3600"}]
 
 
 @pytest.mark.done
@@ -0,0 +1,100 @@
+"""
+Test batched GetMetricData fetching.
+
+"""
+
+import datetime
+import os
+import time
+
+import pytest
+
+from horey.alert_system.metric_data_fetcher import MetricDataFetcher
+
+# pylint: disable= missing-function-docstring
+
+START_TIME = datetime.datetime(2026, 1, 1, tzinfo=datetime.timezone.utc)
+END_TIME = START_TIME + datetime.timedelta(minutes=10)
+
+
+class CloudWatchClientStandIn:
+    """
+    Returns value = metric index * 10 + minute for every statistic, two pages per request.
+
+    """
+
+    def __init__(self):
+        self.requests = []
+
+    def get_metric_data_raw(self, region, request_dict):
+        assert region == "us-west-2"
+        self.requests.append(request_dict)
+        timestamps = [START_TIME + datetime.timedelta(minutes=minute) for minute in range(10)]
+        pages = [[], []]
+        for query in request_dict["MetricDataQueries"]:
+            metric_index = int(query["MetricStat"]["Metric"]["MetricName"].split("_")[1])
+            values = [metric_index * 10 + minute for minute in range(10)]
+            pages[0].append({"Id": query["Id"], "Timestamps": timestamps[:5], "Values": values[:5]})
+            pages[1].append({"Id": query["Id"], "Timestamps": timestamps[5:], "Values": values[5:]})
+        return [{"MetricDataResults": page} for page in pages]
+
+
+def get_metrics(count):
+    return [{"Namespace": "AWS/EC2", "MetricName": f"metric_{index}",
+             "Dimensions": [{"Name": "InstanceId", "Value": f"i-{index}"}]} for index in range(count)]
+
+
+@pytest.mark.done
+def test_get_metrics_statistics_batches_and_joins():
+    client = CloudWatchClientStandIn()
+    fetcher = MetricDataFetcher(client, "us-west-2")
+    metrics = get_metrics(250)
+
+    ret = fetcher.get_metrics_statistics(metrics, START_TIME, END_TIME)
+
+    assert len(client.requests) == 3
+    assert all(len(request["MetricDataQueries"]) <= MetricDataFetcher.MAX_QUERIES_PER_REQUEST
+               for request in client.requests)
+    assert len(ret) == 250
+    assert len(ret[123]) == 10
+    assert ret[123][7] == {"Timestamp": START_TIME + datetime.timedelta(minutes=7), "SampleCount": 1237,
+                           "Average": 1237, "Sum": 1237, "Minimum": 1237, "Maximum": 1237}
+
+
+@pytest.mark.done
+def test_build_datapoints_drops_partial_timestamps():
+    fetcher = MetricDataFetcher(None, "us-west-2", statistics=["Average", "Maximum"])
+    series = {"m0_average": ([START_TIME, END_TIME], [1, 2]),
+              "m0_maximum": ([END_TIME], [3])}
+    assert fetcher.build_datapoints(0, series) == [{"Timestamp": END_TIME, "Average": 2, "Maximum": 3}]
+
+
+@pytest.mark.done
+def test_get_metrics_statistics_cache(tmp_path):
+    client = CloudWatchClientStandIn()
+    fetcher = MetricDataFetcher(client, "us-west-2", cache_dir_path=str(tmp_path))
+    metrics = get_metrics(3)
+
+    ret = fetcher.get_metrics_statistics(metrics, START_TIME, END_TIME)
+    assert fetcher.get_metrics_statistics(metrics, START_TIME, END_TIME) == ret
+    assert len(client.requests) == 1
+
+    fetcher.get_metrics_statistics(get_metrics(4), START_TIME, END_TIME)
+    assert len(client.requests) == 2
+    assert len(client.requests[1]["MetricDataQueries"]) == len(MetricDataFetcher.STATISTICS)
+
+
+@pytest.mark.done
+def test_evict_cache(tmp_path):
+    fetcher = MetricDataFetcher(CloudWatchClientStandIn(), "us-west-2", cache_dir_path=str(tmp_path))
+    fetcher.get_metrics_statistics(get_metrics(4), START_TIME, END_TIME)
+    file_paths = sorted(str(file_path) for file_path in tmp_path.iterdir())
+    assert len(file_paths) == 4
+    now = time.time()
+    os.utime(file_paths[0], (now, now - MetricDataFetcher.CACHE_MAX_AGE - 1))
+    for index, file_path in enumerate(file_paths[1:]):
+        os.utime(file_path, (now, now - 10 + index))
+
+    fetcher.CACHE_MAX_SIZE = sum(os.path.getsize(file_path) for file_path in file_paths[2:])
+    assert fetcher.evict_cache() == 2
+    assert sorted(str(file_path) for file_path in tmp_path.iterdir()) == file_paths[2:]
@@ -0,0 +1,68 @@
+"""
+Test alarm limits statistics kernel.
+
+"""
+
+import datetime
+import random
+import statistics
+
+import pytest
+
+from horey.alert_system.metric_statistics import MetricStatistics
+
+# pylint: disable= missing-function-docstring
+
+START_TIME = datetime.datetime(2026, 1, 1, tzinfo=datetime.timezone.utc)
+
+
+def get_datapoints(count):
+    generator = random.Random(count)
+    ret = []
+    for index in range(count):
+        minimum = generator.uniform(0, 10)
+        maximum = minimum + generator.uniform(0, 100)
+        ret.append({"Timestamp": START_TIME + datetime.timedelta(minutes=index),
+                    "Minimum": minimum, "Maximum": maximum, "Average": (minimum + maximum) / 2})
+    return ret
+
+
+@pytest.mark.done
+@pytest.mark.parametrize("count", [1, 2, 101, 1440])
+def test_generate_limits_statistics_matches_statistics_module(count):
+    datapoints = get_datapoints(count)
+    ret = MetricStatistics(datapoints).generate_limits_statistics()
+
+    assert ret["median_max"] == pytest.approx(statistics.median(x["Maximum"] for x in datapoints))
+    assert ret["mean_max"] == pytest.approx(statistics.mean(x["Maximum"] for x in datapoints))
+    assert ret["absolute_max_value"] == max(x["Maximum"] for x in datapoints)
+    assert ret["median_min"] == pytest.approx(statistics.median(x["Minimum"] for x in datapoints))
+    assert ret["mean_min"] == pytest.approx(statistics.mean(x["Minimum"] for x in datapoints))
+    assert ret["absolute_min_value"] == min(x["Minimum"] for x in datapoints)
+    assert ret["median_average"] == pytest.approx(statistics.median(x["Average"] for x in datapoints))
+    assert ret["mean_average"] == pytest.approx(statistics.mean(x["Average"] for x in datapoints))
+    assert ret["absolute_min_average"] == min(x["Average"] for x in datapoints)
+
+
+@pytest.mark.done
+def test_robust_statistics():
+    datapoints = [{"Maximum": value, "Minimum": value, "Average": value} for value in [1, 2, 3, 4, 100]]
+    metric_statistics = MetricStatistics(datapoints)
+    assert metric_statistics.percentile("Maximum", 25) == 2
+    assert metric_statistics.percentile("Maximum", 90) == pytest.approx(61.6)
+    assert metric_statistics.mad("Maximum") == 1
+    assert metric_statistics.ewma("Maximum", alpha=0.5) == pytest.approx(51.5625)
+
+
+@pytest.mark.done
+def test_seasonal_baseline():
+    datapoints = [{"Timestamp": START_TIME + datetime.timedelta(hours=hour), "Maximum": hour % 24,
+                   "Minimum": 0, "Average": 0} for hour in range(24 * 3)]
+    baseline = MetricStatistics(datapoints).seasonal_baseline("Maximum")
+    assert baseline == {hour: hour for hour in range(24)}
+
+
+@pytest.mark.done
+def test_empty_datapoints():
+    with pytest.raises(ValueError):
+        MetricStatistics([]).median("Maximum")
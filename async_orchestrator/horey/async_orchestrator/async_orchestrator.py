@@ -4,11 +4,11 @@ Async orchestrator
 """
 
 import datetime
-import json
 import sys
 import time
 import threading
 import traceback
+from concurrent.futures import ThreadPoolExecutor, Future, CancelledError
 
 from horey.h_logger import get_logger
 
@@ -18,12 +18,42 @@ logger = get_logger()
 class AsyncOrchestrator:
     """
     Main class.
+    Every task runs in its own thread, or on a pool of max_workers threads if set.
+    A task waiting for other tasks holds its pool worker: with a bounded pool, tasks waiting
+    for not yet started tasks can deadlock - wait from the tasks only with an unbounded orchestrator.
+    Every task has a concurrent.futures.Future, completion is signaled - waiting does not poll.
+    A task can depend on other tasks - it is submitted when all of them succeed
+    and fails with DependencyFailedError if any of them fails or is cancelled.
 
     """
 
-    def __init__(self):
+    def __init__(self, max_workers=None):
+        """
+
+        :param max_workers: Thread pool size, None - a thread per task.
+        """
+
         self.tasks = {}
         self.alive = True
+        self.max_workers = max_workers
+        self._executor = None
+        self._threads = []
+        self._condition = threading.Condition()
+        self._worker = threading.local()
+
+    @property
+    def executor(self):
+        """
+        Tasks' thread pool.
+
+        :return:
+        """
+
+        with self._condition:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=self.max_workers,
+                                                    thread_name_prefix="async_orchestrator")
+            return self._executor
 
     def start_task(self, task):
         """
@@ -37,23 +67,87 @@ class AsyncOrchestrator:
             return False
 
         logger.info(f"Starting task '{task.id}' at {time.strftime('%X')}")
-        if task.id in self.tasks:
-            logger.error(f"Task with id {task.id} already in tasks: current traceback:")
-            ret = traceback.extract_stack()
-            for line in ret:
-                logger.error(line)
-            logger.error(f"Task with id {task.id} already in task: existing task traceback:")
-            for line in self.tasks[task.id].traceback:
-                logger.error(line)
-            raise self.ExistingTaskID(f"Task with id {task.id} already in tasks: {self.tasks}")
-        self.tasks[task.id] = task
-        task.traceback = traceback.extract_stack()
-
-        thread = threading.Thread(target=self.task_runner_thread, args=(task,))
-        thread.start()
-        logger.info(f"Started thread for '{task.id}' in start_task at {time.strftime('%X')}")
+        with self._condition:
+            if task.id in self.tasks:
+                logger.error(f"Task with id {task.id} already in tasks: current traceback:")
+                ret = traceback.extract_stack()
+                for line in ret:
+                    logger.error(line)
+                logger.error(f"Task with id {task.id} already in task: existing task traceback:")
+                for line in self.tasks[task.id].traceback:
+                    logger.error(line)
+                raise self.ExistingTaskID(f"Task with id {task.id} already in tasks: {self.tasks}")
+
+            missing_dependencies = [task_id for task_id in task.dependencies if task_id not in self.tasks]
+            if missing_dependencies:
+                raise ValueError(f"Task '{task.id}' depends on unknown tasks: {missing_dependencies}")
+
+            dependencies = [self.tasks[task_id] for task_id in task.dependencies]
+            self.tasks[task.id] = task
+            task.traceback = traceback.extract_stack()
+            task.future.add_done_callback(lambda _: self.task_done_callback(task))
+            self._condition.notify_all()
+
+        if not dependencies:
+            self.submit_task(task)
+        else:
+            self.start_task_after_dependencies(task, dependencies)
+        logger.info(f"Started '{task.id}' in start_task at {time.strftime('%X')}")
         return True
 
+    def submit_task(self, task):
+        """
+        Start the task's thread or submit to the thread pool.
+
+        :param task:
+        :return:
+        """
+
+        if self.max_workers is None:
+            thread = threading.Thread(target=self.task_runner_thread, args=(task,))
+            with self._condition:
+                self._threads = [alive_thread for alive_thread in self._threads if alive_thread.is_alive()]
+                self._threads.append(thread)
+            thread.start()
+            return
+
+        try:
+            self.executor.submit(self.task_runner_thread, task)
+        except RuntimeError as error_inst:
+            # Executor was shut down.
+            if task.future.set_running_or_notify_cancel():
+                task.future.set_exception(error_inst)
+
+    def start_task_after_dependencies(self, task, dependencies):
+        """
+        Submit the task when the last dependency finishes.
+
+        :param task:
+        :param dependencies:
+        :return:
+        """
+
+        lock = threading.Lock()
+        remaining = [len(dependencies)]
+
+        def dependency_done_callback(_):
+            with lock:
+                remaining[0] -= 1
+                if remaining[0]:
+                    return
+
+            failed = [dependency.id for dependency in dependencies if dependency.exception is not None]
+            if failed:
+                if task.future.set_running_or_notify_cancel():
+                    task.future.set_exception(self.DependencyFailedError(
+                        f"Task '{task.id}' dependencies failed: {failed}"))
+                return
+
+            self.submit_task(task)
+
+        for dependency in dependencies:
+            dependency.future.add_done_callback(dependency_done_callback)
+
     def task_runner_thread(self, task):
         """
         Task running thread
@@ -62,7 +156,13 @@ class AsyncOrchestrator:
         :return:
         """
 
+        if not task.future.set_running_or_notify_cancel():
+            logger.info(f"Task '{task.id}' was cancelled before start")
+            return
+
         logger.info(f"started task_runner_thread at {time.strftime('%X')}")
+        task.start_time = datetime.datetime.now()
+        self._worker.task = task
 
         try:
             if not self.alive:
@@ -77,7 +177,6 @@ class AsyncOrchestrator:
             task.exit_code = 0
             logger.info(f"Task '{task.id}' Set exit code = {task.exit_code}")
         except Exception as error_inst:
-            task.exception = error_inst
             logger.error(f"Exception output start {task.id}")
             logger.exception(error_inst)
             exc_info = traceback.format_exc()
@@ -85,104 +184,192 @@ class AsyncOrchestrator:
             for line in lines.split("\n"):
                 logger.error(line)
             logger.error(f"Exception output end {task.id}")
-
+            task.future.set_exception(error_inst)
+        else:
+            task.future.set_result(task.result)
         finally:
+            self._worker.task = None
+            if not task.future.done():
+                task.future.set_exception(RuntimeError(f"Task '{task.id}' was interrupted"))
+
+        logger.info(f"finished task_runner_thread at {time.strftime('%X')}")
+
+    def task_done_callback(self, task):
+        """
+        Task's future is done - succeeded, failed or cancelled.
+
+        :param task:
+        :return:
+        """
+
+        task.end_time = datetime.datetime.now()
+        if task.future.cancelled():
+            task.exception = CancelledError(f"Task '{task.id}' was cancelled")
+        else:
+            task.exception = task.future.exception()
+
+        with self._condition:
             logger.info(f"Setting task {task.id} as finished")
             task.finished = True
+            self._condition.notify_all()
 
-        logger.info(f"finished task_runner_thread at {time.strftime('%X')}")
+    def cancel_task(self, task_id):
+        """
+        Cancel the task if it did not start yet. Its dependent tasks fail.
 
-    def wait_for_tasks(self, sleep_time=1):
+        :param task_id:
+        :return: True if cancelled.
+        """
+
+        task = self.tasks[task_id]
+        cancelled = task.future.cancel()
+        logger.info(f"Cancel task '{task_id}': {'cancelled' if cancelled else 'already running or finished'}")
+        return cancelled
+
+    def check_worker_wait(self):
+        """
+        Waiting from a task on a bounded pool holds a worker the waited tasks may need.
+
+        :return:
+        """
+
+        task = getattr(self._worker, "task", None)
+        if task is not None and self.max_workers is not None:
+            logger.warning(f"Task '{task.id}' waits for tasks on a pool of {self.max_workers} workers - "
+                           f"it deadlocks if all the workers wait")
+
+    def wait_for_tasks(self, sleep_time=1, timeout=60 * 60):
         """
         Wait for all tasks to finish.
 
+        :param sleep_time: Progress log interval.
+        :param timeout:
         :return:
         """
         logger.info(f"started wait_for_tasks at {time.strftime('%X')}")
+        self.check_worker_wait()
 
-        end_time = datetime.datetime.now() + datetime.timedelta(hours=1)
-        while datetime.datetime.now() < end_time:
-            for task in self.tasks.values():
-                if not task.finished:
-                    logger.info(f"Task {task.id} is not yet finished")
-                    break
-            else:
-                logger.info("All tasks have finished.")
-                return True
+        end_time = datetime.datetime.now() + datetime.timedelta(seconds=timeout)
+        with self._condition:
+            while True:
+                not_finished = [task.id for task in self.tasks.values() if not task.finished]
+                if not not_finished:
+                    logger.info("All tasks have finished.")
+                    return True
 
-            logger.info(f"Waiting for tasks to finish. Going to sleep {sleep_time}")
-            time.sleep(sleep_time)
-        raise TimeoutError(f"Finished wait_for_tasks at {time.strftime('%X')}")
+                time_left = (end_time - datetime.datetime.now()).total_seconds()
+                if time_left <= 0:
+                    raise TimeoutError(f"Finished wait_for_tasks at {time.strftime('%X')}")
+
+                logger.info(f"Waiting for {len(not_finished)} tasks to finish.")
+                self._condition.wait(timeout=min(sleep_time, time_left))
 
     # pylint: disable= too-many-arguments, too-many-positional-arguments
     def get_task_result(self, task_id, sleep_time=1, timeout=20*60, start_timeout=60, silent_exit=False):
         """
-        Wait for all tasks to finish.
+        Wait for the task to finish and return its result.
 
+        :param task_id:
+        :param sleep_time: Progress log interval.
+        :param timeout:
+        :param start_timeout: Time to wait for the task to be started.
+        :param silent_exit: sys.exit with the task's exit code on failure.
         :return:
         """
         logger.info(f"started get_task_result at {time.strftime('%X')}")
+        self.check_worker_wait()
         now = datetime.datetime.now()
         end_time = now + datetime.timedelta(seconds=timeout)
         end_time_for_task_to_start = now + datetime.timedelta(seconds=start_timeout)
 
-        while datetime.datetime.now() < end_time_for_task_to_start:
-            if self.tasks.get(task_id):
-                break
-            logger.info(f"Waiting for task '{task_id}' to start. Going to sleep {sleep_time}")
-            time.sleep(sleep_time)
-        else:
-            raise TimeoutError(f"Task '{task_id}' did not start for {start_timeout} seconds. {time.strftime('%X')}")
-
-        task = self.tasks.get(task_id)
-
-        while datetime.datetime.now() < end_time:
-            if task.finished:
-                if task.exception:
-                    raise RuntimeError(f"Task failed: '{task_id}' look for 'Exception output start {task_id}' ") from task.exception
-                if task.exit_code != 0:
-                    logger.info(f"Task '{task_id}' exit code = {task.exit_code}")
-                    if task.exit_code is None:
-                        raise RuntimeError(f"Task exit code was not set: '{task_id}' exit code is None")
-
-                    if task.exit_code == 1:
-                        time.sleep(1)
-
-                    if task.exit_code == 0:
-                        continue
-
-                    if silent_exit:
-                        sys.exit(task.exit_code)
-                    raise RuntimeError(f"Task failed: '{task_id}' with exit code != 0")
-                return task.result
-
-            logger.info(f"Waiting for task '{task_id}' to start and finish. Going to sleep {sleep_time}")
-            time.sleep(sleep_time)
-        raise TimeoutError(f"Task did not finish during {timeout} seconds. {time.strftime('%X')}")
-
-    def start_task_from_function(self, function, *args, task_name=None, **kwargs):
+        with self._condition:
+            while task_id not in self.tasks:
+                time_left = (end_time_for_task_to_start - datetime.datetime.now()).total_seconds()
+                if time_left <= 0:
+                    raise TimeoutError(
+                        f"Task '{task_id}' did not start for {start_timeout} seconds. {time.strftime('%X')}")
+                logger.info(f"Waiting for task '{task_id}' to start.")
+                self._condition.wait(timeout=min(sleep_time, time_left))
+            task = self.tasks[task_id]
+
+            while not task.finished:
+                time_left = (end_time - datetime.datetime.now()).total_seconds()
+                if time_left <= 0:
+                    raise TimeoutError(f"Task did not finish during {timeout} seconds. {time.strftime('%X')}")
+                logger.info(f"Waiting for task '{task_id}' to finish.")
+                self._condition.wait(timeout=min(sleep_time, time_left))
+
+        if task.exception:
+            if silent_exit and task.exit_code:
+                sys.exit(task.exit_code)
+            raise RuntimeError(f"Task failed: '{task_id}' look for 'Exception output start {task_id}' ") from task.exception
+        return task.result
+
+    def start_task_from_function(self, function, *args, task_name=None, dependencies=None, **kwargs):
         """
         Create and run task
 
         :param function:
+        :param task_name: Task id, function name by default.
+        :param dependencies: Ids of the tasks to finish successfully before this one starts.
         :return:
         """
 
         task_name = task_name or function.__name__
-        task = AsyncOrchestrator.Task(task_name, function)
+        task = AsyncOrchestrator.Task(task_name, function, dependencies=dependencies)
         task.args = args
         task.kwargs = kwargs
         self.start_task(task)
         return task
 
+    def get_tasks_metrics(self):
+        """
+        Per task state and timing.
+
+        :return:
+        """
+
+        with self._condition:
+            tasks = list(self.tasks.values())
+
+        return {task.id: {"state": task.state,
+                          "queue_time": task.queue_time,
+                          "run_time": task.run_time} for task in tasks}
+
+    def shutdown(self, wait=True):
+        """
+        Stop accepting tasks, cancel not started ones.
+
+        :param wait: Wait for the running tasks.
+        :return:
+        """
+
+        self.alive = False
+        with self._condition:
+            tasks = list(self.tasks.values())
+            executor = self._executor
+            threads = list(self._threads)
+
+        for task in tasks:
+            task.future.cancel()
+
+        if executor is not None:
+            executor.shutdown(wait=wait)
+
+        if wait:
+            for thread in threads:
+                if thread is not threading.current_thread():
+                    thread.join()
+
     class Task:
         """
         Task to be run
         """
-        def __init__(self, task_id, function):
+
+        def __init__(self, task_id, function, dependencies=None):
             self.id = task_id
             self.function = function
-            self.started = True
+            self.started = False
             self.result = None
             self.finished = False
             self.exception = None
@@ -190,6 +377,52 @@ class AsyncOrchestrator:
             self.traceback = None
             self.args = []
             self.kwargs = {}
+            self.dependencies = list(dependencies) if dependencies else []
+            self.future = Future()
+            self.created_time = datetime.datetime.now()
+            self.start_time = None
+            self.end_time = None
+
+        @property
+        def state(self):
+            """
+            pending, running, succeeded, failed or cancelled.
+
+            :return:
+            """
+
+            if self.future.cancelled():
+                return "cancelled"
+            if not self.finished:
+                return "running" if self.started else "pending"
+            return "failed" if self.exception is not None else "succeeded"
+
+        @property
+        def queue_time(self):
+            """
+            Seconds from creation to start.
+
+            :return:
+            """
+
+            return None if self.start_time is None else (self.start_time - self.created_time).total_seconds()
+
+        @property
+        def run_time(self):
+            """
+            Seconds from start to end.
+
+            :return:
+            """
+
+            if self.start_time is None or self.end_time is None:
+                return None
+            return (self.end_time - self.start_time).total_seconds()
 
     class ExistingTaskID(RuntimeError):
         pass
+
+    class DependencyFailedError(RuntimeError):
+        """
+        Task's dependency failed or was cancelled.
+        """
@@ -32,3 +32,91 @@ def test_get_task_result():
     async_orchestrator.start_task(task)
     ret = async_orchestrator.get_task_result(task.id)
     assert ret == test(timeout=0)
+
+
+@pytest.mark.done
+def test_get_task_result_no_polling_latency():
+    async_orchestrator = AsyncOrchestrator(max_workers=2)
+    task = async_orchestrator.start_task_from_function(test, timeout=0.1)
+    start = time.perf_counter()
+    assert async_orchestrator.get_task_result(task.id) == 1
+    assert time.perf_counter() - start < 0.5
+    assert task.future.result() == 1
+    assert async_orchestrator.get_tasks_metrics()[task.id]["state"] == "succeeded"
+
+
+@pytest.mark.done
+def test_bounded_pool():
+    async_orchestrator = AsyncOrchestrator(max_workers=2)
+    for index in range(6):
+        async_orchestrator.start_task_from_function(test, timeout=0.1, task_name=f"test_{index}")
+    start = time.perf_counter()
+    async_orchestrator.wait_for_tasks()
+    assert time.perf_counter() - start >= 0.3
+    assert all(task.result == 1 for task in async_orchestrator.tasks.values())
+
+
+@pytest.mark.done
+def test_dependencies():
+    async_orchestrator = AsyncOrchestrator(max_workers=4)
+    finished = []
+
+    def append(name, timeout=0.0):
+        time.sleep(timeout)
+        finished.append(name)
+        return name
+
+    async_orchestrator.start_task_from_function(append, "first", 0.2, task_name="first")
+    async_orchestrator.start_task_from_function(append, "second", task_name="second")
+    async_orchestrator.start_task_from_function(append, "third", task_name="third", dependencies=["first", "second"])
+    assert async_orchestrator.get_task_result("third") == "third"
+    assert finished == ["second", "first", "third"]
+
+    with pytest.raises(ValueError):
+        async_orchestrator.start_task_from_function(append, "fourth", task_name="fourth", dependencies=["missing"])
+
+
+@pytest.mark.done
+def test_failed_dependency():
+    async_orchestrator = AsyncOrchestrator()
+
+    def fail():
+        raise ValueError("fail")
+
+    async_orchestrator.start_task_from_function(fail)
+    async_orchestrator.start_task_from_function(test, task_name="dependent", dependencies=["fail"])
+    with pytest.raises(RuntimeError):
+        async_orchestrator.get_task_result("dependent")
+    assert isinstance(async_orchestrator.tasks["dependent"].exception, AsyncOrchestrator.DependencyFailedError)
+
+
+@pytest.mark.done
+def test_cancel_task():
+    async_orchestrator = AsyncOrchestrator(max_workers=1)
+    async_orchestrator.start_task_from_function(test, timeout=0.2, task_name="running")
+    async_orchestrator.start_task_from_function(test, timeout=0, task_name="pending")
+    async_orchestrator.start_task_from_function(test, timeout=0, task_name="dependent", dependencies=["pending"])
+    time.sleep(0.05)
+    assert async_orchestrator.cancel_task("pending")
+    assert not async_orchestrator.cancel_task("running")
+    async_orchestrator.wait_for_tasks()
+    metrics = async_orchestrator.get_tasks_metrics()
+    assert metrics["running"]["state"] == "succeeded"
+    assert metrics["running"]["run_time"] >= 0.2
+    assert metrics["pending"]["state"] == "cancelled"
+    assert metrics["dependent"]["state"] == "failed"
+
+
+@pytest.mark.done
+def test_default_thread_per_task_nested_waits():
+    async_orchestrator = AsyncOrchestrator()
+    count = 64
+
+    def wait_for_next(index):
+        return async_orchestrator.get_task_result(f"task_{index + 1}", timeout=5, start_timeout=5) + 1
+
+    for index in range(count):
+        async_orchestrator.start_task_from_function(wait_for_next, index, task_name=f"task_{index}")
+    async_orchestrator.start_task_from_function(lambda: 0, task_name=f"task_{count}")
+    assert async_orchestrator.get_task_result("task_0", timeout=10) == count
+    async_orchestrator.shutdown()
@@ -11,6 +11,7 @@ import datetime
 import time
 import zipfile
 from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 
 from horey.aws_api.aws_clients.ecr_client import Boto3Client, ECRClient
@@ -28,6 +29,7 @@ from horey.aws_api.aws_clients.application_auto_scaling_client import (
 )
 from horey.aws_api.aws_services_entities.auto_scaling_group import AutoScalingGroup
 from horey.aws_api.aws_clients.s3_client import S3Client
+from horey.aws_api.aws_clients.s3_inventory import S3InventorySummary
 from horey.aws_api.aws_services_entities.s3_bucket import S3Bucket
 
 from horey.aws_api.aws_clients.elbv2_client import ELBV2Client
@@ -88,6 +90,7 @@ from horey.aws_api.aws_clients.eks_client import EKSClient
 from horey.aws_api.base_entities.region import Region
 
 from horey.common_utils.common_utils import CommonUtils
+from horey.common_utils.objects_index import ObjectsIndex
 
 from horey.h_logger import get_logger
 from horey.common_utils.text_block import TextBlock
@@ -231,12 +234,58 @@ class AWSAPI:
         self.sns_subscriptions = []
         self.eks_addons = []
         self.eks_clusters = []
+        self._objects_indexes = {}
 
         self.configuration = configuration
         self.aws_accounts = None
         if init_configuration:
             self.init_configuration()
 
+    def find_objects(self, collection_name, values, max_count=None):
+        """
+        Indexed CommonUtils.find_objects_by_values over self collection.
+        The index is built on first use and rebuilt when the collection is re-inited or its length changes.
+
+        :param collection_name: self attribute name, e.g. "lambdas"
+        :param values: dict of attribute name - value
+        :param max_count: Maximum amount to return
+        :return:
+        """
+
+        return self.get_objects_index(collection_name, values.keys()).find(values, max_count=max_count)
+
+    def get_objects_index(self, collection_name, attributes):
+        """
+        Get or build the hash index of self collection by the attributes.
+
+        :param collection_name:
+        :param attributes:
+        :return:
+        """
+
+        attributes = tuple(sorted(attributes))
+        objects = getattr(self, collection_name)
+        index = self._objects_indexes.get((collection_name, attributes))
+        if index is None or not index.is_valid(objects):
+            index = ObjectsIndex(objects, attributes)
+            self._objects_indexes[(collection_name, attributes)] = index
+        return index
+
+    def invalidate_objects_indexes(self, collection_name=None):
+        """
+        Drop indexes. Called by init_* methods, otherwise needed only if objects were replaced or changed in place.
+
+        :param collection_name: None - all collections.
+        :return:
+        """
+
+        if collection_name is None:
+            self._objects_indexes = {}
+            return
+
+        for key in [key for key in self._objects_indexes if key[0] == collection_name]:
+            del self._objects_indexes[key]
+
     def init_configuration(self):
         """
         Sets current active account from configuration
@@ -324,6 +373,7 @@ class AWSAPI:
         """
 
         self.ecs_container_instances = list(self.ecs_client.yield_container_instances())
+        self.invalidate_objects_indexes("ecs_container_instances")
 
     def init_managed_prefix_lists(
             self, region=None, full_information=True
@@ -341,6 +391,7 @@ class AWSAPI:
             )
 
         self.managed_prefix_lists = objects
+        self.invalidate_objects_indexes("managed_prefix_lists")
 
     def init_vpcs(self, region=None):
         """
@@ -358,6 +409,7 @@ class AWSAPI:
             objects += self.ec2_client.get_all_vpcs(region=_region)
 
         self.vpcs = objects
+        self.invalidate_objects_indexes("vpcs")
 
     @property
     def subnets(self):
@@ -387,6 +439,7 @@ class AWSAPI:
             objects += self.ec2_client.get_all_subnets(region=_region, update_info=update_info)
 
         self._subnets = objects
+        self.invalidate_objects_indexes("subnets")
 
     def init_glue_tables(self, region=None):
         """
@@ -404,6 +457,7 @@ class AWSAPI:
             objects += self.glue_client.get_all_tables(region=_region)
 
         self.glue_tables = objects
+        self.invalidate_objects_indexes("glue_tables")
 
     def init_glue_databases(self, region=None):
         """
@@ -421,6 +475,7 @@ class AWSAPI:
             objects += self.glue_client.get_all_databases(region=_region)
 
         self.glue_databases = objects
+        self.invalidate_objects_indexes("glue_databases")
 
     def init_availability_zones(self):
         """
@@ -432,6 +487,7 @@ class AWSAPI:
         objects = self.ec2_client.get_all_availability_zones()
 
         self.availability_zones = objects
+        self.invalidate_objects_indexes("availability_zones")
 
     def init_nat_gateways(self, region=None):
         """
@@ -444,6 +500,7 @@ class AWSAPI:
         objects = self.ec2_client.get_all_nat_gateways(region=region)
 
         self.nat_gateways = objects
+        self.invalidate_objects_indexes("nat_gateways")
 
     def init_dynamodb_tables(self, region=None, full_information=False):
         """
@@ -455,6 +512,7 @@ class AWSAPI:
         """
 
         self.dynamodb_tables = self.dynamodb_client.get_all_tables(region=region, full_information=full_information)
+        self.invalidate_objects_indexes("dynamodb_tables")
 
     def init_dynamodb_endpoints(self, region=None):
         """
@@ -467,6 +525,7 @@ class AWSAPI:
         objects = self.dynamodb_client.get_all_endpoints(region=region)
 
         self.dynamodb_endpoints = objects
+        self.invalidate_objects_indexes("dynamodb_endpoints")
 
     def init_sesv2_email_identities(
             self,region=None
@@ -479,6 +538,7 @@ class AWSAPI:
         """
 
         self.sesv2_email_identities = self.sesv2_client.get_all_email_identities(region=region)
+        self.invalidate_objects_indexes("sesv2_email_identities")
 
     def init_ses_identities(
             self, region=None
@@ -491,6 +551,7 @@ class AWSAPI:
         """
 
         self.ses_identities = list(self.ses_client.yield_identities(region=region, full_information=True))
+        self.invalidate_objects_indexes("ses_identities")
 
     def init_sesv2_accounts(
             self, region=None
@@ -503,6 +564,7 @@ class AWSAPI:
         """
 
         self.sesv2_accounts = list(self.sesv2_client.yield_accounts(region=region))
+        self.invalidate_objects_indexes("sesv2_accounts")
 
     def init_sesv2_email_templates(self, region=None):
         """
@@ -513,6 +575,7 @@ class AWSAPI:
         """
 
         self.sesv2_email_templates = self.sesv2_client.get_all_email_templates(region=region)
+        self.invalidate_objects_indexes("sesv2_email_templates")
 
     def init_sesv2_configuration_sets(
             self, region=None, full_information=True
@@ -526,6 +589,7 @@ class AWSAPI:
         """
 
         self.sesv2_configuration_sets = self.sesv2_client.get_all_configuration_sets(region=region, full_information=full_information)
+        self.invalidate_objects_indexes("sesv2_configuration_sets")
 
     def init_sns_topics(self, region=None):
         """
@@ -536,6 +600,7 @@ class AWSAPI:
         """
 
         self.sns_topics = self.sns_client.get_all_topics(region=region)
+        self.invalidate_objects_indexes("sns_topics")
 
     def init_sns_subscriptions(self, region=None):
         """
@@ -546,6 +611,7 @@ class AWSAPI:
         """
 
         self.sns_subscriptions = self.sns_client.get_all_subscriptions(region=region)
+        self.invalidate_objects_indexes("sns_subscriptions")
 
     def init_eks_clusters(self, region=None):
         """
@@ -558,6 +624,7 @@ class AWSAPI:
         objects = self.eks_client.get_all_clusters(region=region)
 
         self.eks_clusters = objects
+        self.invalidate_objects_indexes("eks_clusters")
         return objects
 
     def init_eks_addons(self, region=None):
@@ -571,6 +638,7 @@ class AWSAPI:
         objects = self.eks_client.get_all_addons(region=region)
 
         self.eks_addons = objects
+        self.invalidate_objects_indexes("eks_addons")
         return objects
 
     def init_ecr_images(self):
@@ -581,6 +649,7 @@ class AWSAPI:
         """
 
         self.ecr_images = self.ecr_client.get_all_images()
+        self.invalidate_objects_indexes("ecr_images")
 
     def init_ecr_repositories(self, region=None):
         """
@@ -593,6 +662,7 @@ class AWSAPI:
         objects = self.ecr_client.get_all_repositories(region=region)
 
         self.ecr_repositories = objects
+        self.invalidate_objects_indexes("ecr_repositories")
 
     def init_ecs_clusters(self, region=None):
         """
@@ -610,6 +680,7 @@ class AWSAPI:
                 self.ecs_clusters += self.ecs_client.get_all_clusters(region=region)
         else:
             self.ecs_clusters += self.ecs_client.get_all_clusters(region=region)
+        self.invalidate_objects_indexes("ecs_clusters")
 
     def init_ecs_capacity_providers(
             self, region=None
@@ -622,6 +693,7 @@ class AWSAPI:
         """
 
         self.ecs_capacity_providers = self.ecs_client.get_all_capacity_providers(region=region)
+        self.invalidate_objects_indexes("ecs_capacity_providers")
 
     def init_ecs_services(self, region=None):
         """
@@ -639,6 +711,7 @@ class AWSAPI:
                 self.ecs_services += self.ecs_client.get_all_services(region=region)
         else:
             self.ecs_services = self.ecs_client.get_all_services(region=region)
+        self.invalidate_objects_indexes("ecs_services")
 
     def init_ecs_task_definitions(self, region=None):
         """
@@ -658,6 +731,7 @@ class AWSAPI:
                 self.ecs_task_definitions += self.ecs_client.get_all_task_definitions(region=region)
         else:
             self.ecs_task_definitions = self.ecs_client.get_all_task_definitions(region=region)
+        self.invalidate_objects_indexes("ecs_task_definitions")
 
     def init_ecs_tasks(self, region=None):
         """
@@ -677,6 +751,7 @@ class AWSAPI:
                 self.ecs_tasks += self.ecs_client.get_all_tasks(region=region)
         else:
             self.ecs_tasks = self.ecs_client.get_all_tasks(region=region)
+        self.invalidate_objects_indexes("ecs_tasks")
 
     def init_auto_scaling_groups(self, region=None):
         """
@@ -689,6 +764,7 @@ class AWSAPI:
         objects = self.autoscaling_client.get_all_auto_scaling_groups(region=region)
 
         self.auto_scaling_groups = objects
+        self.invalidate_objects_indexes("auto_scaling_groups")
 
     def init_auto_scaling_policies(
             self, region=None
@@ -703,6 +779,7 @@ class AWSAPI:
         objects = self.autoscaling_client.get_all_policies(region=region)
 
         self.auto_scaling_policies = objects
+        self.invalidate_objects_indexes("auto_scaling_policies")
 
     def init_application_auto_scaling_policies(
             self, region=None
@@ -719,6 +796,7 @@ class AWSAPI:
             )
 
         self.application_auto_scaling_policies = objects
+        self.invalidate_objects_indexes("application_auto_scaling_policies")
 
     def init_application_auto_scaling_scalable_targets(
             self, region=None
@@ -735,6 +813,7 @@ class AWSAPI:
             )
 
         self.application_auto_scaling_scalable_targets = objects
+        self.invalidate_objects_indexes("application_auto_scaling_scalable_targets")
 
     def init_amis(self):
         """
@@ -746,6 +825,7 @@ class AWSAPI:
         objects = self.ec2_client.get_all_amis()
 
         self.amis = objects
+        self.invalidate_objects_indexes("amis")
 
     def init_key_pairs(self):
         """
@@ -757,6 +837,7 @@ class AWSAPI:
         objects = self.ec2_client.get_all_key_pairs()
 
         self.key_pairs = objects
+        self.invalidate_objects_indexes("key_pairs")
 
     def init_internet_gateways(self):
         """
@@ -768,6 +849,7 @@ class AWSAPI:
         objects = self.ec2_client.get_all_internet_gateways()
 
         self.internet_gateways = objects
+        self.invalidate_objects_indexes("internet_gateways")
 
     def init_vpc_peerings(self, region=None):
         """
@@ -780,6 +862,7 @@ class AWSAPI:
         objects = self.ec2_client.get_all_vpc_peerings(region=region)
 
         self.vpc_peerings = objects
+        self.invalidate_objects_indexes("vpc_peerings")
 
     @property
     def route_tables(self):
@@ -804,6 +887,7 @@ class AWSAPI:
         objects = self.ec2_client.get_all_route_tables(region=region)
 
         self._route_tables = objects
+        self.invalidate_objects_indexes("route_tables")
 
     def init_elastic_addresses(self, region=None):
         """
@@ -816,6 +900,7 @@ class AWSAPI:
         objects = self.ec2_client.get_all_elastic_addresses(region=region)
 
         self.elastic_addresses = objects
+        self.invalidate_objects_indexes("elastic_addresses")
 
     def init_network_interfaces(self):
         """
@@ -825,6 +910,7 @@ class AWSAPI:
         """
 
         self.network_interfaces = self.ec2_client.get_all_interfaces()
+        self.invalidate_objects_indexes("network_interfaces")
 
         return self.network_interfaces
 
@@ -844,6 +930,7 @@ class AWSAPI:
                 self.ec2_instances += self.ec2_client.get_all_instances(region=region)
         else:
             self.ec2_instances = self.ec2_client.get_all_instances(region=region)
+        self.invalidate_objects_indexes("ec2_instances")
 
     def init_ec2_volumes(self, region=None):
         """
@@ -853,6 +940,7 @@ class AWSAPI:
         """
 
         self.ec2_volumes = self.ec2_client.get_all_volumes(region=region)
+        self.invalidate_objects_indexes("ec2_volumes")
 
     def init_spot_fleet_requests(self):
         """
@@ -864,6 +952,7 @@ class AWSAPI:
         objects = self.ec2_client.get_all_spot_fleet_requests()
 
         self.spot_fleet_requests = objects
+        self.invalidate_objects_indexes("spot_fleet_requests")
 
     def init_ec2_launch_templates(self):
         """
@@ -875,6 +964,7 @@ class AWSAPI:
         objects = self.ec2_client.get_all_ec2_launch_templates()
 
         self.ec2_launch_templates = objects
+        self.invalidate_objects_indexes("ec2_launch_templates")
 
     def init_ec2_launch_template_versions(self):
         """
@@ -885,6 +975,7 @@ class AWSAPI:
         objects =  self.ec2_client.get_all_launch_template_versions()
 
         self.ec2_launch_template_versions = objects
+        self.invalidate_objects_indexes("ec2_launch_template_versions")
 
     def init_s3_buckets(self, full_information=True):
         """
@@ -897,6 +988,7 @@ class AWSAPI:
         objects = self.s3_client.get_all_buckets(full_information=full_information)
 
         self.s3_buckets = objects
+        self.invalidate_objects_indexes("s3_buckets")
 
     def init_iam_users(self):
         """
@@ -914,6 +1006,7 @@ class AWSAPI:
                 self.users += self.iam_client.get_all_users()
         else:
             self.users = self.iam_client.get_all_users()
+        self.invalidate_objects_indexes("users")
 
     def init_iam_roles(self):
         """
@@ -932,6 +1025,7 @@ class AWSAPI:
                 self.iam_roles += self.iam_client.get_all_roles()
         else:
             self.iam_roles = self.iam_client.get_all_roles()
+        self.invalidate_objects_indexes("iam_roles")
 
     def init_iam_instance_profiles(self):
         """
@@ -950,6 +1044,7 @@ class AWSAPI:
                 self.iam_instance_profiles += self.iam_client.get_all_instance_profiles()
         else:
             self.iam_instance_profiles = self.iam_client.get_all_instance_profiles()
+        self.invalidate_objects_indexes("iam_instance_profiles")
 
     def cache_raw_cloud_watch_metrics(self, cache_dir):
         """
@@ -972,6 +1067,7 @@ class AWSAPI:
         objects = self.cloud_watch_client.get_all_alarms()
 
         self.cloud_watch_alarms = objects
+        self.invalidate_objects_indexes("cloud_watch_alarms")
 
     def init_cloud_watch_metrics(self, update_info=False):
         """
@@ -982,6 +1078,7 @@ class AWSAPI:
         """
 
         self.cloud_watch_metrics = self.cloud_watch_client.get_all_metrics(update_info=update_info)
+        self.invalidate_objects_indexes("cloud_watch_metrics")
 
     def init_cloud_watch_log_groups(self):
         """
@@ -993,6 +1090,7 @@ class AWSAPI:
         objects = self.cloud_watch_logs_client.get_cloud_watch_log_groups()
 
         self.cloud_watch_log_groups = objects
+        self.invalidate_objects_indexes("cloud_watch_log_groups")
 
     def init_cloud_watch_log_groups_metric_filters(
             self
@@ -1006,6 +1104,7 @@ class AWSAPI:
         objects = self.cloud_watch_logs_client.get_log_group_metric_filters()
 
         self.cloud_watch_log_groups_metric_filters = objects
+        self.invalidate_objects_indexes("cloud_watch_log_groups_metric_filters")
 
     def init_and_cache_raw_large_cloud_watch_log_groups(
             self, cloudwatch_log_groups_streams_cache_dir, log_group_names=None
@@ -1049,6 +1148,7 @@ class AWSAPI:
                 self.iam_policies += self.iam_client.get_all_policies()
         else:
             self.iam_policies = self.iam_client.get_all_policies()
+        self.invalidate_objects_indexes("iam_policies")
 
     def init_iam_groups(self):
         """
@@ -1065,6 +1165,7 @@ class AWSAPI:
                 self.iam_groups += self.iam_client.get_all_groups()
         else:
             self.iam_groups = self.iam_client.get_all_groups()
+        self.invalidate_objects_indexes("iam_groups")
 
     def init_and_cache_s3_bucket_objects_synchronous(self, buckets_objects_cache_dir):
         """
@@ -1128,6 +1229,96 @@ class AWSAPI:
                 )
                 continue
 
+    def generate_s3_inventory_summary(self, summarised_data_file, bucket_name=None, max_workers=16,
+                                      prefix_depth=1):
+        """
+        Summarise buckets' objects while listing - nothing is cached per object.
+        Buckets are partitioned by their top level prefixes, partitions are listed concurrently.
+
+        :param summarised_data_file: Columnar summary file.
+        :param bucket_name: Single bucket.
+        :param max_workers:
+        :param prefix_depth: Per prefix summary depth.
+        :return:
+        """
+
+        buckets = [bucket for bucket in self.s3_buckets if bucket_name is None or bucket.name == bucket_name]
+        summary = S3InventorySummary(prefix_depth=prefix_depth)
+
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            partitions = []
+            for bucket, (bucket_summary, prefixes) in zip(buckets, executor.map(
+                    lambda bucket: self.summarise_s3_bucket_prefix(bucket.name, prefix_depth, delimiter="/"),
+                    buckets)):
+                summary.merge(bucket_summary)
+                partitions += [(bucket.name, prefix) for prefix in prefixes]
+
+            logger.info(f"Listing {len(partitions)} prefixes in {len(buckets)} buckets")
+            for bucket_summary, _ in executor.map(
+                    lambda partition: self.summarise_s3_bucket_prefix(partition[0], prefix_depth, prefix=partition[1]),
+                    partitions):
+                summary.merge(bucket_summary)
+
+        summary.write(summarised_data_file)
+        return summary
+
+    def summarise_s3_bucket_prefix(self, bucket_name, prefix_depth, prefix=None, delimiter=None):
+        """
+        Summarise objects under the prefix.
+
+        :param bucket_name:
+        :param prefix_depth:
+        :param prefix:
+        :param delimiter: "/" - summarise only the top level objects and return the sub prefixes.
+        :return: summary, sub prefixes
+        """
+
+        summary = S3InventorySummary(prefix_depth=prefix_depth)
+        prefixes = []
+        counter = 0
+        try:
+            for page in self.s3_client.yield_bucket_objects_pages(bucket_name, prefix=prefix, delimiter=delimiter):
+                counter += summary.add_objects_page(bucket_name, page)
+                prefixes += [common_prefix["Prefix"] for common_prefix in page.get("CommonPrefixes", [])]
+        except Exception as inst:
+            if "AccessDenied" not in repr(inst):
+                raise
+            logger.warning(f"Listing bucket '{bucket_name}' failed: {repr(inst)}")
+
+        logger.info(f"Summarised {counter} objects in '{bucket_name}/{prefix or ''}'")
+        return summary, prefixes
+
+    def generate_s3_inventory_manifest_summary(self, manifest_bucket_name, manifest_key, summarised_data_file,
+                                               max_workers=16, prefix_depth=1):
+        """
+        Summarise S3 Inventory report (CSV format) - the data files are streamed concurrently.
+
+        :param manifest_bucket_name:
+        :param manifest_key: .../manifest.json
+        :param summarised_data_file: Columnar summary file.
+        :param max_workers:
+        :param prefix_depth:
+        :return:
+        """
+
+        manifest = json.load(self.s3_client.get_object_body(manifest_bucket_name, manifest_key))
+        destination_bucket_name, file_schema, keys = S3InventorySummary.get_inventory_manifest_files(manifest)
+
+        def summarise_inventory_file(key):
+            file_summary = S3InventorySummary(prefix_depth=prefix_depth)
+            counter = file_summary.add_inventory_csv_file(
+                self.s3_client.get_object_body(destination_bucket_name, key), file_schema)
+            logger.info(f"Summarised {counter} objects from inventory file '{key}'")
+            return file_summary
+
+        summary = S3InventorySummary(prefix_depth=prefix_depth)
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            for file_summary in executor.map(summarise_inventory_file, keys):
+                summary.merge(file_summary)
+
+        summary.write(summarised_data_file)
+        return summary
+
     def init_lambdas(self, full_information=True):
         """
         Init AWS lambdas
@@ -1148,6 +1339,7 @@ class AWSAPI:
             self.lambdas = self.lambda_client.get_all_lambdas(
                 full_information=full_information
             )
+        self.invalidate_objects_indexes("lambdas")
 
     def init_load_balancers(self, region=None):
         """
@@ -1157,6 +1349,7 @@ class AWSAPI:
         """
 
         self.load_balancers = self.elbv2_client.get_all_load_balancers(region=region)
+        self.invalidate_objects_indexes("load_balancers")
 
     def init_classic_load_balancers(self):
         """
@@ -1168,6 +1361,7 @@ class AWSAPI:
         objects = self.elb_client.get_all_load_balancers()
 
         self.classic_load_balancers = objects
+        self.invalidate_objects_indexes("classic_load_balancers")
 
     def init_hosted_zones(
             self, full_information=True
@@ -1183,6 +1377,7 @@ class AWSAPI:
             )
 
         self.hosted_zones = objects
+        self.invalidate_objects_indexes("hosted_zones")
 
     def init_cloudfront_distributions(
             self, full_information=True
@@ -1198,6 +1393,7 @@ class AWSAPI:
             )
 
         self.cloudfront_distributions = objects
+        self.invalidate_objects_indexes("cloudfront_distributions")
 
     def init_cloudfront_origin_access_identities(
             self, full_information=True
@@ -1213,6 +1409,7 @@ class AWSAPI:
             )
 
         self.cloudfront_origin_access_identities = objects
+        self.invalidate_objects_indexes("cloudfront_origin_access_identities")
 
     def init_event_bridge_rules(
             self, full_information=True
@@ -1227,6 +1424,7 @@ class AWSAPI:
             )
 
         self.event_bridge_rules = objects
+        self.invalidate_objects_indexes("event_bridge_rules")
 
     def init_servicediscovery_services(
             self, region=None
@@ -1242,6 +1440,7 @@ class AWSAPI:
             )
 
         self.servicediscovery_services = objects
+        self.invalidate_objects_indexes("servicediscovery_services")
 
     def init_servicediscovery_namespaces(
             self, region=None
@@ -1257,6 +1456,7 @@ class AWSAPI:
             )
 
         self.servicediscovery_namespaces = objects
+        self.invalidate_objects_indexes("servicediscovery_namespaces")
 
     def init_elasticsearch_domains(
             self,
@@ -1270,6 +1470,7 @@ class AWSAPI:
         objects = self.elasticsearch_client.get_all_domains()
 
         self.elasticsearch_domains = objects
+        self.invalidate_objects_indexes("elasticsearch_domains")
 
     def init_secrets_manager_secrets(
             self, full_information=True
@@ -1285,6 +1486,7 @@ class AWSAPI:
             )
 
         self.secrets_manager_secrets = objects
+        self.invalidate_objects_indexes("secrets_manager_secrets")
 
     def init_rds_db_subnet_groups(self, region=None):
         """
@@ -1296,6 +1498,7 @@ class AWSAPI:
         objects = self.rds_client.get_all_db_subnet_groups(region=region)
 
         self.rds_db_subnet_groups = objects
+        self.invalidate_objects_indexes("rds_db_subnet_groups")
 
     def init_rds_db_cluster_parameter_groups(
             self, region=None
@@ -1309,6 +1512,7 @@ class AWSAPI:
         objects = self.rds_client.get_all_db_cluster_parameter_groups(region=region)
 
         self.rds_db_cluster_parameter_groups = objects
+        self.invalidate_objects_indexes("rds_db_cluster_parameter_groups")
 
     def init_rds_db_cluster_snapshots(
             self, region=None
@@ -1322,6 +1526,7 @@ class AWSAPI:
         objects = self.rds_client.get_all_db_cluster_snapshots(region=region)
 
         self.rds_db_cluster_snapshots = objects
+        self.invalidate_objects_indexes("rds_db_cluster_snapshots")
 
     def init_rds_db_parameter_groups(
             self, region=None
@@ -1335,6 +1540,7 @@ class AWSAPI:
         objects = self.rds_client.get_all_db_parameter_groups(region=region)
 
         self.rds_db_parameter_groups = objects
+        self.invalidate_objects_indexes("rds_db_parameter_groups")
 
     def init_rds_db_instances(self, region=None):
         """
@@ -1346,6 +1552,7 @@ class AWSAPI:
         objects = self.rds_client.get_all_db_instances(region=region)
 
         self.rds_db_instances = objects
+        self.invalidate_objects_indexes("rds_db_instances")
 
     def init_rds_db_clusters(self, region=None, full_information=False, update_info=False):
         """
@@ -1358,6 +1565,7 @@ class AWSAPI:
         objects = self.rds_client.get_all_db_clusters(region=region, full_information=full_information, update_info=update_info)
 
         self.rds_db_clusters = objects
+        self.invalidate_objects_indexes("rds_db_clusters")
 
     def init_elasticache_clusters(self, region=None):
         """
@@ -1369,6 +1577,7 @@ class AWSAPI:
         objects = self.elasticache_client.get_all_clusters(region=region)
 
         self.elasticache_clusters = objects
+        self.invalidate_objects_indexes("elasticache_clusters")
 
     def init_elasticache_cache_parameter_groups(
             self, region=None
@@ -1384,6 +1593,7 @@ class AWSAPI:
             )
 
         self.elasticache_cache_parameter_groups = objects
+        self.invalidate_objects_indexes("elasticache_cache_parameter_groups")
 
     def init_elasticache_cache_subnet_groups(
             self, region=None
@@ -1397,6 +1607,7 @@ class AWSAPI:
         objects = self.elasticache_client.get_all_cache_subnet_groups(region=region)
 
         self.elasticache_cache_subnet_groups = objects
+        self.invalidate_objects_indexes("elasticache_cache_subnet_groups")
 
     def init_elasticache_cache_security_groups(
             self, region=None
@@ -1412,6 +1623,7 @@ class AWSAPI:
             )
 
         self.elasticache_cache_security_groups = objects
+        self.invalidate_objects_indexes("elasticache_cache_security_groups")
 
     def init_elasticache_replication_groups(
             self, region=None
@@ -1425,6 +1637,7 @@ class AWSAPI:
         objects = self.elasticache_client.get_all_replication_groups(region=region)
 
         self.elasticache_replication_groups = objects
+        self.invalidate_objects_indexes("elasticache_replication_groups")
 
     def init_sqs_queues(self, region=None):
         """
@@ -1434,6 +1647,7 @@ class AWSAPI:
         """
 
         self.sqs_queues = self.sqs_client.get_all_queues(region=region)
+        self.invalidate_objects_indexes("sqs_queues")
 
     def init_lambda_event_source_mappings(
             self, region=None
@@ -1453,6 +1667,7 @@ class AWSAPI:
                 self.lambda_event_source_mappings += self.lambda_client.get_all_event_source_mappings(region=region)
         else:
             self.lambda_event_source_mappings = self.lambda_client.get_all_event_source_mappings(region=region)
+        self.invalidate_objects_indexes("lambda_event_source_mappings")
 
     def init_target_groups(self, update_info=False):
         """
@@ -1463,6 +1678,7 @@ class AWSAPI:
         """
 
         self.target_groups = self.elbv2_client.get_all_target_groups(update_info=update_info)
+        self.invalidate_objects_indexes("target_groups")
 
     def init_acm_certificates(self):
         """
@@ -1473,6 +1689,7 @@ class AWSAPI:
         objects = self.acm_client.get_all_certificates()
 
         self.acm_certificates = objects
+        self.invalidate_objects_indexes("acm_certificates")
 
     def init_kms_keys(self):
         """
@@ -1484,6 +1701,7 @@ class AWSAPI:
         objects = self.kms_client.get_all_keys()
 
         self.kms_keys = objects
+        self.invalidate_objects_indexes("kms_keys")
 
     def init_security_groups(
             self
@@ -1497,6 +1715,7 @@ class AWSAPI:
         objects = self.ec2_client.get_all_security_groups(
             )
         self.security_groups = objects
+        self.invalidate_objects_indexes("security_groups")
 
     @staticmethod
     def cache_objects_from_generator(generator, sub_dir):
@@ -1651,6 +1870,9 @@ class AWSAPI:
         with open(summarised_data_file, encoding="utf-8") as fh:
             all_buckets = json.load(fh)
 
+        if S3InventorySummary.is_columnar(all_buckets):
+            all_buckets = S3InventorySummary.init_from_dict(all_buckets).to_by_date_split()
+
         by_bucket_sorted_data = {}
 
         for bucket_name, bucket_data in all_buckets.items():
@@ -0,0 +1,278 @@
+"""
+Client side rate limiting of AWS API calls.
+Token bucket and retry budget per (account, region, service) with AIMD rate adjustment.
+
+"""
+
+import random
+import threading
+import time
+
+from horey.h_logger import get_logger
+
+logger = get_logger()
+
+
+class RetryBudgetExhaustedError(RuntimeError):
+    """
+    No retries left in the retry budget.
+
+    """
+
+
+class TokenBucket:
+    """
+    Token bucket. The refill rate is increased additively on success and
+    decreased multiplicatively on throttling.
+
+    """
+
+    # pylint: disable= too-many-instance-attributes
+    # pylint: disable= too-many-arguments, too-many-positional-arguments
+    def __init__(self, rate=None, min_rate=0.5, max_rate=100.0, increase_step=0.5, decrease_factor=0.5):
+        self.min_rate = min_rate
+        self.max_rate = max_rate
+        self.increase_step = increase_step
+        self.decrease_factor = decrease_factor
+        self.rate = rate if rate is not None else max_rate
+        self.capacity = max(1.0, self.rate)
+        self.tokens = self.capacity
+        self.last_refill = time.monotonic()
+        self.lock = threading.Lock()
+        self.start_time = time.monotonic()
+        self.requests_count = 0
+        self.throttles_count = 0
+        self.waited_seconds = 0.0
+
+    def refill(self):
+        """
+        Add tokens accumulated since last refill. Must be called under lock.
+
+        :return:
+        """
+
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.last_refill) * self.rate)
+        self.last_refill = now
+
+    def acquire(self):
+        """
+        Block until a token is available.
+
+        :return:
+        """
+
+        while True:
+            with self.lock:
+                self.refill()
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    self.requests_count += 1
+                    return
+                time_to_sleep = (1 - self.tokens) / self.rate
+                self.waited_seconds += time_to_sleep
+            time.sleep(time_to_sleep)
+
+    def on_success(self):
+        """
+        Additive increase.
+
+        :return:
+        """
+
+        with self.lock:
+            self.rate = min(self.max_rate, self.rate + self.increase_step)
+            self.capacity = max(1.0, self.rate)
+
+    def on_throttle(self):
+        """
+        Multiplicative decrease. Drop the accumulated tokens so the parallel callers slow down together.
+
+        :return:
+        """
+
+        with self.lock:
+            self.throttles_count += 1
+            self.rate = max(self.min_rate, self.rate * self.decrease_factor)
+            self.capacity = max(1.0, self.rate)
+            self.tokens = min(self.tokens, 0.0)
+
+    def get_statistics(self):
+        """
+        Counters.
+
+        :return:
+        """
+
+        with self.lock:
+            elapsed = max(time.monotonic() - self.start_time, 1e-9)
+            return {"rate": self.rate,
+                    "requests": self.requests_count,
+                    "throttles": self.throttles_count,
+                    "waited_seconds": self.waited_seconds,
+                    "effective_rate": self.requests_count / elapsed}
+
+
+class RetryBudget:
+    """
+    Retry quota. Each retry consumes tokens, each success refunds a token.
+
+    """
+
+    def __init__(self, capacity=500, retry_cost=10, throttle_retry_cost=5, success_refund=1):
+        self.capacity = capacity
+        self.retry_cost = retry_cost
+        self.throttle_retry_cost = throttle_retry_cost
+        self.success_refund = success_refund
+        self.tokens = capacity
+        self.lock = threading.Lock()
+
+    def consume(self, throttling=False):
+        """
+        Take the retry cost from the budget.
+
+        :param throttling:
+        :return: True if the retry is permitted
+        """
+
+        cost = self.throttle_retry_cost if throttling else self.retry_cost
+        with self.lock:
+            if self.tokens < cost:
+                return False
+            self.tokens -= cost
+            return True
+
+    def refund(self):
+        """
+        Return tokens on successful call.
+
+        :return:
+        """
+
+        with self.lock:
+            self.tokens = min(self.capacity, self.tokens + self.success_refund)
+
+
+class AdaptiveRateLimiter:
+    """
+    Registry of token buckets and retry budgets.
+    Every key has its own retry budget - a throttled service does not exhaust the retries of the others.
+
+    """
+
+    BACKOFF_BASE = 1.0
+    BACKOFF_CAP = 60.0
+
+    def __init__(self, retry_budget=None, bucket_arguments=None, retry_budget_arguments=None):
+        """
+
+        :param retry_budget: Retry budget shared by all the keys. Default - budget per key.
+        :param bucket_arguments: TokenBucket arguments.
+        :param retry_budget_arguments: Per key RetryBudget arguments.
+        """
+
+        self.retry_budget = retry_budget
+        self.bucket_arguments = bucket_arguments or {}
+        self.retry_budget_arguments = retry_budget_arguments or {}
+        self.buckets = {}
+        self.retry_budgets = {}
+        self.lock = threading.Lock()
+
+    def get_bucket(self, key):
+        """
+        Get or create bucket.
+
+        :param key: (account, region, service)
+        :return:
+        """
+
+        bucket = self.buckets.get(key)
+        if bucket is not None:
+            return bucket
+
+        with self.lock:
+            if key not in self.buckets:
+                self.buckets[key] = TokenBucket(**self.bucket_arguments)
+            return self.buckets[key]
+
+    def get_retry_budget(self, key):
+        """
+        Get or create the key's retry budget.
+
+        :param key: (account, region, service)
+        :return:
+        """
+
+        if self.retry_budget is not None:
+            return self.retry_budget
+
+        retry_budget = self.retry_budgets.get(key)
+        if retry_budget is not None:
+            return retry_budget
+
+        with self.lock:
+            if key not in self.retry_budgets:
+                self.retry_budgets[key] = RetryBudget(**self.retry_budget_arguments)
+            return self.retry_budgets[key]
+
+    def acquire(self, key):
+        """
+        Wait for the permission to send a request.
+
+        :param key:
+        :return:
+        """
+
+        self.get_bucket(key).acquire()
+
+    def on_success(self, key):
+        """
+        Report success.
+
+        :param key:
+        :return:
+        """
+
+        self.get_bucket(key).on_success()
+        self.get_retry_budget(key).refund()
+
+    def on_error(self, key, attempt, throttling):
+        """
+        Report failure, consume retry budget and calculate the backoff.
+
+        :param key:
+        :param attempt: Consecutive failures count.
+        :param throttling:
+        :return: seconds to sleep before retrying
+        """
+
+        if throttling:
+            self.get_bucket(key).on_throttle()
+
+        if not self.get_retry_budget(key).consume(throttling=throttling):
+            raise RetryBudgetExhaustedError(f"Retry budget exhausted while calling {key}")
+
+        return self.get_backoff_time(attempt)
+
+    def get_backoff_time(self, attempt):
+        """
+        Exponential backoff with full jitter.
+
+        :param attempt:
+        :return:
+        """
+
+        return random.uniform(0, min(self.BACKOFF_CAP, self.BACKOFF_BASE * 2 ** min(attempt, 32)))
+
+    def get_statistics(self):
+        """
+        Per key counters.
+
+        :return:
+        """
+
+        with self.lock:
+            buckets = dict(self.buckets)
+        ret = {"/".join(str(part) for part in key): bucket.get_statistics() for key, bucket in buckets.items()}
+        logger.info(f"Rate limiter statistics: {ret}")
+        return ret
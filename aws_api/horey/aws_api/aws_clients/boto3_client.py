@@ -4,11 +4,13 @@ Base Boto3 client. It provides sessions and client management.
 
 import os
 import datetime
-import json
 import shutil
 import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
 
 from horey.aws_api.aws_clients.sessions_manager import SessionsManager
+from horey.aws_api.aws_clients.adaptive_rate_limiter import AdaptiveRateLimiter
+from horey.aws_api.aws_clients.cache_backends import CompactCacheBackend
 from horey.h_logger import get_logger
 from horey.aws_api.base_entities.aws_account import AWSAccount
 from horey.aws_api.base_entities.region import Region
@@ -28,6 +30,11 @@ class Boto3Client:
     NEXT_PAGE_RESPONSE_KEY = "NextToken"
     NEXT_PAGE_INITIAL_KEY = None
     DEBUG = False
+    REGIONS_MAX_WORKERS = 1
+    RATE_LIMITER = AdaptiveRateLimiter()
+    CACHE_BACKEND = CompactCacheBackend()
+    THROTTLING_ERROR_MARKS = ["Throttling", "TooManyRequestsException", "RequestLimitExceeded",
+                              "SlowDown", "Rate exceeded"]
     _main_cache_dir_path = None
 
     def __init__(self, client_name, aws_account:AWSAccount=None):
@@ -134,6 +141,40 @@ class Boto3Client:
         """
         raise RuntimeError(f"Nobody can set a client explicitly in{self}")
 
+    def get_rate_limiter_key(self, func_command):
+        """
+        Rate limiter bucket key of the bound client method.
+
+        :param func_command:
+        :return: (account, region, service)
+        """
+
+        aws_account = self.aws_account if self.aws_account is not None else AWSAccount.get_aws_account()
+        account_id = "default_account" if aws_account is None else aws_account.id
+        meta = func_command.__self__.meta
+        return account_id, meta.region_name, meta.service_model.service_name
+
+    @staticmethod
+    def get_rate_limiter_statistics():
+        """
+        Effective request rate, throttles and waits per (account, region, service).
+
+        :return:
+        """
+
+        return Boto3Client.RATE_LIMITER.get_statistics()
+
+    def is_throttling_exception(self, exception_instance):
+        """
+        Check whether the exception is a throttling response.
+
+        :param exception_instance:
+        :return:
+        """
+
+        str_repr = repr(exception_instance)
+        return any(mark in str_repr for mark in self.THROTTLING_ERROR_MARKS)
+
     # pylint: disable= too-many-arguments, too-many-branches
     # pylint: disable= too-many-positional-arguments
     def yield_with_paginator(
@@ -161,7 +202,9 @@ class Boto3Client:
             filters_req = {}
 
         starting_token = self.NEXT_PAGE_INITIAL_KEY
+        rate_limiter_key = self.get_rate_limiter_key(func_command)
         retry_counter = 0
+        attempt = 0
         while retry_counter < self.EXECUTION_RETRY_COUNT:
             try:
                 logger.info(
@@ -178,9 +221,11 @@ class Boto3Client:
                         return_string,
                         filters_req,
                         raw_data=raw_data,
-                        internal_starting_token=internal_starting_token
+                        internal_starting_token=internal_starting_token,
+                        rate_limiter_key=rate_limiter_key
                 ):
                     retry_counter = 0
+                    attempt = 0
                     starting_token = new_starting_token
                     yield result
                 break
@@ -195,11 +240,10 @@ class Boto3Client:
                 ):
                     raise
                 exception_weight = 10
-                time_to_sleep = 1
 
-                if "Throttling" in repr(exception_instance):
+                throttling = self.is_throttling_exception(exception_instance)
+                if throttling:
                     exception_weight = 1
-                    time_to_sleep = retry_counter + exception_weight
                     logger.error(
                         f"Retrying after Throttling '{func_command.__name__}' attempt {retry_counter}/{self.EXECUTION_RETRY_COUNT} Error: {exception_instance}"
                     )
@@ -219,6 +263,8 @@ class Boto3Client:
                     raise
 
                 retry_counter += exception_weight
+                time_to_sleep = self.RATE_LIMITER.on_error(rate_limiter_key, attempt, throttling)
+                attempt += 1
                 time.sleep(time_to_sleep)
                 logger.warning(
                     f"Retrying '{func_command.__name__}' attempt {retry_counter}/{self.EXECUTION_RETRY_COUNT} Error: {exception_instance}"
@@ -237,7 +283,8 @@ class Boto3Client:
             return_string,
             filters_req,
             raw_data=False,
-            internal_starting_token=False
+            internal_starting_token=False,
+            rate_limiter_key=None
     ):
         """
         Fetch data from single pagination loop run.
@@ -248,11 +295,24 @@ class Boto3Client:
         :param filters_req:
         :param raw_data:
         :param internal_starting_token:
+        :param rate_limiter_key:
         :return:
         """
-        for _page in func_command.__self__.get_paginator(func_command.__name__).paginate(
+
+        if rate_limiter_key is None:
+            rate_limiter_key = self.get_rate_limiter_key(func_command)
+
+        pages = iter(func_command.__self__.get_paginator(func_command.__name__).paginate(
                 PaginationConfig={self.NEXT_PAGE_REQUEST_KEY: starting_token}, **filters_req
-        ):
+        ))
+        while True:
+            # Each page is a separate API request.
+            self.RATE_LIMITER.acquire(rate_limiter_key)
+            try:
+                _page = next(pages)
+            except StopIteration:
+                return
+            self.RATE_LIMITER.on_success(rate_limiter_key)
 
             starting_token = self.unpack_pagination_loop_starting_token(
                 _page, return_string, internal_starting_token
@@ -359,7 +419,11 @@ class Boto3Client:
         :return:
         """
 
+        rate_limiter_key = self.get_rate_limiter_key(func_command)
+        body = filters_req.get("Body") if filters_req else None
+        body_position = body.tell() if hasattr(body, "seek") else None
         retry_counter = 0
+        attempt = 0
         while retry_counter < self.EXECUTION_RETRY_COUNT:
             Boto3Client.EXEC_COUNT += 1
 
@@ -367,11 +431,16 @@ class Boto3Client:
                 logger.info(
                     f"Executing: '{func_command.__name__}'"
                 )
+                if attempt and body_position is not None:
+                    # Streamed body was consumed by the failed attempt.
+                    body.seek(body_position)
                 if self.DEBUG:
                     logger.info(
                         f"Executing: '{func_command.__name__}' and args '{filters_req}'"
                     )
+                self.RATE_LIMITER.acquire(rate_limiter_key)
                 response = func_command(**filters_req)
+                self.RATE_LIMITER.on_success(rate_limiter_key)
                 break
             except Exception as exception_instance:
                 logger.warning(
@@ -382,11 +451,10 @@ class Boto3Client:
                 ):
                     raise
                 exception_weight = 10
-                time_to_sleep = 1
 
-                if "Throttling" in repr(exception_instance):
+                throttling = self.is_throttling_exception(exception_instance)
+                if throttling:
                     exception_weight = 1
-                    time_to_sleep = retry_counter + exception_weight
                     logger.error(
                         f"Retrying after Throttling '{func_command.__name__}' attempt {retry_counter}/{self.EXECUTION_RETRY_COUNT} Error: {exception_instance}"
                     )
@@ -424,6 +492,8 @@ class Boto3Client:
                     raise
 
                 retry_counter += exception_weight
+                time_to_sleep = self.RATE_LIMITER.on_error(rate_limiter_key, attempt, throttling)
+                attempt += 1
                 time.sleep(time_to_sleep)
                 logger.warning(
                     f"Retrying '{func_command.__name__}' attempt {retry_counter}/{self.EXECUTION_RETRY_COUNT} Error: {exception_instance}"
@@ -629,29 +699,21 @@ class Boto3Client:
         """
 
     @staticmethod
-    def cache_objects(objects, file_path, indent=4):
+    def cache_objects(objects, file_path, indent=4, cache_backend=None):
         """
         Cache the objects.
 
         :param objects:
         :param file_path:
         :param indent:
+        :param cache_backend: Cache file format. Defaults to CACHE_BACKEND.
         :return:
         """
         if objects is None:
             return
 
-        objects_dicts = [obj.convert_to_dict() for obj in objects]
-
-        os.makedirs(os.path.dirname(file_path), exist_ok=True)
-
-        with open(file_path, "w", encoding="utf-8") as file_handler:
-
-            logger.info(f"Caching {len(objects_dicts)} objects to cache {file_path}")
-            if objects_dicts:
-                logger.info(f"Caching object sample '{objects_dicts[0].keys()=}' to cache {file_path}")
-
-            json.dump(objects_dicts, file_handler, indent=indent)
+        cache_backend = cache_backend or Boto3Client.CACHE_BACKEND
+        cache_backend.write((obj.convert_to_dict() for obj in objects), file_path, indent=indent)
 
     @staticmethod
     def clear_sessions():
@@ -704,7 +766,10 @@ class Boto3Client:
 
     def add_entity_to_cache(self, entity, full_information, get_tags):
         """
-        Add new entity.
+        Add new entity or replace the cached one with the same id.
+        Appends to the cache log- does not rewrite the cache file.
+        The other cache files of the entity class in the region are invalidated -
+        their entities are fetched with different information or filters.
 
         :param get_tags:
         :param full_information:
@@ -714,14 +779,60 @@ class Boto3Client:
 
         file_path = self.generate_cache_file_path(entity.__class__, entity.region.region_mark, full_information,
                                                   get_tags)
-        if os.path.exists(file_path):
-            with open(file_path, encoding="utf-8") as file_handler:
-                objects = json.load(file_handler)
+        if not file_path:
+            return
+
+        for cache_file_path in self.get_entity_class_cache_file_paths(entity.__class__, entity.region.region_mark):
+            if cache_file_path != file_path:
+                self.CACHE_BACKEND.invalidate(cache_file_path)
 
-            logger.info(f"Adding entity '{entity.convert_to_dict().keys()}' to cache {file_path}")
-            objects.append(entity.convert_to_dict())
-            with open(file_path, "w", encoding="utf-8") as file_handler:
-                json.dump(objects, file_handler, indent=4)
+        if self.CACHE_BACKEND.exists(file_path):
+            dict_src = entity.convert_to_dict()
+            logger.info(f"Adding entity '{dict_src.keys()}' to cache {file_path}")
+            self.CACHE_BACKEND.put(file_path, dict_src)
+
+    def delete_entity_from_cache(self, entity):
+        """
+        Delete entity from the cache files of its class in its region.
+        Filtered cache files are invalidated.
+
+        :param entity:
+        :return:
+        """
+
+        if self.main_cache_dir_path is None:
+            return
+
+        region_mark = entity.region.region_mark
+        variant_file_paths = [self.generate_cache_file_path(entity.__class__, region_mark, full_information, get_tags)
+                              for full_information in (False, True) for get_tags in (False, True)]
+        key = self.CACHE_BACKEND.get_dict_key(entity.convert_to_dict())
+        for cache_file_path in self.get_entity_class_cache_file_paths(entity.__class__, region_mark):
+            if cache_file_path not in variant_file_paths:
+                self.CACHE_BACKEND.invalidate(cache_file_path)
+            elif self.CACHE_BACKEND.exists(cache_file_path):
+                logger.info(f"Deleting entity '{key}' from cache {cache_file_path}")
+                self.CACHE_BACKEND.delete(cache_file_path, key)
+
+    def get_entity_class_cache_file_paths(self, entity_class, region_dir_name):
+        """
+        Generated cache file paths of the entity class in the region - all information, tags and filter variants.
+
+        :param entity_class:
+        :param region_dir_name:
+        :return:
+        """
+
+        cache_client_dir_path = os.path.dirname(self.generate_cache_file_path(entity_class, region_dir_name,
+                                                                              False, False))
+        entity_class_file_raw_name = entity_class.get_cache_file_name().replace(".json", "")
+        file_paths = set()
+        for file_name in os.listdir(cache_client_dir_path):
+            # Cache backends' data, index, log and lock files share the generated file name prefix.
+            raw_name = file_name.split(".")[0]
+            if raw_name == entity_class_file_raw_name or raw_name.startswith(entity_class_file_raw_name + "_"):
+                file_paths.add(os.path.join(cache_client_dir_path, raw_name + ".json"))
+        return sorted(file_paths)
 
     # pylint: disable= too-many-positional-arguments
     def generate_cache_file_path(self, class_type, region_dir_name, full_information, get_tags, cache_suffix=None):
@@ -765,23 +876,43 @@ class Boto3Client:
         return os.path.join(cache_client_dir_path, file_name)
 
     @staticmethod
-    def load_objects_from_cache(class_type, file_path):
+    def load_objects_from_cache(class_type, file_path, ids=None, names=None, cache_backend=None):
         """
         Load objects from cached file
 
         @param file_path:
         @param class_type:
+        @param ids: Load only objects with these ids.
+        @param names: Load only objects with these names.
+        @param cache_backend:
+        @return:
+        """
+
+        cache_backend = cache_backend or Boto3Client.CACHE_BACKEND
+        if not cache_backend.exists(file_path):
+            return None
+
+        return list(Boto3Client.yield_objects_from_cache(class_type, file_path, ids=ids, names=names,
+                                                         cache_backend=cache_backend))
+
+    @staticmethod
+    def yield_objects_from_cache(class_type, file_path, ids=None, names=None, cache_backend=None):
+        """
+        Stream objects from cached file. Each object is decoded when requested.
+
+        @param file_path:
+        @param class_type:
+        @param ids: Load only objects with these ids.
+        @param names: Load only objects with these names.
+        @param cache_backend:
         @return:
         """
 
         logger.info(f"Loading '{class_type}' objects from cache file: {file_path}")
 
-        if not os.path.exists(file_path):
-            return None
-        with open(file_path, encoding="utf-8") as file_handler:
-            return [
-                class_type(dict_src, from_cache=True) for dict_src in json.load(file_handler)
-            ]
+        cache_backend = cache_backend or Boto3Client.CACHE_BACKEND
+        for dict_src in cache_backend.yield_dicts(file_path, ids=ids, names=names):
+            yield class_type(dict_src, from_cache=True)
 
     # pylint: disable= too-many-positional-arguments
     def regional_service_entities_generator(self, regional_fetcher_generator,
@@ -792,13 +923,15 @@ class Boto3Client:
                                             regions=None,
                                             global_service=False,
                                             filters_req=None,
-                                            cache_filter_callback=None):
+                                            cache_filter_callback=None,
+                                            max_workers=None):
         """
         Be sure you know what you do, when you set full_information=True.
         This can kill your memory, if you have a lot of data.
         For example in Cloudwatch or S3.
         Sometimes it's better using yield* or explicitly setting full_information=None
 
+        :param max_workers: Fetch regions concurrently. Defaults to REGIONS_MAX_WORKERS (1 - sequential).
         :param filters_req: Request input params if any.
         :param regional_fetcher_generator: The lowest API facing function. Retrieves raw dictionaries.
         :param entity_class: Class of the entity to init with the raw Data.
@@ -826,6 +959,22 @@ class Boto3Client:
         if not regions:
             raise ValueError(f"Was not able to find region while fetching {entity_class} information.")
 
+        regions = list(regions)
+        if max_workers is None:
+            max_workers = self.REGIONS_MAX_WORKERS
+
+        if max_workers > 1 and len(regions) > 1:
+            yield from self.concurrent_regions_service_entities_generator(
+                regions, regional_fetcher_generator, entity_class,
+                max_workers=max_workers,
+                full_information_callback=full_information_callback,
+                get_tags_callback=get_tags_callback,
+                update_info=update_info,
+                filters_req=filters_req,
+                cache_filter_callback=cache_filter_callback
+            )
+            return
+
         for region in regions:
             yield from self.region_service_entities_generator(
                     region, regional_fetcher_generator, entity_class,
@@ -836,6 +985,61 @@ class Boto3Client:
                     cache_filter_callback=cache_filter_callback
             )
 
+    # pylint: disable= too-many-positional-arguments
+    def concurrent_regions_service_entities_generator(self, regions,
+                                                      regional_fetcher_generator,
+                                                      entity_class,
+                                                      max_workers=None,
+                                                      full_information_callback=None,
+                                                      get_tags_callback=None,
+                                                      update_info=False,
+                                                      filters_req=None,
+                                                      cache_filter_callback=None):
+        """
+        Fetch regions on a bounded worker pool. Each worker runs region_service_entities_generator,
+        so the per region cache files are written exactly as in the sequential flow.
+        Entities are yielded region by region, in the order the regions complete.
+
+        :param regions:
+        :param regional_fetcher_generator:
+        :param entity_class:
+        :param max_workers:
+        :param full_information_callback:
+        :param get_tags_callback:
+        :param update_info:
+        :param filters_req:
+        :param cache_filter_callback:
+        :return:
+        """
+
+        # Resolve the shared state in the calling thread, so workers reuse the connection clients.
+        _ = self.account_id
+        for region in regions:
+            self.get_session_client(region=region)
+
+        def fetch_region(region):
+            start_time = datetime.datetime.now()
+            ret = list(self.region_service_entities_generator(
+                region, regional_fetcher_generator, entity_class,
+                full_information_callback=full_information_callback,
+                get_tags_callback=get_tags_callback,
+                update_info=update_info,
+                filters_req=filters_req,
+                cache_filter_callback=cache_filter_callback
+            ))
+            logger.info(f"Fetched {len(ret)} '{entity_class.__name__}' objects from region "
+                        f"'{region.region_mark}'. Took {datetime.datetime.now() - start_time}")
+            return ret
+
+        with ThreadPoolExecutor(max_workers=min(max_workers, len(regions))) as executor:
+            futures = {executor.submit(fetch_region, region): region for region in regions}
+            try:
+                for future in as_completed(futures):
+                    yield from future.result()
+            finally:
+                for future in futures:
+                    future.cancel()
+
     # pylint: disable= too-many-locals, too-many-positional-arguments
     def region_service_entities_generator(self, region,
                                           regional_fetcher_generator,
@@ -870,9 +1074,8 @@ class Boto3Client:
                                                   cache_suffix=cache_suffix)
         if file_name:
             if not update_info and (not filters_req or cache_filter_callback):
-                objects = self.load_objects_from_cache(entity_class, file_name)
-                if objects is not None:
-                    yield from objects
+                if self.CACHE_BACKEND.exists(file_name):
+                    yield from self.yield_objects_from_cache(entity_class, file_name)
                     return
 
         final_result = []
@@ -888,7 +1091,7 @@ class Boto3Client:
 
             # obj_ret will be returned to user and can be modified.
             # obj is a pure replay from server and will be stored as is.
-            obj_ret = entity_class(obj.convert_to_dict(), from_cache=True)
+            obj_ret = obj.copy_as_cached()
             final_result.append(obj)
             yield obj_ret
 
@@ -0,0 +1,572 @@
+"""
+Entities cache file formats.
+
+JSONCacheBackend - legacy indented JSON list.
+CompactCacheBackend - zlib compressed JSON records with an offset index.
+Records can be streamed one by one or loaded selectively by id/name without decoding the rest.
+Changes are appended to a log file and merged into the data file on compaction.
+
+"""
+
+import json
+import os
+import struct
+import zlib
+from contextlib import contextmanager
+
+try:
+    import fcntl
+except ImportError:
+    # Windows
+    fcntl = None
+    import msvcrt
+
+from horey.h_logger import get_logger
+
+logger = get_logger()
+
+
+class CacheBackend:
+    """
+    Base class of the cache file formats.
+
+    """
+
+    LEGACY_FILE_EXTENSION = ".json"
+
+    def write(self, dicts_src, file_path, indent=4):
+        """
+        Write the dicts to the cache.
+
+        :param dicts_src: iterable of dicts
+        :param file_path: Generated cache file path.
+        :param indent:
+        :return: Written objects count.
+        """
+
+        raise NotImplementedError()
+
+    def yield_dicts(self, file_path, ids=None, names=None):
+        """
+        Yield cached dicts.
+
+        :param file_path:
+        :param ids: Load only the objects with these ids.
+        :param names: Load only the objects with these names.
+        :return:
+        """
+
+        raise NotImplementedError()
+
+    def exists(self, file_path):
+        """
+        Check whether cache can be read.
+
+        :param file_path:
+        :return:
+        """
+
+        raise NotImplementedError()
+
+    def invalidate(self, file_path):
+        """
+        Remove the cache - next read fetches from the API.
+
+        :param file_path:
+        :return:
+        """
+
+        raise NotImplementedError()
+
+    def put(self, file_path, dict_src):
+        """
+        Add or replace the cached dict with the same key.
+        Read-modify-write - formats with append support override it.
+        A dict without id and name can not replace its cached copy - the cache is invalidated.
+
+        :param file_path:
+        :param dict_src:
+        :return:
+        """
+
+        key = self.get_dict_key(dict_src)
+        if key is None:
+            self.invalidate_unkeyed(file_path)
+            return
+        dicts_src = [cached for cached in self.yield_dicts(file_path) if self.get_dict_key(cached) != key]
+        dicts_src.append(dict_src)
+        self.write(dicts_src, file_path)
+
+    def delete(self, file_path, key):
+        """
+        Delete the cached dict by key.
+
+        :param file_path:
+        :param key: id or name if id is not set.
+        :return:
+        """
+
+        if key is None:
+            self.invalidate_unkeyed(file_path)
+            return
+        dicts_src = [cached for cached in self.yield_dicts(file_path) if self.get_dict_key(cached) != key]
+        self.write(dicts_src, file_path)
+
+    def invalidate_unkeyed(self, file_path):
+        """
+        Invalidate the cache on a change of an object without id and name.
+
+        :param file_path:
+        :return:
+        """
+
+        logger.warning(f"Can not update cached object without id or name, invalidating cache {file_path}")
+        self.invalidate(file_path)
+
+    @staticmethod
+    def get_dict_key(dict_src):
+        """
+        Key used to identify the same object on update/delete.
+
+        :param dict_src:
+        :return:
+        """
+
+        key = CacheBackend.get_dict_id(dict_src)
+        return key if key is not None else CacheBackend.get_dict_name(dict_src)
+
+    @staticmethod
+    def dict_matches(dict_src, ids, names):
+        """
+        Filter by ids/names.
+
+        :param dict_src:
+        :param ids:
+        :param names:
+        :return:
+        """
+
+        if ids is None and names is None:
+            return True
+
+        if ids is not None and CacheBackend.get_dict_id(dict_src) in ids:
+            return True
+
+        return names is not None and CacheBackend.get_dict_name(dict_src) in names
+
+    @staticmethod
+    def get_dict_id(dict_src):
+        """
+        AwsObject.convert_to_dict stores the id under the property's private attribute.
+
+        :param dict_src:
+        :return:
+        """
+
+        return dict_src.get("_id", dict_src.get("id"))
+
+    @staticmethod
+    def get_dict_name(dict_src):
+        """
+        AwsObject.convert_to_dict stores the name under the property's private attribute.
+
+        :param dict_src:
+        :return:
+        """
+
+        return dict_src.get("_name", dict_src.get("name"))
+
+    @staticmethod
+    def replace_file(tmp_file_path, file_path):
+        """
+        Atomic file replacement.
+
+        :param tmp_file_path:
+        :param file_path:
+        :return:
+        """
+
+        os.replace(tmp_file_path, file_path)
+
+
+class JSONCacheBackend(CacheBackend):
+    """
+    Legacy format: single JSON list.
+
+    """
+
+    def write(self, dicts_src, file_path, indent=4):
+        objects_dicts = list(dicts_src)
+        os.makedirs(os.path.dirname(file_path), exist_ok=True)
+        tmp_file_path = file_path + ".tmp"
+        with open(tmp_file_path, "w", encoding="utf-8") as file_handler:
+            logger.info(f"Caching {len(objects_dicts)} objects to cache {file_path}")
+            if objects_dicts:
+                logger.info(f"Caching object sample '{objects_dicts[0].keys()=}' to cache {file_path}")
+            json.dump(objects_dicts, file_handler, indent=indent)
+        self.replace_file(tmp_file_path, file_path)
+        return len(objects_dicts)
+
+    def yield_dicts(self, file_path, ids=None, names=None):
+        with open(file_path, encoding="utf-8") as file_handler:
+            dicts_src = json.load(file_handler)
+
+        for dict_src in dicts_src:
+            if self.dict_matches(dict_src, ids, names):
+                yield dict_src
+
+    def exists(self, file_path):
+        return os.path.exists(file_path)
+
+    def invalidate(self, file_path):
+        if os.path.exists(file_path):
+            os.remove(file_path)
+
+
+class CompactCacheBackend(CacheBackend):
+    """
+    Data file: sequence of [4 bytes big endian length][zlib compressed JSON] records.
+    Index file: JSON with [offset, length, id, name] per record.
+    Log file: appended records {"key": key, "value": dict or None on delete}, latest wins.
+    The log is compacted into the data file when it outgrows it.
+    Falls back to the legacy JSON file if no compact cache was written yet.
+
+    """
+
+    FILE_EXTENSION = ".hcache"
+    INDEX_FILE_SUFFIX = ".index"
+    LOG_FILE_SUFFIX = ".log"
+    LOCK_FILE_SUFFIX = ".lock"
+    FORMAT_VERSION = 1
+    RECORD_HEADER = struct.Struct(">I")
+    COMPACTION_MIN_LOG_SIZE = 1024 * 1024
+
+    def __init__(self, compression_level=6):
+        self.compression_level = compression_level
+        self.legacy_backend = JSONCacheBackend()
+
+    def get_data_file_path(self, file_path):
+        """
+        Generate data file path from the generated cache file path.
+
+        :param file_path:
+        :return:
+        """
+
+        if file_path.endswith(self.LEGACY_FILE_EXTENSION):
+            file_path = file_path[:-len(self.LEGACY_FILE_EXTENSION)]
+        return file_path + self.FILE_EXTENSION
+
+    def get_index_file_path(self, file_path):
+        """
+        Generate index file path from the generated cache file path.
+
+        :param file_path:
+        :return:
+        """
+
+        return self.get_data_file_path(file_path) + self.INDEX_FILE_SUFFIX
+
+    def get_log_file_path(self, file_path):
+        """
+        Generate log file path from the generated cache file path.
+
+        :param file_path:
+        :return:
+        """
+
+        return self.get_data_file_path(file_path) + self.LOG_FILE_SUFFIX
+
+    @contextmanager
+    def lock(self, file_path, shared=False):
+        """
+        Inter process lock of the cache files. Not reentrant.
+
+        :param file_path:
+        :param shared: Readers' lock.
+        :return:
+        """
+
+        lock_file_path = self.get_data_file_path(file_path) + self.LOCK_FILE_SUFFIX
+        os.makedirs(os.path.dirname(lock_file_path), exist_ok=True)
+        with open(lock_file_path, "a", encoding="utf-8") as file_handler:
+            if fcntl is None:
+                with self.lock_msvcrt(file_handler):
+                    yield
+                return
+
+            fcntl.flock(file_handler, fcntl.LOCK_SH if shared else fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(file_handler, fcntl.LOCK_UN)
+
+    @staticmethod
+    @contextmanager
+    def lock_msvcrt(file_handler):
+        """
+        Windows lock - exclusive only, the readers' lock is exclusive as well.
+
+        :param file_handler:
+        :return:
+        """
+
+        file_handler.seek(0)
+        while True:
+            try:
+                # LK_LOCK retries for 10 seconds before raising.
+                msvcrt.locking(file_handler.fileno(), msvcrt.LK_LOCK, 1)
+                break
+            except OSError:
+                logger.info(f"Waiting for cache lock {file_handler.name}")
+        try:
+            yield
+        finally:
+            file_handler.seek(0)
+            msvcrt.locking(file_handler.fileno(), msvcrt.LK_UNLCK, 1)
+
+    def encode_record(self, dict_src):
+        """
+        Serialize single dict.
+
+        :param dict_src:
+        :return:
+        """
+
+        data = zlib.compress(json.dumps(dict_src, separators=(",", ":")).encode("utf-8"), self.compression_level)
+        return self.RECORD_HEADER.pack(len(data)) + data
+
+    @staticmethod
+    def decode_record(data):
+        """
+        Deserialize single record payload.
+
+        :param data:
+        :return:
+        """
+
+        return json.loads(zlib.decompress(data))
+
+    def yield_records(self, file_handler, file_path):
+        """
+        Read records sequentially from an open file.
+
+        :param file_handler:
+        :param file_path:
+        :return:
+        """
+
+        while header := file_handler.read(self.RECORD_HEADER.size):
+            if len(header) != self.RECORD_HEADER.size:
+                raise ValueError(f"Truncated cache file: {file_path}")
+            length = self.RECORD_HEADER.unpack(header)[0]
+            data = file_handler.read(length)
+            if len(data) != length:
+                raise ValueError(f"Truncated cache file: {file_path}")
+            yield self.decode_record(data)
+
+    def write(self, dicts_src, file_path, indent=4):
+        with self.lock(file_path):
+            return self.write_unlocked(dicts_src, file_path)
+
+    def write_unlocked(self, dicts_src, file_path):
+        """
+        Write data and index files and drop the log. Must be called under the lock.
+
+        :param dicts_src:
+        :param file_path:
+        :return:
+        """
+
+        data_file_path = self.get_data_file_path(file_path)
+        index_file_path = self.get_index_file_path(file_path)
+
+        records = []
+        offset = 0
+        with open(data_file_path + ".tmp", "wb") as file_handler:
+            for dict_src in dicts_src:
+                record = self.encode_record(dict_src)
+                file_handler.write(record)
+                records.append([offset, len(record), self.get_dict_id(dict_src), self.get_dict_name(dict_src)])
+                offset += len(record)
+
+        with open(index_file_path + ".tmp", "w", encoding="utf-8") as file_handler:
+            json.dump({"version": self.FORMAT_VERSION, "records": records}, file_handler)
+
+        # Data first- index is never pointing to a missing record.
+        self.replace_file(data_file_path + ".tmp", data_file_path)
+        self.replace_file(index_file_path + ".tmp", index_file_path)
+        log_file_path = self.get_log_file_path(file_path)
+        if os.path.exists(log_file_path):
+            os.remove(log_file_path)
+        logger.info(f"Cached {len(records)} objects to cache {data_file_path}, {offset} bytes")
+
+        if os.path.exists(file_path) and file_path != data_file_path:
+            logger.info(f"Removing legacy cache file: {file_path}")
+            os.remove(file_path)
+
+        return len(records)
+
+    def load_index(self, file_path):
+        """
+        Load the records' index.
+
+        :param file_path:
+        :return:
+        """
+
+        with open(self.get_index_file_path(file_path), encoding="utf-8") as file_handler:
+            index = json.load(file_handler)
+
+        if index.get("version") != self.FORMAT_VERSION:
+            raise ValueError(f"Unsupported cache index version: {index.get('version')}")
+        return index["records"]
+
+    def load_log(self, file_path):
+        """
+        Latest logged state per key.
+
+        :param file_path:
+        :return: {key: dict or None if deleted}
+        """
+
+        log_file_path = self.get_log_file_path(file_path)
+        if not os.path.exists(log_file_path):
+            return {}
+
+        ret = {}
+        with open(log_file_path, "rb") as file_handler:
+            for entry in self.yield_records(file_handler, log_file_path):
+                ret.pop(entry["key"], None)
+                ret[entry["key"]] = entry["value"]
+        return ret
+
+    # pylint: disable= consider-using-with
+    def yield_dicts(self, file_path, ids=None, names=None):
+        # Snapshot under the lock. Compaction replaces the files, so the open handler stays consistent.
+        file_handler = None
+        with self.lock(file_path, shared=True):
+            if os.path.exists(self.get_index_file_path(file_path)):
+                records = self.load_index(file_path)
+                log_entries = self.load_log(file_path)
+                file_handler = open(self.get_data_file_path(file_path), "rb")
+
+        if file_handler is None:
+            yield from self.legacy_backend.yield_dicts(file_path, ids=ids, names=names)
+            return
+
+        with file_handler:
+            if ids is None and names is None:
+                dicts_src = self.yield_records(file_handler, file_path)
+            else:
+                dicts_src = self.yield_indexed_dicts(file_handler, records, ids, names)
+
+            for dict_src in dicts_src:
+                if log_entries and self.get_dict_key(dict_src) in log_entries:
+                    continue
+                yield dict_src
+
+        for dict_src in log_entries.values():
+            if dict_src is not None and self.dict_matches(dict_src, ids, names):
+                yield dict_src
+
+    def yield_indexed_dicts(self, file_handler, records, ids, names):
+        """
+        Decode only the requested records.
+
+        :param file_handler:
+        :param records:
+        :param ids:
+        :param names:
+        :return:
+        """
+
+        ids = set(ids) if ids is not None else set()
+        names = set(names) if names is not None else set()
+        for offset, length, record_id, record_name in records:
+            if record_id not in ids and record_name not in names:
+                continue
+            file_handler.seek(offset + self.RECORD_HEADER.size)
+            yield self.decode_record(file_handler.read(length - self.RECORD_HEADER.size))
+
+    def exists(self, file_path):
+        return os.path.exists(self.get_index_file_path(file_path)) or self.legacy_backend.exists(file_path)
+
+    def invalidate(self, file_path):
+        with self.lock(file_path):
+            for cache_file_path in [self.get_index_file_path(file_path), self.get_data_file_path(file_path),
+                                    self.get_log_file_path(file_path), file_path]:
+                if os.path.exists(cache_file_path):
+                    os.remove(cache_file_path)
+
+    def put(self, file_path, dict_src):
+        key = self.get_dict_key(dict_src)
+        if key is None:
+            self.invalidate_unkeyed(file_path)
+            return
+        self.append_log_entry(file_path, key, dict_src)
+
+    def delete(self, file_path, key):
+        if key is None:
+            self.invalidate_unkeyed(file_path)
+            return
+        self.append_log_entry(file_path, key, None)
+
+    def append_log_entry(self, file_path, key, value):
+        """
+        O(1) change. Compacts when the log outgrows the data file.
+
+        :param file_path:
+        :param key:
+        :param value: dict or None on delete
+        :return:
+        """
+
+        with self.lock(file_path):
+            if not os.path.exists(self.get_index_file_path(file_path)):
+                # Migrate legacy JSON (or start empty), so the log always has a base to apply on.
+                dicts_src = list(self.legacy_backend.yield_dicts(file_path)) \
+                    if self.legacy_backend.exists(file_path) else []
+                self.write_unlocked(dicts_src, file_path)
+
+            log_file_path = self.get_log_file_path(file_path)
+            with open(log_file_path, "ab") as file_handler:
+                file_handler.write(self.encode_record({"key": key, "value": value}))
+                file_handler.flush()
+                os.fsync(file_handler.fileno())
+
+            log_size = os.path.getsize(log_file_path)
+            if log_size > max(self.COMPACTION_MIN_LOG_SIZE, os.path.getsize(self.get_data_file_path(file_path))):
+                self.compact_unlocked(file_path)
+
+    def compact(self, file_path):
+        """
+        Merge the log into the data file.
+
+        :param file_path:
+        :return:
+        """
+
+        with self.lock(file_path):
+            self.compact_unlocked(file_path)
+
+    def compact_unlocked(self, file_path):
+        """
+        Merge the log into the data file. Must be called under the lock.
+
+        :param file_path:
+        :return:
+        """
+
+        log_entries = self.load_log(file_path)
+        if not log_entries:
+            return
+
+        logger.info(f"Compacting {len(log_entries)} log entries into cache {self.get_data_file_path(file_path)}")
+        tmp_dicts = []
+        with open(self.get_data_file_path(file_path), "rb") as file_handler:
+            for dict_src in self.yield_records(file_handler, file_path):
+                if self.get_dict_key(dict_src) not in log_entries:
+                    tmp_dicts.append(dict_src)
+        tmp_dicts += [dict_src for dict_src in log_entries.values() if dict_src is not None]
+        self.write_unlocked(tmp_dicts, file_path)
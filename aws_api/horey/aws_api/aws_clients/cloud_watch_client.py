@@ -16,6 +16,8 @@ class CloudWatchClient(Boto3Client):
     Client to work with cloud watch entities API
     """
 
+    DESCRIBE_ALARMS_MAX_NAMES = 100
+
     def __init__(self, aws_account=None):
         client_name = "cloudwatch"
         super().__init__(client_name, aws_account=aws_account)
@@ -76,6 +78,20 @@ class CloudWatchClient(Boto3Client):
                 raise NotImplementedError("CompositeAlarms")
             yield from dict_src["MetricAlarms"]
 
+    def yield_alarms_by_names(self, region, alarm_names):
+        """
+        Describe alarms in batches - DescribeAlarms accepts up to 100 alarm names.
+
+        :param region:
+        :param alarm_names:
+        :return: Raw alarm dicts. Missing alarms are not yielded.
+        """
+
+        alarm_names = list(alarm_names)
+        for start in range(0, len(alarm_names), self.DESCRIBE_ALARMS_MAX_NAMES):
+            yield from self.regional_fetcher_generator_alarms(
+                region, filters_req={"AlarmNames": alarm_names[start: start + self.DESCRIBE_ALARMS_MAX_NAMES]})
+
     def update_alarm_information(self, alarm:CloudWatchAlarm):
         """
         Standard.
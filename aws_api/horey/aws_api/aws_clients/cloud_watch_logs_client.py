@@ -2,10 +2,14 @@
 AWS client to handle cloud watch logs.
 """
 import datetime
+import functools
+import os
 import time
 import uuid
+from concurrent.futures import ThreadPoolExecutor, as_completed
 
 from horey.aws_api.aws_clients.boto3_client import Boto3Client
+from horey.aws_api.aws_clients.cloud_watch_logs_export import LogExportCheckpoint, LogEventsExporter
 from horey.aws_api.aws_services_entities.cloud_watch_log_group import CloudWatchLogGroup
 from horey.aws_api.aws_services_entities.cloud_watch_log_group_metric_filter import (
     CloudWatchLogGroupMetricFilter,
@@ -200,20 +204,7 @@ class CloudWatchLogsClient(Boto3Client):
 
     def yield_log_events(self, log_group: CloudWatchLogGroup, stream, filters_req=None):
         """
-
-        # todo: refactor
-        for response in self.execute(
-                self.get_session_client(region=region).get_log_events,
-                "events",
-                raw_data=True,
-                filters_req={
-                    "logGroupName": log_group.name,
-                    "logStreamName": stream.name,
-                    "nextToken": token,
-                },
-        ):
-            if token != response["nextForwardToken"]:
-                raise ValueError()
+        Yield stream events from head.
 
         :param stream:
         :param filters_req:
@@ -221,11 +212,6 @@ class CloudWatchLogsClient(Boto3Client):
         :return:
         """
 
-        self.NEXT_PAGE_RESPONSE_KEY = "nextForwardToken"
-        token = None
-        new_token = None
-        stop = False
-
         filters_req_consolidated = {
             "logGroupName": log_group.name,
             "logStreamName": stream.name,
@@ -235,26 +221,116 @@ class CloudWatchLogsClient(Boto3Client):
         if filters_req:
             filters_req_consolidated.update(filters_req)
 
-        while not stop:
-            if token is not None:
-                filters_req_consolidated["nextToken"] = token
-
-            for response in self.execute(
-                    self.get_session_client(region=log_group.region).get_log_events,
-                    "events",
-                    raw_data=True,
-                    filters_req=filters_req_consolidated,
-            ):
-                new_token = response["nextForwardToken"]
-                logger.info(f"old token: {token} new token: {new_token}")
-                if new_token == token:
-                    return
-                logger.info(f"Extracted {len(response['events'])} events")
-                yield from response["events"]
-                # todo: Understand why did I do this sleep before? time.sleep(10)
+        for events, _ in self.yield_log_events_pages(log_group.region, filters_req_consolidated):
+            logger.info(f"Extracted {len(events)} events")
+            yield from events
+
+    def yield_log_events_pages(self, region, filters_req, token=None):
+        """
+        get_log_events pages. Pagination state is kept in the call, not on the client - thread safe.
 
+        :param region:
+        :param filters_req:
+        :param token: nextForwardToken to continue from.
+        :return: (events, token of the next page)
+        """
+
+        filters_req = dict(filters_req)
+        while True:
+            if token is not None:
+                filters_req["nextToken"] = token
+
+            response = self.execute_without_pagination(self.get_session_client(region=region).get_log_events,
+                                                       None, raw_data=True, filters_req=filters_req)[0]
+            new_token = response["nextForwardToken"]
+            if new_token == token:
+                return
+            yield response["events"], new_token
             token = new_token
-        return
+
+    def yield_filtered_log_events_pages(self, region, filters_req, token=None):
+        """
+        filter_log_events pages. Pagination state is kept in the call, not on the client - thread safe.
+
+        :param region:
+        :param filters_req:
+        :param token: nextToken to continue from.
+        :return: (events, token of the next page or None if it was the last one)
+        """
+
+        filters_req = dict(filters_req)
+        while True:
+            if token is not None:
+                filters_req["nextToken"] = token
+
+            response = self.execute_without_pagination(self.get_session_client(region=region).filter_log_events,
+                                                       None, raw_data=True, filters_req=filters_req)[0]
+            token = response.get("nextToken")
+            yield response["events"], token
+            if token is None:
+                return
+
+    # pylint: disable= too-many-arguments, too-many-locals, too-many-positional-arguments
+    def export_log_group(self, log_group: CloudWatchLogGroup, dir_path, start_time=None, end_time=None,
+                         time_shard=None, filter_pattern=None, max_workers=8, events_per_chunk=10000):
+        """
+        Export log group events as gzip JSONL chunks.
+        Streams - or time shards if time_shard is set - are exported concurrently.
+        Rerun with the same dir_path resumes from the persisted per unit tokens.
+
+        :param log_group:
+        :param dir_path:
+        :param start_time: datetime
+        :param end_time: datetime
+        :param time_shard: timedelta - split [start_time, end_time) to filter_log_events shards instead of streams.
+        :param filter_pattern:
+        :param max_workers:
+        :param events_per_chunk:
+        :return: Exported events count.
+        """
+
+        os.makedirs(dir_path, exist_ok=True)
+        checkpoint = LogExportCheckpoint(os.path.join(dir_path, "checkpoint.json"))
+
+        base_request = {"logGroupName": log_group.name}
+        if start_time is not None:
+            base_request["startTime"] = int(start_time.timestamp() * 1000)
+        if end_time is not None:
+            base_request["endTime"] = int(end_time.timestamp() * 1000)
+
+        units = []
+        if time_shard is not None:
+            if start_time is None or end_time is None:
+                raise ValueError("time_shard requires start_time and end_time")
+            if filter_pattern is not None:
+                base_request["filterPattern"] = filter_pattern
+
+            shard_start = start_time
+            while shard_start < end_time:
+                shard_end = min(shard_start + time_shard, end_time)
+                request = dict(base_request, startTime=int(shard_start.timestamp() * 1000),
+                               endTime=int(shard_end.timestamp() * 1000))
+                units.append((f"shard:{shard_start.isoformat()}", request, self.yield_filtered_log_events_pages))
+                shard_start = shard_end
+        else:
+            for stream in self.yield_log_group_streams(log_group):
+                if filter_pattern is not None:
+                    request = dict(base_request, logStreamNames=[stream.name], filterPattern=filter_pattern)
+                    units.append((f"stream:{stream.name}", request, self.yield_filtered_log_events_pages))
+                else:
+                    request = dict(base_request, logStreamName=stream.name, startFromHead=True)
+                    units.append((f"stream:{stream.name}", request, self.yield_log_events_pages))
+
+        logger.info(f"Exporting log group {log_group.name}: {len(units)} units, {max_workers} workers")
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            futures = [executor.submit(LogEventsExporter.export_unit, unit_id,
+                                       functools.partial(pages_generator, log_group.region, request),
+                                       dir_path, checkpoint, events_per_chunk)
+                       for unit_id, request, pages_generator in units]
+            events_count = sum(future.result() for future in as_completed(futures))
+
+        logger.info(f"Exported log group {log_group.name}: {events_count} events")
+        return events_count
 
     def update_log_group_information(self, log_group: CloudWatchLogGroup, update_info=False):
         """
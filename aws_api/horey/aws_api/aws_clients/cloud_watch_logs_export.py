@@ -0,0 +1,196 @@
+"""
+Log events export state: compressed JSONL chunks and resumable per unit (stream or time shard) checkpoints.
+
+"""
+
+import gzip
+import hashlib
+import json
+import os
+import re
+import threading
+
+
+class LogExportCheckpoint:
+    """
+    Per unit pagination token and written chunks count.
+    Updates are appended to a journal file - O(1) per update, the shared lock is held only for the append.
+    The journal is merged into the checkpoint file atomically on load.
+    The token is saved only after the chunk holding the events before it was written,
+    so a resumed export re-fetches at most one chunk per unit - and overwrites it under the same name.
+
+    """
+
+    JOURNAL_FILE_SUFFIX = ".journal"
+
+    def __init__(self, file_path):
+        self.file_path = file_path
+        self.journal_file_path = file_path + self.JOURNAL_FILE_SUFFIX
+        self._lock = threading.Lock()
+        self.units = {}
+        if os.path.exists(file_path):
+            with open(file_path, encoding="utf-8") as file_handler:
+                self.units = json.load(file_handler)
+        self.compact()
+
+    def compact(self):
+        """
+        Apply the journal to the checkpoint file and remove the journal.
+
+        :return:
+        """
+
+        if not os.path.exists(self.journal_file_path):
+            return
+
+        with open(self.journal_file_path, encoding="utf-8") as file_handler:
+            for line in file_handler:
+                try:
+                    entry = json.loads(line)
+                except ValueError:
+                    # Crashed in the middle of the last append.
+                    break
+                self.units[entry["unit_id"]] = entry["state"]
+
+        tmp_file_path = f"{self.file_path}.tmp"
+        with open(tmp_file_path, "w", encoding="utf-8") as file_handler:
+            json.dump(self.units, file_handler)
+        os.replace(tmp_file_path, self.file_path)
+        os.remove(self.journal_file_path)
+
+    def get(self, unit_id):
+        """
+        Unit state: {"token": str|None, "chunks": int, "events": int, "finished": bool}
+
+        :param unit_id:
+        :return:
+        """
+
+        with self._lock:
+            return dict(self.units.get(unit_id) or {"token": None, "chunks": 0, "events": 0, "finished": False})
+
+    def update(self, unit_id, **kwargs):
+        """
+        Update unit state and append it to the journal.
+
+        :param unit_id:
+        :param kwargs:
+        :return:
+        """
+
+        with self._lock:
+            state = self.units.setdefault(unit_id, {"token": None, "chunks": 0, "events": 0, "finished": False})
+            state.update(kwargs)
+            line = json.dumps({"unit_id": unit_id, "state": state}) + "\n"
+            with open(self.journal_file_path, "a", encoding="utf-8") as file_handler:
+                file_handler.write(line)
+
+
+class JSONLChunksWriter:
+    """
+    Writes a unit's events as gzip compressed JSONL chunk files: <unit file prefix>-<chunk index>.jsonl.gz
+    A chunk file appears only when complete.
+
+    """
+
+    def __init__(self, dir_path, unit_id, chunk_index=0):
+        self.dir_path = dir_path
+        self.file_prefix = self.get_file_prefix(unit_id)
+        self.chunk_index = chunk_index
+        self.events = []
+
+    @staticmethod
+    def get_file_prefix(unit_id):
+        """
+        File system safe and unique unit file name prefix.
+
+        :param unit_id:
+        :return:
+        """
+
+        return f"{re.sub(r'[^A-Za-z0-9_.-]', '_', unit_id)[:100]}-{hashlib.sha1(unit_id.encode('utf-8')).hexdigest()[:8]}"
+
+    def extend(self, events):
+        """
+        Buffer page events.
+
+        :param events:
+        :return:
+        """
+
+        self.events.extend(events)
+
+    def flush(self):
+        """
+        Write buffered events as the next chunk.
+
+        :return: Chunk file path or None if nothing was buffered.
+        """
+
+        if not self.events:
+            return None
+
+        file_path = os.path.join(self.dir_path, f"{self.file_prefix}-{self.chunk_index:06d}.jsonl.gz")
+        tmp_file_path = f"{file_path}.tmp"
+        with gzip.open(tmp_file_path, "wt", encoding="utf-8") as file_handler:
+            for event in self.events:
+                file_handler.write(json.dumps(event))
+                file_handler.write("\n")
+        os.replace(tmp_file_path, file_path)
+
+        self.chunk_index += 1
+        self.events = []
+        return file_path
+
+    @staticmethod
+    def yield_events(file_path):
+        """
+        Read chunk back.
+
+        :param file_path:
+        :return:
+        """
+
+        with gzip.open(file_path, "rt", encoding="utf-8") as file_handler:
+            for line in file_handler:
+                yield json.loads(line)
+
+
+class LogEventsExporter:
+    """
+    Export single unit's pages to chunks.
+
+    """
+
+    # pylint: disable= too-many-arguments, too-many-positional-arguments
+    @staticmethod
+    def export_unit(unit_id, pages_generator, dir_path, checkpoint, events_per_chunk):
+        """
+        Export single stream or time shard, checkpoint after every chunk.
+
+        :param unit_id:
+        :param pages_generator: Callable(token=None) yielding (events, next page token or None)
+        :param dir_path:
+        :param checkpoint: LogExportCheckpoint
+        :param events_per_chunk:
+        :return: Unit's exported events count.
+        """
+
+        state = checkpoint.get(unit_id)
+        if state["finished"]:
+            return state["events"]
+
+        writer = JSONLChunksWriter(dir_path, unit_id, chunk_index=state["chunks"])
+        events_count = state["events"]
+        for events, token in pages_generator(token=state["token"]):
+            writer.extend(events)
+            # No next page token - the final update below follows.
+            if len(writer.events) >= events_per_chunk and token is not None:
+                events_count += len(writer.events)
+                writer.flush()
+                checkpoint.update(unit_id, token=token, chunks=writer.chunk_index, events=events_count)
+
+        events_count += len(writer.events)
+        writer.flush()
+        checkpoint.update(unit_id, chunks=writer.chunk_index, events=events_count, finished=True)
+        return events_count
@@ -2,7 +2,10 @@
 AWS lambda client to handle lambda service API requests.
 """
 
+import time
+
 from horey.aws_api.aws_clients.boto3_client import Boto3Client
+from horey.aws_api.aws_clients.dynamodb_transfer import DynamoDBSerializer, ParallelScanner
 
 from horey.aws_api.base_entities.aws_account import AWSAccount
 from horey.aws_api.aws_services_entities.dynamodb_table import DynamoDBTable
@@ -18,6 +21,10 @@ class DynamoDBClient(Boto3Client):
     Client to handle specific aws service API calls.
     """
 
+    BATCH_WRITE_MAX_ITEMS = 25
+    BATCH_GET_MAX_KEYS = 100
+    BATCH_MAX_RETRIES = 8
+
     def __init__(self, aws_account=None):
         client_name = "dynamodb"
         super().__init__(client_name, aws_account=aws_account)
@@ -175,27 +182,7 @@ class DynamoDBClient(Boto3Client):
         :return:
         """
 
-        def convert_to_dynamodbish_subroutine(sub_obj_src):
-            """
-            Recursive Subroutine.
-
-            :param sub_obj_src:
-            :return:
-            """
-
-            if isinstance(sub_obj_src, dict):
-                return {"M": {key: convert_to_dynamodbish_subroutine(value) for key, value in sub_obj_src.items()}}
-            if isinstance(sub_obj_src, str):
-                return {"S": sub_obj_src}
-            if isinstance(sub_obj_src, int):
-                return {"N": str(sub_obj_src)}
-
-            raise ValueError(f"Unsupported type: {type(sub_obj_src)}")
-
-        if not isinstance(obj_src, dict):
-            raise ValueError(f"Dict expected: {type(obj_src)}")
-
-        return {key: convert_to_dynamodbish_subroutine(value) for key, value in obj_src.items()}
+        return DynamoDBSerializer.serialize(obj_src)
 
     @staticmethod
     def convert_from_dynamodbish(obj_src):
@@ -206,34 +193,7 @@ class DynamoDBClient(Boto3Client):
         :return:
         """
 
-        def convert_from_dynamodbish_subroutine(sub_obj_src):
-            """
-            Recursive Subroutine.
-
-            :param sub_obj_src:
-            :return:
-            """
-
-            if not isinstance(sub_obj_src, dict):
-                return sub_obj_src
-
-            if len(sub_obj_src) != 1:
-                raise ValueError(f"Value must be of type S/M/D...: '{sub_obj_src}'")
-
-            if "S" in sub_obj_src:
-                return sub_obj_src["S"]
-            if "N" in sub_obj_src:
-                return int(sub_obj_src["N"])
-            if "M" in sub_obj_src:
-                return {value_key: convert_from_dynamodbish_subroutine(value) for value_key, value in
-                        sub_obj_src["M"].items()}
-
-            raise ValueError(f"Unsupported type: {type(sub_obj_src)}")
-
-        if not isinstance(obj_src, dict):
-            raise ValueError(f"Dict expected: {type(obj_src)}")
-
-        return {key: convert_from_dynamodbish_subroutine(value) for key, value in obj_src.items()}
+        return DynamoDBSerializer.deserialize(obj_src)
 
     def update_table_information(self, table: DynamoDBTable, get_tags=True, raise_if_not_found=False):
         """
@@ -323,16 +283,41 @@ class DynamoDBClient(Boto3Client):
                                      filters_req=filters_req, instant_raise=True):
             return self.convert_from_dynamodbish(response)
 
-    def scan(self, table: DynamoDBTable):
+    def scan(self, table: DynamoDBTable, total_segments=1, max_workers=None):
         """
-        Standard.
+        Standard. With total_segments > 1 the segments are scanned in parallel
+        and the items are streamed as they arrive - not in table order.
+
+        :param table:
+        :param total_segments:
+        :param max_workers:
+        :return:
+        """
+
+        if total_segments == 1:
+            yield from self.scan_segment(table)
+            return
+
+        yield from ParallelScanner(lambda segment, segments_count: self.scan_segment(table, segment, segments_count),
+                                   total_segments, max_workers=max_workers)
+
+    def scan_segment(self, table: DynamoDBTable, segment=None, total_segments=None):
+        """
+        Scan single segment.
 
         :param table:
+        :param segment:
+        :param total_segments:
         :return:
         """
 
+        filters_req = {"TableName": table.name}
+        if total_segments is not None:
+            filters_req["Segment"] = segment
+            filters_req["TotalSegments"] = total_segments
+
         for response in self.execute(self.get_session_client(region=table.region).scan, "Items",
-                                     filters_req={"TableName": table.name},
+                                     filters_req=filters_req,
                                      ):
             yield self.convert_from_dynamodbish(response)
 
@@ -353,3 +338,106 @@ class DynamoDBClient(Boto3Client):
         for response in self.execute(self.get_session_client(region=table.region).delete_item, None, raw_data=True,
                                      filters_req=filters_req, instant_raise=True):
             return response
+
+    def batch_write_items(self, table: DynamoDBTable, put_items=None, delete_keys=None):
+        """
+        BatchWriteItem - 25 requests per call. Unprocessed items are retried with exponential backoff.
+        Normal dicts, automatically converted to dynamodbish.
+
+        :param table:
+        :param put_items: Items to put.
+        :param delete_keys: Keys of the items to delete.
+        :return: Number of written requests.
+        """
+
+        write_requests = [{"PutRequest": {"Item": self.convert_to_dynamodbish(item)}} for item in put_items or []]
+        write_requests += [{"DeleteRequest": {"Key": self.convert_to_dynamodbish(key)}} for key in delete_keys or []]
+
+        logger.info(f"Batch writing {len(write_requests)} requests to dynamoDB table: '{table.name}'")
+        for start in range(0, len(write_requests), self.BATCH_WRITE_MAX_ITEMS):
+            self.batch_write_items_raw(table, write_requests[start: start + self.BATCH_WRITE_MAX_ITEMS])
+        return len(write_requests)
+
+    def batch_write_items_raw(self, table: DynamoDBTable, write_requests):
+        """
+        Single BatchWriteItem request, retry the unprocessed items.
+
+        :param table:
+        :param write_requests: Dynamodbish Put/Delete requests.
+        :return:
+        """
+
+        def batch_write_item(requests):
+            filters_req = {"RequestItems": {table.name: requests}}
+            for response in self.execute(self.get_session_client(region=table.region).batch_write_item, None,
+                                         raw_data=True, filters_req=filters_req, instant_raise=True):
+                return response
+            return None
+
+        self.execute_with_unprocessed_retries(batch_write_item,
+                                              lambda response: response.get("UnprocessedItems", {}).get(table.name),
+                                              write_requests, f"write requests to table '{table.name}'")
+
+    def batch_get_items(self, table: DynamoDBTable, keys):
+        """
+        BatchGetItem - 100 keys per call. Unprocessed keys are retried with exponential backoff.
+
+        :param table:
+        :param keys: Normal dict keys.
+        :return: Found items - normal dicts, not in keys' order.
+        """
+
+        dynamodbish_keys = [self.convert_to_dynamodbish(key) for key in keys]
+        ret = []
+        for start in range(0, len(dynamodbish_keys), self.BATCH_GET_MAX_KEYS):
+            ret += self.batch_get_items_raw(table, dynamodbish_keys[start: start + self.BATCH_GET_MAX_KEYS])
+        return ret
+
+    def batch_get_items_raw(self, table: DynamoDBTable, dynamodbish_keys):
+        """
+        Single BatchGetItem request, retry the unprocessed keys.
+
+        :param table:
+        :param dynamodbish_keys:
+        :return:
+        """
+
+        def batch_get_item(keys):
+            filters_req = {"RequestItems": {table.name: {"Keys": keys}}}
+            for response in self.execute(self.get_session_client(region=table.region).batch_get_item, None,
+                                         raw_data=True, filters_req=filters_req, instant_raise=True):
+                return response
+            return None
+
+        responses = self.execute_with_unprocessed_retries(
+            batch_get_item,
+            lambda response: response.get("UnprocessedKeys", {}).get(table.name, {}).get("Keys"),
+            dynamodbish_keys, f"keys from table '{table.name}'")
+        return [self.convert_from_dynamodbish(item) for response in responses
+                for item in response["Responses"].get(table.name, [])]
+
+    def execute_with_unprocessed_retries(self, request_callback, get_unprocessed_callback, requests, description):
+        """
+        Send batch request, resend the unprocessed part with exponential backoff.
+
+        :param request_callback: Callable(requests) -> response.
+        :param get_unprocessed_callback: Callable(response) -> unprocessed requests.
+        :param requests:
+        :param description: Requests description for the logs.
+        :return: Responses.
+        """
+
+        responses = []
+        for retry_counter in range(self.BATCH_MAX_RETRIES):
+            response = request_callback(requests)
+            if response is not None:
+                responses.append(response)
+                requests = get_unprocessed_callback(response)
+
+            if not requests:
+                return responses
+
+            logger.warning(f"Retrying {len(requests)} unprocessed dynamoDB {description}")
+            time.sleep(min(0.05 * 2 ** retry_counter, 5))
+
+        raise RuntimeError(f"Failed to process {len(requests)} dynamoDB {description}")
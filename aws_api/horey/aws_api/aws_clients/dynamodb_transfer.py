@@ -0,0 +1,198 @@
+"""
+DynamoDB items serialization and parallel scan streaming.
+
+"""
+
+import decimal
+import queue
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+
+class DynamoDBSerializer:
+    """
+    Typed conversion between normal dicts and dynamodbish attribute values.
+    Converters are dispatched by exact type with an isinstance fallback for subclasses.
+
+    """
+
+    @staticmethod
+    def serialize(obj_src):
+        """
+        Convert item to dynamodb format.
+
+        :param obj_src:
+        :return:
+        """
+
+        if not isinstance(obj_src, dict):
+            raise ValueError(f"Dict expected: {type(obj_src)}")
+
+        return {key: DynamoDBSerializer.serialize_value(value) for key, value in obj_src.items()}
+
+    @staticmethod
+    def serialize_value(value):
+        """
+        Single attribute value.
+
+        :param value:
+        :return:
+        """
+
+        converter = SERIALIZERS.get(type(value))
+        if converter is None:
+            for value_type, type_converter in SERIALIZERS.items():
+                if isinstance(value, value_type):
+                    converter = type_converter
+                    break
+            else:
+                raise ValueError(f"Unsupported type: {type(value)}")
+        return converter(value)
+
+    @staticmethod
+    def deserialize(obj_src):
+        """
+        Convert item from dynamodb format.
+
+        :param obj_src:
+        :return:
+        """
+
+        if not isinstance(obj_src, dict):
+            raise ValueError(f"Dict expected: {type(obj_src)}")
+
+        return {key: DynamoDBSerializer.deserialize_value(value) for key, value in obj_src.items()}
+
+    @staticmethod
+    def deserialize_value(value):
+        """
+        Single attribute value.
+
+        :param value:
+        :return:
+        """
+
+        if not isinstance(value, dict):
+            return value
+
+        if len(value) != 1:
+            raise ValueError(f"Value must be of type S/M/D...: '{value}'")
+
+        for type_key, type_value in value.items():
+            try:
+                return DESERIALIZERS[type_key](type_value)
+            except KeyError as inst_error:
+                raise ValueError(f"Unsupported type: {type_key}") from inst_error
+
+    @staticmethod
+    def deserialize_number(value):
+        """
+        Integers stay integers.
+
+        :param value:
+        :return:
+        """
+
+        try:
+            return int(value)
+        except ValueError:
+            return float(value)
+
+
+SERIALIZERS = {
+    str: lambda value: {"S": value},
+    bool: lambda value: {"BOOL": value},
+    int: lambda value: {"N": str(value)},
+    float: lambda value: {"N": repr(value)},
+    decimal.Decimal: lambda value: {"N": str(value)},
+    type(None): lambda value: {"NULL": True},
+    bytes: lambda value: {"B": value},
+    dict: lambda value: {"M": {key: DynamoDBSerializer.serialize_value(sub_value) for key, sub_value in value.items()}},
+    list: lambda value: {"L": [DynamoDBSerializer.serialize_value(sub_value) for sub_value in value]},
+    tuple: lambda value: {"L": [DynamoDBSerializer.serialize_value(sub_value) for sub_value in value]},
+}
+
+DESERIALIZERS = {
+    "S": lambda value: value,
+    "N": DynamoDBSerializer.deserialize_number,
+    "BOOL": lambda value: value,
+    "NULL": lambda value: None,
+    "B": lambda value: value,
+    "M": lambda value: {key: DynamoDBSerializer.deserialize_value(sub_value) for key, sub_value in value.items()},
+    "L": lambda value: [DynamoDBSerializer.deserialize_value(sub_value) for sub_value in value],
+    "SS": set,
+    "NS": lambda value: {DynamoDBSerializer.deserialize_number(sub_value) for sub_value in value},
+    "BS": set,
+}
+
+
+class ParallelScanner:
+    """
+    Stream items of a parallel (Segment/TotalSegments) scan as they arrive.
+    Each segment runs in its own worker, items are passed through a bounded queue,
+    so memory is capped regardless of the table size.
+
+    """
+
+    QUEUE_BLOCK_SIZE = 100
+
+    def __init__(self, scan_segment, total_segments, max_workers=None, max_queued_blocks=64):
+        """
+
+        :param scan_segment: Callable(segment, total_segments) yielding items.
+        :param total_segments:
+        :param max_workers: total_segments by default.
+        :param max_queued_blocks: Queue size in blocks of QUEUE_BLOCK_SIZE items.
+        """
+
+        self.scan_segment = scan_segment
+        self.total_segments = total_segments
+        self.max_workers = max_workers or total_segments
+        self.max_queued_blocks = max_queued_blocks
+
+    def __iter__(self):
+        items_queue = queue.Queue(maxsize=self.max_queued_blocks)
+        stop_event = threading.Event()
+
+        def put(element):
+            while not stop_event.is_set():
+                try:
+                    items_queue.put(element, timeout=0.1)
+                    return True
+                except queue.Full:
+                    continue
+            return False
+
+        def scan_segment_worker(segment):
+            try:
+                block = []
+                for item in self.scan_segment(segment, self.total_segments):
+                    block.append(item)
+                    if len(block) >= self.QUEUE_BLOCK_SIZE:
+                        if not put(("items", block)):
+                            return
+                        block = []
+                if block:
+                    put(("items", block))
+            except Exception as inst_error:
+                put(("error", inst_error))
+            finally:
+                put(("done", segment))
+
+        executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="dynamodb_scan")
+        try:
+            for segment in range(self.total_segments):
+                executor.submit(scan_segment_worker, segment)
+
+            segments_left = self.total_segments
+            while segments_left:
+                element_type, element = items_queue.get()
+                if element_type == "items":
+                    yield from element
+                elif element_type == "error":
+                    raise element
+                else:
+                    segments_left -= 1
+        finally:
+            stop_event.set()
+            executor.shutdown(wait=True, cancel_futures=True)
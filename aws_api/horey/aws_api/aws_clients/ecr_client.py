@@ -62,6 +62,7 @@ class ECRClient(Boto3Client):
         else:
             dict_ret = self.provision_repository_raw(repository.region, repository.generate_create_request())
             repository.update_from_raw_response(dict_ret)
+            self.clear_cache(ECRRepository)
 
         self.tag_resource(repository, arn_identifier="resourceArn", tags_identifier="tags")
 
@@ -89,10 +90,10 @@ class ECRClient(Boto3Client):
             self.delete_repository_policy_raw(repository.region, delete_request)
 
         if repository.tags != repo_region.tags:
-            self.clear_cache(ECRRepository)
-            self.tag_resource(repository, arn_identifier="resourceArn", tags_identifier="tags")
+            self.tag_repository_raw(repository.region, {"resourceArn": repository.arn, "tags": repository.tags})
 
         self.update_repository_information(repository)
+        self.add_entity_to_cache(repository, full_information=True, get_tags=True)
         return repository
 
     def update_repository_information(self, repository, full_information=True):
@@ -145,7 +146,7 @@ class ECRClient(Boto3Client):
 
     def set_repository_policy_raw(self, region, request_dict):
         """
-        Standard.
+        Standard. The cache is updated by provision_repository.
 
         @param request_dict:
         @return:
@@ -154,13 +155,12 @@ class ECRClient(Boto3Client):
         for response in self.execute(
                 self.get_session_client(region=region).set_repository_policy, None, raw_data=True, filters_req=request_dict
         ):
-            self.clear_cache(ECRRepository)
             return response
         return None
 
     def delete_repository_policy_raw(self, region, request_dict):
         """
-        Standard.
+        Standard. The cache is updated by provision_repository.
 
         @param request_dict:
         @return:
@@ -169,12 +169,26 @@ class ECRClient(Boto3Client):
         for response in self.execute(
                 self.get_session_client(region=region).delete_repository_policy, None, raw_data=True, filters_req=request_dict
         ):
-            self.clear_cache(ECRRepository)
             return response
 
+    def tag_repository_raw(self, region, request_dict):
+        """
+        Standard. The cache is updated by provision_repository.
+
+        @param request_dict:
+        @return:
+        """
+
+        logger.info(f"Tagging ecr repository: {request_dict['resourceArn']}")
+        for response in self.execute(
+                self.get_session_client(region=region).tag_resource, None, raw_data=True, filters_req=request_dict
+        ):
+            return response
+        return None
+
     def provision_repository_raw(self, region, request_dict):
         """
-        Provision ECR repo from dict request.
+        Provision ECR repo from dict request. The cache is updated by provision_repository.
 
         :param region:
         :param request_dict:
@@ -186,7 +200,6 @@ class ECRClient(Boto3Client):
         for response in self.execute(
                 self.get_session_client(region=region).create_repository, "repository", filters_req=request_dict
         ):
-            self.clear_cache(ECRRepository)
             return response
 
     # pylint: disable= too-many-arguments
@@ -335,11 +348,12 @@ class ECRClient(Boto3Client):
         dict_ret = self.dispose_repository_raw(repository.region, repository.generate_dispose_request())
         if dict_ret:
             repository.update_from_raw_response(dict_ret)
+        self.delete_entity_from_cache(repository)
         return True
 
     def dispose_repository_raw(self, region, request_dict):
         """
-        Standard
+        Standard. The cache is updated by dispose_repository.
 
         @param request_dict:
         @return:
@@ -350,7 +364,6 @@ class ECRClient(Boto3Client):
                 exception_ignore_callback=lambda error: "RepositoryNotFoundException" in repr(error)
 
         ):
-            self.clear_cache(ECRRepository)
             return response
 
     def tag_image(self, image, new_tags):
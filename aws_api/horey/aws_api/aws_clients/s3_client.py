@@ -14,6 +14,7 @@ from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 
 from horey.aws_api.aws_clients.boto3_client import Boto3Client
+from horey.aws_api.aws_clients.s3_transfer import FilePartReader, InFlightBytesLimiter, ETagUtils
 from horey.aws_api.aws_services_entities.s3_bucket import S3Bucket
 from horey.h_logger import get_logger
 from horey.aws_api.base_entities.region import Region
@@ -24,7 +25,7 @@ logger = get_logger()
 # pylint: disable= too-many-instance-attributes
 class UploadTask:
     """
-    File part or single file uploading task.
+    File part or single file uploading or downloading task.
     Characters that might require special handling
     The following characters in a key name might require additional code handling
     and likely need to be URL encoded or referenced as HEX. Some of these are non-printable
@@ -77,8 +78,11 @@ class UploadTask:
         self.upload_id = None
         self.extra_args = extra_args
         self.attempts = []
+        self.retryable = True
         self.error = None
         self.part_number = None
+        self.size = None
+        self.e_tag = None
 
     class Type(Enum):
         """
@@ -87,6 +91,8 @@ class UploadTask:
 
         FILE = 0
         PART = 1
+        DOWNLOAD_FILE = 2
+        DOWNLOAD_PART = 3
 
 
 class TasksQueue:
@@ -137,6 +143,15 @@ class TasksQueue:
         """
         return len(TasksQueue.TASKS_DICT) == 0
 
+    @staticmethod
+    def clear():
+        """
+        Drop all the tasks - the flow failed.
+
+        @return:
+        """
+        TasksQueue.TASKS_DICT.clear()
+
     @staticmethod
     def remove(task):
         """
@@ -152,7 +167,8 @@ class TasksQueue:
         Remove successfully finished tasks.
         If the task failed to upload:
         1) If the thread was complete - mark the task as not running for rerun.
-        2) If the thread was unexpectedly killed raises TaskThreadError.
+        2) If the task can not be retried - raises TaskThreadError.
+        3) If the thread was unexpectedly killed raises TaskThreadError.
         @return:
         """
         finished_tasks = []
@@ -167,6 +183,11 @@ class TasksQueue:
                     finished_tasks.append(task)
                     continue
 
+                if not task.retryable:
+                    raise self.TaskThreadError(
+                        f"Task {task.id} failed after {len(task.attempts)} attempts: {task.attempts[-1:]}"
+                    )
+
                 task.finished = False
                 task.started = False
             elif task.error is not None:
@@ -213,6 +234,11 @@ class S3Client(Boto3Client):
 
     TASKS_QUEUE = None
     THREAD_POOL_EXECUTOR = None
+    IN_FLIGHT_BYTES_LIMITER = None
+    DOWNLOAD_CHUNK_SIZE = 1024 * 1024
+    DOWNLOAD_MAX_ATTEMPTS = 5
+    DOWNLOAD_PERMANENT_ERRORS = ("(PreconditionFailed)", "(412)", "(NoSuchKey)", "(404)", "(AccessDenied)",
+                                 "(403)", "(InvalidRange)")
 
     def __init__(self, aws_account=None):
         client_name = "s3"
@@ -221,6 +247,7 @@ class S3Client(Boto3Client):
         self._max_queue_size = 1000
         self._multipart_threshold = 10 * 1024 * 1024
         self._max_concurrent_requests = 70
+        self._max_in_flight_bytes = 512 * 1024 * 1024
         self.finished_uploading_flow = False
         self.multipart_uploads = {}
         self._tasks_manager_thread_keepalive = None
@@ -359,6 +386,40 @@ class S3Client(Boto3Client):
                 "Can not change max_concurrent_requests for running executor"
             )
 
+    @property
+    def max_in_flight_bytes(self):
+        """
+        Max total size of the files and parts being uploaded at once.
+
+        :return:
+        """
+        return self._max_in_flight_bytes
+
+    @max_in_flight_bytes.setter
+    def max_in_flight_bytes(self, value):
+        """
+        Max total size of the files and parts being uploaded at once.
+
+        :param value:
+        :return:
+        """
+        self.validate_int(value)
+        self._max_in_flight_bytes = value
+
+        if S3Client.IN_FLIGHT_BYTES_LIMITER is not None:
+            S3Client.IN_FLIGHT_BYTES_LIMITER.max_bytes = value
+
+    @property
+    def in_flight_bytes_limiter(self):
+        """
+        Single limiter - shared as the executor is.
+
+        :return:
+        """
+        if S3Client.IN_FLIGHT_BYTES_LIMITER is None:
+            S3Client.IN_FLIGHT_BYTES_LIMITER = InFlightBytesLimiter(self.max_in_flight_bytes)
+        return S3Client.IN_FLIGHT_BYTES_LIMITER
+
     @staticmethod
     def validate_int(value, min_value=1, max_value=None):
         """
@@ -423,11 +484,45 @@ class S3Client(Boto3Client):
         except Exception as inst:
             if "AccessDenied" in repr(inst):
                 print(
-                    f"yield_bucket_objects failed {bucket.name}: {repr(inst)}"
+                    f"yield_bucket_objects failed {bucket_name}: {repr(inst)}"
                 )
             else:
                 raise
 
+    def yield_bucket_objects_pages(self, bucket_name, prefix=None, delimiter=None):
+        """
+        Raw list_objects_v2 pages - no BucketObject instantiation.
+
+        :param bucket_name:
+        :param prefix:
+        :param delimiter: With "/" the pages hold the next level CommonPrefixes.
+        :return:
+        """
+
+        filters_req = {"Bucket": bucket_name}
+        if prefix:
+            filters_req["Prefix"] = prefix
+        if delimiter:
+            filters_req["Delimiter"] = delimiter
+
+        yield from self.execute(self.get_session_client().list_objects_v2, None, raw_data=True,
+                                filters_req=filters_req)
+
+    def get_object_body(self, bucket_name, key):
+        """
+        Object's streaming body.
+
+        :param bucket_name:
+        :param key:
+        :return:
+        """
+
+        for response in self.execute(self.get_session_client().get_object, None, raw_data=True,
+                                     filters_req={"Bucket": bucket_name, "Key": key}):
+            return response["Body"]
+
+        raise ValueError(f"Object '{key}' does not exist in bucket '{bucket_name}'")
+
     def get_bucket_object(self, bucket: S3Bucket, bucket_object: S3Bucket.BucketObject):
         """
         Download bucket key data.
@@ -450,6 +545,7 @@ class S3Client(Boto3Client):
     def get_bucket_object_file(self, bucket: S3Bucket, bucket_object: S3Bucket.BucketObject, file_path: Path):
         """
         Download bucket key data and write to file.
+        Large objects are downloaded with concurrent byte range requests.
 
         @param bucket:
         @param bucket_object:
@@ -457,9 +553,7 @@ class S3Client(Boto3Client):
         @return:
         """
 
-        data = self.get_bucket_object(bucket, bucket_object)
-        with open(file_path, "wb") as file_handler:
-            file_handler.write(data)
+        self.download_file(bucket.name, bucket_object.key, str(file_path))
         return True
 
     def update_bucket_information(self, bucket: S3Bucket):
@@ -603,6 +697,25 @@ class S3Client(Boto3Client):
         """
 
         dst_root_key = dst_root_key.lstrip("/").rstrip("/")
+
+        self.run_tasks_flow(lambda: self.start_uploading_object(
+            bucket_name,
+            src_object_path,
+            dst_root_key,
+            keep_src_object_name=keep_src_object_name,
+            extra_args=extra_args,
+            metadata_callback=metadata_callback,
+        ), f"Upload with args {bucket_name, src_object_path, dst_root_key, keep_src_object_name}")
+
+    def run_tasks_flow(self, start_tasks_callback, flow_description):
+        """
+        Run the tasks manager thread, insert the tasks and wait for all of them to finish.
+
+        @param start_tasks_callback: Inserts the tasks into the tasks queue.
+        @param flow_description: Log string.
+        @return: start_tasks_callback return value.
+        """
+
         start_time = datetime.datetime.now()
 
         self.finished_uploading_flow = False
@@ -611,20 +724,22 @@ class S3Client(Boto3Client):
         thread = threading.Thread(target=self.start_tasks_manager_thread)
         thread.start()
 
-        self.start_uploading_object(
-            bucket_name,
-            src_object_path,
-            dst_root_key,
-            keep_src_object_name=keep_src_object_name,
-            extra_args=extra_args,
-            metadata_callback=metadata_callback,
-        )
-        self.finished_uploading_flow = True
+        try:
+            ret = start_tasks_callback()
+        except Exception:
+            # The tasks queue is shared - do not leave the manager running into the next flow.
+            self.tasks_queue.clear()
+            self.finished_uploading_flow = True
+            thread.join()
+            raise
+        finally:
+            self.finished_uploading_flow = True
 
         sleep_time = 0.5
 
         while not self.tasks_queue.empty():
             if self._tasks_manager_thread_keepalive is None:
+                self.tasks_queue.clear()
                 raise RuntimeError("Tasks manager thread is dead")
 
             if (
@@ -643,9 +758,9 @@ class S3Client(Boto3Client):
 
         end_time = datetime.datetime.now()
         logger.info(
-            f"Upload with args {bucket_name, src_object_path, dst_root_key, keep_src_object_name} "
-            f"finished in {end_time - start_time}"
+            f"{flow_description} finished in {end_time - start_time}"
         )
+        return ret
 
     # pylint: disable= too-many-arguments
     # pylint: disable= too-many-positional-arguments
@@ -714,7 +829,7 @@ class S3Client(Boto3Client):
         )
 
         for _ in range(60):
-            if not self.tasks_queue.empty():
+            if not self.tasks_queue.empty() or self.finished_uploading_flow:
                 break
             logger.info(
                 "Tasks manager thread waiting for first tasks in tasks queue to start running"
@@ -759,6 +874,10 @@ class S3Client(Boto3Client):
                     f"Uploading file {task.file_path} failed with {task.attempts[-1]}"
                 )
 
+            if not self.in_flight_bytes_limiter.try_acquire(task.size):
+                time.sleep(0.05)
+                continue
+
             self.execute_s3_upload_task(task)
 
     def finish_multipart_uploads(self, finished_tasks):
@@ -825,7 +944,10 @@ class S3Client(Boto3Client):
             self.thread_pool_executor.submit(self.upload_file_thread, task)
         elif task.task_type == task.Type.PART:
             self.thread_pool_executor.submit(self.upload_file_part_thread, task)
+        elif task.task_type in [task.Type.DOWNLOAD_FILE, task.Type.DOWNLOAD_PART]:
+            self.thread_pool_executor.submit(self.download_file_thread, task)
         else:
+            self.in_flight_bytes_limiter.release(task.size)
             raise ValueError(task.type)
 
     def upload_file_thread(self, task):
@@ -840,6 +962,8 @@ class S3Client(Boto3Client):
             task.finished = True
             task.succeed = False
             task.error = exception_instance
+        finally:
+            self.in_flight_bytes_limiter.release(task.size)
 
     def upload_file_thread_helper(self, task):
         """
@@ -849,8 +973,17 @@ class S3Client(Boto3Client):
         @return:
         """
         logger.info(f"Starting upload_file_thread for file {task.file_path}")
-        with open(task.file_path, "rb") as file_handler:
-            file_data = file_handler.read()
+        with FilePartReader(task.file_path) as file_data:
+            self.put_file_object(task, file_data)
+
+    def put_file_object(self, task, file_data):
+        """
+        Upload the complete file body.
+
+        @param task: UpdateTask with all needed info
+        @param file_data: FilePartReader of the file.
+        @return:
+        """
 
         start_time = datetime.datetime.now()
         filters_req = {
@@ -897,9 +1030,13 @@ class S3Client(Boto3Client):
         Calculate and add ContentMD5 key and value.
 
         @param filters_req:
-        @param file_data:
+        @param file_data: bytes or FilePartReader
         @return:
         """
+        if isinstance(file_data, FilePartReader):
+            filters_req["ContentMD5"] = file_data.get_content_md5()
+            return
+
         md = hashlib.md5(file_data).digest()
         content_md5_string = base64.b64encode(md).decode("utf-8")
         filters_req["ContentMD5"] = content_md5_string
@@ -916,6 +1053,8 @@ class S3Client(Boto3Client):
             task.finished = True
             task.succeed = False
             task.error = exception_instance
+        finally:
+            self.in_flight_bytes_limiter.release(task.size)
 
     def upload_file_part_thread_helper(self, task):
         """
@@ -928,9 +1067,17 @@ class S3Client(Boto3Client):
             f"Reading file {task.file_path} offset {task.offset_index}, offset_length {task.offset_length}"
         )
 
-        with open(task.file_path, "rb") as file_handler:
-            file_handler.seek(task.offset_index)
-            byte_chunk = file_handler.read(task.offset_length)
+        with FilePartReader(task.file_path, offset=task.offset_index, length=task.offset_length) as byte_chunk:
+            self.upload_part_body(task, byte_chunk)
+
+    def upload_part_body(self, task, byte_chunk):
+        """
+        Upload the part body.
+
+        @param task: UpdateTask of the part.
+        @param byte_chunk: FilePartReader of the part region.
+        @return:
+        """
 
         logger.info(f"Uploading {len(byte_chunk)} bytes part {task.part_number}")
         filters_req = {
@@ -1004,6 +1151,7 @@ class S3Client(Boto3Client):
         task = UploadTask(
             task_id, task_type, file_path, bucket_name, key_name, extra_args=extra_args
         )
+        task.size = file_size
         task.start_time = datetime.datetime.now()
         return self.insert_task_into_tasks_queue(task)
 
@@ -1065,6 +1213,7 @@ class S3Client(Boto3Client):
             task.part_number = part_number
             task.offset_index = self.multipart_chunk_size * (part_number - 1)
             task.offset_length = self.multipart_chunk_size
+            task.size = task.offset_length
             task.upload_id = upload_id
             self.multipart_uploads[upload_id].append(task)
             self.insert_task_into_tasks_queue(task)
@@ -1077,7 +1226,8 @@ class S3Client(Boto3Client):
             )
             task.part_number = part_number
             task.offset_index = self.multipart_chunk_size * (part_number - 1)
-            task.offset_length = self.multipart_chunk_size
+            task.offset_length = part_chunk
+            task.size = task.offset_length
             task.upload_id = upload_id
             self.multipart_uploads[upload_id].append(task)
             self.insert_task_into_tasks_queue(task)
@@ -1258,7 +1408,8 @@ class S3Client(Boto3Client):
 
     def download_file(self, bucket_name, key_path, file_path):
         """
-        Download single file
+        Download single file.
+        Objects larger than multipart_threshold are split to byte range requests.
 
         :param bucket_name:
         :param key_path:
@@ -1267,7 +1418,229 @@ class S3Client(Boto3Client):
         """
 
         logger.info(f"Downloading from {bucket_name}/{key_path}")
-        self.get_session_client().download_file(bucket_name, key_path, file_path)
+        self.run_tasks_flow(lambda: self.start_downloading_file_task(bucket_name, key_path, file_path),
+                            f"Download {bucket_name}/{key_path} to {file_path}")
+
+    def sync_download(self, bucket_name, src_root_key, dst_dir_path):
+        """
+        Download keys tree to the directory. Files with the object's size and ETag are skipped.
+
+        :param bucket_name:
+        :param src_root_key: Root of the s3 keys tree.
+        :param dst_dir_path:
+        :return: Downloaded keys.
+        """
+
+        src_root_key = src_root_key.strip("/")
+        prefix = f"{src_root_key}/" if src_root_key else ""
+
+        def start_tasks():
+            ret = []
+            skipped_count = 0
+            for bucket_object in self.yield_bucket_objects(None, custom_filters={"Prefix": prefix},
+                                                           bucket_name=bucket_name):
+                if bucket_object.key.endswith("/"):
+                    continue
+
+                file_path = self.generate_download_file_path(dst_dir_path, bucket_object.key[len(prefix):])
+                if ETagUtils.is_unchanged(file_path, bucket_object.size, bucket_object.e_tag):
+                    skipped_count += 1
+                    continue
+
+                self.start_downloading_file_task(bucket_name, bucket_object.key, file_path,
+                                                 size=bucket_object.size, e_tag=bucket_object.e_tag)
+                ret.append(bucket_object.key)
+            logger.info(f"Sync download {bucket_name}/{prefix}: {len(ret)} changed, {skipped_count} unchanged")
+            return ret
+
+        return self.run_tasks_flow(start_tasks, f"Sync download {bucket_name}/{prefix} to {dst_dir_path}")
+
+    @staticmethod
+    def generate_download_file_path(dst_dir_path, relative_key):
+        """
+        Local path of the key. Keys escaping the directory ('..', absolute paths) are rejected.
+
+        :param dst_dir_path:
+        :param relative_key: Key relative to the synced root.
+        :return:
+        """
+
+        dst_dir_path = os.path.abspath(dst_dir_path)
+        parts = relative_key.split("/")
+        if any(part == ".." or os.sep in part or (os.altsep and os.altsep in part) or os.path.splitdrive(part)[0]
+               for part in parts):
+            raise ValueError(f"Key '{relative_key}' is not a path inside '{dst_dir_path}'")
+
+        file_path = os.path.abspath(os.path.join(dst_dir_path, *[part for part in parts if part]))
+        if os.path.commonpath([dst_dir_path, file_path]) != dst_dir_path or file_path == dst_dir_path:
+            raise ValueError(f"Key '{relative_key}' is not a path inside '{dst_dir_path}'")
+        return file_path
+
+    # pylint: disable= too-many-arguments
+    # pylint: disable= too-many-positional-arguments
+    def sync_upload(self, bucket_name, src_dir_path, dst_root_key, extra_args=None, metadata_callback=None):
+        """
+        Upload directory tree to the keys tree. Files with the object's size and ETag are skipped.
+
+        :param bucket_name:
+        :param src_dir_path:
+        :param dst_root_key: Root of the s3 keys tree.
+        :param extra_args:
+        :param metadata_callback:
+        :return: Uploaded keys.
+        """
+
+        dst_root_key = dst_root_key.strip("/")
+        prefix = f"{dst_root_key}/" if dst_root_key else ""
+
+        def start_tasks():
+            remote_objects = {bucket_object.key: (bucket_object.size, bucket_object.e_tag) for bucket_object in
+                              self.yield_bucket_objects(None, custom_filters={"Prefix": prefix},
+                                                        bucket_name=bucket_name)}
+            ret = []
+            skipped_count = 0
+            for dir_path, _, file_names in os.walk(src_dir_path):
+                for file_name in file_names:
+                    file_path = os.path.join(dir_path, file_name)
+                    key_name = prefix + os.path.relpath(file_path, src_dir_path).replace(os.sep, "/")
+                    remote_object = remote_objects.get(key_name)
+                    if remote_object is not None and ETagUtils.is_unchanged(file_path, *remote_object):
+                        skipped_count += 1
+                        continue
+
+                    self.start_uploading_file_task(bucket_name, file_path, key_name, extra_args=extra_args,
+                                                   metadata_callback=metadata_callback)
+                    ret.append(key_name)
+            logger.info(f"Sync upload {src_dir_path} to {bucket_name}/{prefix}: {len(ret)} changed, "
+                        f"{skipped_count} unchanged")
+            return ret
+
+        return self.run_tasks_flow(start_tasks, f"Sync upload {src_dir_path} to {bucket_name}/{prefix}")
+
+    # pylint: disable= too-many-positional-arguments
+    def start_downloading_file_task(self, bucket_name, key_name, file_path, size=None, e_tag=None):
+        """
+        Insert the download tasks of the object.
+        If object larger then multipart_threshold it is split to byte range parts written in place.
+
+        :param bucket_name:
+        :param key_name:
+        :param file_path:
+        :param size: Object size, fetched if not set.
+        :param e_tag: Object ETag, fetched if not set. Parts are downloaded only if the object was not changed.
+        :return:
+        """
+
+        if size is None or e_tag is None:
+            filters_req = {"Bucket": bucket_name, "Key": key_name}
+            for response in self.execute(self.get_session_client().head_object, None, raw_data=True,
+                                         filters_req=filters_req):
+                size = response["ContentLength"]
+                e_tag = response["ETag"]
+                break
+            else:
+                raise ValueError(f"Object '{key_name}' does not exist in bucket '{bucket_name}'")
+
+        dir_path = os.path.dirname(file_path)
+        if dir_path:
+            os.makedirs(dir_path, exist_ok=True)
+
+        if size < self.multipart_threshold:
+            task = UploadTask(f"download:{file_path}", UploadTask.Type.DOWNLOAD_FILE, file_path, bucket_name,
+                              key_name)
+            task.size = size
+            task.e_tag = e_tag
+            task.start_time = datetime.datetime.now()
+            return self.insert_task_into_tasks_queue(task)
+
+        with open(file_path, "wb") as file_handler:
+            if hasattr(os, "posix_fallocate"):
+                os.posix_fallocate(file_handler.fileno(), 0, size)
+            else:
+                file_handler.truncate(size)
+
+        for part_number, offset_index in enumerate(range(0, size, self.multipart_chunk_size), start=1):
+            task = UploadTask(f"download:{file_path}%{part_number}", UploadTask.Type.DOWNLOAD_PART, file_path,
+                              bucket_name, key_name)
+            task.part_number = part_number
+            task.offset_index = offset_index
+            task.offset_length = min(self.multipart_chunk_size, size - offset_index)
+            task.size = task.offset_length
+            task.e_tag = e_tag
+            task.start_time = datetime.datetime.now()
+            self.insert_task_into_tasks_queue(task)
+        return None
+
+    def download_file_thread(self, task):
+        """
+        Function starts a file or file part downloading thread
+        @param task:
+        @return:
+        """
+        try:
+            self.download_file_thread_helper(task)
+        except Exception as exception_instance:
+            task.attempts.append(repr(exception_instance))
+            task.retryable = len(task.attempts) < self.DOWNLOAD_MAX_ATTEMPTS
+            task.finished = True
+            task.succeed = False
+            task.error = exception_instance
+        finally:
+            self.in_flight_bytes_limiter.release(task.size)
+
+    def download_file_thread_helper(self, task):
+        """
+        Downloads the object or its byte range and writes it in place.
+
+        @param task: UpdateTask with all needed info
+        @return:
+        """
+
+        filters_req = {"Bucket": task.bucket_name, "Key": task.key_name}
+        if task.task_type == task.Type.DOWNLOAD_PART:
+            filters_req["Range"] = f"bytes={task.offset_index}-{task.offset_index + task.offset_length - 1}"
+        if task.e_tag is not None:
+            filters_req["IfMatch"] = task.e_tag
+
+        start_time = datetime.datetime.now()
+        try:
+            for response in self.execute(self.get_session_client().get_object, None, raw_data=True,
+                                         filters_req=filters_req):
+                self.write_response_body(task, response["Body"])
+                task.succeed = True
+                break
+            else:
+                raise RuntimeError(f"Was not able to download {task.bucket_name}/{task.key_name}")
+        except Exception as exception_inst:
+            logger.warning(f"Failed to download {filters_req} with exception {repr(exception_inst)}")
+            task.attempts.append(repr(exception_inst))
+            task.succeed = False
+            # The object changed (IfMatch), was deleted or is not accessible - retries will not help.
+            if any(error in task.attempts[-1] for error in self.DOWNLOAD_PERMANENT_ERRORS) or \
+                    len(task.attempts) >= self.DOWNLOAD_MAX_ATTEMPTS:
+                task.retryable = False
+
+        task.finished = True
+        end_time = datetime.datetime.now()
+        logger.info(
+            f"Downloaded {task.key_name} part {task.part_number}, {task.size} bytes took {end_time - start_time}"
+        )
+
+    def write_response_body(self, task, body):
+        """
+        Stream the response body into the file - whole file or in place at the part offset.
+
+        @param task:
+        @param body: botocore StreamingBody
+        @return:
+        """
+
+        mode = "r+b" if task.task_type == task.Type.DOWNLOAD_PART else "wb"
+        with open(task.file_path, mode) as file_handler:
+            if task.task_type == task.Type.DOWNLOAD_PART:
+                file_handler.seek(task.offset_index)
+            for chunk in body.iter_chunks(chunk_size=self.DOWNLOAD_CHUNK_SIZE):
+                file_handler.write(chunk)
 
     def copy_object_raw(self, request_dict, region=None):
         """
@@ -0,0 +1,207 @@
+"""
+Bounded memory S3 objects summaries: size and keys count per bucket/day and per bucket/prefix.
+Aggregated while listing or from S3 Inventory CSV files - objects are never buffered.
+
+"""
+
+import csv
+import datetime
+import gzip
+import io
+import json
+import os
+from collections import defaultdict
+from urllib.parse import unquote_plus
+
+
+class S3InventorySummary:
+    """
+    Summary of S3 objects.
+    Written as compact columnar JSON: one array per column, a row per bucket/day or bucket/prefix.
+
+    """
+
+    FORMAT = "s3_inventory_summary_columnar"
+
+    def __init__(self, prefix_depth=1):
+        self.prefix_depth = prefix_depth
+        # (bucket name, "YYYY-MM-DD"): [keys, size]
+        self.by_day = defaultdict(lambda: [0, 0])
+        # (bucket name, prefix): [keys, size]
+        self.by_prefix = defaultdict(lambda: [0, 0])
+
+    def get_prefix(self, key):
+        """
+        First prefix_depth key components, "" for the keys in the bucket root.
+
+        :param key:
+        :return:
+        """
+
+        components = key.split("/", self.prefix_depth)
+        if len(components) == 1:
+            return ""
+        return "/".join(components[:-1]) + "/"
+
+    def add(self, bucket_name, key, size, last_modified):
+        """
+        Aggregate single object.
+
+        :param bucket_name:
+        :param key:
+        :param size:
+        :param last_modified: datetime or ISO format string.
+        :return:
+        """
+
+        day = last_modified[:10] if isinstance(last_modified, str) else \
+            last_modified.astimezone(datetime.timezone.utc).date().isoformat()
+
+        day_counters = self.by_day[(bucket_name, day)]
+        day_counters[0] += 1
+        day_counters[1] += size
+
+        prefix_counters = self.by_prefix[(bucket_name, self.get_prefix(key))]
+        prefix_counters[0] += 1
+        prefix_counters[1] += size
+
+    def add_objects_page(self, bucket_name, page):
+        """
+        Aggregate list_objects_v2 response page.
+
+        :param bucket_name:
+        :param page:
+        :return: Number of objects in the page.
+        """
+
+        contents = page.get("Contents", [])
+        for object_info in contents:
+            self.add(bucket_name, object_info["Key"], object_info["Size"], object_info["LastModified"])
+        return len(contents)
+
+    def add_inventory_csv_file(self, file_handler, file_schema):
+        """
+        Aggregate S3 Inventory CSV file.
+
+        :param file_handler: Binary gzip compressed CSV stream.
+        :param file_schema: Manifest's fileSchema, e.g. "Bucket, Key, Size, LastModifiedDate"
+        :return: Number of objects in the file.
+        """
+
+        columns = [column.strip() for column in file_schema.split(",")]
+        bucket_index = columns.index("Bucket")
+        key_index = columns.index("Key")
+        size_index = columns.index("Size")
+        last_modified_index = columns.index("LastModifiedDate")
+
+        counter = 0
+        with gzip.GzipFile(fileobj=file_handler) as gzip_file_handler:
+            for row in csv.reader(io.TextIOWrapper(gzip_file_handler, encoding="utf-8", newline="")):
+                # Delete markers have no size.
+                if not row[size_index]:
+                    continue
+                self.add(row[bucket_index], unquote_plus(row[key_index]), int(row[size_index]),
+                         row[last_modified_index])
+                counter += 1
+        return counter
+
+    @staticmethod
+    def get_inventory_manifest_files(manifest):
+        """
+        Data file keys from S3 Inventory manifest.json.
+
+        :param manifest:
+        :return: (destination bucket name, file schema, keys)
+        """
+
+        if manifest["fileFormat"] != "CSV":
+            raise NotImplementedError(f"S3 Inventory file format: {manifest['fileFormat']}")
+
+        destination_bucket_name = manifest["destinationBucket"].split(":::")[-1]
+        return destination_bucket_name, manifest["fileSchema"], [file_info["key"] for file_info in manifest["files"]]
+
+    def merge(self, other):
+        """
+        Add other summary's counters.
+
+        :param other:
+        :return:
+        """
+
+        for dst, src in [(self.by_day, other.by_day), (self.by_prefix, other.by_prefix)]:
+            for key, (keys_count, size) in src.items():
+                counters = dst[key]
+                counters[0] += keys_count
+                counters[1] += size
+        return self
+
+    def to_by_date_split(self):
+        """
+        Nested format: bucket name -> year -> month -> day -> {"keys": int, "size": int}
+
+        :return:
+        """
+
+        ret = {}
+        for (bucket_name, day), (keys_count, size) in self.by_day.items():
+            year, month, day_of_month = (str(int(part)) for part in day.split("-"))
+            ret.setdefault(bucket_name, {}).setdefault(year, {}).setdefault(month, {})[day_of_month] = \
+                {"keys": keys_count, "size": size}
+        return ret
+
+    def convert_to_dict(self):
+        """
+        Columnar format.
+
+        :return:
+        """
+
+        ret = {"format": self.FORMAT, "prefix_depth": self.prefix_depth}
+        for name, counters in [("by_day", self.by_day), ("by_prefix", self.by_prefix)]:
+            rows = sorted(counters.items())
+            ret[name] = {"bucket": [key[0] for key, _ in rows],
+                         "value": [key[1] for key, _ in rows],
+                         "keys": [value[0] for _, value in rows],
+                         "size": [value[1] for _, value in rows]}
+        return ret
+
+    @classmethod
+    def init_from_dict(cls, dict_src):
+        """
+        Init from the columnar format.
+
+        :param dict_src:
+        :return:
+        """
+
+        ret = cls(prefix_depth=dict_src["prefix_depth"])
+        for name, counters in [("by_day", ret.by_day), ("by_prefix", ret.by_prefix)]:
+            columns = dict_src[name]
+            for bucket_name, value, keys_count, size in zip(columns["bucket"], columns["value"], columns["keys"],
+                                                            columns["size"]):
+                counters[(bucket_name, value)] = [keys_count, size]
+        return ret
+
+    @classmethod
+    def is_columnar(cls, dict_src):
+        """
+        Check the summary file format.
+
+        :param dict_src:
+        :return:
+        """
+
+        return dict_src.get("format") == cls.FORMAT
+
+    def write(self, file_path):
+        """
+        Write atomically.
+
+        :param file_path:
+        :return:
+        """
+
+        tmp_file_path = f"{file_path}.tmp"
+        with open(tmp_file_path, "w", encoding="utf-8") as file_handler:
+            json.dump(self.convert_to_dict(), file_handler, separators=(",", ":"))
+        os.replace(tmp_file_path, file_path)
@@ -0,0 +1,253 @@
+"""
+S3 transfer helpers: zero copy file part bodies, in flight bytes accounting
+and local files to S3 objects comparison.
+
+"""
+
+import base64
+import hashlib
+import io
+import mmap
+import os
+import threading
+
+
+class FilePartReader(io.RawIOBase):
+    """
+    Read only, seekable file-like view of a file region backed by mmap.
+    Passed as Body to put_object/upload_part - botocore streams it in small blocks
+    instead of the whole part being read into a bytes object.
+    Positions are relative to the region start.
+
+    """
+
+    MD5_BLOCK_SIZE = 1024 * 1024
+
+    def __init__(self, file_path, offset=0, length=None):
+        super().__init__()
+        self.file_path = file_path
+        self._mmap = None
+        self._view = memoryview(b"")
+        self._position = 0
+
+        with open(file_path, "rb") as file_handler:
+            file_size = os.fstat(file_handler.fileno()).st_size
+            if offset > file_size:
+                raise ValueError(f"Offset {offset} is out of file {file_path} size {file_size}")
+            self.length = file_size - offset if length is None else min(length, file_size - offset)
+
+            if self.length > 0:
+                map_offset = offset - offset % mmap.ALLOCATIONGRANULARITY
+                self._mmap = mmap.mmap(file_handler.fileno(), offset - map_offset + self.length,
+                                       access=mmap.ACCESS_READ, offset=map_offset)
+                self._view = memoryview(self._mmap)[offset - map_offset:]
+
+    def __len__(self):
+        return self.length
+
+    def readable(self):
+        return True
+
+    def seekable(self):
+        return True
+
+    def read(self, size=-1):
+        """
+        Copy of the next block. Only the requested block is copied.
+
+        :param size:
+        :return:
+        """
+
+        if self.closed:
+            raise ValueError("I/O operation on closed file")
+
+        end = self.length if size is None or size < 0 else min(self.length, self._position + size)
+        if end <= self._position:
+            return b""
+
+        ret = self._view[self._position: end].tobytes()
+        self._position = end
+        return ret
+
+    def readinto(self, buffer):
+        """
+        Read directly into the caller's buffer.
+
+        :param buffer:
+        :return:
+        """
+
+        data_view = memoryview(buffer).cast("B")
+        end = min(self.length, self._position + len(data_view))
+        size = max(0, end - self._position)
+        data_view[:size] = self._view[self._position: self._position + size]
+        self._position += size
+        return size
+
+    def seek(self, offset, whence=io.SEEK_SET):
+        if whence == io.SEEK_SET:
+            position = offset
+        elif whence == io.SEEK_CUR:
+            position = self._position + offset
+        elif whence == io.SEEK_END:
+            position = self.length + offset
+        else:
+            raise ValueError(f"Unknown whence: {whence}")
+
+        if position < 0:
+            raise ValueError(f"Negative seek position {position}")
+
+        self._position = position
+        return self._position
+
+    def tell(self):
+        return self._position
+
+    def get_md5(self):
+        """
+        MD5 digest of the region - hashed straight from the mapped pages.
+
+        :return:
+        """
+
+        md5 = hashlib.md5()
+        for start in range(0, self.length, self.MD5_BLOCK_SIZE):
+            md5.update(self._view[start: start + self.MD5_BLOCK_SIZE])
+        return md5.digest()
+
+    def get_content_md5(self):
+        """
+        ContentMD5 request value.
+
+        :return:
+        """
+
+        return base64.b64encode(self.get_md5()).decode("utf-8")
+
+    def close(self):
+        if self.closed:
+            return
+
+        self._view.release()
+        self._view = memoryview(b"")
+        if self._mmap is not None:
+            self._mmap.close()
+            self._mmap = None
+        super().close()
+
+
+class InFlightBytesLimiter:
+    """
+    Caps the total size of the bodies being transferred at once, instead of the tasks count.
+    A single body larger than the cap is let through when nothing else is in flight.
+
+    """
+
+    def __init__(self, max_bytes):
+        self.max_bytes = max_bytes
+        self.in_flight_bytes = 0
+        self.peak_in_flight_bytes = 0
+        self._lock = threading.Lock()
+
+    def try_acquire(self, size):
+        """
+        Reserve size bytes if the cap allows.
+
+        :param size:
+        :return: True if reserved.
+        """
+
+        with self._lock:
+            if self.in_flight_bytes and self.in_flight_bytes + size > self.max_bytes:
+                return False
+            self.in_flight_bytes += size
+            self.peak_in_flight_bytes = max(self.peak_in_flight_bytes, self.in_flight_bytes)
+            return True
+
+    def release(self, size):
+        """
+        Return reserved bytes.
+
+        :param size:
+        :return:
+        """
+
+        with self._lock:
+            self.in_flight_bytes -= size
+            if self.in_flight_bytes < 0:
+                raise RuntimeError(f"Released more bytes than reserved: {self.in_flight_bytes}")
+
+
+class ETagUtils:
+    """
+    Compare local files with S3 objects by ETag, without downloading.
+
+    """
+
+    MIB = 1024 * 1024
+    COMMON_PART_SIZES = (8 * MIB, 5 * MIB, 16 * MIB, 64 * MIB, 100 * MIB)
+
+    @staticmethod
+    def calculate(file_path, part_size=None):
+        """
+        S3 ETag of the file uploaded as a single object or with parts of part_size.
+
+        :param file_path:
+        :param part_size: None - single object upload.
+        :return: ETag without quotes
+        """
+
+        if part_size is None:
+            with FilePartReader(file_path) as reader:
+                return reader.get_md5().hex()
+
+        digests = []
+        file_size = os.path.getsize(file_path)
+        for offset in range(0, file_size, part_size):
+            with FilePartReader(file_path, offset=offset, length=part_size) as reader:
+                digests.append(reader.get_md5())
+        return f"{hashlib.md5(b''.join(digests)).hexdigest()}-{len(digests)}"
+
+    @staticmethod
+    def get_part_sizes(file_size, parts_count):
+        """
+        Part sizes that split the file into parts_count parts - most probable first.
+
+        :param file_size:
+        :param parts_count:
+        :return:
+        """
+
+        ret = [part_size for part_size in ETagUtils.COMMON_PART_SIZES
+               if (file_size + part_size - 1) // part_size == parts_count]
+        part_size = -(-file_size // parts_count)
+        part_size = -(-part_size // ETagUtils.MIB) * ETagUtils.MIB
+        if part_size not in ret and (file_size + part_size - 1) // part_size == parts_count:
+            ret.append(part_size)
+        return ret
+
+    @staticmethod
+    def is_unchanged(file_path, size, e_tag):
+        """
+        Local file has the S3 object's size and ETag.
+        ETags of SSE-KMS or SSE-C encrypted objects are not MD5 based - such files are reported changed.
+
+        :param file_path:
+        :param size:
+        :param e_tag:
+        :return:
+        """
+
+        if not os.path.isfile(file_path) or os.path.getsize(file_path) != size:
+            return False
+
+        e_tag = e_tag.strip('"')
+        if "-" not in e_tag:
+            return ETagUtils.calculate(file_path) == e_tag
+
+        parts_count = int(e_tag.split("-")[1])
+        for part_size in ETagUtils.get_part_sizes(size, parts_count):
+            if ETagUtils.calculate(file_path, part_size=part_size) == e_tag:
+                return True
+        return False
@@ -3,7 +3,6 @@ Manages sessions towards multiple AWS accounts and regions.
 """
 import threading
 import datetime
-import time
 from typing import Any
 import boto3
 import botocore
@@ -65,23 +64,19 @@ class SessionsManager:
             :return:
             """
             # pylint: disable= consider-using-with
+            if not SessionsManager.Connection.LOCK.acquire(timeout=10):
+                raise LockAcquiringFailError()
+
             try:
-                for _ in range(10):
-                    acquired = SessionsManager.Connection.LOCK.acquire(blocking=False)
-                    if acquired is True:
-                        if region_mark not in self.clients:
-                            self.clients[region_mark] = {}
-
-                        if client_name in self.clients[region_mark]:
-                            return
-
-                        self.clients[region_mark][client_name] = self.session.client(
-                            client_name, region_name=region_mark
-                        )
-                        break
-                    time.sleep(1)
-                else:
-                    raise LockAcquiringFailError()
+                if region_mark not in self.clients:
+                    self.clients[region_mark] = {}
+
+                if client_name in self.clients[region_mark]:
+                    return
+
+                self.clients[region_mark][client_name] = self.session.client(
+                    client_name, region_name=region_mark
+                )
             finally:
                 SessionsManager.Connection.LOCK.release()
 
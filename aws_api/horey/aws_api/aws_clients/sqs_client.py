@@ -116,6 +116,7 @@ class SQSClient(Boto3Client):
             dict_src = {"QueueUrl": response}
             queue.update_from_raw_response(dict_src)
             self.update_queue_information(queue)
+            self.add_entity_to_cache(queue, full_information=False, get_tags=True)
             return
 
         region_queue = region_queues[0]
@@ -157,7 +158,7 @@ class SQSClient(Boto3Client):
 
     def provision_queue_raw(self, region, request_dict):
         """
-        Standard.
+        Standard. The cache is updated by provision_queue.
 
         :param request_dict:
         :return:
@@ -167,7 +168,6 @@ class SQSClient(Boto3Client):
         for response in self.execute(
                 self.get_session_client(region=region).create_queue, "QueueUrl", filters_req=request_dict
         ):
-            self.clear_cache(SQSQueue)
             return response
 
     def receive_message(self, queue):
@@ -3,6 +3,8 @@ A base class for working with aws objects - parsing, caching and initiation.
 """
 import os
 import re
+import sys
+import copy
 import datetime
 from enum import Enum
 
@@ -30,8 +32,19 @@ class AwsObject:
         r"([0-9]{4})-([0-9]{2})-([0-9]{2}) ([0-9]{2}):([0-9]{2}):([0-9]{2}).([0-9]{6})+([0-9]{4})"
     )
     SELF_CACHED_TYPE_KEY_NAME = "horey_cached_type"
+    # CamelCase -> snake_case memo, shared by all classes: AWS replies reuse a small set of keys.
+    _FORMATTED_ATTR_NAMES = {}
 
     CLIENT_NAME = "default"
+    # Opt in per class with set_compact_mode: drops dict_src and interns repeated strings.
+    COMPACT_MODE = False
+    # Attributes packed in arrays by CompactObjectsStore.
+    COMPACT_INT_ATTRIBUTES = ()
+    COMPACT_DATETIME_ATTRIBUTES = ()
+    # Unique per object values- interning them only grows the interned strings table.
+    COMPACT_UNIQUE_ATTRIBUTES = ()
+    _IMMUTABLE_TYPES = frozenset([str, int, float, bool, type(None), bytes])
+    _CACHED_AS_IS_TYPES = frozenset([str, int, bool, type(None)])
     common_re_utils = CommonREUtils()
 
     def __init__(self, dict_src, from_cache=False):
@@ -87,6 +100,54 @@ class AwsObject:
             else:
                 self.init_default_attr(key_src, value)
 
+        if self.COMPACT_MODE:
+            self.compact()
+
+    @classmethod
+    def set_compact_mode(cls, value=True):
+        """
+        Memory compact mode for high cardinality objects.
+        The objects will not keep the raw reply in dict_src.
+
+        :param value:
+        :return:
+        """
+
+        cls.COMPACT_MODE = value
+
+    def compact(self):
+        """
+        Drop the raw reply and intern the strings.
+
+        :return:
+        """
+
+        self.dict_src = None
+        for key, value in self.__dict__.items():
+            if key not in self.COMPACT_UNIQUE_ATTRIBUTES:
+                self.__dict__[key] = self.intern_value(value)
+
+    @staticmethod
+    def intern_value(value):
+        """
+        Intern strings in the value. Region marks, namespaces, dimension names etc. repeat in every object.
+
+        :param value:
+        :return:
+        """
+
+        if isinstance(value, str):
+            return sys.intern(value)
+
+        if isinstance(value, list):
+            return [AwsObject.intern_value(sub_value) for sub_value in value]
+
+        if isinstance(value, dict):
+            return {AwsObject.intern_value(key): AwsObject.intern_value(sub_value)
+                    for key, sub_value in value.items()}
+
+        return value
+
     def init_horey_cached_type(self, attr_name, value):
         """
         Init automatically cached values
@@ -96,19 +157,7 @@ class AwsObject:
         """
 
         if value.get(self.SELF_CACHED_TYPE_KEY_NAME) == "datetime":
-            # Example: datetime.datetime.strptime('2017-07-26 15:54:10.000000+0000', '%Y-%m-%d %H:%M:%S.%f%z')
-            try:
-                new_value = datetime.datetime.strptime(
-                    value["value"], "%Y-%m-%d %H:%M:%S.%f%z"
-                )
-            except Exception as inst:
-                if len(value["value"].split(".")[-1]) == 6:
-                    new_value = datetime.datetime.strptime(
-                        value["value"], "%Y-%m-%d %H:%M:%S.%f"
-                    )
-                else:
-                    raise RuntimeError(value["value"]) from inst
-
+            new_value = self.init_cached_datetime(value["value"])
         elif value.get(self.SELF_CACHED_TYPE_KEY_NAME) == "ip":
             new_value = IP(value["value"], from_dict=True)
         elif value.get(self.SELF_CACHED_TYPE_KEY_NAME) == "region":
@@ -129,6 +178,23 @@ class AwsObject:
 
         self.init_default_attr(attr_name, new_value)
 
+    @staticmethod
+    def init_cached_datetime(str_value):
+        """
+        Init datetime from its cached string.
+
+        :param str_value:
+        :return:
+        """
+
+        # Example: datetime.datetime.strptime('2017-07-26 15:54:10.000000+0000', '%Y-%m-%d %H:%M:%S.%f%z')
+        try:
+            return datetime.datetime.strptime(str_value, "%Y-%m-%d %H:%M:%S.%f%z")
+        except Exception as inst:
+            if len(str_value.split(".")[-1]) == 6:
+                return datetime.datetime.strptime(str_value, "%Y-%m-%d %H:%M:%S.%f")
+            raise RuntimeError(str_value) from inst
+
     @classmethod
     def get_cache_file_name(cls):
         """
@@ -258,7 +324,9 @@ class AwsObject:
             raise self.UnknownKeyError(
                     "\n".join(composed_errors))
 
-        if not self.dict_src:
+        if self.COMPACT_MODE:
+            self.compact()
+        elif not self.dict_src:
             self.dict_src = dict_src
 
         return not bool(composed_errors)
@@ -305,9 +373,16 @@ class AwsObject:
         :return:
         """
 
+        try:
+            return AwsObject._FORMATTED_ATTR_NAMES[name]
+        except KeyError:
+            pass
+
         s1 = self._FIRST_CAP_RE.sub(r"\1_\2", name)
         s1 = s1.replace("__", "_")
-        return self._ALL_CAP_RE.sub(r"\1_\2", s1).lower()
+        formatted_name = self._ALL_CAP_RE.sub(r"\1_\2", s1).lower()
+        AwsObject._FORMATTED_ATTR_NAMES[name] = formatted_name
+        return formatted_name
 
     def convert_to_dict(self):
         """
@@ -319,6 +394,85 @@ class AwsObject:
         ret_dict = self.convert_to_dict_static(self.__dict__)
         return ret_dict
 
+    def copy_as_cached(self):
+        """
+        Same result as init from self.convert_to_dict() with from_cache=True, without the dict round trip.
+        Values are normalized the way they are cached: float -> str, Enum -> its value, nested datetimes -> cached dicts.
+        Objects holding AwsObjects or with custom convert_to_dict do the full round trip.
+
+        :return:
+        """
+
+        if type(self).convert_to_dict is not AwsObject.convert_to_dict:
+            return self.__class__(self.convert_to_dict(), from_cache=True)
+
+        ret_dict = {}
+        for key, value in self.__dict__.items():
+            if isinstance(value, AwsObject) or \
+                    (isinstance(value, list) and any(isinstance(sub_value, AwsObject) for sub_value in value)):
+                return self.__class__(self.convert_to_dict(), from_cache=True)
+            ret_dict[self.format_attr_name(key)] = self.copy_cached_attribute_value(value)
+
+        ret = self.__class__.__new__(self.__class__)
+        ret.__dict__ = ret_dict
+        if self.COMPACT_MODE:
+            ret.compact()
+        return ret
+
+    @staticmethod
+    def copy_cached_attribute_value(value):
+        """
+        Attribute value as it is initialized from cache.
+
+        :param value:
+        :return:
+        """
+
+        if type(value) in AwsObject._CACHED_AS_IS_TYPES:
+            return value
+
+        if isinstance(value, datetime.datetime):
+            return AwsObject.init_cached_datetime(AwsObject.convert_to_dict_static(value)["value"])
+
+        if isinstance(value, Region):
+            # Regions are singletons.
+            return value
+
+        if isinstance(value, IP):
+            return value.copy()
+
+        return AwsObject.convert_to_dict_static(value)
+
+    @staticmethod
+    def copy_attribute_value(value):
+        """
+        Copy attribute value so the copy can be modified independently.
+
+        :param value:
+        :return:
+        """
+
+        # pylint: disable=too-many-return-statements
+        if type(value) in AwsObject._IMMUTABLE_TYPES:
+            return value
+
+        if isinstance(value, dict):
+            return {key: AwsObject.copy_attribute_value(sub_value) for key, sub_value in value.items()}
+
+        if isinstance(value, list):
+            return [AwsObject.copy_attribute_value(sub_value) for sub_value in value]
+
+        if isinstance(value, (Region, Enum, datetime.datetime)):
+            return value
+
+        if isinstance(value, AwsObject):
+            return value.copy_as_cached()
+
+        if isinstance(value, IP):
+            return value.copy()
+
+        return copy.deepcopy(value)
+
     @staticmethod
     def convert_to_dict_static(obj_src, custom_types=None):
         """
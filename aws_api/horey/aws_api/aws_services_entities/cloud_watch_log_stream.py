@@ -7,6 +7,9 @@ class CloudWatchLogStream(AwsObject):
     The class representing log group's log stream
     """
 
+    COMPACT_INT_ATTRIBUTES = ("first_event_timestamp", "last_event_timestamp", "last_ingestion_time", "stored_bytes")
+    COMPACT_UNIQUE_ATTRIBUTES = ("_name", "arn", "upload_sequence_token")
+
     def __init__(self, dict_src, from_cache=False):
         self.statements = []
         self.last_event_timestamp = None
@@ -0,0 +1,152 @@
+"""
+Columnar storage of high cardinality AWS objects (S3 keys, metrics, log streams).
+Objects are kept as columns and materialized on access.
+
+"""
+
+import datetime
+import math
+from array import array
+
+from horey.aws_api.aws_services_entities.aws_object import AwsObject
+
+
+class CompactObjectsStore:
+    """
+    Column per attribute. Integer and datetime attributes declared by the entity class
+    (COMPACT_INT_ATTRIBUTES, COMPACT_DATETIME_ATTRIBUTES) are packed in arrays,
+    strings are interned, dict_src is not stored.
+
+    """
+
+    INT_NONE = -2 ** 63
+    SKIPPED_ATTRIBUTES = ("dict_src",)
+
+    def __init__(self, entity_class, int_attributes=None, datetime_attributes=None):
+        self.entity_class = entity_class
+        self.int_attributes = set(int_attributes if int_attributes is not None
+                                  else entity_class.COMPACT_INT_ATTRIBUTES)
+        self.datetime_attributes = set(datetime_attributes if datetime_attributes is not None
+                                       else entity_class.COMPACT_DATETIME_ATTRIBUTES)
+        self.columns = {}
+        self.length = 0
+
+    def __len__(self):
+        return self.length
+
+    def __iter__(self):
+        for index in range(self.length):
+            yield self[index]
+
+    def __getitem__(self, index):
+        if index < 0:
+            index += self.length
+        if not 0 <= index < self.length:
+            raise IndexError(index)
+
+        obj = self.entity_class.__new__(self.entity_class)
+        obj.__dict__ = {attr_name: self.decode(attr_name, column[index]) for attr_name, column in self.columns.items()}
+        obj.dict_src = None
+        return obj
+
+    def new_column(self, attr_name):
+        """
+        Create column, backfilled for the already stored objects.
+
+        :param attr_name:
+        :return:
+        """
+
+        if attr_name in self.int_attributes:
+            return array("q", [self.INT_NONE]) * self.length
+
+        if attr_name in self.datetime_attributes:
+            return array("d", [math.nan]) * self.length
+
+        return [None] * self.length
+
+    def append(self, obj):
+        """
+        Add object.
+
+        :param obj:
+        :return:
+        """
+
+        if not isinstance(obj, self.entity_class):
+            raise ValueError(f"Expected {self.entity_class.__name__}, received: {type(obj)}")
+
+        obj_dict = obj.__dict__
+        for attr_name in obj_dict:
+            if attr_name not in self.columns and attr_name not in self.SKIPPED_ATTRIBUTES:
+                self.columns[attr_name] = self.new_column(attr_name)
+
+        for attr_name, column in self.columns.items():
+            column.append(self.encode(attr_name, obj_dict.get(attr_name)))
+        self.length += 1
+
+    def extend(self, objects):
+        """
+        Add objects.
+
+        :param objects:
+        :return:
+        """
+
+        for obj in objects:
+            self.append(obj)
+
+    def encode(self, attr_name, value):
+        """
+        Column representation of the value.
+
+        :param attr_name:
+        :param value:
+        :return:
+        """
+
+        if attr_name in self.int_attributes:
+            if value is None:
+                return self.INT_NONE
+            if not isinstance(value, int):
+                raise ValueError(f"{self.entity_class.__name__}.{attr_name} is not int: {value}")
+            return value
+
+        if attr_name in self.datetime_attributes:
+            if value is None:
+                return math.nan
+            if value.tzinfo is None:
+                raise ValueError(f"{self.entity_class.__name__}.{attr_name} must be timezone aware: {value}")
+            return value.timestamp()
+
+        if attr_name in self.entity_class.COMPACT_UNIQUE_ATTRIBUTES:
+            return value
+
+        return AwsObject.intern_value(value)
+
+    def decode(self, attr_name, value):
+        """
+        Object representation of the column value.
+
+        :param attr_name:
+        :param value:
+        :return:
+        """
+
+        if attr_name in self.int_attributes:
+            return None if value == self.INT_NONE else value
+
+        if attr_name in self.datetime_attributes:
+            return None if math.isnan(value) else datetime.datetime.fromtimestamp(value, tz=datetime.timezone.utc)
+
+        return AwsObject.copy_attribute_value(value)
+
+    def get_column(self, attr_name):
+        """
+        Raw column values- for aggregations without materializing the objects.
+
+        :param attr_name:
+        :return:
+        """
+
+        return self.columns[attr_name]
@@ -16,6 +16,8 @@ class EC2Instance(AwsObject):
     Class to represent ec2 instance
     """
 
+    COMPACT_DATETIME_ATTRIBUTES = ("launch_time",)
+
     def __init__(self, dict_src, from_cache=False):
         """
         Init EC2 instance with boto3 dict
@@ -334,6 +334,10 @@ class S3Bucket(AwsObject):
         Class representing one saved object in S3 bucket.
         """
 
+        COMPACT_INT_ATTRIBUTES = ("size",)
+        COMPACT_DATETIME_ATTRIBUTES = ("last_modified",)
+        COMPACT_UNIQUE_ATTRIBUTES = ("key", "e_tag")
+
         def __init__(self, src_data, from_cache=False):
             self.key = None
             self.last_modified = None
@@ -364,4 +368,5 @@ class S3Bucket(AwsObject):
             options = {}
             self._init_from_cache(dict_src, options)
 
-            self.size = dict_src["dict_src"]["Size"]
+            if dict_src.get("dict_src"):
+                self.size = dict_src["dict_src"]["Size"]
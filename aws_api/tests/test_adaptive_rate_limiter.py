@@ -0,0 +1,68 @@
+"""
+Test adaptive rate limiter.
+
+"""
+
+import pytest
+
+from horey.aws_api.aws_clients.adaptive_rate_limiter import AdaptiveRateLimiter, RetryBudget, \
+    RetryBudgetExhaustedError, TokenBucket
+
+# pylint: disable= missing-function-docstring
+
+KEY = ("default_account", "us-west-2", "ec2")
+
+
+@pytest.mark.unit
+def test_token_bucket_aimd():
+    bucket = TokenBucket(rate=10, max_rate=20, increase_step=1, decrease_factor=0.5)
+    bucket.on_throttle()
+    assert bucket.rate == 5
+    bucket.on_success()
+    assert bucket.rate == 6
+    assert bucket.get_statistics()["throttles"] == 1
+
+
+@pytest.mark.unit
+def test_token_bucket_min_rate():
+    bucket = TokenBucket(rate=1, min_rate=0.5)
+    for _ in range(10):
+        bucket.on_throttle()
+    assert bucket.rate == 0.5
+
+
+@pytest.mark.unit
+def test_rate_limiter_retry_budget_exhausted():
+    rate_limiter = AdaptiveRateLimiter(retry_budget=RetryBudget(capacity=10, throttle_retry_cost=5))
+    rate_limiter.BACKOFF_CAP = 0
+    rate_limiter.on_error(KEY, 0, True)
+    rate_limiter.on_error(KEY, 1, True)
+    with pytest.raises(RetryBudgetExhaustedError):
+        rate_limiter.on_error(KEY, 2, True)
+
+
+@pytest.mark.unit
+def test_rate_limiter_retry_budget_per_key():
+    rate_limiter = AdaptiveRateLimiter(retry_budget_arguments={"capacity": 10, "throttle_retry_cost": 5})
+    rate_limiter.BACKOFF_CAP = 0
+    other_key = ("default_account", "us-west-2", "s3")
+    rate_limiter.on_error(KEY, 0, True)
+    rate_limiter.on_error(KEY, 1, True)
+    with pytest.raises(RetryBudgetExhaustedError):
+        rate_limiter.on_error(KEY, 2, True)
+    rate_limiter.on_error(other_key, 0, True)
+
+
+@pytest.mark.unit
+def test_rate_limiter_statistics():
+    rate_limiter = AdaptiveRateLimiter()
+    rate_limiter.acquire(KEY)
+    rate_limiter.on_success(KEY)
+    statistics = rate_limiter.get_statistics()
+    assert statistics["default_account/us-west-2/ec2"]["requests"] == 1
+
+
+@pytest.mark.unit
+def test_backoff_time_capped():
+    rate_limiter = AdaptiveRateLimiter()
+    assert 0 <= rate_limiter.get_backoff_time(100) <= rate_limiter.BACKOFF_CAP
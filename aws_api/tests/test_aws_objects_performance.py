@@ -0,0 +1,214 @@
+"""
+Micro benchmarks of AwsObject initialisation over all aws_services_entities classes.
+Run with -m benchmark -s to see the objects/sec report.
+
+"""
+
+import datetime
+import gc
+import importlib
+import inspect
+import logging
+import pkgutil
+import time
+import tracemalloc
+from enum import Enum
+
+import pytest
+
+import horey.aws_api.aws_services_entities
+from horey.aws_api.aws_services_entities.aws_object import AwsObject
+from horey.aws_api.aws_services_entities.compact_objects_store import CompactObjectsStore
+from horey.aws_api.aws_services_entities.s3_bucket import S3Bucket
+
+# pylint: disable= missing-function-docstring
+
+REPLY_KEYS_COUNT = 30
+ITERATIONS = 200
+
+
+class NoMemo(dict):
+    """
+    Disables the attribute names' memo - baseline.
+
+    """
+
+    def __setitem__(self, key, value):
+        return None
+
+
+def get_entity_classes():
+    """
+    All AwsObject subclasses.
+
+    :return:
+    """
+
+    ret = set()
+    for module_info in pkgutil.iter_modules(horey.aws_api.aws_services_entities.__path__):
+        module = importlib.import_module(f"horey.aws_api.aws_services_entities.{module_info.name}")
+        for _, class_type in inspect.getmembers(module, inspect.isclass):
+            if issubclass(class_type, AwsObject) and class_type is not AwsObject:
+                ret.add(class_type)
+    return sorted(ret, key=lambda class_type: class_type.__name__)
+
+
+def generate_reply():
+    reply = {"Name": "horey-name", "Id": "horey-id", "Arn": "arn:aws:ec2:us-east-1:123456789012:resource/id",
+             "Tags": [{"Key": "Name", "Value": "horey-name"}]}
+    for index in range(REPLY_KEYS_COUNT):
+        reply[f"SomeHTTPAttribute{index}Name"] = {"NestedKey": [index, str(index)]}
+    return reply
+
+
+def get_constructible_objects(reply):
+    ret = []
+    for class_type in get_entity_classes():
+        if "from_cache" not in inspect.signature(class_type.__init__).parameters:
+            continue
+        try:
+            ret.append(class_type(reply))
+        except Exception:  # pylint: disable= broad-exception-caught
+            continue
+    return ret
+
+
+def get_round_trip_objects(reply):
+    ret = []
+    for obj in get_constructible_objects(reply):
+        try:
+            obj.__class__(obj.convert_to_dict(), from_cache=True)
+        except Exception:  # pylint: disable= broad-exception-caught
+            continue
+        ret.append(obj)
+    return ret
+
+
+def measure(callback, objects):
+    start = time.perf_counter()
+    for _ in range(ITERATIONS):
+        for obj in objects:
+            callback(obj)
+    return ITERATIONS * len(objects) / (time.perf_counter() - start)
+
+
+@pytest.fixture(name="quiet_logger")
+def fixture_quiet_logger():
+    logging.disable(logging.WARNING)
+    yield
+    logging.disable(logging.NOTSET)
+
+
+@pytest.mark.benchmark
+def test_benchmark_init_from_reply(quiet_logger):  # pylint: disable= unused-argument
+    reply = generate_reply()
+    objects = get_constructible_objects(reply)
+    assert len(objects) > 80
+
+    memo = AwsObject._FORMATTED_ATTR_NAMES  # pylint: disable= protected-access
+    try:
+        AwsObject._FORMATTED_ATTR_NAMES = NoMemo()  # pylint: disable= protected-access
+        before = measure(lambda obj: obj.__class__(reply), objects)
+    finally:
+        AwsObject._FORMATTED_ATTR_NAMES = memo  # pylint: disable= protected-access
+    after = measure(lambda obj: obj.__class__(reply), objects)
+
+    print(f"\nInit from reply over {len(objects)} classes: before {before:.0f} objects/sec, "
+          f"after {after:.0f} objects/sec")
+
+
+@pytest.mark.benchmark
+def test_benchmark_copy_as_cached(quiet_logger):  # pylint: disable= unused-argument
+    objects = get_round_trip_objects(generate_reply())
+
+    before = measure(lambda obj: obj.__class__(obj.convert_to_dict(), from_cache=True), objects)
+    after = measure(lambda obj: obj.copy_as_cached(), objects)
+
+    print(f"\nCopy for return over {len(objects)} classes: dict round trip {before:.0f} objects/sec, "
+          f"copy_as_cached {after:.0f} objects/sec")
+
+
+class CopyTestState(Enum):
+    """
+    Enum attribute value.
+
+    """
+
+    OK = "ok"
+
+
+def assert_same_attributes(this, other):
+    assert this.__dict__.keys() == other.__dict__.keys()
+    for key, value in this.__dict__.items():
+        other_value = other.__dict__[key]
+        assert type(value) is type(other_value), key
+        assert AwsObject.convert_to_dict_static(value) == AwsObject.convert_to_dict_static(other_value), key
+
+
+@pytest.mark.unit
+def test_copy_as_cached_equals_round_trip(quiet_logger):  # pylint: disable= unused-argument
+    reply = generate_reply()
+    reply.update({"Threshold": 80.0,
+                  "CreationDate": datetime.datetime(2024, 1, 2, 3, 4, 5, 6, tzinfo=datetime.timezone.utc),
+                  "Nested": {"Value": 1.5, "Date": datetime.datetime(2024, 1, 2, 3, 4, 5, 6)}})
+    objects = get_round_trip_objects(reply)
+    assert len(objects) > 80
+
+    for obj in objects:
+        obj.copy_test_state = CopyTestState.OK
+        copied = obj.copy_as_cached()
+        round_trip = obj.__class__(obj.convert_to_dict(), from_cache=True)
+        assert_same_attributes(copied, round_trip)
+        copied.tags.append({"Key": "new", "Value": "new"})
+        assert copied.tags != obj.tags
+
+
+def yield_bucket_object_replies(count):
+    for index in range(count):
+        yield {"Key": f"logs/2024/01/{index % 31:02d}/service-{index % 7}/part-{index}.gz",
+             "LastModified": datetime.datetime(2024, 1, 1, tzinfo=datetime.timezone.utc) +
+                             datetime.timedelta(seconds=index),
+             "ETag": f"\"{index:032x}\"",
+             "Size": index * 17,
+             "StorageClass": "STANDARD"}
+
+
+def measure_memory(callback):
+    gc.collect()
+    tracemalloc.start()
+    try:
+        ret = callback()
+        current, _ = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return ret, current
+
+
+@pytest.mark.benchmark
+def test_benchmark_compact_memory():
+    count = 20000
+
+    _, regular_size = measure_memory(
+        lambda: [S3Bucket.BucketObject(reply) for reply in yield_bucket_object_replies(count)])
+    try:
+        S3Bucket.BucketObject.set_compact_mode()
+        compact_objects, compact_size = measure_memory(
+            lambda: [S3Bucket.BucketObject(reply) for reply in yield_bucket_object_replies(count)])
+
+        def init_store():
+            store = CompactObjectsStore(S3Bucket.BucketObject)
+            store.extend(S3Bucket.BucketObject(reply) for reply in yield_bucket_object_replies(count))
+            return store
+
+        store, store_size = measure_memory(init_store)
+    finally:
+        S3Bucket.BucketObject.set_compact_mode(False)
+
+    print(f"\n{count} S3 keys: regular {regular_size // count} bytes/object, "
+          f"compact mode {compact_size // count} bytes/object, "
+          f"columnar store {store_size // count} bytes/object")
+    assert compact_size < regular_size
+    assert store_size < compact_size
+    assert len(store) == count
+    assert store[5].convert_to_dict() == compact_objects[5].convert_to_dict()
+    assert store[-1].size == (count - 1) * 17
@@ -0,0 +1,153 @@
+"""
+Test entities cache backends.
+
+"""
+
+import json
+import os
+
+import pytest
+
+from horey.aws_api.aws_clients.boto3_client import Boto3Client
+from horey.aws_api.aws_clients.cache_backends import CompactCacheBackend, JSONCacheBackend
+from horey.aws_api.aws_clients.ecr_client import ECRClient
+from horey.aws_api.aws_services_entities.ecr_repository import ECRRepository
+from horey.aws_api.base_entities.region import Region
+
+# pylint: disable= missing-function-docstring, protected-access
+
+DICTS_SRC = [{"_id": f"i-{index}", "_name": f"name-{index}", "value": index} for index in range(100)]
+
+
+@pytest.mark.unit
+def test_compact_write_and_stream(tmp_path):
+    file_path = str(tmp_path / "ec2_instance.json")
+    backend = CompactCacheBackend()
+    assert backend.write(iter(DICTS_SRC), file_path) == 100
+    assert backend.exists(file_path)
+    assert list(backend.yield_dicts(file_path)) == DICTS_SRC
+
+
+@pytest.mark.unit
+def test_compact_load_subset(tmp_path):
+    file_path = str(tmp_path / "ec2_instance.json")
+    backend = CompactCacheBackend()
+    backend.write(DICTS_SRC, file_path)
+    ret = list(backend.yield_dicts(file_path, ids=["i-3"], names=["name-70"]))
+    assert [dict_src["value"] for dict_src in ret] == [3, 70]
+
+
+@pytest.mark.unit
+def test_compact_legacy_fallback(tmp_path):
+    file_path = str(tmp_path / "ec2_instance.json")
+    with open(file_path, "w", encoding="utf-8") as file_handler:
+        json.dump(DICTS_SRC, file_handler)
+
+    backend = CompactCacheBackend()
+    assert backend.exists(file_path)
+    assert len(list(backend.yield_dicts(file_path, ids=["i-5"]))) == 1
+
+    backend.write(DICTS_SRC[:10], file_path)
+    assert not os.path.exists(file_path)
+    assert len(list(backend.yield_dicts(file_path))) == 10
+
+
+@pytest.mark.unit
+def test_json_backend(tmp_path):
+    file_path = str(tmp_path / "ec2_instance.json")
+    backend = JSONCacheBackend()
+    backend.write(DICTS_SRC, file_path)
+    assert list(backend.yield_dicts(file_path, names=["name-1"])) == [DICTS_SRC[1]]
+
+
+@pytest.mark.unit
+def test_compact_put_and_delete(tmp_path):
+    file_path = str(tmp_path / "ec2_instance.json")
+    backend = CompactCacheBackend()
+    backend.write(DICTS_SRC, file_path)
+    backend.put(file_path, {"_id": "i-1", "_name": "name-1", "value": -1})
+    backend.put(file_path, {"_id": "i-new", "_name": "name-new", "value": 1000})
+    backend.delete(file_path, "i-2")
+
+    ret = {dict_src["_id"]: dict_src["value"] for dict_src in backend.yield_dicts(file_path)}
+    assert len(ret) == 100
+    assert ret["i-1"] == -1
+    assert ret["i-new"] == 1000
+    assert "i-2" not in ret
+    assert [dict_src["value"] for dict_src in backend.yield_dicts(file_path, ids=["i-1"])] == [-1]
+
+    backend.compact(file_path)
+    assert not os.path.exists(backend.get_log_file_path(file_path))
+    assert {dict_src["_id"]: dict_src["value"] for dict_src in backend.yield_dicts(file_path)} == ret
+
+
+@pytest.mark.unit
+def test_compact_put_migrates_legacy(tmp_path):
+    file_path = str(tmp_path / "ec2_instance.json")
+    with open(file_path, "w", encoding="utf-8") as file_handler:
+        json.dump(DICTS_SRC[:5], file_handler)
+
+    backend = CompactCacheBackend()
+    backend.put(file_path, {"_id": "i-new", "value": 1})
+    assert not os.path.exists(file_path)
+    assert len(list(backend.yield_dicts(file_path))) == 6
+
+
+@pytest.mark.unit
+def test_compact_auto_compaction(tmp_path):
+    file_path = str(tmp_path / "ec2_instance.json")
+    backend = CompactCacheBackend()
+    backend.COMPACTION_MIN_LOG_SIZE = 0
+    backend.write([], file_path)
+    for index in range(20):
+        backend.put(file_path, {"_id": "i-1", "value": index})
+    assert [dict_src["value"] for dict_src in backend.yield_dicts(file_path)] == [19]
+
+
+@pytest.mark.unit
+def test_put_without_key_invalidates(tmp_path):
+    for backend in [CompactCacheBackend(), JSONCacheBackend()]:
+        file_path = str(tmp_path / f"{backend.__class__.__name__}.json")
+        backend.write(DICTS_SRC, file_path)
+        backend.put(file_path, {"value": -1})
+        assert not backend.exists(file_path)
+
+        backend.write(DICTS_SRC, file_path)
+        backend.delete(file_path, None)
+        assert not backend.exists(file_path)
+
+
+@pytest.mark.unit
+def test_boto3_client_entity_cache(tmp_path, monkeypatch):
+    monkeypatch.setattr(Boto3Client, "_main_cache_dir_path", str(tmp_path))
+    client = ECRClient()
+    client._account_id = "123456789012"
+    region = Region.get_region("us-west-2")
+
+    def get_repository(name):
+        repository = ECRRepository({})
+        repository.name = name
+        repository.region = region
+        return repository
+
+    file_path = client.generate_cache_file_path(ECRRepository, region.region_mark, True, True)
+    filtered_file_path = client.generate_cache_file_path(ECRRepository, region.region_mark, True, True,
+                                                         cache_suffix="filtered")
+    no_tags_file_path = client.generate_cache_file_path(ECRRepository, region.region_mark, True, False)
+    for cache_file_path in [file_path, filtered_file_path, no_tags_file_path]:
+        client.cache_objects([get_repository(f"repo-{index}") for index in range(3)], cache_file_path)
+    assert client.get_entity_class_cache_file_paths(ECRRepository, region.region_mark) == \
+           sorted([file_path, filtered_file_path, no_tags_file_path])
+
+    client.add_entity_to_cache(get_repository("repo-new"), True, True)
+    assert sorted(dict_src["_name"] for dict_src in Boto3Client.CACHE_BACKEND.yield_dicts(file_path)) == \
+           ["repo-0", "repo-1", "repo-2", "repo-new"]
+    assert not Boto3Client.CACHE_BACKEND.exists(filtered_file_path)
+    assert not Boto3Client.CACHE_BACKEND.exists(no_tags_file_path)
+
+    client.cache_objects([get_repository(f"repo-{index}") for index in range(3)], no_tags_file_path)
+    client.delete_entity_from_cache(get_repository("repo-1"))
+    assert sorted(dict_src["_name"] for dict_src in Boto3Client.CACHE_BACKEND.yield_dicts(file_path)) == \
+           ["repo-0", "repo-2", "repo-new"]
+    assert sorted(dict_src["_name"] for dict_src in Boto3Client.CACHE_BACKEND.yield_dicts(no_tags_file_path)) == \
+           ["repo-0", "repo-2"]
@@ -0,0 +1,88 @@
+"""
+Test log events export chunks and resume.
+
+"""
+
+import glob
+import os
+
+import pytest
+
+from horey.aws_api.aws_clients.cloud_watch_logs_export import LogExportCheckpoint, JSONLChunksWriter, \
+    LogEventsExporter
+
+# pylint: disable= missing-function-docstring
+
+PAGES_COUNT = 10
+PAGE_SIZE = 7
+
+
+def get_pages_generator(fail_after=None):
+    def pages_generator(token=None):
+        start = 0 if token is None else int(token)
+        for index in range(start, PAGES_COUNT):
+            if fail_after is not None and index == fail_after:
+                raise RuntimeError("Crash")
+            events = [{"timestamp": index, "message": f"{index}-{event_index}"} for event_index in range(PAGE_SIZE)]
+            yield events, str(index + 1) if index + 1 < PAGES_COUNT else None
+    return pages_generator
+
+
+def read_messages(dir_path, unit_id):
+    ret = []
+    prefix = JSONLChunksWriter.get_file_prefix(unit_id)
+    for file_path in sorted(glob.glob(os.path.join(dir_path, f"{prefix}-*.jsonl.gz"))):
+        ret += [event["message"] for event in JSONLChunksWriter.yield_events(file_path)]
+    return ret
+
+
+@pytest.mark.unit
+def test_export_unit(tmp_path):
+    checkpoint = LogExportCheckpoint(str(tmp_path / "checkpoint.json"))
+    assert LogEventsExporter.export_unit("stream:a/b", get_pages_generator(), str(tmp_path), checkpoint,
+                                         events_per_chunk=20) == PAGES_COUNT * PAGE_SIZE
+    messages = read_messages(str(tmp_path), "stream:a/b")
+    assert len(messages) == PAGES_COUNT * PAGE_SIZE
+    assert messages[0] == "0-0"
+    assert checkpoint.get("stream:a/b")["finished"]
+
+
+@pytest.mark.unit
+def test_export_unit_resume_after_crash(tmp_path):
+    checkpoint_file_path = str(tmp_path / "checkpoint.json")
+    with pytest.raises(RuntimeError):
+        LogEventsExporter.export_unit("stream:a", get_pages_generator(fail_after=6), str(tmp_path),
+                                      LogExportCheckpoint(checkpoint_file_path), events_per_chunk=20)
+
+    checkpoint = LogExportCheckpoint(checkpoint_file_path)
+    assert checkpoint.get("stream:a")["token"] == "6"
+    assert LogEventsExporter.export_unit("stream:a", get_pages_generator(), str(tmp_path), checkpoint,
+                                         events_per_chunk=20) == PAGES_COUNT * PAGE_SIZE
+
+    messages = read_messages(str(tmp_path), "stream:a")
+    assert len(messages) == len(set(messages)) == PAGES_COUNT * PAGE_SIZE
+    assert not glob.glob(str(tmp_path / "*.tmp"))
+
+    assert LogEventsExporter.export_unit("stream:a", get_pages_generator(fail_after=0), str(tmp_path),
+                                         checkpoint, events_per_chunk=20) == PAGES_COUNT * PAGE_SIZE
+
+
+@pytest.mark.unit
+def test_checkpoint_journal(tmp_path):
+    checkpoint_file_path = str(tmp_path / "checkpoint.json")
+    checkpoint = LogExportCheckpoint(checkpoint_file_path)
+    checkpoint.update("stream:a", token="1", chunks=1, events=20)
+    checkpoint.update("stream:b", token="1", chunks=1, events=20)
+    checkpoint.update("stream:a", token="2", chunks=2, events=40)
+    assert not os.path.exists(checkpoint_file_path)
+    with open(checkpoint.journal_file_path, encoding="utf-8") as file_handler:
+        assert len(file_handler.readlines()) == 3
+
+    with open(checkpoint.journal_file_path, "a", encoding="utf-8") as file_handler:
+        file_handler.write('{"unit_id": "stream:a", "sta')
+
+    checkpoint = LogExportCheckpoint(checkpoint_file_path)
+    assert not os.path.exists(checkpoint.journal_file_path)
+    assert checkpoint.get("stream:a") == {"token": "2", "chunks": 2, "events": 40, "finished": False}
+    assert checkpoint.get("stream:b")["token"] == "1"
+    assert LogExportCheckpoint(checkpoint_file_path).get("stream:a")["token"] == "2"
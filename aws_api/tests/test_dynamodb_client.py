@@ -133,3 +133,24 @@ def test_get_all_tables():
 def test_get_region_tables():
     ret = client.get_region_tables(Region.get_region("us-west-2"))
     assert len(ret) > 0
+
+
+@pytest.mark.unit
+def test_execute_with_unprocessed_retries():
+    dynamodb_client = DynamoDBClient()
+    dynamodb_client.BATCH_MAX_RETRIES = 3
+    requests_sent = []
+
+    def request_callback(requests):
+        requests_sent.append(requests)
+        return {"Processed": requests[:2], "Unprocessed": requests[2:]}
+
+    responses = dynamodb_client.execute_with_unprocessed_retries(
+        request_callback, lambda response: response["Unprocessed"], [1, 2, 3, 4, 5], "test requests")
+    assert requests_sent == [[1, 2, 3, 4, 5], [3, 4, 5], [5]]
+    assert [response["Processed"] for response in responses] == [[1, 2], [3, 4], [5]]
+
+    dynamodb_client.BATCH_MAX_RETRIES = 2
+    with pytest.raises(RuntimeError, match="Failed to process 1 dynamoDB test requests"):
+        dynamodb_client.execute_with_unprocessed_retries(
+            request_callback, lambda response: response["Unprocessed"], [1, 2, 3, 4, 5], "test requests")
@@ -0,0 +1,112 @@
+"""
+Test dynamodb serialization and parallel scan.
+Benchmarks run against a local stand-in of the scan pages. Run with -s to see the report.
+
+"""
+
+import decimal
+import threading
+import time
+
+import pytest
+
+from horey.aws_api.aws_clients.dynamodb_transfer import DynamoDBSerializer, ParallelScanner
+
+# pylint: disable= missing-function-docstring
+
+ITEMS_COUNT = 8000
+PAGE_SIZE = 100
+PAGE_LATENCY = 0.005
+
+
+def scan_segment_stand_in(segment, total_segments):
+    """
+    Pages of the segment's items, each page costs PAGE_LATENCY.
+
+    """
+
+    segment_items = range(segment, ITEMS_COUNT, total_segments)
+    for start in range(0, len(segment_items), PAGE_SIZE):
+        time.sleep(PAGE_LATENCY)
+        for index in segment_items[start: start + PAGE_SIZE]:
+            yield {"alarm_name": f"alarm_{index}", "alarm_state": {"cooldown_time": 300, "epoch_triggered": index}}
+
+
+@pytest.mark.unit
+def test_serializer_round_trip():
+    item = {"primary_key": "test_primary_key",
+            "secondary_key": 1,
+            "float": 1.5,
+            "decimal": decimal.Decimal("2.25"),
+            "bool": True,
+            "none": None,
+            "list": [1, "a", {"b": False}],
+            "builds": {"1": {"version": "1.0.0"}}}
+    dynamodbish_item = DynamoDBSerializer.serialize(item)
+    assert dynamodbish_item["secondary_key"] == {"N": "1"}
+    assert dynamodbish_item["bool"] == {"BOOL": True}
+    assert dynamodbish_item["builds"] == {"M": {"1": {"M": {"version": {"S": "1.0.0"}}}}}
+
+    expected = dict(item, decimal=2.25)
+    assert DynamoDBSerializer.deserialize(dynamodbish_item) == expected
+
+
+@pytest.mark.unit
+def test_serializer_errors():
+    with pytest.raises(ValueError):
+        DynamoDBSerializer.serialize([])
+    with pytest.raises(ValueError):
+        DynamoDBSerializer.serialize({"set": {1, 2}})
+    with pytest.raises(ValueError):
+        DynamoDBSerializer.deserialize({"a": {"S": "a", "N": "1"}})
+    with pytest.raises(ValueError):
+        DynamoDBSerializer.deserialize({"a": {"XX": "a"}})
+
+
+@pytest.mark.unit
+def test_parallel_scanner_yields_all_items():
+    names = [item["alarm_name"] for item in ParallelScanner(scan_segment_stand_in, 8)]
+    assert sorted(names) == sorted(f"alarm_{index}" for index in range(ITEMS_COUNT))
+
+
+@pytest.mark.unit
+def test_parallel_scanner_early_close():
+    threads_count = threading.active_count()
+    scanner = iter(ParallelScanner(scan_segment_stand_in, 4, max_queued_blocks=1))
+    next(scanner)
+    scanner.close()
+    assert threading.active_count() == threads_count
+
+
+@pytest.mark.unit
+def test_parallel_scanner_raises_segment_error():
+    def scan_segment(segment, _):
+        if segment == 2:
+            raise RuntimeError("Segment failed")
+        yield from scan_segment_stand_in(segment, 4)
+
+    with pytest.raises(RuntimeError, match="Segment failed"):
+        list(ParallelScanner(scan_segment, 4))
+
+
+@pytest.mark.unit
+def test_benchmark_scan():
+    start = time.perf_counter()
+    sequential_count = sum(1 for _ in ParallelScanner(scan_segment_stand_in, 1))
+    sequential_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    parallel_count = sum(1 for _ in ParallelScanner(scan_segment_stand_in, 8))
+    parallel_time = time.perf_counter() - start
+
+    items = list(scan_segment_stand_in(0, 1))
+    start = time.perf_counter()
+    for item in items:
+        DynamoDBSerializer.deserialize(DynamoDBSerializer.serialize(item))
+    serializer_time = time.perf_counter() - start
+
+    print(f"\nScan 1 segment: {sequential_count / sequential_time:.0f} items/sec, "
+          f"8 segments: {parallel_count / parallel_time:.0f} items/sec; "
+          f"serializer round trip: {len(items) / serializer_time:.0f} items/sec")
+    assert sequential_count == parallel_count == ITEMS_COUNT
+    assert parallel_time * 3 < sequential_time
@@ -6,8 +6,11 @@ Testing S3 options.
 import datetime
 import json
 import os
+import re
 
 from unittest.mock import Mock
+
+import pytest
 from horey.aws_api.aws_clients.s3_client import S3Client
 from horey.aws_api.aws_services_entities.s3_bucket import S3Bucket
 from horey.aws_api.base_entities.aws_account import AWSAccount
@@ -395,3 +398,101 @@ def test_download_file():
     s3_client = S3Client()
     s3_client.download_file(None, None, None)
 
+
+
+def test_sync_upload_and_download():
+    src_dir = os.path.join(os.path.dirname(os.path.abspath(__file__)), "sync_src_dir")
+    dst_dir = os.path.join(os.path.dirname(os.path.abspath(__file__)), "sync_dst_dir")
+    os.makedirs(os.path.join(src_dir, "sub"), exist_ok=True)
+    create_test_file(os.path.join(src_dir, "small_file"), 10)
+    create_test_file(os.path.join(src_dir, "sub", "large_file"), 30 * 1024 * 1024)
+
+    s3_client = S3Client()
+    s3_client.sync_upload(TEST_BUCKET_NAME, src_dir, "sync_root")
+    assert s3_client.sync_upload(TEST_BUCKET_NAME, src_dir, "sync_root") == []
+
+    assert len(s3_client.sync_download(TEST_BUCKET_NAME, "sync_root", dst_dir)) == 2
+    assert s3_client.sync_download(TEST_BUCKET_NAME, "sync_root", dst_dir) == []
+    assert os.path.getsize(os.path.join(dst_dir, "sub", "large_file")) == 30 * 1024 * 1024
+
+
+class OfflineBody:
+    """
+    get_object response body.
+
+    """
+
+    def __init__(self, data):
+        self.data = data
+
+    def iter_chunks(self, chunk_size):
+        for index in range(0, len(self.data), chunk_size):
+            yield self.data[index: index + chunk_size]
+
+
+def get_offline_s3_client(bucket_objects, get_object_error=None):
+    """
+    S3Client with the API calls served from bucket_objects dict: key -> bytes.
+
+    """
+
+    s3_client = S3Client()
+    # pylint: disable= protected-access
+    s3_client._multipart_threshold = 1000
+    s3_client._multipart_chunk_size = 300
+    session_client = Mock()
+    s3_client.get_session_client = lambda region=None: session_client
+    s3_client.yield_bucket_objects = lambda *_, **__: iter(
+        [Mock(key=key, size=len(data), e_tag='"offline"') for key, data in bucket_objects.items()])
+    s3_client.get_object_requests = []
+
+    def execute(func_command, _, filters_req=None, **__):
+        assert func_command is session_client.get_object
+        s3_client.get_object_requests.append(filters_req)
+        if get_object_error is not None:
+            raise get_object_error
+        assert filters_req["IfMatch"] == '"offline"'
+        data = bucket_objects[filters_req["Key"]]
+        if "Range" in filters_req:
+            start, end = re.match(r"bytes=(\d+)-(\d+)", filters_req["Range"]).groups()
+            data = data[int(start): int(end) + 1]
+        yield {"Body": OfflineBody(data)}
+
+    s3_client.execute = execute
+    return s3_client
+
+
+@pytest.mark.unit
+def test_sync_download_offline(tmp_path):
+    bucket_objects = {"root/small_file": b"small", "root/sub/large_file": os.urandom(2500)}
+    s3_client = get_offline_s3_client(bucket_objects)
+
+    assert sorted(s3_client.sync_download(TEST_BUCKET_NAME, "root", str(tmp_path))) == sorted(bucket_objects)
+    assert (tmp_path / "small_file").read_bytes() == b"small"
+    assert (tmp_path / "sub" / "large_file").read_bytes() == bucket_objects["root/sub/large_file"]
+    ranges = sorted(request["Range"] for request in s3_client.get_object_requests if "Range" in request)
+    assert len(ranges) == 9
+    assert "bytes=2400-2499" in ranges
+
+
+@pytest.mark.unit
+def test_sync_download_rejects_keys_outside_dir(tmp_path):
+    s3_client = get_offline_s3_client({"root/../../escaped": b"data"})
+    with pytest.raises(ValueError):
+        s3_client.sync_download(TEST_BUCKET_NAME, "root", str(tmp_path / "dst"))
+    assert not (tmp_path / "escaped").exists()
+
+    assert S3Client.generate_download_file_path(str(tmp_path), "/a//b") == str(tmp_path / "a" / "b")
+    for key in ["..", "a/../../b", ""]:
+        with pytest.raises(ValueError):
+            S3Client.generate_download_file_path(str(tmp_path), key)
+
+
+@pytest.mark.unit
+def test_sync_download_permanent_error_is_not_retried(tmp_path):
+    error = RuntimeError("An error occurred (PreconditionFailed) when calling the GetObject operation")
+    s3_client = get_offline_s3_client({"root/small_file": b"small"}, get_object_error=error)
+    with pytest.raises(RuntimeError):
+        s3_client.sync_download(TEST_BUCKET_NAME, "root", str(tmp_path))
+    assert len(s3_client.get_object_requests) == 1
+    assert s3_client.tasks_queue.empty()
@@ -0,0 +1,84 @@
+"""
+Test S3 objects summary.
+
+"""
+
+import datetime
+import gzip
+import io
+import json
+
+import pytest
+
+from horey.aws_api.aws_clients.s3_inventory import S3InventorySummary
+
+# pylint: disable= missing-function-docstring
+
+LAST_MODIFIED = datetime.datetime(2024, 3, 5, 23, 30, tzinfo=datetime.timezone.utc)
+
+
+def get_page(keys):
+    return {"Contents": [{"Key": key, "Size": 10, "LastModified": LAST_MODIFIED} for key in keys],
+            "CommonPrefixes": [{"Prefix": "logs/"}]}
+
+
+@pytest.mark.unit
+@pytest.mark.parametrize("prefix_depth, key, prefix", [(1, "a/b/c", "a/"), (1, "a", ""), (2, "a/b/c", "a/b/"),
+                                                       (2, "a/c", "a/"), (1, "a/", "a/")])
+def test_get_prefix(prefix_depth, key, prefix):
+    assert S3InventorySummary(prefix_depth=prefix_depth).get_prefix(key) == prefix
+
+
+@pytest.mark.unit
+def test_add_objects_page_and_merge():
+    summary = S3InventorySummary()
+    assert summary.add_objects_page("bucket", get_page(["a/1", "a/2", "root"])) == 3
+    other = S3InventorySummary()
+    other.add("bucket", "b/1", 5, "2024-03-06T01:00:00.000Z")
+    summary.merge(other)
+
+    assert summary.by_prefix == {("bucket", "a/"): [2, 20], ("bucket", ""): [1, 10], ("bucket", "b/"): [1, 5]}
+    assert summary.to_by_date_split() == {"bucket": {"2024": {"3": {"5": {"keys": 3, "size": 30},
+                                                                    "6": {"keys": 1, "size": 5}}}}}
+
+
+@pytest.mark.unit
+def test_write_columnar(tmp_path):
+    summary = S3InventorySummary(prefix_depth=2)
+    summary.add_objects_page("bucket_1", get_page(["a/b/1", "a/c/2"]))
+    summary.add_objects_page("bucket_2", get_page(["x"]))
+    file_path = str(tmp_path / "summary.json")
+    summary.write(file_path)
+
+    with open(file_path, encoding="utf-8") as file_handler:
+        dict_src = json.load(file_handler)
+    assert S3InventorySummary.is_columnar(dict_src)
+    assert dict_src["by_prefix"]["bucket"] == ["bucket_1", "bucket_1", "bucket_2"]
+
+    loaded = S3InventorySummary.init_from_dict(dict_src)
+    assert loaded.by_day == summary.by_day
+    assert loaded.by_prefix == summary.by_prefix
+
+
+@pytest.mark.unit
+def test_add_inventory_csv_file():
+    lines = ['"bucket","logs/2024/a%20b.gz","100","2024-03-05T10:00:00.000Z"',
+             '"bucket","logs/deleted","","2024-03-05T10:00:00.000Z"',
+             '"bucket","index.html","7","2024-01-01T00:00:00.000Z"']
+    file_handler = io.BytesIO(gzip.compress("\n".join(lines).encode("utf-8")))
+    manifest = {"destinationBucket": "arn:aws:s3:::inventory", "fileFormat": "CSV",
+                "fileSchema": "Bucket, Key, Size, LastModifiedDate",
+                "files": [{"key": "data/1.csv.gz"}]}
+    bucket_name, file_schema, keys = S3InventorySummary.get_inventory_manifest_files(manifest)
+    assert (bucket_name, keys) == ("inventory", ["data/1.csv.gz"])
+
+    summary = S3InventorySummary()
+    assert summary.add_inventory_csv_file(file_handler, file_schema) == 2
+    assert summary.by_prefix == {("bucket", "logs/"): [1, 100], ("bucket", ""): [1, 7]}
+    assert summary.by_day[("bucket", "2024-01-01")] == [1, 7]
+
+
+@pytest.mark.unit
+def test_inventory_manifest_parquet_not_implemented():
+    with pytest.raises(NotImplementedError):
+        S3InventorySummary.get_inventory_manifest_files({"fileFormat": "Parquet"})
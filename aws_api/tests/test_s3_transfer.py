@@ -0,0 +1,163 @@
+"""
+Test S3 transfer helpers.
+Benchmarks run against a local stand-in of upload_part. Run with -s to see the report.
+
+"""
+
+import base64
+import hashlib
+import os
+import time
+import tracemalloc
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from horey.aws_api.aws_clients.s3_transfer import FilePartReader, InFlightBytesLimiter, ETagUtils
+
+# pylint: disable= missing-function-docstring
+
+PART_SIZE = 8 * 1024 * 1024
+PARTS_COUNT = 8
+SEND_BLOCK_SIZE = 64 * 1024
+
+
+@pytest.fixture(name="file_path")
+def fixture_file_path(tmp_path):
+    file_path = tmp_path / "data.bin"
+    block = os.urandom(1024 * 1024)
+    with open(file_path, "wb") as file_handler:
+        for _ in range(PART_SIZE * PARTS_COUNT // len(block)):
+            file_handler.write(block)
+        file_handler.write(b"tail")
+    return str(file_path)
+
+
+def upload_part_stand_in(**kwargs):
+    """
+    Consumes the body the way the http layer does.
+
+    """
+
+    body = kwargs["Body"]
+    md5 = hashlib.md5()
+    if isinstance(body, bytes):
+        for start in range(0, len(body), SEND_BLOCK_SIZE):
+            md5.update(body[start: start + SEND_BLOCK_SIZE])
+    else:
+        while block := body.read(SEND_BLOCK_SIZE):
+            md5.update(block)
+
+    if "ContentMD5" in kwargs:
+        assert base64.b64encode(md5.digest()).decode("utf-8") == kwargs["ContentMD5"]
+    return {"ETag": md5.hexdigest()}
+
+
+def upload_part_read(file_path, offset, length):
+    with open(file_path, "rb") as file_handler:
+        file_handler.seek(offset)
+        byte_chunk = file_handler.read(length)
+    content_md5 = base64.b64encode(hashlib.md5(byte_chunk).digest()).decode("utf-8")
+    return upload_part_stand_in(Body=byte_chunk, ContentMD5=content_md5)
+
+
+def upload_part_reader(file_path, offset, length):
+    with FilePartReader(file_path, offset=offset, length=length) as byte_chunk:
+        return upload_part_stand_in(Body=byte_chunk, ContentMD5=byte_chunk.get_content_md5())
+
+
+def measure_upload(upload_part, file_path):
+    file_size = os.path.getsize(file_path)
+    tracemalloc.start()
+    start = time.perf_counter()
+    try:
+        with ThreadPoolExecutor(max_workers=PARTS_COUNT) as executor:
+            futures = [executor.submit(upload_part, file_path, offset, PART_SIZE)
+                       for offset in range(0, file_size, PART_SIZE)]
+            etags = [future.result()["ETag"] for future in futures]
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return etags, file_size / (time.perf_counter() - start), peak
+
+
+@pytest.mark.unit
+def test_benchmark_upload_parts(file_path):
+    read_etags, read_throughput, read_peak = measure_upload(upload_part_read, file_path)
+    reader_etags, reader_throughput, reader_peak = measure_upload(upload_part_reader, file_path)
+
+    print(f"\nread(): {read_throughput / 1024 / 1024:.0f} MiB/sec, peak {read_peak // 1024} KiB; "
+          f"FilePartReader: {reader_throughput / 1024 / 1024:.0f} MiB/sec, peak {reader_peak // 1024} KiB")
+    assert read_etags == reader_etags
+    assert reader_peak * 10 < read_peak
+
+
+@pytest.mark.unit
+def test_file_part_reader_region(file_path):
+    with open(file_path, "rb") as file_handler:
+        file_handler.seek(PART_SIZE * PARTS_COUNT - 10)
+        expected = file_handler.read()
+
+    with FilePartReader(file_path, offset=PART_SIZE * PARTS_COUNT - 10, length=PART_SIZE) as reader:
+        assert len(reader) == 14
+        assert reader.read(4) == expected[:4]
+        assert reader.read() == expected[4:]
+        assert reader.read() == b""
+        reader.seek(0)
+        buffer = bytearray(20)
+        assert reader.readinto(buffer) == 14
+        assert bytes(buffer[:14]) == expected
+        assert reader.get_md5() == hashlib.md5(expected).digest()
+
+
+@pytest.mark.unit
+def test_file_part_reader_empty_file(tmp_path):
+    file_path = tmp_path / "empty"
+    file_path.write_bytes(b"")
+    with FilePartReader(str(file_path)) as reader:
+        assert len(reader) == 0
+        assert reader.read() == b""
+        assert reader.get_md5() == hashlib.md5(b"").digest()
+
+
+@pytest.mark.unit
+def test_in_flight_bytes_limiter():
+    limiter = InFlightBytesLimiter(10)
+    assert limiter.try_acquire(6)
+    assert not limiter.try_acquire(6)
+    limiter.release(6)
+    assert limiter.try_acquire(20)
+    assert not limiter.try_acquire(1)
+    limiter.release(20)
+    assert limiter.peak_in_flight_bytes == 20
+
+
+def get_multipart_etag(file_path, part_size):
+    digests = []
+    with open(file_path, "rb") as file_handler:
+        while block := file_handler.read(part_size):
+            digests.append(hashlib.md5(block).digest())
+    return f"\"{hashlib.md5(b''.join(digests)).hexdigest()}-{len(digests)}\""
+
+
+@pytest.mark.unit
+def test_etag_unchanged_single_part(tmp_path):
+    file_path = tmp_path / "small"
+    file_path.write_bytes(b"horey")
+    e_tag = f"\"{hashlib.md5(b'horey').hexdigest()}\""
+    assert ETagUtils.is_unchanged(str(file_path), 5, e_tag)
+    assert not ETagUtils.is_unchanged(str(file_path), 6, e_tag)
+    assert not ETagUtils.is_unchanged(str(tmp_path / "missing"), 5, e_tag)
+    file_path.write_bytes(b"yeroh")
+    assert not ETagUtils.is_unchanged(str(file_path), 5, e_tag)
+
+
+@pytest.mark.unit
+@pytest.mark.parametrize("part_size", [8 * 1024 * 1024, 16 * 1024 * 1024, 7 * 1024 * 1024])
+def test_etag_unchanged_multipart(file_path, part_size):
+    e_tag = get_multipart_etag(file_path, part_size)
+    assert ETagUtils.is_unchanged(file_path, os.path.getsize(file_path), e_tag)
+
+    with open(file_path, "r+b") as file_handler:
+        file_handler.write(b"changed")
+    assert not ETagUtils.is_unchanged(file_path, os.path.getsize(file_path), e_tag)
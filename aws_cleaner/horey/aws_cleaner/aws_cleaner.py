@@ -6,7 +6,9 @@ import os
 import json
 import datetime
 # pylint: disable=no-name-in-module, too-many-lines
+import inspect
 from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
 from enum import Enum
 
 import requests
@@ -18,6 +20,7 @@ from horey.aws_api.aws_api_configuration_policy import AWSAPIConfigurationPolicy
 from horey.aws_cleaner.aws_cleaner_configuration_policy import AWSCleanerConfigurationPolicy
 from horey.aws_cleaner.price_list_product import PriceListProduct
 from horey.common_utils.text_block import TextBlock
+from horey.common_utils.objects_index import ObjectsIndex
 from horey.aws_api.base_entities.aws_account import AWSAccount
 from horey.common_utils.common_utils import CommonUtils
 from horey.network.service import ServiceTCP, Service
@@ -1169,17 +1172,77 @@ class AWSCleaner:
     def clean(self):
         """
         Run all active cleanup reports.
+        The inventories the reports use are fetched concurrently once, then the reports run concurrently.
+        Report blocks are added in the active cleanups order, followed by the timing block.
 
         :return:
         """
 
+        report_generators = self.get_active_cleanups()
+        tb_timing = TextBlock("Cleanup reports timing")
+
+        inventories = self.get_reports_inventories(report_generators)
+        logger.info(f"Prefetching inventories: {inventories}")
+        with ThreadPoolExecutor(max_workers=self.configuration.reports_max_workers) as executor:
+            for inventory, (_, run_time) in zip(inventories, executor.map(
+                    lambda inventory: self.run_timed(getattr(self, inventory)), inventories)):
+                tb_timing.lines.append(f"{inventory}: {run_time:.2f} sec")
+
+            results = list(executor.map(self.run_timed, report_generators))
+
         tb_ret = TextBlock("AWS Cleanup report")
-        for report_generator in self.get_active_cleanups():
-            report = report_generator()
+        for report_generator, (report, run_time) in zip(report_generators, results):
+            tb_timing.lines.append(f"{report_generator.__name__}: {run_time:.2f} sec")
             if report:
                 tb_ret.blocks.append(report)
+        tb_ret.blocks.append(tb_timing)
         return tb_ret
 
+    @staticmethod
+    def run_timed(function):
+        """
+        Run and measure.
+
+        :param function:
+        :return: result, run time in seconds
+        """
+
+        start = perf_counter()
+        ret = function()
+        return ret, perf_counter() - start
+
+    def get_reports_inventories(self, report_generators):
+        """
+        Names of the init_* functions the reports call. Recorded by running the reports
+        with permissions_only - the same calls without fetching.
+
+        :param report_generators:
+        :return: In the first call order.
+        """
+
+        init_function_names = [name for name, function in inspect.getmembers(type(self), inspect.isfunction)
+                               if name.startswith("init_") and
+                               "permissions_only" in inspect.signature(function).parameters]
+        called = []
+
+        def record_calls(name, function):
+            def recording_function(*args, **kwargs):
+                if name not in called:
+                    called.append(name)
+                return function(*args, **kwargs)
+            return recording_function
+
+        for name in init_function_names:
+            setattr(self, name, record_calls(name, getattr(self, name)))
+        try:
+            for report_generator in report_generators:
+                report_generator(permissions_only=True)
+        finally:
+            for name in init_function_names:
+                delattr(self, name)
+
+        return called
+
     # pylint: disable= too-many-branches
     def generate_permissions(self):
         """
@@ -1603,8 +1666,8 @@ class AWSCleaner:
         for aws_lambda in self.aws_api.lambdas:
             lst_str_sgs = aws_lambda.get_assinged_security_group_ids()
             for security_group_id in lst_str_sgs:
-                lst_security_group = CommonUtils.find_objects_by_values(
-                    self.aws_api.security_groups, {"id": security_group_id}, max_count=1
+                lst_security_group = self.aws_api.find_objects(
+                    "security_groups", {"id": security_group_id}, max_count=1
                 )
                 if len(lst_security_group) == 0:
                     line = f"{aws_lambda.name}: {security_group_id}"
@@ -1791,8 +1854,8 @@ class AWSCleaner:
             "Not functioning lambdas- either the last run was to much time ago or it never run"
         )
         for aws_lambda in self.aws_api.lambdas:
-            log_groups = CommonUtils.find_objects_by_values(
-                self.aws_api.cloud_watch_log_groups,
+            log_groups = self.aws_api.find_objects(
+                "cloud_watch_log_groups",
                 {"name": f"/aws/lambda/{aws_lambda.name}"},
                 max_count=1,
             )
@@ -2039,7 +2102,7 @@ class AWSCleaner:
 
         for inst in self.aws_api.ec2_instances:
             name = inst.name or inst.id
-            amis = CommonUtils.find_objects_by_values(self.aws_api.amis, {"id": inst.image_id}, max_count=1)
+            amis = self.aws_api.find_objects("amis", {"id": inst.image_id}, max_count=1)
             if not amis:
                 tb_ret.lines.append(f"{name} Can not find AMI, looks like it was either deleted or made private.")
                 continue
@@ -2316,11 +2379,11 @@ class AWSCleaner:
                 f"'{cluster.default_engine_version['EngineVersion']}'")
 
         subnet_group = \
-            CommonUtils.find_objects_by_values(self.aws_api.rds_db_subnet_groups, {"name": cluster.db_subnet_group},
-                                               max_count=1)[0]
+            self.aws_api.find_objects("rds_db_subnet_groups", {"name": cluster.db_subnet_group},
+                                      max_count=1)[0]
         for dict_subnet in subnet_group.subnets:
             subnet_id = dict_subnet['SubnetIdentifier']
-            subnet = CommonUtils.find_objects_by_values(self.aws_api.subnets, {"id": subnet_id}, max_count=1)[0]
+            subnet = self.aws_api.find_objects("subnets", {"id": subnet_id}, max_count=1)[0]
             route_table = self.aws_api.find_route_table_by_subnet(subnet)
 
             default_route = route_table.get_default_route()
@@ -2343,7 +2406,7 @@ class AWSCleaner:
         for dict_security_group in cluster.vpc_security_groups:
             sg_id = dict_security_group["VpcSecurityGroupId"]
             security_group = \
-                CommonUtils.find_objects_by_values(self.aws_api.security_groups, {"id": sg_id}, max_count=1)[0]
+                self.aws_api.find_objects("security_groups", {"id": sg_id}, max_count=1)[0]
             for ip, service in security_group.get_ingress_pairs():
                 if service is Service.any():
                     tb_ret.lines.append(f"SG '{security_group.name}' {ip}:{service}")
@@ -2447,8 +2510,8 @@ class AWSCleaner:
             if group.retention_in_days is None:
                 action.no_retention = True
 
-            metric_filters = CommonUtils.find_objects_by_values(self.aws_api.cloud_watch_log_groups_metric_filters,
-                                                                {"log_group_name": group.name})
+            metric_filters = self.aws_api.find_objects("cloud_watch_log_groups_metric_filters",
+                                                       {"log_group_name": group.name})
             all_metric_filters += metric_filters
             if not metric_filters:
                 action.no_metric_filter = True
@@ -2574,22 +2637,22 @@ class AWSCleaner:
 
         for alarm_action_arn in all_actions:
             if "arn:aws:autoscaling" in alarm_action_arn:
-                found_policies = CommonUtils.find_objects_by_values(self.aws_api.application_auto_scaling_policies,
-                                                                    {"arn": alarm_action_arn})
+                found_policies = self.aws_api.find_objects("application_auto_scaling_policies",
+                                                           {"arn": alarm_action_arn})
                 if not found_policies:
                     report_action = ReportActionCloudwatchAlarm({"arn": alarm.arn},
                                                                 reason="Autoscaling policy does not exist")
                     report_action.action_blackholes.append(alarm_action_arn)
                     lst_ret.append(report_action)
             elif "arn:aws:sns" in alarm_action_arn:
-                found_topics = CommonUtils.find_objects_by_values(self.aws_api.sns_topics, {"arn": alarm_action_arn})
+                found_topics = self.aws_api.find_objects("sns_topics", {"arn": alarm_action_arn})
                 if not found_topics:
                     report_action = ReportActionCloudwatchAlarm({"arn": alarm.arn},
                                                                 reason="SNS topic does not exist")
                     report_action.action_blackholes.append(alarm_action_arn)
                     lst_ret.append(report_action)
             elif "arn:aws:lambda" in alarm_action_arn:
-                lambdas = CommonUtils.find_objects_by_values(self.aws_api.lambdas, {"arn": alarm_action_arn})
+                lambdas = self.aws_api.find_objects("lambdas", {"arn": alarm_action_arn})
                 if not lambdas:
                     report_action = ReportActionCloudwatchAlarm({"arn": alarm.arn},
                                                                 reason="Lambda does not exist")
@@ -2619,8 +2682,8 @@ class AWSCleaner:
                 report_action.dimension_balckholes.append(alarm.dimensions)
                 lst_ret.append(report_action)
         else:
-            metric_filters = CommonUtils.find_objects_by_values(self.aws_api.cloud_watch_log_groups_metric_filters,
-                                                                {"name": alarm.metric_name})
+            metric_filters = self.aws_api.find_objects("cloud_watch_log_groups_metric_filters",
+                                                       {"name": alarm.metric_name})
             if not metric_filters:
                 report_action = ReportActionCloudwatchAlarm({"arn": alarm.arn},
                                                             reason="Metric filter does not exist")
@@ -2641,23 +2704,23 @@ class AWSCleaner:
         for dimension in alarm.dimensions:
             match dimension["Name"]:
                 case "ClusterName":
-                    if not CommonUtils.find_objects_by_values(self.aws_api.ecs_clusters, {"name": dimension["Value"]}):
+                    if not self.aws_api.find_objects("ecs_clusters", {"name": dimension["Value"]}):
                         report_action = ReportActionCloudwatchAlarm({"arn": alarm.arn},
                                                                     reason="Resource does not exist")
                         report_action.dimension_balckholes.append(dimension)
                         lst_ret.append(report_action)
                         break
                 case "CapacityProviderName":
-                    if not CommonUtils.find_objects_by_values(self.aws_api.ecs_capacity_providers,
-                                                              {"name": dimension["Value"]}):
+                    if not self.aws_api.find_objects("ecs_capacity_providers",
+                                                     {"name": dimension["Value"]}):
                         report_action = ReportActionCloudwatchAlarm({"arn": alarm.arn},
                                                                     reason="Resource does not exist")
                         report_action.dimension_balckholes.append(dimension)
                         lst_ret.append(report_action)
                         break
                 case "ServiceName":
-                    if not CommonUtils.find_objects_by_values(self.aws_api.ecs_services,
-                                                              {"name": dimension["Value"]}):
+                    if not self.aws_api.find_objects("ecs_services",
+                                                     {"name": dimension["Value"]}):
                         report_action = ReportActionCloudwatchAlarm({"arn": alarm.arn},
                                                                     reason="Resource does not exist")
                         report_action.dimension_balckholes.append(dimension)
@@ -2667,8 +2730,8 @@ class AWSCleaner:
                     if alarm.namespace != "AWS/DynamoDB":
                         lst_ret.append(self.generate_cleaner_error_report(f"Alarm {alarm.arn} dimensions in namespace {alarm.namespace} not yet implemented"))
                         continue
-                    if not CommonUtils.find_objects_by_values(self.aws_api.dynamodb_tables,
-                                                              {"name": dimension["Value"]}):
+                    if not self.aws_api.find_objects("dynamodb_tables",
+                                                     {"name": dimension["Value"]}):
                         report_action = ReportActionCloudwatchAlarm({"arn": alarm.arn},
                                                                     reason="Resource does not exist")
                         report_action.dimension_balckholes.append(dimension)
@@ -2679,8 +2742,8 @@ class AWSCleaner:
                         lst_ret.append(self.generate_cleaner_error_report(
                             f"Alarm {alarm.arn} dimensions in namespace {alarm.namespace} not yet implemented"))
                         continue
-                    if not CommonUtils.find_objects_by_values(self.aws_api.lambdas,
-                                                              {"name": dimension["Value"]}):
+                    if not self.aws_api.find_objects("lambdas",
+                                                     {"name": dimension["Value"]}):
                         report_action = ReportActionCloudwatchAlarm({"arn": alarm.arn},
                                                                     reason="Resource does not exist")
                         report_action.dimension_balckholes.append(dimension)
@@ -2691,8 +2754,8 @@ class AWSCleaner:
                         lst_ret.append(self.generate_cleaner_error_report(
                             f"Alarm {alarm.arn} dimensions in namespace {alarm.namespace} not yet implemented"))
                         continue
-                    if not CommonUtils.find_objects_by_values(self.aws_api.sqs_queues,
-                                                              {"name": dimension["Value"]}):
+                    if not self.aws_api.find_objects("sqs_queues",
+                                                     {"name": dimension["Value"]}):
                         report_action = ReportActionCloudwatchAlarm({"arn": alarm.arn},
                                                                     reason="Resource does not exist")
                         report_action.dimension_balckholes.append(dimension)
@@ -2703,8 +2766,8 @@ class AWSCleaner:
                         lst_ret.append(self.generate_cleaner_error_report(
                             f"Alarm {alarm.arn} dimensions in namespace {alarm.namespace} not yet implemented"))
                         continue
-                    if not CommonUtils.find_objects_by_values(self.aws_api.rds_db_clusters,
-                                                              {"id": dimension["Value"]}):
+                    if not self.aws_api.find_objects("rds_db_clusters",
+                                                     {"id": dimension["Value"]}):
                         report_action = ReportActionCloudwatchAlarm({"arn": alarm.arn},
                                                                     reason="Resource does not exist")
                         report_action.dimension_balckholes.append(dimension)
@@ -2719,8 +2782,8 @@ class AWSCleaner:
                         lst_ret.append(self.generate_cleaner_error_report(
                             f"Alarm {alarm.arn} dimensions in namespace {alarm.namespace} not yet implemented"))
                         continue
-                    if not CommonUtils.find_objects_by_values(self.aws_api.rds_db_instances,
-                                                              {"id": dimension["Value"]}):
+                    if not self.aws_api.find_objects("rds_db_instances",
+                                                     {"id": dimension["Value"]}):
                         report_action = ReportActionCloudwatchAlarm({"arn": alarm.arn},
                                                                     reason="Resource does not exist")
                         report_action.dimension_balckholes.append(dimension)
@@ -2731,8 +2794,8 @@ class AWSCleaner:
                         lst_ret.append(self.generate_cleaner_error_report(
                             f"Alarm {alarm.arn} dimensions in namespace {alarm.namespace} not yet implemented"))
                         continue
-                    if not CommonUtils.find_objects_by_values(self.aws_api.event_bridge_rules,
-                                                              {"_name": dimension["Value"]}):
+                    if not self.aws_api.find_objects("event_bridge_rules",
+                                                     {"_name": dimension["Value"]}):
                         report_action = ReportActionCloudwatchAlarm({"arn": alarm.arn},
                                                                     reason="Resource does not exist")
                         report_action.dimension_balckholes.append(dimension)
@@ -2747,8 +2810,8 @@ class AWSCleaner:
                         lst_ret.append(self.generate_cleaner_error_report(
                             f"Alarm {alarm.arn} dimensions in namespace {alarm.namespace} not yet implemented"))
                         continue
-                    if not CommonUtils.find_objects_by_values(self.aws_api.event_bridge_rules,
-                                                              {"_name": dimension["Value"]}):
+                    if not self.aws_api.find_objects("event_bridge_rules",
+                                                     {"_name": dimension["Value"]}):
                         report_action = ReportActionCloudwatchAlarm({"arn": alarm.arn},
                                                                     reason="Resource does not exist")
                         report_action.dimension_balckholes.append(dimension)
@@ -2763,8 +2826,8 @@ class AWSCleaner:
                         lst_ret.append(self.generate_cleaner_error_report(
                             f"Alarm {alarm.arn} dimensions in namespace {alarm.namespace} not yet implemented"))
                         continue
-                    if not CommonUtils.find_objects_by_values(self.aws_api.event_bridge_rules,
-                                                              {"_name": dimension["Value"]}):
+                    if not self.aws_api.find_objects("event_bridge_rules",
+                                                     {"_name": dimension["Value"]}):
                         report_action = ReportActionCloudwatchAlarm({"arn": alarm.arn},
                                                                     reason="Resource does not exist")
                         report_action.dimension_balckholes.append(dimension)
@@ -2780,8 +2843,8 @@ class AWSCleaner:
                         lst_ret.append(self.generate_cleaner_error_report(
                             f"Alarm {alarm.arn} dimensions in namespace {alarm.namespace} not yet implemented"))
                         continue
-                    if not CommonUtils.find_objects_by_values(self.aws_api.event_bridge_rules,
-                                                              {"_name": dimension["Value"]}):
+                    if not self.aws_api.find_objects("event_bridge_rules",
+                                                     {"_name": dimension["Value"]}):
                         report_action = ReportActionCloudwatchAlarm({"arn": alarm.arn},
                                                                     reason="Resource does not exist")
                         report_action.dimension_balckholes.append(dimension)
@@ -2792,8 +2855,8 @@ class AWSCleaner:
                         lst_ret.append(self.generate_cleaner_error_report(
                             f"Alarm {alarm.arn} dimensions in namespace {alarm.namespace} not yet implemented"))
                         continue
-                    if not CommonUtils.find_objects_by_values(self.aws_api.auto_scaling_groups,
-                                                              {"name": dimension["Value"]}):
+                    if not self.aws_api.find_objects("auto_scaling_groups",
+                                                     {"name": dimension["Value"]}):
                         report_action = ReportActionCloudwatchAlarm({"arn": alarm.arn},
                                                                     reason="Resource does not exist")
                         report_action.dimension_balckholes.append(dimension)
@@ -2804,8 +2867,8 @@ class AWSCleaner:
                         lst_ret.append(self.generate_cleaner_error_report(
                             f"Alarm {alarm.arn} dimensions in namespace {alarm.namespace} not yet implemented"))
                         continue
-                    if not CommonUtils.find_objects_by_values(self.aws_api.ec2_instances,
-                                                              {"id": dimension["Value"]}):
+                    if not self.aws_api.find_objects("ec2_instances",
+                                                     {"id": dimension["Value"]}):
                         report_action = ReportActionCloudwatchAlarm({"arn": alarm.arn},
                                                                     reason="Resource does not exist")
                         report_action.dimension_balckholes.append(dimension)
@@ -2844,21 +2907,21 @@ class AWSCleaner:
         if not metric.metric_transformations or len(metric.metric_transformations) > 1:
             raise NotImplementedError("Can not check the metric filter")
 
-        alarms = CommonUtils.find_objects_by_values(self.aws_api.cloud_watch_alarms,
-                                                    {"namespace": metric.metric_transformations[
-                                                        0]["metricNamespace"],
-                                                     "metric_name":
-                                                         metric.metric_transformations[
-                                                             0]["metricName"]})
+        alarms = self.aws_api.find_objects("cloud_watch_alarms",
+                                           {"namespace": metric.metric_transformations[
+                                               0]["metricNamespace"],
+                                            "metric_name":
+                                                metric.metric_transformations[
+                                                    0]["metricName"]})
         for alarm in alarms:
             if not alarm.actions_enabled:
                 action.disabled_actions_alarms.append(alarm.name)
         if len(alarms) == len(action.disabled_actions_alarms):
             action.no_alarms = True
 
-        log_groups = CommonUtils.find_objects_by_values(self.aws_api.cloud_watch_log_groups,
-                                                    {"name": metric.log_group_name,
-                                                     "region": metric.region})
+        log_groups = self.aws_api.find_objects("cloud_watch_log_groups",
+                                               {"name": metric.log_group_name,
+                                                "region": metric.region})
         if not log_groups:
             action.no_log_group = True
             breakpoint()
@@ -3020,7 +3083,7 @@ class AWSCleaner:
         for load_balancer in self.aws_api.load_balancers:
             for availability_zone in load_balancer.availability_zones:
                 subnet_id = availability_zone["SubnetId"]
-                subnet = CommonUtils.find_objects_by_values(self.aws_api.subnets, {"id": subnet_id}, max_count=1)[0]
+                subnet = self.aws_api.find_objects("subnets", {"id": subnet_id}, max_count=1)[0]
                 route_table = self.aws_api.find_route_table_by_subnet(subnet)
 
                 default_route = route_table.get_default_route()
@@ -3101,19 +3164,20 @@ class AWSCleaner:
                 tb_ret.lines.append(target_group.name)
 
         tb_ret = TextBlock("Target Groups monitoring report")
+        namespaces = ["AWS/ApplicationELB", "AWS/NetworkELB"]
+        dimension_name = "TargetGroup"
+        metrics_by_dimension = self.group_cloudwatch_objects_by_namespace_and_dimension(
+            self.aws_api.cloud_watch_metrics, namespaces, dimension_name)
+        alarms_by_dimension = self.group_cloudwatch_objects_by_namespace_and_dimension(
+            self.aws_api.cloud_watch_alarms, namespaces, dimension_name)
         for target_group in self.aws_api.target_groups:
             dimension_value = target_group.arn[target_group.arn.find(":targetgroup/") + 1:]
-            namespaces = ["AWS/ApplicationELB", "AWS/NetworkELB"]
-            dimension_name = "TargetGroup"
-            metrics = self.find_cloudwatch_object_by_namespace_and_dimension(self.aws_api.cloud_watch_metrics,
-                                                                             namespaces, dimension_name,
-                                                                             dimension_value)
+            metrics = metrics_by_dimension.get(dimension_value, [])
             if not metrics:
                 tb_ret.lines.append(f"Target Group: {target_group.name} has no available metrics.")
                 continue
 
-            alarms = self.find_cloudwatch_object_by_namespace_and_dimension(self.aws_api.cloud_watch_alarms, namespaces,
-                                                                            dimension_name, dimension_value)
+            alarms = alarms_by_dimension.get(dimension_value, [])
             inactive_alarms = []
             active_alarms = []
             for alarm in alarms:
@@ -3137,11 +3201,19 @@ class AWSCleaner:
         Find alarms matching the metric.
 
         :param metric:
-        :param alarms:
+        :param alarms: list of alarms or ObjectsIndex by metric_name, namespace and dict_dimensions.
         :return:
         """
 
-        alarms = alarms if alarms is not None else self.aws_api.cloud_watch_alarms
+        values = {"metric_name": metric.name,
+                  "namespace": metric.namespace,
+                  "dict_dimensions": metric.dict_dimensions}
+        if alarms is None:
+            return self.aws_api.find_objects("cloud_watch_alarms", values)
+
+        if isinstance(alarms, ObjectsIndex):
+            return alarms.find(values)
+
         return [alarm for alarm in alarms if
                 alarm.metric_name == metric.name and
                 alarm.namespace == metric.namespace and
@@ -3170,6 +3242,28 @@ class AWSCleaner:
             lst_ret.append(mon_obj)
         return lst_ret
 
+    @staticmethod
+    def group_cloudwatch_objects_by_namespace_and_dimension(monitor_objects, namespaces, dimension_name):
+        """
+        Single pass version of find_cloudwatch_object_by_namespace_and_dimension for joins:
+        group metrics or alarms by the dimension value.
+
+        :param monitor_objects:
+        :param namespaces:
+        :param dimension_name:
+        :return: dict dimension value - list of objects
+        """
+
+        dict_ret = defaultdict(list)
+        for mon_obj in monitor_objects:
+            if mon_obj.namespace not in namespaces:
+                continue
+
+            for dimension_value in {dimension["Value"] for dimension in mon_obj.dimensions if
+                                    dimension["Name"] == dimension_name}:
+                dict_ret[dimension_value].append(mon_obj)
+        return dict_ret
+
     def find_cloudwatch_metrics_by_namespace_excluding_dimension(self, namespaces, dimension_names):
         """
         Metrics or alarms are filtered the same way.
@@ -3246,11 +3340,9 @@ class AWSCleaner:
             return permissions
 
         tb_ret = TextBlock("Unused security groups")
-        used_security_group_ids = []
+        used_security_group_ids = set()
         for interface in self.aws_api.network_interfaces:
-            sg_ids = interface.get_used_security_group_ids()
-            used_security_group_ids += sg_ids
-        used_security_group_ids = list(set(used_security_group_ids))
+            used_security_group_ids.update(interface.get_used_security_group_ids())
         all_security_groups_dict = {sg.id: sg.name for sg in self.aws_api.security_groups}
         tb_ret.lines = [
             f"{sg_id} [{all_security_groups_dict[sg_id]}]"
@@ -3319,8 +3411,8 @@ class AWSCleaner:
             listeners_services.append(service)
 
         for security_group_id in load_balancer.security_groups:
-            security_group = CommonUtils.find_objects_by_values(
-                self.aws_api.security_groups, {"id": security_group_id}, max_count=1
+            security_group = self.aws_api.find_objects(
+                "security_groups", {"id": security_group_id}, max_count=1
             )[0]
             security_group_dst_pairs = security_group.get_ingress_pairs()
 
@@ -3431,6 +3523,7 @@ class AWSCleaner:
         metrics = [metric for metric in self.aws_api.cloud_watch_metrics if metric.namespace == "AWS/SES"]
 
         alarms = [alarm for alarm in self.aws_api.cloud_watch_alarms if alarm.namespace == "AWS/SES"]
+        alarms_index = ObjectsIndex(alarms, ["metric_name", "namespace", "dict_dimensions"])
         inactive_alarms = [alarm for alarm in alarms if not alarm.actions_enabled]
 
         if inactive_alarms:
@@ -3455,7 +3548,7 @@ class AWSCleaner:
             if {dimension["Name"] for dimension in metric.dimensions} == {"EMAIL", "ORG"}:
                 continue
 
-            metric_alarms = self.find_cloudwatch_metric_alarms(metric, alarms=alarms)
+            metric_alarms = self.find_cloudwatch_metric_alarms(metric, alarms=alarms_index)
             if len(metric_alarms) > 1:
                 tb_ret.lines.append(
                     f"Unknown Cloudwatch Metric status. Multiple alarms found for metric: {metric.name}: {[alarm.name for alarm in metric_alarms]}")
@@ -3515,15 +3608,15 @@ class AWSCleaner:
 
         # todo: copied from alarm:
         breakpoint()
-        # subscriptions = CommonUtils.find_objects_by_values(self.aws_api.sns_subscriptions,
+        # subscriptions = self.aws_api.find_objects("sns_subscriptions",
         if not subscriptions:
             subreport_json["sns_action_blackhole"].append(action)
             errors.append(f"Alarm's '{alarm.name}' action sns-topic has no subscriptions: {action}")
 
         for subscription in subscriptions:
             if subscription.protocol == "lambda":
-                lambdas = CommonUtils.find_objects_by_values(self.aws_api.lambdas,
-                                                         {"arn": subscription.endpoint})
+                lambdas = self.aws_api.find_objects("lambdas",
+                                                {"arn": subscription.endpoint})
                 if not lambdas:
                     subreport_json["sns_action_blackhole"].append(action)
                     errors.append(
@@ -4030,7 +4123,7 @@ class AWSCleaner:
         """
 
         lst_ret = []
-        cluster_container_instances = CommonUtils.find_objects_by_values(self.aws_api.ecs_container_instances, {"cluster_name": cluster.name})
+        cluster_container_instances = self.aws_api.find_objects("ecs_container_instances", {"cluster_name": cluster.name})
         if not cluster_container_instances:
             return []
 
@@ -34,6 +34,18 @@ class AWSCleanerConfigurationPolicy(ConfigurationPolicy):
         self._cleanup_report_elasticache = None
         self._cleanup_report_rds = None
         self._cleanup_report_dynamodb = None
+        self._reports_max_workers = None
+
+    @property
+    def reports_max_workers(self):
+        if self._reports_max_workers is None:
+            self._reports_max_workers = 8
+        return self._reports_max_workers
+
+    @reports_max_workers.setter
+    @ConfigurationPolicy.validate_type_decorator(int)
+    def reports_max_workers(self, value):
+        self._reports_max_workers = value
 
     @property
     def cleanup_report_dynamodb(self):
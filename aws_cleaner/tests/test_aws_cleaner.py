@@ -699,6 +699,16 @@ def test_cleanup_report_sqs(configuration):
     assert os.path.exists(cleaner.configuration.sqs_report_file_path)
 
 
+@pytest.mark.done
+def test_get_reports_inventories(configuration_generate_permissions):
+    configuration_generate_permissions.cleanup_report_ebs_volumes = True
+    configuration_generate_permissions.cleanup_report_sqs = True
+    cleaner = AWSCleaner(configuration_generate_permissions)
+    ret = cleaner.get_reports_inventories(cleaner.get_active_cleanups())
+    assert ret == ["init_ec2_volumes", "init_sqs_queues", "init_cloudwatch_alarms"]
+    assert "init_ec2_volumes" not in cleaner.__dict__
+
+
 @pytest.mark.todo
 def test_clean(configuration):
     cleaner = AWSCleaner(configuration)
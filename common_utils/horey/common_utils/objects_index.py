@@ -0,0 +1,120 @@
+"""
+Hash index over objects' attributes.
+Indexed replacement of CommonUtils.find_objects_by_values for repeated lookups.
+
+"""
+
+import operator
+from collections import defaultdict
+
+
+class ObjectsIndex:
+    """
+    Objects grouped by a tuple of attribute values.
+    Objects missing any of the attributes are not indexed - same as in CommonUtils.find_objects_by_values.
+    Objects with unhashable attribute values are kept aside and compared one by one.
+    The index does not see objects replaced or changed in place - rebuild it after such changes.
+
+    """
+
+    LIST_MARKER = object()
+    DICT_MARKER = object()
+
+    def __init__(self, objects, attributes):
+        self.objects = objects
+        # Shallow copy - is_valid(verify=True) detects replaced objects.
+        self.snapshot = list(objects)
+        self.attributes = tuple(attributes)
+        self.buckets = defaultdict(list)
+        self.unhashable = []
+
+        for position, obj in enumerate(self.snapshot):
+            try:
+                key = tuple(self.make_hashable(getattr(obj, attribute)) for attribute in self.attributes)
+                bucket = self.buckets[key]
+            except AttributeError:
+                continue
+            except TypeError:
+                self.unhashable.append(position)
+                continue
+            bucket.append(position)
+
+    def is_valid(self, objects, verify=False):
+        """
+        The index was built for this list and the list's length did not change since - O(1).
+
+        :param objects:
+        :param verify: Also check the objects were not replaced - O(N), for debugging.
+        :return:
+        """
+
+        if objects is not self.objects or len(objects) != len(self.snapshot):
+            return False
+
+        return not verify or all(map(operator.is_, objects, self.snapshot))
+
+    def find(self, values, max_count=None):
+        """
+        Find objects by the attribute values.
+
+        :param values: dict attribute name - value. Must have the index attributes.
+        :param max_count: Maximum amount to return
+        :return:
+        """
+
+        try:
+            key = tuple(self.make_hashable(values[attribute]) for attribute in self.attributes)
+            positions = self.buckets.get(key, [])
+        except TypeError:
+            # Unhashable lookup value - compare to all the objects.
+            positions = [position for position, obj in enumerate(self.snapshot) if self.matches(obj, values)]
+        else:
+            if self.unhashable:
+                positions = sorted(positions + [position for position in self.unhashable
+                                                if self.matches(self.snapshot[position], values)])
+
+        if max_count is not None:
+            positions = positions[:max_count]
+        return [self.snapshot[position] for position in positions]
+
+    def matches(self, obj, values):
+        """
+        Compare the object's attributes one by one - same as CommonUtils.find_objects_by_values.
+
+        :param obj:
+        :param values:
+        :return:
+        """
+
+        for attribute in self.attributes:
+            try:
+                if getattr(obj, attribute) != values[attribute]:
+                    return False
+            except AttributeError:
+                return False
+        return True
+
+    @staticmethod
+    def make_hashable(value):
+        """
+        Lists and dicts can be used as keys.
+        Lists and dicts are marked - a list does not match an equal tuple, a dict does not match its items set.
+
+        :param value:
+        :return:
+        """
+
+        if isinstance(value, dict):
+            return ObjectsIndex.DICT_MARKER, frozenset((key, ObjectsIndex.make_hashable(sub_value))
+                                                       for key, sub_value in value.items())
+
+        if isinstance(value, list):
+            return ObjectsIndex.LIST_MARKER, tuple(ObjectsIndex.make_hashable(sub_value) for sub_value in value)
+
+        if isinstance(value, tuple):
+            return tuple(ObjectsIndex.make_hashable(sub_value) for sub_value in value)
+
+        if isinstance(value, set):
+            return frozenset(value)
+
+        return value
@@ -0,0 +1,80 @@
+"""
+Objects index tests
+
+"""
+
+from horey.common_utils.common_utils import CommonUtils
+from horey.common_utils.objects_index import ObjectsIndex
+
+# pylint: disable= missing-function-docstring
+
+
+class Obj:
+    """
+    Indexed object.
+
+    """
+
+    def __init__(self, name, region, dimensions=None):
+        self.name = name
+        self.region = region
+        if dimensions is not None:
+            self.dimensions = dimensions
+
+
+def get_objects():
+    return [Obj(f"name_{index % 10}", f"region_{index % 3}", {"Id": str(index % 5)}) for index in range(100)] + \
+           [Obj("name_0", "region_0")]
+
+
+def test_find_equals_find_objects_by_values():
+    objects = get_objects()
+    index = ObjectsIndex(objects, ["name", "region"])
+    for name in ["name_0", "name_5", "missing"]:
+        for region in ["region_0", "region_2"]:
+            values = {"name": name, "region": region}
+            assert index.find(values) == CommonUtils.find_objects_by_values(objects, values)
+
+
+def test_find_by_dict_attribute():
+    objects = get_objects()
+    index = ObjectsIndex(objects, ["dimensions"])
+    ret = index.find({"dimensions": {"Id": "3"}})
+    assert len(ret) == 20
+    assert index.find({"dimensions": {"Id": "3"}}, max_count=2) == ret[:2]
+
+
+def test_is_valid():
+    objects = get_objects()
+    index = ObjectsIndex(objects, ["name"])
+    assert index.is_valid(objects)
+    objects.append(Obj("name_0", "region_0"))
+    assert not index.is_valid(objects)
+    assert not index.is_valid(list(objects))
+    objects.pop()
+    assert index.is_valid(objects)
+    objects[5] = Obj("name_0", "region_0")
+    assert index.is_valid(objects)
+    assert not index.is_valid(objects, verify=True)
+
+
+def test_unhashable_values():
+    objects = get_objects()
+    objects[3].dimensions = {"Id": bytearray(b"3")}
+    objects[7].dimensions = {"Id": "7", "Values": [{1, 2}]}
+    objects.append(Obj("name_0", "region_0", {"Id": bytearray(b"3")}))
+    index = ObjectsIndex(objects, ["dimensions"])
+    for dimensions in [{"Id": "3"}, {"Id": bytearray(b"3")}, {"Id": "7", "Values": [{1, 2}]}]:
+        values = {"dimensions": dimensions}
+        assert index.find(values) == CommonUtils.find_objects_by_values(objects, values)
+    assert len(index.find({"dimensions": {"Id": bytearray(b"3")}})) == 2
+
+
+def test_list_and_tuple_do_not_match():
+    objects = [Obj("name", "region", [1, 2]), Obj("name", "region", (1, 2)),
+               Obj("name", "region", {"a": 1}), Obj("name", "region", frozenset([("a", 1)]))]
+    index = ObjectsIndex(objects, ["dimensions"])
+    for dimensions in [[1, 2], (1, 2), {"a": 1}, frozenset([("a", 1)])]:
+        values = {"dimensions": dimensions}
+        assert index.find(values) == CommonUtils.find_objects_by_values(objects, values)
+        assert len(index.find(values)) == 1
@@ -9,9 +9,9 @@ import os
 import datetime
 import time
 import threading
-import stat
 import traceback
 
+from collections import deque
 from contextlib import contextmanager
 from pathlib import Path
 from typing import List, Any, Tuple
@@ -23,6 +23,10 @@ from horey.deployer.deployment_target import DeploymentTarget
 from horey.deployer.remote_deployment_step import RemoteDeploymentStep
 from horey.deployer.deployment_step import DeploymentStep
 from horey.deployer.replacement_engine import ReplacementEngine
+from horey.deployer.rollout_scheduler import RolloutScheduler, RateLimiter, DeploymentTimeline
+from horey.deployer.ssh_connection_pool import SSHConnectionPool
+from horey.deployer.shell_output_reader import ShellOutputReader
+from horey.deployer.sftp_transfer import SFTPDirectoryTransfer, SFTPSessions
 from horey.common_utils.zip_utils import ZipUtils
 from horey.common_utils.remoter import Remoter
 
@@ -37,14 +41,31 @@ class SSHRemoter(Remoter):
 
     """
 
-    def __init__(self, executor, sftp_client, remote_deployment_dir: Path, host_address=None):
+    # pylint: disable= too-many-arguments, too-many-positional-arguments
+    def __init__(self, executor, sftp_client, remote_deployment_dir: Path, host_address=None, sftp_session=None):
         self._state = {}
         self.host_address = host_address
         self.executor = executor
         self.sftp_client = sftp_client
+        self.sftp_session = sftp_session
         logger.info(f"Setting remote deployment dir in deployer: {remote_deployment_dir}")
         self.remote_deployment_dir = remote_deployment_dir
 
+    @contextmanager
+    def get_sftp_client(self):
+        """
+        Pooled SFTP session if the pool is set, the shared client otherwise.
+
+        :return:
+        """
+
+        if self.sftp_session is None:
+            yield self.sftp_client
+            return
+
+        with self.sftp_session() as sftp_client:
+            yield sftp_client
+
     def get_host_address(self):
         """
         Get host address
@@ -109,12 +130,14 @@ class SSHRemoter(Remoter):
 
         if sudo:
             remote_tmp_file_path = Path('/tmp')/src.name
-            self.sftp_client.put(str(src), str(remote_tmp_file_path))
+            with self.get_sftp_client() as sftp_client:
+                sftp_client.put(str(src), str(remote_tmp_file_path))
             if remote_tmp_file_path == dst:
                 return [], [], 0
             return self.execute(f"sudo mv {Path('/tmp')/src.name} {dst}")
         logger.info(f"SFTP put_file: {src} -> {dst}")
-        return self.sftp_client.put(str(src), str(dst))
+        with self.get_sftp_client() as sftp_client:
+            return sftp_client.put(str(src), str(dst))
 
     def put_directory(self, src: Path, dst: Path, sudo: bool = False):
         """
@@ -128,11 +151,23 @@ class SSHRemoter(Remoter):
 
         if sudo:
             remote_tmp_path = Path('/tmp')/src.name
-            self.sftp_client.put_dir(src, remote_tmp_path)
+            with self.get_sftp_client() as sftp_client:
+                sftp_client.put_dir(src, remote_tmp_path, execute=self.execute_exit_code, host_address=self.host_address)
             if remote_tmp_path == dst:
                 return [], [], 0
             return self.execute(f"sudo mv {Path('/tmp')/src.name} {dst}")
-        return self.sftp_client.put_dir(src, dst)
+        with self.get_sftp_client() as sftp_client:
+            return sftp_client.put_dir(src, dst, execute=self.execute_exit_code, host_address=self.host_address)
+
+    def execute_exit_code(self, command: str) -> int:
+        """
+        Remote command exit code.
+
+        :param command:
+        :return:
+        """
+
+        return self.execute(command)[2]
 
 
     def get_deployment_dir(self) -> Path:
@@ -154,7 +189,8 @@ class SSHRemoter(Remoter):
         :return:
         """
 
-        self.sftp_client.get(str(src), str(dst))
+        with self.get_sftp_client() as sftp_client:
+            sftp_client.get(str(src), str(dst))
         return True
 
 
@@ -165,27 +201,43 @@ class HoreySFTPClient(paramiko.SFTPClient):
 
     """
 
-    def put_dir(self, source: pathlib.Path, target: pathlib.Path):
+    MAX_SESSIONS = 4
+
+    def put_dir(self, source: pathlib.Path, target: pathlib.Path, max_workers=8, execute=None, host_address=None,
+                max_sessions=None):
         """
         Uploads the contents of the source directory to the target path. The
         target directory needs to exists. All subdirectories in source are
         created under target.
+        Files run concurrently over extra SFTP sessions, files unchanged since the previous upload are skipped.
+
+        :param source:
+        :param target:
+        :param max_workers:
+        :param execute: Callable(command) -> exit code, small files are packed to a single tar if set.
+        :param host_address: Statistics name.
+        :param max_sessions: SFTP sessions including this one, MAX_SESSIONS by default.
+        :return:
         """
 
-        self.mkdir(target, ignore_existing=True)
         logger.info(f"Copying local directory '{source}' to remote {target}")
-
-        for src in source.iterdir():
-            logger.info(f"SFTP Uploading '{src}'")
-            dst = target / src.name
-            if src.is_file():
-                self.put(
-                    str(src), str(dst), confirm=True
-                )
-            else:
-                self.put_dir(src, dst)
+        sessions = SFTPSessions(self, self.open_session, max_sessions=max_sessions or self.MAX_SESSIONS)
+        try:
+            SFTPDirectoryTransfer(sessions, max_workers=max_workers, execute=execute,
+                                  name=host_address).put_dir(source, target)
+        finally:
+            sessions.close()
         return True
 
+    def open_session(self):
+        """
+        New SFTP session over the same transport.
+
+        :return:
+        """
+
+        return HoreySFTPClient.from_transport(self.get_channel().get_transport())
+
     def mkdir(self, path: pathlib.Path, mode=511, ignore_existing=False):
         """
         Augments mkdir by adding an option to not fail if the folder exists
@@ -202,12 +254,14 @@ class HoreySFTPClient(paramiko.SFTPClient):
             else:
                 raise
 
-    def get_dir(self, remote_path: pathlib.Path, local_path: pathlib.Path):
+    def get_dir(self, remote_path: pathlib.Path, local_path: pathlib.Path, max_workers=8, max_sessions=None):
         """
         Get remote dir
 
         :param remote_path:
         :param local_path:
+        :param max_workers:
+        :param max_sessions: SFTP sessions including this one, MAX_SESSIONS by default.
         :return:
         """
 
@@ -219,17 +273,11 @@ class HoreySFTPClient(paramiko.SFTPClient):
 
         logger.info(f"Copying remote directory '{remote_path}' to local {local_path}")
 
-        os.makedirs(local_path, exist_ok=True)
-
-        remote_files_and_dirs = self.listdir_attr(path=str(remote_path))
-        for attribute in remote_files_and_dirs:
-            if stat.S_ISDIR(attribute.st_mode):
-                self.get_dir(remote_path / attribute.filename, local_path)
-                continue
-            self.get(
-                str(remote_path/ attribute.filename),
-                str(local_path / attribute.filename),
-            )
+        sessions = SFTPSessions(self, self.open_session, max_sessions=max_sessions or self.MAX_SESSIONS)
+        try:
+            SFTPDirectoryTransfer(sessions, max_workers=max_workers).get_dir(remote_path, local_path)
+        finally:
+            sessions.close()
         return True
 
 
@@ -240,13 +288,19 @@ class RemoteDeployer:
     """
 
     REGEX_CLEANER = re.compile(r'(\x9B|\x1B\[)[0-?]*[ -/]*[@-~]')
+    SSH_CONNECTIONS_PER_SECOND = 2
+    SSH_KEEPALIVE_INTERVAL = 30
+    SFTP_SESSIONS_PER_CONNECTION = 4
+    SSH_WINDOW_SIZE = 16 * 1024 * 1024
+    REMOTE_ZIP_CACHE_DIR_PATH = Path("/tmp/horey_deployer_cache")
 
     def __init__(self, configuration=None):
         self.configuration = configuration
         self.replacement_engine = ReplacementEngine()
-        self.clients_lock = threading.Lock()
-        self.ssh_clients = {}
-        self.sftp_clients = {}
+        self.connection_pool = SSHConnectionPool(keepalive_interval=self.SSH_KEEPALIVE_INTERVAL,
+                                                 max_sftp_sessions=self.SFTP_SESSIONS_PER_CONNECTION,
+                                                 rate_limiter=RateLimiter(self.SSH_CONNECTIONS_PER_SECOND))
+        self.timeline = DeploymentTimeline()
 
     def provision_target_remote_deployer_infrastructure_thread(self, deployment_target: DeploymentTarget):
         """
@@ -314,12 +368,14 @@ class RemoteDeployer:
             )
 
     @staticmethod
-    def generate_unzip_script_file_contents(remote_zip_path: pathlib.Path, remote_deployment_dir_path: pathlib.Path):
+    def generate_unzip_script_file_contents(remote_zip_path: pathlib.Path, remote_deployment_dir_path: pathlib.Path,
+                                            remove_zip=True):
         """
         Generate the script to unzip remotely copied zipped deployment dir.
 
         :param remote_zip_path:
         :param remote_deployment_dir_path:
+        :param remove_zip: False - keep the zip cached.
         :return:
         """
 
@@ -331,8 +387,9 @@ class RemoteDeployer:
             "unzip -v || export unzip_installed=1\n"
             f"if [[ $unzip_installed == '1' ]]; then sudo DEBIAN_FRONTEND=noninteractive apt update && sudo NEEDRESTART_MODE=a apt install -yqq unzip; fi\n"
             f"unzip {remote_zip_path} -d {remote_deployment_dir_path}\n"
-            f"rm {remote_zip_path}\n"
         )
+        if remove_zip:
+            command += f"rm {remote_zip_path}\n"
         logger.info(f"[REMOTE] {command}")
         return command
 
@@ -346,8 +403,10 @@ class RemoteDeployer:
         """
 
         try:
-            self.upload_target_remote_deployer_infrastructure(deployment_target)
-            self.provision_target_remote_deployer_executor(deployment_target)
+            with self.timeline.record(deployment_target.deployment_target_address, "upload"):
+                self.upload_target_remote_deployer_infrastructure(deployment_target)
+            with self.timeline.record(deployment_target.deployment_target_address, "provision_executor"):
+                self.provision_target_remote_deployer_executor(deployment_target)
         except Exception as error_instance:
             traceback_str = "".join(
                 traceback.format_tb(error_instance.__traceback__)
@@ -365,11 +424,14 @@ class RemoteDeployer:
         Upload to remote destination
         Unzip remotely
 
+        The remote zip is cached by the deployment dir content hash - unchanged content is neither zipped
+        nor uploaded again.
+
         """
 
         ssh_client = self.get_deployment_target_ssh_client(target)
         sftp_client = self.get_deployment_target_sftp_client(target)
-        local_zip_file_path = self.zip_target_remote_deployer_infrastructure(target)
+        remote_zip_path = self.upload_target_remote_deployer_infrastructure_zip(target, sftp_client)
         command = f"sudo rm -rf {target.remote_deployment_dir_path}"
         channel = ssh_client.invoke_shell()
 
@@ -382,22 +444,13 @@ class RemoteDeployer:
             target.remote_deployment_dir_path, ignore_existing=True
         )
 
-        zip_file_name = local_zip_file_path.name
-        remote_zip_path = target.remote_deployment_dir_path / zip_file_name
-
-        logger.info(
-            f"sftp: copying zip file from local {local_zip_file_path} to "
-            f"{target.deployment_target_address}:{remote_zip_path}"
-        )
-
-        sftp_client.put(str(local_zip_file_path), str(remote_zip_path))
         local_unziper_file_path = os.path.join(
             target.local_deployment_dir_path, "unzip_script.sh"
         )
         with open(local_unziper_file_path, "w", encoding="utf-8") as file_handler:
             file_handler.write(
                 self.generate_unzip_script_file_contents(
-                    remote_zip_path, target.remote_deployment_dir_path
+                    remote_zip_path, target.remote_deployment_dir_path, remove_zip=False
                 )
             )
 
@@ -418,6 +471,44 @@ class RemoteDeployer:
 
         return True
 
+    def upload_target_remote_deployer_infrastructure_zip(self, target: DeploymentTarget,
+                                                         sftp_client: HoreySFTPClient) -> Path:
+        """
+        Upload the zipped deployment dir to the remote cache, unless already there.
+
+        :param target:
+        :param sftp_client:
+        :return: Remote zip path
+        """
+
+        content_hash = SFTPDirectoryTransfer.generate_manifest_hash(
+            SFTPDirectoryTransfer.generate_manifest(Path(target.local_deployment_dir_path)))
+        zip_file_prefix = os.path.basename(target.local_deployment_dir_path)
+        remote_zip_path = self.REMOTE_ZIP_CACHE_DIR_PATH / f"{zip_file_prefix}-{content_hash[:16]}.zip"
+
+        try:
+            sftp_client.stat(str(remote_zip_path))
+            logger.info(f"sftp: {target.deployment_target_address}:{remote_zip_path} is cached, skipping upload")
+            return remote_zip_path
+        except IOError:
+            pass
+
+        local_zip_file_path = self.zip_target_remote_deployer_infrastructure(target)
+        sftp_client.mkdir(self.REMOTE_ZIP_CACHE_DIR_PATH, ignore_existing=True)
+        for file_name in sftp_client.listdir(str(self.REMOTE_ZIP_CACHE_DIR_PATH)):
+            if file_name.startswith(f"{zip_file_prefix}-"):
+                sftp_client.remove(str(self.REMOTE_ZIP_CACHE_DIR_PATH / file_name))
+
+        logger.info(
+            f"sftp: copying zip file from local {local_zip_file_path} to "
+            f"{target.deployment_target_address}:{remote_zip_path}"
+        )
+        # Renamed when complete - interrupted uploads are never taken from the cache.
+        remote_tmp_zip_path = f"{remote_zip_path}.tmp"
+        sftp_client.put(str(local_zip_file_path), remote_tmp_zip_path, confirm=False)
+        sftp_client.posix_rename(remote_tmp_zip_path, str(remote_zip_path))
+        return remote_zip_path
+
     @staticmethod
     def zip_target_remote_deployer_infrastructure(target: DeploymentTarget) -> Path:
         """
@@ -492,10 +583,12 @@ class RemoteDeployer:
         return True
 
     @staticmethod
-    def execute_remote_shell(channel: paramiko.Channel, cmd:str, remote_address:str, timeout=60*60, stdin=None, retries=1, retry_on_exception=True):
+    def execute_remote_shell(channel: paramiko.Channel, cmd:str, remote_address:str, timeout=60*60, stdin=None, retries=1, retry_on_exception=True,
+                             output_callback=None):
         """
         Execute command using remote shell.
 
+        :param output_callback: Called with each output line as soon as it arrives.
         :param retry_on_exception:
         :param retries:
         :param stdin:
@@ -524,7 +617,8 @@ class RemoteDeployer:
                 stdin.write(f"{cmd} ; {echo_cmd}\n")
                 stdin.flush()
                 end_time = datetime.datetime.now() + datetime.timedelta(seconds=timeout)
-                shout, exit_code = RemoteDeployer.fetch_remote_shell_output(channel, cmd, echo_cmd, finish, end_time, remote_address)
+                shout, exit_code = RemoteDeployer.fetch_remote_shell_output(channel, cmd, echo_cmd, finish, end_time, remote_address,
+                                                                             output_callback=output_callback)
                 return stdin, shout, [], exit_code
             except TimeoutError:
                 logger.warning(f"{remote_address} retrying to execute {i+1}/{retries}")
@@ -543,9 +637,10 @@ class RemoteDeployer:
         raise RemoteDeployer.DeployerError(f"{remote_address} Reached timeout waiting for SSH response") from inst_error
 
     @staticmethod
-    def fetch_remote_shell_output(channel, cmd, echo_cmd, finish, end_time, remote_address):
+    def fetch_remote_shell_output(channel, cmd, echo_cmd, finish, end_time, remote_address, output_callback=None):
         """
         Wait for the output of a command executed via remote shell.
+        Complete lines are parsed once - the last two output lines are kept for the split finish line detection.
 
         :param channel:
         :param cmd:
@@ -553,40 +648,40 @@ class RemoteDeployer:
         :param finish:
         :param end_time:
         :param remote_address:
+        :param output_callback: Called with each output line as soon as it arrives.
         :return:
         """
 
         shell_output = []
-        data_chunk_aggregator = bytes()
-        now_time = datetime.datetime.now()
-        logger.info(f"Waiting for response from server {remote_address}, {now_time=}, {end_time=}")
-        while now_time < end_time:
-            if not channel.recv_ready():
-                time.sleep(0.01)
-                continue
-            raw_data = channel.recv(4096)
-            data_chunk_aggregator += raw_data
-            try:
-                data = data_chunk_aggregator.decode('utf-8')
-            except Exception:
-                logger.error(f"Could not decode: {raw_data}")
-                time.sleep(1)
-                continue
-
-            shell_output_tmp, exit_code, exit_code_line_index = RemoteDeployer.parse_shell_output_chunk(data, cmd, finish, remote_address, echo_cmd, shell_output[-2:])
-            if shell_output_tmp:
+        recent_output = deque(maxlen=2)
+        logger.info(f"Waiting for response from server {remote_address}, {datetime.datetime.now()=}, {end_time=}")
+        with ShellOutputReader(channel) as reader:
+            while True:
+                try:
+                    lines = reader.read_lines(end_time)
+                except TimeoutError as inst_error:
+                    raise TimeoutError(f"{remote_address} Reached timeout waiting for SSH response") from inst_error
+                if not lines:
+                    continue
+
+                shell_output_tmp, exit_code, exit_code_line_index = RemoteDeployer.parse_shell_output_chunk(
+                    "\n".join(lines), cmd, finish, remote_address, echo_cmd, recent_output)
+                streamed_count = len(shell_output)
                 # Augmented assignment operator behaves like extend()
                 shell_output += shell_output_tmp
-                data_chunk_aggregator = bytes()
-            if exit_code is not None:
-                while exit_code_line_index != 0:
-                    # Time complexity O(1)
-                    shell_output.pop()
-                    exit_code_line_index += 1
+                recent_output.extend(shell_output_tmp)
+                if exit_code is not None:
+                    while exit_code_line_index != 0:
+                        # Time complexity O(1)
+                        shell_output.pop()
+                        exit_code_line_index += 1
 
-                return shell_output, exit_code
+                if output_callback is not None:
+                    for line in shell_output[streamed_count:]:
+                        output_callback(line)
 
-        raise TimeoutError(f"{remote_address} Reached timeout waiting for SSH response")
+                if exit_code is not None:
+                    return shell_output, exit_code
 
     @staticmethod
     def parse_shell_output_chunk(data:str, cmd:str, finish:str, remote_address:str, echo_cmd:str, recent_output:List[str]):
@@ -872,9 +967,7 @@ class RemoteDeployer:
         :return:
         """
 
-        with self.get_deployment_target_client_context(deployment_target) as client:
-            transport = client.get_transport()
-            sftp_client = HoreySFTPClient.from_transport(transport)
+        with self.get_deployment_target_sftp_session(deployment_target) as sftp_client:
             sftp_client.put(local_file_path, remote_file_path)
         return True
 
@@ -888,10 +981,8 @@ class RemoteDeployer:
         :return:
         """
 
-        with self.get_deployment_target_client_context(deployment_target) as client:
-            transport = client.get_transport()
-            sftp_client = HoreySFTPClient.from_transport(transport)
-            sftp_client.put_dir(local_path, remote_path)
+        with self.get_deployment_target_sftp_session(deployment_target) as sftp_client:
+            sftp_client.put_dir(local_path, remote_path, max_sessions=self.SFTP_SESSIONS_PER_CONNECTION)
         return True
 
     def get_file_windows(self, deployment_target, local_file_path, remote_file_path):
@@ -907,10 +998,8 @@ class RemoteDeployer:
         sleep_time = 1
         end_time = datetime.datetime.now() + datetime.timedelta(minutes=5)
         while datetime.datetime.now() < end_time:
-            with self.get_deployment_target_client_context(deployment_target) as client:
-                transport = client.get_transport()
+            with self.get_deployment_target_sftp_session(deployment_target) as sftp_client:
                 try:
-                    sftp_client = HoreySFTPClient.from_transport(transport)
                     sftp_client.get(remote_file_path, local_file_path)
                     return True
                 except Exception as inst_error:
@@ -935,10 +1024,8 @@ class RemoteDeployer:
         sleep_time = 1
         end_time = datetime.datetime.now() + datetime.timedelta(minutes=5)
         while datetime.datetime.now() < end_time:
-            with self.get_deployment_target_client_context(deployment_target) as client:
-                transport = client.get_transport()
+            with self.get_deployment_target_sftp_session(deployment_target) as sftp_client:
                 try:
-                    sftp_client = HoreySFTPClient.from_transport(transport)
                     sftp_client.get(remote_file_path, local_file_path)
                     return True
                 except Exception as inst_error:
@@ -1183,38 +1270,13 @@ class RemoteDeployer:
     @contextmanager
     def get_deployment_target_client_context(self, target: DeploymentTarget):
         """
-        SSH client context. With or without bastion tunnel
+        Pooled SSH client context. With or without bastion tunnel
 
         :param target:
         :return:
         """
 
-        logger.info(
-            f"Loading target SSH Key of typefrom '{target.deployment_target_ssh_key_path}'")
-        deployment_target_key = RemoteDeployer.load_ssh_key_from_file(target.deployment_target_ssh_key_path,
-                                                                      "ed25519key")
-        client = self.get_deployment_target_ssh_client(target)
-        yield client
-        return
-
-        if not target.bastion_chain:
-            with paramiko.SSHClient() as client:
-                client.set_missing_host_key_policy(paramiko.AutoAddPolicy())
-                logger.info(
-                    f"Connecting directly to {target.deployment_target_address}, "
-                    f"using key at {target.deployment_target_ssh_key_path}"
-                )
-                client.connect(
-                    target.deployment_target_address,
-                    port=22,
-                    username=target.deployment_target_user_name,
-                    pkey=deployment_target_key,
-                    compress=True,
-                    banner_timeout=60,
-                )
-                yield client
-            return
-        raise NotImplementedError("Bastion chain not implemented")
+        yield self.get_deployment_target_ssh_client(target)
 
     @staticmethod
     def load_ssh_key_from_file(file_path, key_type):
@@ -1438,8 +1500,9 @@ class RemoteDeployer:
                     break
 
             for step in target.steps:
-                self.deploy_target_step(target, step)
-                self.wait_to_finish_step(target, step)
+                with self.timeline.record(target.deployment_target_address, f"step: {step.name}"):
+                    self.deploy_target_step(target, step)
+                    self.wait_to_finish_step(target, step)
 
             target.status_code = target.StatusCode.SUCCESS
 
@@ -1451,12 +1514,16 @@ class RemoteDeployer:
 
         logger.info(f"Finished target deployment: {target.deployment_target_address}")
 
-    def deploy_targets(self, targets, asynchronous=True):
+    def deploy_targets(self, targets, asynchronous=True, rollout_scheduler: RolloutScheduler = None,
+                       timeline_file_path=None):
         """
         Deploy multiple targets.
 
-        :param asynchronous:
+        :param asynchronous: False - one target at a time.
         :param targets:
+        :param rollout_scheduler: Waves, parallelism and failures threshold. Default deploys all the targets
+            and reports the failures at the end.
+        :param timeline_file_path: Per target connect/upload/steps timeline JSON.
         :return:
         """
 
@@ -1468,16 +1535,20 @@ class RemoteDeployer:
         if errors:
             raise ValueError("\n".join(errors))
 
-        for target in targets:
-            self.deploy_target(target, asynchronous=asynchronous)
-            if asynchronous:
-                time.sleep(10)
+        if rollout_scheduler is None:
+            rollout_scheduler = RolloutScheduler(max_parallel=10 if asynchronous else 1)
 
-        return self.wait_to_finish(
-            targets,
-            lambda _target: _target.status_code is not None,
-            lambda _target: _target.status_code == _target.StatusCode.SUCCESS,
-        )
+        total_time = max([2400] + [step.sleep_time * step.retry_attempts for target in targets for step in
+                                   target.steps])
+        logger.info(f"Target deployment timeout calculated from steps and default: {total_time} seconds")
+
+        self.timeline = rollout_scheduler.timeline
+        try:
+            return rollout_scheduler.run(targets, self.deploy_target_thread, total_time)
+        finally:
+            if timeline_file_path is not None:
+                self.timeline.write(timeline_file_path)
+                logger.info(f"Deployment timeline written to: {timeline_file_path}")
 
     class DeployerError(RuntimeError):
         """
@@ -1532,41 +1603,41 @@ class RemoteDeployer:
             key_filename=str(target_key_path),
             sock=target_channel
         )
+        # Large windows let chatty commands stream without waiting for window adjustments.
+        target_client.get_transport().default_window_size = RemoteDeployer.SSH_WINDOW_SIZE
         logger.info(f"Connection to target {target_host} successful.")
         return target_client
 
     # pylint: disable = too-many-arguments, too-many-positional-arguments
     def get_ssh_client(self, target_host: str, target_user: str, target_key_path: str,
                        proxy_jump_addr: str = None,
-                       proxy_jump_client: paramiko.SSHClient = None
+                       proxy_jump_client: paramiko.SSHClient = None,
+                       proxy_jump_key: tuple = None
                        ) -> paramiko.SSHClient:
         """
-        Connect to bastion if not yet connected.
+        Pooled client, connect if not yet connected or the connection is dead.
 
         :param proxy_jump_client:
         :param proxy_jump_addr:
+        :param proxy_jump_key: Jump host connection key, proxy_jump_addr is used if not set.
         :param target_host:
         :param target_user:
         :param target_key_path:
         :return:
         """
 
-        key = f"{proxy_jump_addr}->{target_host}" if proxy_jump_addr is not None else target_host
-        with self.clients_lock:
-            try:
-                client = self.ssh_clients[key]
-                logger.info(f"Reusing existing ssh client for: {key}")
-                return client
-            except KeyError:
-                pass
+        key = SSHConnectionPool.generate_key(target_host, target_user, target_key_path,
+                                             proxy_jump_key if proxy_jump_key is not None else proxy_jump_addr)
+
+        def connect():
             logger.info(f"Creating new ssh client for: {key}: {target_host=}, {target_user=}, {target_key_path=}, {proxy_jump_client=}")
-            client = RemoteDeployer.connect_to_target(target_host,
-                                                          target_user,
-                                                          target_key_path,
-                                                          proxy_jump_client=proxy_jump_client)
-            self.ssh_clients[key] = client
+            with self.timeline.record(target_host, "connect"):
+                return RemoteDeployer.connect_to_target(target_host,
+                                                        target_user,
+                                                        target_key_path,
+                                                        proxy_jump_client=proxy_jump_client)
 
-        return client
+        return self.connection_pool.get_client(key, connect)
 
     def get_deployment_target_ssh_client(self, target: DeploymentTarget
                                          ) -> paramiko.SSHClient:
@@ -1577,48 +1648,74 @@ class RemoteDeployer:
         :return:
         """
 
+        return self.get_deployment_target_ssh_client_and_key(target)[0]
+
+    def get_deployment_target_ssh_client_and_key(self, target: DeploymentTarget):
+        """
+        Connect through the bastion chain, each link's client is pooled.
+
+        :param target:
+        :return: client, connection key
+        """
 
         proxy_jump_client = None
-        proxy_jump_addr = None
+        proxy_jump_key = None
         for bastion_chain_link in target.bastion_chain:
             proxy_jump_client = self.get_ssh_client(bastion_chain_link.address,
-                                                bastion_chain_link.user_name,
-                                                bastion_chain_link.ssh_key_path,
+                                                    bastion_chain_link.user_name,
+                                                    bastion_chain_link.ssh_key_path,
                                                     proxy_jump_client=proxy_jump_client,
-                                                    proxy_jump_addr=proxy_jump_addr)
-            proxy_jump_addr = bastion_chain_link.address
+                                                    proxy_jump_key=proxy_jump_key)
+            proxy_jump_key = SSHConnectionPool.generate_key(bastion_chain_link.address,
+                                                            bastion_chain_link.user_name,
+                                                            bastion_chain_link.ssh_key_path,
+                                                            proxy_jump_key)
+
+        client = self.get_ssh_client(target.deployment_target_address,
+                                     target.deployment_target_user_name,
+                                     target.deployment_target_ssh_key_path,
+                                     proxy_jump_client=proxy_jump_client,
+                                     proxy_jump_key=proxy_jump_key)
+        return client, SSHConnectionPool.generate_key(target.deployment_target_address,
+                                                      target.deployment_target_user_name,
+                                                      target.deployment_target_ssh_key_path,
+                                                      proxy_jump_key)
+
+    @staticmethod
+    def open_sftp_client(ssh_client: paramiko.SSHClient) -> HoreySFTPClient:
+        """
+        New SFTP session over the client's transport.
 
-        return self.get_ssh_client(target.deployment_target_address,
-                                   target.deployment_target_user_name,
-                                   target.deployment_target_ssh_key_path,
-                                   proxy_jump_client=proxy_jump_client,
-                                   proxy_jump_addr=proxy_jump_addr)
+        :param ssh_client:
+        :return:
+        """
 
+        return HoreySFTPClient.from_transport(ssh_client.get_transport())
 
     def get_deployment_target_sftp_client(self, target: DeploymentTarget
                                           ) -> HoreySFTPClient:
         """
-        Get SFTP Client towards deployment target
+        Get shared SFTP Client towards deployment target
 
         :param target:
         :return:
         """
 
-        client = self.get_deployment_target_ssh_client(target)
-        keys_values = list(filter(lambda k: k[1] == client, self.ssh_clients.items()))
-        if len(keys_values) != 1:
-            raise RuntimeError(f"Expected single client: {keys_values=}")
-        key = keys_values[0][0]
+        client, key = self.get_deployment_target_ssh_client_and_key(target)
+        return self.connection_pool.get_sftp_client(key, client, self.open_sftp_client)
 
-        with self.clients_lock:
-            try:
-                client = self.sftp_clients[key]
-                logger.info(f"Reusing existing sftp client for: {key}")
-            except KeyError:
-                transport = client.get_transport()
-                client = HoreySFTPClient.from_transport(transport)
-                self.sftp_clients[key] = client
-        return client
+    @contextmanager
+    def get_deployment_target_sftp_session(self, target: DeploymentTarget):
+        """
+        Borrow pooled SFTP session towards deployment target - safe for concurrent transfers.
+
+        :param target:
+        :return:
+        """
+
+        client, key = self.get_deployment_target_ssh_client_and_key(target)
+        with self.connection_pool.sftp_session(key, client, self.open_sftp_client) as sftp_client:
+            yield sftp_client
 
     def get_remoter(self, target:DeploymentTarget, windows=False, default_timeout=60*60) -> SSHRemoter:
         """
@@ -1651,16 +1748,24 @@ class RemoteDeployer:
             :return:
             """
 
-            channel = ssh_client.invoke_shell()
-            channel.settimeout(120)
-            # This is a prefix line to eliminate the SSH command header output
-            silent_shell_command = 'export PS1=""'
+            shell = {}
+
+            def init_shell(client):
+                channel = client.invoke_shell()
+                channel.settimeout(120)
+                # This is a prefix line to eliminate the SSH command header output
+                silent_shell_command = 'export PS1=""'
+
+                stdin, shout, [], exit_status = self.execute_remote_shell(channel, silent_shell_command, target.deployment_target_address)
+                logger.info(f"[REMOTE] [{target.deployment_target_address}] Initialized remote shell with params: {stdin=}, {shout=}, {exit_status=}")
+                shell["channel"] = channel
+                shell["stdin"] = stdin
+
+            init_shell(ssh_client)
 
-            stdin, shout, [], exit_status = self.execute_remote_shell(channel, silent_shell_command, target.deployment_target_address)
-            logger.info(f"[REMOTE] [{target.deployment_target_address}] Initialized remote shell with params: {stdin=}, {shout=}, {exit_status=}")
             def executor(command:str, timeout:int=None, retries=1):
                 """
-                Reuse channel
+                Reuse channel, reopen it over the pooled connection if closed.
 
                 :param retries:
                 :param timeout:
@@ -1668,7 +1773,10 @@ class RemoteDeployer:
                 :return:
                 """
                 timeout = timeout or default_timeout
-                return self.execute_remote_shell(channel, command, target.deployment_target_address, stdin=stdin, timeout=timeout, retries=retries)
+                if shell["channel"].closed:
+                    logger.warning(f"[REMOTE] [{target.deployment_target_address}] Shell channel closed, reopening")
+                    init_shell(self.get_deployment_target_ssh_client(target))
+                return self.execute_remote_shell(shell["channel"], command, target.deployment_target_address, stdin=shell["stdin"], timeout=timeout, retries=retries)
 
             return executor
 
@@ -1684,9 +1792,10 @@ class RemoteDeployer:
 
             timeout = timeout or default_timeout
 
-            return self.execute_windows(ssh_client, command, target.deployment_target_address, timeout=timeout, retries=retries)
+            return self.execute_windows(self.get_deployment_target_ssh_client(target), command, target.deployment_target_address, timeout=timeout, retries=retries)
 
 
-        ret = SSHRemoter(executor_windows if windows else init_executor_linux(), sftp_client,  target.remote_deployment_dir_path, host_address=target.deployment_target_address)
+        ret = SSHRemoter(executor_windows if windows else init_executor_linux(), sftp_client,  target.remote_deployment_dir_path, host_address=target.deployment_target_address,
+                         sftp_session=lambda: self.get_deployment_target_sftp_session(target))
 
         return ret
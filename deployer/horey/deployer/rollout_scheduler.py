@@ -0,0 +1,283 @@
+"""
+Fleet rollout: canary and batch waves, bounded parallelism, rate limited starts,
+fail fast thresholds and per target timeline.
+
+"""
+
+import datetime
+import json
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+
+from horey.h_logger import get_logger
+
+logger = get_logger()
+
+
+class RateLimiter:
+    """
+    Spread events evenly: at most `rate` acquisitions per second.
+
+    """
+
+    def __init__(self, rate=None):
+        """
+
+        :param rate: Acquisitions per second. None - unlimited.
+        """
+
+        self.interval = 1.0 / rate if rate else 0.0
+        self.lock = threading.Lock()
+        self.next_time = 0.0
+
+    def acquire(self, stop_event=None):
+        """
+        Block until the next slot.
+
+        :param stop_event: Stop waiting when set.
+        :return: False if stopped while waiting.
+        """
+
+        if not self.interval:
+            return True
+
+        with self.lock:
+            now = time.monotonic()
+            slot = max(now, self.next_time)
+            self.next_time = slot + self.interval
+
+        delay = slot - time.monotonic()
+        if delay <= 0:
+            return True
+        if stop_event is None:
+            time.sleep(delay)
+            return True
+        return not stop_event.wait(delay)
+
+
+class DeploymentTimeline:
+    """
+    Per target events: name, start, end, duration and error.
+
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.events = {}
+
+    def add(self, address, name, start, end, error=None):
+        """
+        Add finished event.
+
+        :param address:
+        :param name:
+        :param start: datetime
+        :param end: datetime
+        :param error:
+        :return:
+        """
+
+        event = {"name": name,
+                 "start": start.isoformat(),
+                 "end": end.isoformat(),
+                 "duration": round((end - start).total_seconds(), 3)}
+        if error is not None:
+            event["error"] = error
+
+        with self.lock:
+            self.events.setdefault(address, []).append(event)
+
+    @contextmanager
+    def record(self, address, name):
+        """
+        Record the enclosed block as an event, exceptions are recorded and reraised.
+
+        :param address:
+        :param name:
+        :return:
+        """
+
+        start = datetime.datetime.now(datetime.timezone.utc)
+        try:
+            yield
+        except Exception as inst_error:
+            self.add(address, name, start, datetime.datetime.now(datetime.timezone.utc), error=repr(inst_error))
+            raise
+        self.add(address, name, start, datetime.datetime.now(datetime.timezone.utc))
+
+    def convert_to_dict(self):
+        """
+        Address -> events in start order.
+
+        :return:
+        """
+
+        with self.lock:
+            return {address: sorted(events, key=lambda event: event["start"]) for address, events in
+                    self.events.items()}
+
+    def write(self, file_path):
+        """
+        Write atomically.
+
+        :param file_path:
+        :return:
+        """
+
+        tmp_file_path = f"{file_path}.tmp"
+        with open(tmp_file_path, "w", encoding="utf-8") as file_handler:
+            json.dump(self.convert_to_dict(), file_handler, indent=4)
+        os.replace(tmp_file_path, file_path)
+
+
+class RolloutScheduler:
+    """
+    Deploy targets in waves: optional canary wave first, then batches.
+    Up to max_parallel targets deploy concurrently, starts are rate limited.
+    Fail fast is opt-in: once the failures exceed max_failures no new targets are started - the rest are marked
+    as errors. By default all the targets are deployed and the failures are reported at the end.
+
+    """
+
+    # pylint: disable= too-many-arguments, too-many-positional-arguments
+    def __init__(self, max_parallel=10, canary_count=0, batch_size=None, max_failures=None, starts_per_second=None):
+        """
+
+        :param max_parallel: Concurrent target deployments.
+        :param canary_count: First wave size. Any canary failure stops the rollout.
+        :param batch_size: Next waves size. None - all the rest in a single wave.
+        :param max_failures: Failures tolerated before stopping. None - never stop.
+        :param starts_per_second: Target deployment starts rate. None - unlimited.
+        """
+
+        self.max_parallel = max_parallel
+        self.canary_count = canary_count
+        self.batch_size = batch_size
+        self.max_failures = max_failures
+        self.start_rate_limiter = RateLimiter(starts_per_second)
+        self.timeline = DeploymentTimeline()
+
+    def generate_waves(self, targets):
+        """
+        Split targets to canary and batch waves.
+
+        :param targets:
+        :return:
+        """
+
+        targets = list(targets)
+        waves = []
+        if self.canary_count:
+            waves.append(targets[:self.canary_count])
+            targets = targets[self.canary_count:]
+
+        batch_size = self.batch_size or len(targets)
+        waves += [targets[start: start + batch_size] for start in range(0, len(targets), batch_size)]
+        return [wave for wave in waves if wave]
+
+    @staticmethod
+    def check_succeeded(target):
+        """
+        Target finished successfully.
+
+        :param target:
+        :return:
+        """
+
+        return target.status_code == target.StatusCode.SUCCESS
+
+    # pylint: disable= too-many-locals
+    def run(self, targets, deploy_target, timeout):
+        """
+        Deploy all targets.
+
+        :param targets:
+        :param deploy_target: Callable(target), sets target.status_code.
+        :param timeout: Single target deployment timeout in seconds.
+        :return: True if all succeeded. Raises TimeoutError if any target timed out.
+        """
+
+        stop_event = threading.Event()
+        condition = threading.Condition()
+        started = {}
+        finished = set()
+        failures = []
+        timed_out = []
+
+        def deploy_target_worker(target):
+            address = target.deployment_target_address
+            try:
+                if stop_event.is_set() or not self.start_rate_limiter.acquire(stop_event):
+                    target.status_code = target.StatusCode.ERROR
+                    target.status = f"Not deployed, rollout stopped after failures: {failures}"
+                    return
+                with condition:
+                    started[address] = time.monotonic()
+                with self.timeline.record(address, "deploy"):
+                    deploy_target(target)
+            except Exception as inst_error:
+                if target.status_code is None:
+                    target.status_code = target.StatusCode.ERROR
+                    target.status = repr(inst_error)
+            finally:
+                with condition:
+                    finished.add(address)
+                    if not self.check_succeeded(target):
+                        failures.append(address)
+                        if self.max_failures is not None and len(failures) > self.max_failures:
+                            stop_event.set()
+                    condition.notify_all()
+
+        executor = ThreadPoolExecutor(max_workers=self.max_parallel, thread_name_prefix="rollout")
+        try:
+            for wave_index, wave in enumerate(self.generate_waves(targets)):
+                logger.info(f"Rollout wave {wave_index}: {[target.deployment_target_address for target in wave]}")
+                for target in wave:
+                    executor.submit(deploy_target_worker, target)
+
+                addresses = [target.deployment_target_address for target in wave]
+                with condition:
+                    while not all(address in finished for address in addresses):
+                        now = time.monotonic()
+                        timed_out = [address for address in addresses if address not in finished and
+                                     address in started and now - started[address] > timeout]
+                        if timed_out:
+                            break
+                        deadlines = [started[address] + timeout for address in addresses if
+                                     address in started and address not in finished]
+                        condition.wait(min(deadlines) - now if deadlines else timeout)
+
+                if timed_out:
+                    stop_event.set()
+                    for target in wave:
+                        if target.deployment_target_address in timed_out:
+                            target.status_code = target.StatusCode.ERROR
+                            target.status = f"Deployment timed out after {timeout} seconds"
+                    break
+
+                if wave_index == 0 and self.canary_count and failures:
+                    logger.error(f"Canary wave failed: {failures}")
+                    stop_event.set()
+
+                if stop_event.is_set():
+                    break
+        finally:
+            executor.shutdown(wait=not timed_out, cancel_futures=True)
+
+        for target in targets:
+            if target.status_code is None:
+                target.status_code = target.StatusCode.ERROR
+                target.status = f"Not deployed, rollout stopped after failures: {failures}"
+
+        errors = [f"Result: {[self.check_succeeded(target) for target in targets]}"]
+        for target in targets:
+            if not self.check_succeeded(target):
+                errors.append(f"[REMOTE<-{target.deployment_target_address}] Deployment failed Status: {target.status}")
+
+        if len(errors) > 1:
+            raise (TimeoutError if timed_out else RuntimeError)("\n".join(errors))
+
+        return True
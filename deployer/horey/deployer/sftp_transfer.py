@@ -0,0 +1,397 @@
+"""
+Parallel, delta aware SFTP directory transfer.
+
+"""
+
+import hashlib
+import json
+import os
+import queue
+import shlex
+import stat
+import tarfile
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from pathlib import Path, PurePosixPath
+
+from horey.h_logger import get_logger
+
+logger = get_logger()
+
+
+class TransferStatistics:
+    """
+    Transferred and skipped files, bytes and throughput.
+
+    """
+
+    def __init__(self, name=None):
+        self.name = name
+        self.lock = threading.Lock()
+        self.files = 0
+        self.skipped = 0
+        self.bytes = 0
+        self.start_time = time.perf_counter()
+        self.seconds = None
+
+    def add(self, size):
+        """
+        Count transferred file.
+
+        :param size:
+        :return:
+        """
+
+        with self.lock:
+            self.files += 1
+            self.bytes += size
+
+    def finish(self):
+        """
+        Stop the clock.
+
+        :return:
+        """
+
+        self.seconds = time.perf_counter() - self.start_time
+        return self
+
+    @property
+    def bytes_per_second(self):
+        """
+        Throughput.
+
+        :return:
+        """
+
+        seconds = self.seconds if self.seconds is not None else time.perf_counter() - self.start_time
+        return self.bytes / seconds if seconds else 0.0
+
+    def __str__(self):
+        return (f"[{self.name}] transferred {self.files} files, {self.bytes} bytes, skipped {self.skipped} files "
+                f"in {self.seconds or 0:.2f} seconds: {self.bytes_per_second / 1024 / 1024:.2f} MB/s")
+
+
+class SFTPSessions:
+    """
+    Lend SFTP sessions: the main session first, more sessions are opened over the same transport on demand.
+    Up to max_sessions sessions (the main one included) - the server limits channels per connection,
+    the borrowers wait for a free session once the limit is reached or the server refuses a new channel.
+
+    """
+
+    def __init__(self, main_session, open_session, max_sessions=4):
+        """
+
+        :param main_session:
+        :param open_session: Callable opening new session.
+        :param max_sessions: Sessions including the main one.
+        """
+
+        self.open_session = open_session
+        self.max_sessions = max(1, max_sessions)
+        self.free = queue.SimpleQueue()
+        self.free.put(main_session)
+        self.lock = threading.Lock()
+        self.opened = []
+        self.count = 1
+
+    @contextmanager
+    def __call__(self):
+        session = self.get_session()
+        try:
+            yield session
+        finally:
+            self.free.put(session)
+
+    def get_session(self):
+        """
+        Free session, new one if under the limit, or wait for a session to be returned.
+
+        :return:
+        """
+
+        try:
+            return self.free.get_nowait()
+        except queue.Empty:
+            pass
+
+        with self.lock:
+            can_open = self.count < self.max_sessions
+            if can_open:
+                self.count += 1
+
+        if can_open:
+            try:
+                session = self.open_session()
+            except Exception as inst_error:
+                with self.lock:
+                    self.count -= 1
+                    self.max_sessions = self.count
+                logger.warning(f"Failed opening SFTP session, limiting to {self.max_sessions}: {repr(inst_error)}")
+            else:
+                with self.lock:
+                    self.opened.append(session)
+                return session
+
+        # The main session is never closed - it is eventually returned.
+        return self.free.get()
+
+    def close(self):
+        """
+        Close the sessions opened on demand.
+
+        :return:
+        """
+
+        with self.lock:
+            for session in self.opened:
+                session.close()
+            self.opened = []
+
+
+class SFTPDirectoryTransfer:
+    """
+    Many files in flight over concurrent SFTP sessions.
+    Uploads write a manifest (size and sha256 per file) to the target dir - unchanged files are skipped next time.
+    Small files can be packed into a single tar stream and extracted remotely.
+    Downloads skip local files with the remote size and mtime.
+
+    """
+
+    MANIFEST_FILE_NAME = ".horey_sftp_manifest.json"
+    PACK_FILE_NAME = ".horey_sftp_pack.tar.gz"
+
+    # pylint: disable= too-many-arguments, too-many-positional-arguments
+    def __init__(self, sftp_session, max_workers=8, execute=None, pack_max_file_size=64 * 1024, name=None):
+        """
+
+        :param sftp_session: Context manager factory lending SFTP sessions.
+        :param max_workers: Concurrent file transfers.
+        :param execute: Callable(command) -> exit code. Small files are packed only if set.
+        :param pack_max_file_size: Files up to this size are packed.
+        :param name: Statistics name - e.g. target address.
+        """
+
+        self.sftp_session = sftp_session
+        self.max_workers = max_workers
+        self.execute = execute
+        self.pack_max_file_size = pack_max_file_size
+        self.name = name
+
+    @staticmethod
+    def generate_manifest(source: Path):
+        """
+        Relative posix path -> {"size": int, "sha256": str} for files, {"dir": True} for dirs.
+
+        :param source:
+        :return:
+        """
+
+        ret = {}
+        for dir_path, dir_names, file_names in os.walk(source):
+            dir_names.sort()
+            relative_dir_path = PurePosixPath(Path(dir_path).relative_to(source).as_posix())
+            for dir_name in dir_names:
+                ret[str(relative_dir_path / dir_name)] = {"dir": True}
+            for file_name in sorted(file_names):
+                file_path = os.path.join(dir_path, file_name)
+                sha256 = hashlib.sha256()
+                with open(file_path, "rb") as file_handler:
+                    for block in iter(lambda: file_handler.read(1024 * 1024), b""):
+                        sha256.update(block)
+                ret[str(relative_dir_path / file_name)] = {"size": os.path.getsize(file_path),
+                                                           "sha256": sha256.hexdigest()}
+        ret.pop(SFTPDirectoryTransfer.MANIFEST_FILE_NAME, None)
+        return ret
+
+    @staticmethod
+    def generate_manifest_hash(manifest):
+        """
+        Content hash of the whole directory.
+
+        :param manifest:
+        :return:
+        """
+
+        return hashlib.sha256(json.dumps(manifest, sort_keys=True).encode("utf-8")).hexdigest()
+
+    def load_remote_manifest(self, session, target):
+        """
+        Manifest of the previous upload, empty if missing.
+
+        :param session:
+        :param target:
+        :return:
+        """
+
+        try:
+            with session.open(str(PurePosixPath(target) / self.MANIFEST_FILE_NAME), "r") as file_handler:
+                return json.loads(file_handler.read())
+        except (IOError, ValueError):
+            return {}
+
+    @staticmethod
+    def mkdir(session, path):
+        """
+        Create remote dir, ignore existing.
+
+        :param session:
+        :param path:
+        :return:
+        """
+
+        try:
+            session.mkdir(str(path))
+        except IOError:
+            pass
+
+    def put_dir(self, source: Path, target):
+        """
+        Upload the contents of the source directory to the target path.
+
+        :param source:
+        :param target:
+        :return: TransferStatistics
+        """
+
+        statistics = TransferStatistics(self.name)
+        source = Path(source)
+        target = PurePosixPath(target)
+        manifest = self.generate_manifest(source)
+
+        with self.sftp_session() as session:
+            self.mkdir(session, target)
+            remote_manifest = self.load_remote_manifest(session, target)
+            changed = [relative_path for relative_path, info in manifest.items() if
+                       remote_manifest.get(relative_path) != info]
+            statistics.skipped = len(manifest) - len(changed)
+
+            for relative_path in changed:
+                if manifest[relative_path].get("dir"):
+                    self.mkdir(session, target / relative_path)
+
+        files = [relative_path for relative_path in changed if not manifest[relative_path].get("dir")]
+        packed = [relative_path for relative_path in files if
+                  manifest[relative_path]["size"] <= self.pack_max_file_size] if self.execute is not None else []
+        if len(packed) < 2:
+            packed = []
+        packed_set = set(packed)
+
+        def put_file(relative_path):
+            with self.sftp_session() as session:
+                session.put(str(source / relative_path), str(target / relative_path), confirm=False)
+            statistics.add(manifest[relative_path]["size"])
+
+        with ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="sftp_put") as executor:
+            futures = [executor.submit(put_file, relative_path) for relative_path in files if
+                       relative_path not in packed_set]
+            if packed:
+                self.put_packed(source, target, packed, manifest, statistics)
+            for future in futures:
+                future.result()
+
+        with self.sftp_session() as session:
+            with session.open(str(target / self.MANIFEST_FILE_NAME), "w") as file_handler:
+                file_handler.write(json.dumps(manifest))
+
+        logger.info(f"SFTP put_dir '{source}' -> '{target}': {statistics.finish()}")
+        return statistics
+
+    def put_packed(self, source: Path, target: PurePosixPath, relative_paths, manifest, statistics):
+        """
+        Upload files in a single tar stream and extract remotely.
+
+        :param source:
+        :param target:
+        :param relative_paths:
+        :param manifest:
+        :param statistics:
+        :return:
+        """
+
+        remote_pack_path = target / self.PACK_FILE_NAME
+        with tempfile.TemporaryDirectory() as tmp_dir_path:
+            local_pack_path = os.path.join(tmp_dir_path, self.PACK_FILE_NAME)
+            with tarfile.open(local_pack_path, "w:gz") as tar_file:
+                for relative_path in relative_paths:
+                    tar_file.add(str(source / relative_path), arcname=relative_path)
+            with self.sftp_session() as session:
+                session.put(local_pack_path, str(remote_pack_path), confirm=False)
+
+        quoted_pack_path = shlex.quote(str(remote_pack_path))
+        exit_code = self.execute(f"tar -xzf {quoted_pack_path} -C {shlex.quote(str(target))} && rm -f {quoted_pack_path}")
+        if exit_code != 0:
+            raise RuntimeError(f"Failed extracting '{remote_pack_path}': exit code {exit_code}")
+
+        for relative_path in relative_paths:
+            statistics.add(manifest[relative_path]["size"])
+
+    def list_remote_files(self, session, remote_path):
+        """
+        Remote files tree.
+
+        :param session:
+        :param remote_path:
+        :return: [(relative posix path, SFTPAttributes)], [relative dir paths]
+        """
+
+        files = []
+        dirs = []
+        pending = [PurePosixPath("")]
+        while pending:
+            relative_dir_path = pending.pop()
+            for attribute in session.listdir_attr(str(PurePosixPath(remote_path) / relative_dir_path)):
+                relative_path = relative_dir_path / attribute.filename
+                if stat.S_ISDIR(attribute.st_mode):
+                    dirs.append(relative_path)
+                    pending.append(relative_path)
+                else:
+                    files.append((relative_path, attribute))
+        return files, dirs
+
+    def get_dir(self, remote_path, local_path: Path):
+        """
+        Download remote dir contents into local path.
+
+        :param remote_path:
+        :param local_path:
+        :return: TransferStatistics
+        """
+
+        statistics = TransferStatistics(self.name)
+        remote_path = PurePosixPath(remote_path)
+        local_path = Path(local_path)
+
+        with self.sftp_session() as session:
+            files, dirs = self.list_remote_files(session, remote_path)
+
+        os.makedirs(local_path, exist_ok=True)
+        for relative_dir_path in dirs:
+            os.makedirs(local_path / relative_dir_path, exist_ok=True)
+
+        def get_file(relative_path, attribute):
+            local_file_path = local_path / relative_path
+            try:
+                local_stat = os.stat(local_file_path)
+                if local_stat.st_size == attribute.st_size and int(local_stat.st_mtime) == attribute.st_mtime:
+                    with statistics.lock:
+                        statistics.skipped += 1
+                    return
+            except FileNotFoundError:
+                pass
+
+            with self.sftp_session() as session:
+                session.get(str(remote_path / relative_path), str(local_file_path))
+            os.utime(local_file_path, (attribute.st_atime, attribute.st_mtime))
+            statistics.add(attribute.st_size)
+
+        with ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="sftp_get") as executor:
+            for future in [executor.submit(get_file, relative_path, attribute) for relative_path, attribute in files]:
+                future.result()
+
+        logger.info(f"SFTP get_dir '{remote_path}' -> '{local_path}': {statistics.finish()}")
+        return statistics
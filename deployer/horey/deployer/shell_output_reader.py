@@ -0,0 +1,116 @@
+"""
+Event driven remote shell output reader.
+
+"""
+
+import codecs
+import datetime
+import selectors
+import socket
+
+
+class ShellOutputReader:
+    """
+    Wait for the channel to become readable instead of polling,
+    drain everything available in large reads, decode incrementally (split UTF-8 sequences are kept
+    for the next read) and return complete lines only - the partial last line waits for its end.
+
+    """
+
+    RECV_SIZE = 1024 * 1024
+    MAX_READ_SIZE = 8 * 1024 * 1024
+    MAX_LINE_LENGTH = 1024 * 1024
+
+    def __init__(self, channel):
+        """
+
+        :param channel: Channel or socket - anything with fileno() and non blocking recv().
+        """
+
+        self.channel = channel
+        self.channel_timeout = channel.gettimeout()
+        self.channel.setblocking(False)
+        self.decoder = codecs.getincrementaldecoder("utf-8")(errors="replace")
+        self.pending = ""
+        self.selector = selectors.DefaultSelector()
+        self.selector.register(self.channel, selectors.EVENT_READ)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def close(self):
+        """
+        Release the selector, the channel stays open with its original timeout.
+
+        :return:
+        """
+
+        self.selector.close()
+        self.channel.settimeout(self.channel_timeout)
+
+    def read_lines(self, end_time):
+        """
+        Wait for data and return the complete lines received.
+
+        :param end_time: datetime
+        :return: Lines without line terminators, may be empty if only a partial line arrived.
+        """
+
+        while True:
+            timeout = (end_time - datetime.datetime.now()).total_seconds()
+            if timeout <= 0:
+                raise TimeoutError("Reached timeout waiting for SSH response")
+            if self.selector.select(timeout):
+                break
+
+        data = self.recv_available()
+        if data is None:
+            raise ConnectionError("SSH channel closed")
+        return self.feed(data)
+
+    def recv_available(self):
+        """
+        Receive everything already buffered, up to MAX_READ_SIZE.
+
+        :return: None on EOF
+        """
+
+        chunks = []
+        size = 0
+        while size < self.MAX_READ_SIZE:
+            try:
+                chunk = self.channel.recv(self.RECV_SIZE)
+            except (socket.timeout, BlockingIOError):
+                break
+            if not chunk:
+                if chunks:
+                    break
+                return None
+            chunks.append(chunk)
+            size += len(chunk)
+        return b"".join(chunks)
+
+    def feed(self, data):
+        """
+        Decode data and split to lines.
+
+        :param data: bytes
+        :return:
+        """
+
+        text = self.pending + self.decoder.decode(data)
+        lines = text.splitlines(keepends=True)
+        self.pending = ""
+        if lines:
+            last_line = lines[-1]
+            # "\r" may be the first half of "\r\n"
+            if last_line.endswith("\r") or len(last_line.splitlines()[0]) == len(last_line):
+                self.pending = lines.pop()
+                if len(self.pending) > self.MAX_LINE_LENGTH:
+                    lines.append(self.pending)
+                    self.pending = ""
+
+        return [line.rstrip("\r\n") for line in lines]
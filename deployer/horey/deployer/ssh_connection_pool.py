@@ -0,0 +1,229 @@
+"""
+Shared SSH connections and SFTP sessions.
+
+"""
+
+import threading
+from contextlib import contextmanager
+
+from horey.h_logger import get_logger
+
+logger = get_logger()
+
+
+class SSHConnectionPool:
+    """
+    SSH clients keyed by (host, user, key path, proxy jump key).
+    A client's transport is reused by all the channels: shells, exec commands and SFTP sessions.
+    Dead transports are detected on checkout and reconnected, alive ones are kept alive with keepalive packets.
+
+    """
+
+    # pylint: disable= too-many-instance-attributes
+    def __init__(self, keepalive_interval=30, max_sftp_sessions=4, rate_limiter=None):
+        """
+
+        :param keepalive_interval: Transport keepalive packets interval in seconds.
+        :param max_sftp_sessions: Concurrent SFTP sessions per transport.
+        :param rate_limiter: New connections rate limiter.
+        """
+
+        self.keepalive_interval = keepalive_interval
+        self.max_sftp_sessions = max_sftp_sessions
+        self.rate_limiter = rate_limiter
+        self.lock = threading.Lock()
+        self.sessions_condition = threading.Condition(self.lock)
+        self.clients = {}
+        self.connect_locks = {}
+        self.sftp_clients = {}
+        self.free_sftp_sessions = {}
+        self.sftp_sessions_count = {}
+        # Incremented on discard - sessions of the discarded connection are not returned to the pool.
+        self.generations = {}
+
+    @staticmethod
+    def generate_key(host, user, key_path, proxy_jump_key=None):
+        """
+        Connection key.
+
+        :param host:
+        :param user:
+        :param key_path:
+        :param proxy_jump_key: Connection key (or address) of the jump host.
+        :return:
+        """
+
+        return host, user, str(key_path), proxy_jump_key
+
+    @staticmethod
+    def check_alive(client):
+        """
+        Client's transport is connected.
+
+        :param client:
+        :return:
+        """
+
+        transport = client.get_transport()
+        return transport is not None and transport.is_active()
+
+    @staticmethod
+    def check_session_alive(session):
+        """
+        SFTP session's channel is open.
+
+        :param session:
+        :return:
+        """
+
+        channel = session.get_channel()
+        return channel is not None and not channel.closed
+
+    def get_client(self, key, connect):
+        """
+        Alive pooled client or a new connection.
+
+        :param key:
+        :param connect: Callable returning new connected client.
+        :return:
+        """
+
+        with self.lock:
+            client = self.clients.get(key)
+            if client is not None and self.check_alive(client):
+                return client
+            connect_lock = self.connect_locks.setdefault(key, threading.Lock())
+
+        # Different hosts connect concurrently, the same host - once.
+        with connect_lock:
+            with self.lock:
+                client = self.clients.get(key)
+                if client is not None:
+                    if self.check_alive(client):
+                        return client
+                    logger.warning(f"SSH connection is dead, reconnecting: {key}")
+                    self.discard_raw(key)
+
+            if self.rate_limiter is not None:
+                self.rate_limiter.acquire()
+            client = connect()
+
+            transport = client.get_transport()
+            if transport is not None and self.keepalive_interval:
+                transport.set_keepalive(self.keepalive_interval)
+
+            with self.lock:
+                self.clients[key] = client
+        return client
+
+    def get_sftp_client(self, key, client, open_sftp):
+        """
+        Connection's shared SFTP client.
+
+        :param key:
+        :param client: Pooled SSH client.
+        :param open_sftp: Callable(client) opening new SFTP session.
+        :return:
+        """
+
+        with self.lock:
+            sftp_client = self.sftp_clients.get(key)
+            if sftp_client is not None and self.check_session_alive(sftp_client):
+                return sftp_client
+
+        sftp_client = open_sftp(client)
+        with self.lock:
+            self.sftp_clients[key] = sftp_client
+        return sftp_client
+
+    @contextmanager
+    def sftp_session(self, key, client, open_sftp):
+        """
+        Borrow SFTP session for concurrent transfers - up to max_sftp_sessions sessions per connection.
+
+        :param key:
+        :param client: Pooled SSH client.
+        :param open_sftp: Callable(client) opening new SFTP session.
+        :return:
+        """
+
+        with self.sessions_condition:
+            generation = self.generations.get(key, 0)
+            while True:
+                free_sessions = self.free_sftp_sessions.setdefault(key, [])
+                while free_sessions and not self.check_session_alive(free_sessions[-1]):
+                    free_sessions.pop()
+                    self.sftp_sessions_count[key] -= 1
+                if free_sessions:
+                    session = free_sessions.pop()
+                    break
+                if self.sftp_sessions_count.get(key, 0) < self.max_sftp_sessions:
+                    self.sftp_sessions_count[key] = self.sftp_sessions_count.get(key, 0) + 1
+                    session = None
+                    break
+                self.sessions_condition.wait()
+
+        if session is None:
+            try:
+                session = open_sftp(client)
+            except Exception:
+                self.release_sftp_session(key, generation, None)
+                raise
+
+        try:
+            yield session
+        finally:
+            self.release_sftp_session(key, generation, session)
+
+    def release_sftp_session(self, key, generation, session):
+        """
+        Return borrowed session to the pool.
+
+        :param key:
+        :param generation: Connection generation the session was borrowed from.
+        :param session: None - the session failed to open.
+        :return:
+        """
+
+        with self.sessions_condition:
+            if self.generations.get(key, 0) == generation:
+                if session is not None and self.check_session_alive(session):
+                    self.free_sftp_sessions[key].append(session)
+                else:
+                    self.sftp_sessions_count[key] -= 1
+            self.sessions_condition.notify()
+
+    def discard_raw(self, key):
+        """
+        Drop connection and its SFTP sessions. Must be called with the lock held.
+
+        :param key:
+        :return:
+        """
+
+        self.generations[key] = self.generations.get(key, 0) + 1
+        client = self.clients.pop(key, None)
+        sessions = self.free_sftp_sessions.pop(key, [])
+        self.sftp_sessions_count.pop(key, None)
+        sftp_client = self.sftp_clients.pop(key, None)
+        if sftp_client is not None:
+            sessions.append(sftp_client)
+
+        for closable in sessions + ([client] if client is not None else []):
+            try:
+                closable.close()
+            except Exception as inst_error:
+                logger.warning(f"Failed closing SSH connection {key}: {repr(inst_error)}")
+
+        self.sessions_condition.notify_all()
+
+    def close(self):
+        """
+        Close all connections.
+
+        :return:
+        """
+
+        with self.lock:
+            for key in list(self.clients):
+                self.discard_raw(key)
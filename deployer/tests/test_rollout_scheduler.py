@@ -0,0 +1,127 @@
+"""
+Test fleet rollout scheduling.
+
+"""
+
+import json
+import threading
+import time
+
+import pytest
+
+from horey.deployer.deployment_target import DeploymentTarget
+from horey.deployer.rollout_scheduler import RolloutScheduler, RateLimiter
+
+# pylint: disable = missing-function-docstring
+
+
+def generate_targets(count):
+    ret = []
+    for index in range(count):
+        target = DeploymentTarget()
+        target.deployment_target_address = f"10.0.0.{index}"
+        ret.append(target)
+    return ret
+
+
+def get_deploy_target(failing_addresses=(), sleep_time=0.05):
+    lock = threading.Lock()
+    state = {"running": 0, "max_running": 0, "deployed": []}
+
+    def deploy_target(target):
+        with lock:
+            state["running"] += 1
+            state["max_running"] = max(state["max_running"], state["running"])
+        time.sleep(sleep_time)
+        with lock:
+            state["running"] -= 1
+            state["deployed"].append(target.deployment_target_address)
+        if target.deployment_target_address in failing_addresses:
+            target.status_code = target.StatusCode.FAILURE
+            target.status = "Failed step: 'test'"
+            return
+        target.status_code = target.StatusCode.SUCCESS
+
+    return deploy_target, state
+
+
+@pytest.mark.done
+def test_run_parallel():
+    targets = generate_targets(20)
+    deploy_target, state = get_deploy_target()
+    start = time.monotonic()
+    assert RolloutScheduler(max_parallel=5).run(targets, deploy_target, 10)
+    assert time.monotonic() - start < 1
+    assert state["max_running"] == 5
+    assert len(state["deployed"]) == 20
+
+
+@pytest.mark.done
+def test_generate_waves():
+    targets = generate_targets(10)
+    waves = RolloutScheduler(canary_count=1, batch_size=4).generate_waves(targets)
+    assert [len(wave) for wave in waves] == [1, 4, 4, 1]
+
+
+@pytest.mark.done
+def test_run_canary_failure_stops_rollout():
+    targets = generate_targets(10)
+    deploy_target, state = get_deploy_target(failing_addresses=["10.0.0.0"])
+    with pytest.raises(RuntimeError, match="rollout stopped"):
+        RolloutScheduler(canary_count=1, max_failures=5).run(targets, deploy_target, 10)
+    assert state["deployed"] == ["10.0.0.0"]
+    assert all(target.status_code == target.StatusCode.ERROR for target in targets[1:])
+
+
+@pytest.mark.done
+def test_run_failures_threshold():
+    targets = generate_targets(10)
+    deploy_target, state = get_deploy_target(failing_addresses=["10.0.0.0", "10.0.0.1"])
+    with pytest.raises(RuntimeError):
+        RolloutScheduler(max_parallel=1, max_failures=1).run(targets, deploy_target, 10)
+    assert state["deployed"] == ["10.0.0.0", "10.0.0.1"]
+
+
+@pytest.mark.done
+def test_run_timeout():
+    targets = generate_targets(2)
+    deploy_target, _ = get_deploy_target(sleep_time=2)
+    start = time.monotonic()
+    with pytest.raises(TimeoutError):
+        RolloutScheduler().run(targets, deploy_target, 0.2)
+    assert time.monotonic() - start < 1
+
+
+@pytest.mark.done
+def test_rate_limiter():
+    rate_limiter = RateLimiter(20)
+    start = time.monotonic()
+    for _ in range(5):
+        rate_limiter.acquire()
+    assert 0.19 < time.monotonic() - start < 0.5
+
+
+@pytest.mark.done
+def test_timeline_write(tmp_path):
+    targets = generate_targets(3)
+    deploy_target, _ = get_deploy_target()
+    scheduler = RolloutScheduler()
+    scheduler.run(targets, deploy_target, 10)
+    file_path = tmp_path / "timeline.json"
+    scheduler.timeline.write(str(file_path))
+    with open(file_path, encoding="utf-8") as file_handler:
+        timeline = json.load(file_handler)
+    assert sorted(timeline) == ["10.0.0.0", "10.0.0.1", "10.0.0.2"]
+    assert timeline["10.0.0.0"][0]["name"] == "deploy"
+    assert timeline["10.0.0.0"][0]["duration"] >= 0.05
+
+
+@pytest.mark.done
+def test_run_deploys_all_targets_by_default():
+    targets = generate_targets(10)
+    deploy_target, state = get_deploy_target(failing_addresses=["10.0.0.0", "10.0.0.1"])
+    with pytest.raises(RuntimeError) as error_info:
+        RolloutScheduler(max_parallel=1).run(targets, deploy_target, 10)
+    assert len(state["deployed"]) == 10
+    assert "rollout stopped" not in str(error_info.value)
+    assert [target.status_code == target.StatusCode.SUCCESS for target in targets] == [False, False] + [True] * 8
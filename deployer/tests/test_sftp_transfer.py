@@ -0,0 +1,175 @@
+"""
+Test parallel, delta aware directory transfer.
+
+"""
+
+import os
+import shutil
+import subprocess
+import threading
+from contextlib import contextmanager
+from pathlib import Path
+
+import pytest
+
+from horey.deployer.sftp_transfer import SFTPDirectoryTransfer, SFTPSessions
+
+# pylint: disable = missing-function-docstring
+
+
+class LocalSFTPSession:
+    """
+    SFTP session over the local filesystem.
+
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.put_paths = []
+
+    @staticmethod
+    def mkdir(path):
+        os.mkdir(path)
+
+    @staticmethod
+    def open(path, mode):
+        return open(path, mode, encoding="utf-8")
+
+    def put(self, local_path, remote_path, confirm=True):
+        assert not confirm
+        with self.lock:
+            self.put_paths.append(remote_path)
+        shutil.copyfile(local_path, remote_path)
+
+    @staticmethod
+    def get(remote_path, local_path):
+        shutil.copyfile(remote_path, local_path)
+
+    @staticmethod
+    def listdir_attr(path):
+        ret = []
+        for file_name in os.listdir(path):
+            attribute = os.stat(os.path.join(path, file_name))
+            attribute_dict = {"filename": file_name, "st_mode": attribute.st_mode, "st_size": attribute.st_size,
+                              "st_mtime": int(attribute.st_mtime), "st_atime": int(attribute.st_atime)}
+            ret.append(type("SFTPAttributes", (), attribute_dict))
+        return ret
+
+
+def get_sftp_session(session):
+    @contextmanager
+    def sftp_session():
+        yield session
+    return sftp_session
+
+
+def execute(command):
+    return subprocess.run(command, shell=True, check=False).returncode
+
+
+@pytest.fixture(name="source")
+def source_fixture(tmp_path):
+    source = tmp_path / "source"
+    (source / "sub" / "empty").mkdir(parents=True)
+    for index in range(20):
+        (source / f"small_{index}.txt").write_text(f"small {index}")
+    (source / "sub" / "large.bin").write_bytes(os.urandom(200 * 1024))
+    return source
+
+
+@pytest.mark.done
+def test_put_dir_skips_unchanged(source, tmp_path):
+    target = tmp_path / "target"
+    session = LocalSFTPSession()
+    transfer = SFTPDirectoryTransfer(get_sftp_session(session), max_workers=4)
+
+    statistics = transfer.put_dir(source, target)
+    assert statistics.files == 21
+    assert (target / "sub" / "empty").is_dir()
+    assert (target / "sub" / "large.bin").read_bytes() == (source / "sub" / "large.bin").read_bytes()
+
+    (source / "small_3.txt").write_text("changed")
+    session.put_paths = []
+    statistics = transfer.put_dir(source, target)
+    assert session.put_paths == [str(target / "small_3.txt")]
+    assert statistics.skipped == 22
+    assert (target / "small_3.txt").read_text() == "changed"
+
+
+@pytest.mark.done
+def test_put_dir_packs_small_files(source, tmp_path):
+    target = tmp_path / "target dir; echo"
+    session = LocalSFTPSession()
+    statistics = SFTPDirectoryTransfer(get_sftp_session(session), execute=execute).put_dir(source, target)
+
+    assert statistics.files == 21
+    assert sorted(Path(path).name for path in session.put_paths) == [SFTPDirectoryTransfer.PACK_FILE_NAME,
+                                                                     "large.bin"]
+    assert (target / "small_7.txt").read_text() == "small 7"
+    assert not (target / SFTPDirectoryTransfer.PACK_FILE_NAME).exists()
+
+
+@pytest.mark.done
+def test_get_dir_skips_unchanged(source, tmp_path):
+    local_path = tmp_path / "local"
+    transfer = SFTPDirectoryTransfer(get_sftp_session(LocalSFTPSession()))
+
+    statistics = transfer.get_dir(source, local_path)
+    assert statistics.files == 21
+    assert (local_path / "sub" / "empty").is_dir()
+    assert (local_path / "sub" / "large.bin").read_bytes() == (source / "sub" / "large.bin").read_bytes()
+
+    statistics = transfer.get_dir(source, local_path)
+    assert statistics.files == 0
+    assert statistics.skipped == 21
+
+
+@pytest.mark.done
+def test_generate_manifest_hash(source):
+    manifest_hash = SFTPDirectoryTransfer.generate_manifest_hash(SFTPDirectoryTransfer.generate_manifest(source))
+    (source / "small_0.txt").write_text("changed")
+    assert SFTPDirectoryTransfer.generate_manifest_hash(SFTPDirectoryTransfer.generate_manifest(source)) != \
+           manifest_hash
+
+
+@pytest.mark.done
+def test_sftp_sessions_limit(source, tmp_path):
+    opened = []
+
+    def open_session():
+        opened.append(LocalSFTPSession())
+        return opened[-1]
+
+    sessions = SFTPSessions(LocalSFTPSession(), open_session, max_sessions=2)
+    with sessions() as main_session, sessions() as extra_session:
+        assert opened == [extra_session]
+        borrowed = []
+        thread = threading.Thread(target=lambda: borrowed.append(sessions.get_session()))
+        thread.start()
+        thread.join(0.2)
+        assert thread.is_alive()
+    thread.join(1)
+    assert borrowed[0] in [main_session, extra_session]
+    sessions.free.put(borrowed[0])
+
+    statistics = SFTPDirectoryTransfer(sessions, max_workers=8).put_dir(source, tmp_path / "target")
+    assert statistics.files == 21
+    assert len(opened) == 1
+
+
+@pytest.mark.done
+def test_sftp_sessions_open_failure_waits():
+    def open_session():
+        raise OSError("ChannelException(1, 'Administratively prohibited')")
+
+    main_session = LocalSFTPSession()
+    sessions = SFTPSessions(main_session, open_session, max_sessions=4)
+    borrowed = []
+    with sessions():
+        thread = threading.Thread(target=lambda: borrowed.append(sessions.get_session()))
+        thread.start()
+        thread.join(0.2)
+        assert thread.is_alive()
+        assert sessions.max_sessions == 1
+    thread.join(1)
+    assert borrowed == [main_session]
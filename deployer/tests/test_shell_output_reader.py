@@ -0,0 +1,96 @@
+"""
+Test remote shell output reader.
+
+"""
+
+import datetime
+import socket
+import threading
+import time
+
+import pytest
+
+from horey.deployer.shell_output_reader import ShellOutputReader
+
+# pylint: disable = missing-function-docstring
+
+
+@pytest.fixture(name="channels")
+def channels_fixture():
+    local, remote = socket.socketpair()
+    yield local, remote
+    local.close()
+    remote.close()
+
+
+def get_end_time(seconds=5):
+    return datetime.datetime.now() + datetime.timedelta(seconds=seconds)
+
+
+def read_all_lines(reader, count):
+    ret = []
+    while len(ret) < count:
+        ret += reader.read_lines(get_end_time())
+    return ret
+
+
+@pytest.mark.done
+def test_read_lines_split_utf8_and_lines(channels):
+    local, remote = channels
+    data = "שלום עולם\r\nsecond line\nthird\r\n".encode("utf-8")
+    with ShellOutputReader(local) as reader:
+        lines = []
+        for byte_index in range(len(data)):
+            remote.sendall(data[byte_index: byte_index + 1])
+            lines += reader.read_lines(get_end_time())
+    assert lines == ["שלום עולם", "second line", "third"]
+
+
+@pytest.mark.done
+def test_read_lines_timeout(channels):
+    local, remote = channels
+    remote.sendall(b"partial line")
+    with ShellOutputReader(local) as reader:
+        assert not reader.read_lines(get_end_time())
+        with pytest.raises(TimeoutError):
+            reader.read_lines(get_end_time(0.1))
+
+
+@pytest.mark.done
+def test_read_lines_closed(channels):
+    local, remote = channels
+    remote.close()
+    with ShellOutputReader(local) as reader:
+        with pytest.raises(ConnectionError):
+            reader.read_lines(get_end_time())
+
+
+@pytest.mark.done
+def test_read_lines_benchmark(channels):
+    local, remote = channels
+    line = ("x" * 99 + "\n").encode("utf-8")
+    lines_count = 1024 * 1024
+    block = line * 1024
+
+    def send():
+        for _ in range(lines_count // 1024):
+            remote.sendall(block)
+
+    thread = threading.Thread(target=send)
+    start = time.perf_counter()
+    thread.start()
+    with ShellOutputReader(local) as reader:
+        assert len(read_all_lines(reader, lines_count)) == lines_count
+    took = time.perf_counter() - start
+    thread.join()
+    print(f"Read {len(line) * lines_count / 1024 / 1024:.0f} MB in {took:.2f} seconds")
+    assert took < 30
+
+
+@pytest.mark.done
+def test_close_restores_channel_timeout(channels):
+    local, _ = channels
+    local.settimeout(120)
+    with ShellOutputReader(local):
+        assert local.gettimeout() == 0.0
+    assert local.gettimeout() == 120
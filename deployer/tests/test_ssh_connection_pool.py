@@ -0,0 +1,141 @@
+"""
+Test SSH connections and SFTP sessions pooling.
+
+"""
+
+import threading
+import time
+
+import pytest
+
+from horey.deployer.ssh_connection_pool import SSHConnectionPool
+
+# pylint: disable = missing-function-docstring, too-few-public-methods
+
+
+class FakeTransport:
+    """
+    paramiko Transport stand-in: alive until closed.
+
+    """
+
+    def __init__(self):
+        self.active = True
+        self.keepalive = None
+
+    def is_active(self):
+        return self.active
+
+    def set_keepalive(self, interval):
+        self.keepalive = interval
+
+
+class FakeChannel:
+    """
+    paramiko Channel stand-in.
+
+    """
+
+    def __init__(self):
+        self.closed = False
+
+
+class FakeClient:
+    """
+    paramiko SSHClient stand-in: closing kills its transport.
+
+    """
+
+    def __init__(self):
+        self.transport = FakeTransport()
+
+    def get_transport(self):
+        return self.transport
+
+    def close(self):
+        self.transport.active = False
+
+
+class FakeSFTPClient:
+    """
+    paramiko SFTPClient stand-in: closing closes its channel.
+
+    """
+
+    def __init__(self, client):
+        self.client = client
+        self.channel = FakeChannel()
+
+    def get_channel(self):
+        return self.channel
+
+    def close(self):
+        self.channel.closed = True
+
+
+def get_connect(counter):
+    def connect():
+        counter.append(1)
+        time.sleep(0.05)
+        return FakeClient()
+    return connect
+
+
+@pytest.mark.done
+def test_get_client_reused():
+    pool = SSHConnectionPool(keepalive_interval=15)
+    connections = []
+    key = pool.generate_key("10.0.0.1", "ubuntu", "/tmp/key")
+    threads = [threading.Thread(target=pool.get_client, args=(key, get_connect(connections))) for _ in range(10)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    client = pool.get_client(key, get_connect(connections))
+    assert len(connections) == 1
+    assert client.get_transport().keepalive == 15
+
+
+@pytest.mark.done
+def test_get_client_reconnects_dead():
+    pool = SSHConnectionPool()
+    connections = []
+    key = pool.generate_key("10.0.0.1", "ubuntu", "/tmp/key", proxy_jump_key="10.0.0.2")
+    client = pool.get_client(key, get_connect(connections))
+    sftp_client = pool.get_sftp_client(key, client, FakeSFTPClient)
+    client.get_transport().active = False
+
+    client_new = pool.get_client(key, get_connect(connections))
+    assert client_new is not client
+    assert len(connections) == 2
+    assert sftp_client.channel.closed
+    assert pool.get_sftp_client(key, client_new, FakeSFTPClient).client is client_new
+
+
+@pytest.mark.done
+def test_sftp_session_bounded():
+    pool = SSHConnectionPool(max_sftp_sessions=2)
+    key = pool.generate_key("10.0.0.1", "ubuntu", "/tmp/key")
+    client = pool.get_client(key, get_connect([]))
+    lock = threading.Lock()
+    state = {"running": 0, "max_running": 0, "sessions": set()}
+
+    def transfer():
+        with pool.sftp_session(key, client, FakeSFTPClient) as session:
+            with lock:
+                state["running"] += 1
+                state["max_running"] = max(state["max_running"], state["running"])
+                state["sessions"].add(id(session))
+            time.sleep(0.02)
+            with lock:
+                state["running"] -= 1
+
+    threads = [threading.Thread(target=transfer) for _ in range(10)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert state["max_running"] == 2
+    assert len(state["sessions"]) == 2
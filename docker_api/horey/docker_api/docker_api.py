@@ -12,6 +12,7 @@ import platform
 import re
 import threading
 import time
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 from random import random
 from time import perf_counter
@@ -21,6 +22,7 @@ from docker.errors import BuildError
 from docker.utils.json_stream import json_stream
 from horey.h_logger import get_logger, get_raw_logger
 from horey.common_utils.bash_executor import BashExecutor
+from horey.docker_api.image_transfer import ImageFile, PushProgress
 
 logger = get_logger()
 BashExecutor.set_logger(logger, override=False)
@@ -32,6 +34,11 @@ class DockerAPI:
 
     """
 
+    PUSH_MAX_WORKERS = 4
+    PUSH_RETRIES = 10
+    PUSH_BACKOFF_BASE_SECONDS = 5
+    PUSH_BACKOFF_MAX_SECONDS = 120
+
     def __init__(self):
         if "macos" in platform.platform().lower():
             self.client = docker.DockerClient(base_url=f'unix:///Users/{getpass.getuser()}/.docker/run/docker.sock')
@@ -330,61 +337,96 @@ class DockerAPI:
         image.tag(tags[0])
         return self.tag_image(image, tags[1:])
 
-    def upload_images(self, repo_tags, retry=True):
+    def upload_images(self, repo_tags, retry=True, max_workers=None):
         """
-        Upload images based on the tags. Retry if concurrent uploads failed by server
+        Upload images based on the tags. Retry each tag if its upload failed by server.
 
         :param repo_tags:
         :param retry:
+        :param max_workers: Concurrent tag uploads.
+        :return:
+        """
+
+        return self.raw_upload_images(repo_tags, retries=self.PUSH_RETRIES if retry else 1, max_workers=max_workers)
+
+    def raw_upload_images(self, repo_tags, retries=1, max_workers=None):
+        """
+        Upload the tags concurrently.
+
+        :param repo_tags:
+        :param retries: Per tag attempts on IncompleteRead.
+        :param max_workers:
         :return:
         """
 
-        retries_limit = 60
-        for retry_counter in range(retries_limit):
+        logger.info(f"Uploading image to repository {repo_tags}")
+        if not repo_tags:
+            return True
+
+        max_workers = min(max_workers or self.PUSH_MAX_WORKERS, len(repo_tags))
+        with ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="docker_push") as executor:
+            futures = [executor.submit(self.upload_image_tag, repository, retries=retries) for repository in repo_tags]
+
+        for future in futures:
+            future.result()
+        return True
+
+    def upload_image_tag(self, repository, retries=1):
+        """
+        Upload single tag, retry with exponential backoff if server closed the connection.
+
+        :param repository:
+        :param retries:
+        :return: PushProgress
+        """
+
+        for retry_counter in range(retries):
             try:
-                return self.raw_upload_images(repo_tags)
+                return self.push_image_tag(repository)
             except Exception as error_inst:
                 if "IncompleteRead" not in repr(error_inst):
                     raise
-                if not retry:
-                    raise
-                time_to_sleep = random() * 20 + 10
+                if retry_counter == retries - 1:
+                    if retries == 1:
+                        raise
+                    raise TimeoutError(f"Image tag {repository} uploading failed for {retries} times") from error_inst
+                time_to_sleep = min(self.PUSH_BACKOFF_MAX_SECONDS,
+                                    self.PUSH_BACKOFF_BASE_SECONDS * 2 ** retry_counter) * (0.5 + random())
                 logger.info(
-                    f"Received IncompleteRead, it means server closed connection. Going to sleep ({retry_counter}/{retries_limit}) for {time_to_sleep}")
+                    f"Received IncompleteRead uploading {repository}, it means server closed connection. "
+                    f"Going to sleep ({retry_counter}/{retries}) for {time_to_sleep}")
                 time.sleep(time_to_sleep)
 
-        raise TimeoutError(f"Image tags {repo_tags} uploading failed for {retries_limit} times")
+        raise ValueError(f"Retries must be positive: {retries}")
 
-    def raw_upload_images(self, repo_tags):
+    def push_image_tag(self, repository):
         """
-        Try uploading
+        Push single tag, collect layers progress.
 
-        :param repo_tags:
-        :return:
+        :param repository:
+        :return: PushProgress
         """
 
         errors_detected = []
-        logger.info(f"Uploading image to repository {repo_tags}")
-        for repository in repo_tags:
-            logger.info(f"Uploading {repository} to repository")
-            time_start = datetime.datetime.now()
-            for log_line in self.client.images.push(
-                    repository=repository, stream=True, decode=True
-            ):
-                try:
-                    self.print_log_line(log_line)
-                except DockerAPI.OutputError:
-                    errors_detected.append(log_line)
-
-            time_end = datetime.datetime.now()
-            if errors_detected:
-                raise RuntimeError(
-                    f"Failed to upload {repository} took {time_end - time_start} time. {errors_detected}")
-
-            logger.info(
-                f"Uploading repository {repository} took {time_end - time_start} time."
-            )
-        return True
+        push_progress = PushProgress(repository)
+        logger.info(f"Uploading {repository} to repository")
+        for log_line in self.client.images.push(
+                repository=repository, stream=True, decode=True
+        ):
+            if push_progress.update(log_line):
+                continue
+            try:
+                self.print_log_line(log_line)
+            except DockerAPI.OutputError:
+                errors_detected.append(log_line)
+
+        push_progress.finish()
+        if errors_detected:
+            raise RuntimeError(
+                f"Failed to upload {repository} took {push_progress.seconds:.2f} seconds. {errors_detected}")
+
+        logger.info(push_progress.generate_report())
+        return push_progress
 
     def pull_images(self, repo, tag=None, all_tags=False):
         """
@@ -602,9 +644,9 @@ class DockerAPI:
         logger.info(f"{image_id=} {child_ids=}")
         return child_ids
 
-    def save(self, image, file_path):
+    def save(self, image, file_path, compression=None):
         """
-        Save image to file.
+        Save image to file. Streamed in chunks.
 
         Example:
 
@@ -615,30 +657,23 @@ class DockerAPI:
             >>> f.close()
         :param file_path:
         :param image:
+        :param compression: None or "zstd", zstd by default for .zst file suffix. Requires zstandard package.
         :return:
         """
 
-        if os.path.exists(file_path):
-            os.remove(file_path)
-
-        with open(file_path, "wb") as file_handler:
-            for chunk in image.save():
-                file_handler.write(chunk)
+        ImageFile(file_path, compression=compression).write(image.save(chunk_size=ImageFile.CHUNK_SIZE))
 
         return os.path.exists(file_path)
 
     def load(self, file_path):
         """
-        Load from file.
+        Load from file. Streamed in chunks, zstd compressed files are decompressed on the fly.
 
         :param file_path:
         :return:
         """
 
-        with open(file_path, "rb") as file_handler:
-            data = file_handler.read()
-
-        images = self.client.images.load(data)
+        images = self.client.images.load(ImageFile(file_path).iter_chunks())
 
         if not isinstance(images, list):
             raise ValueError(f"Expected list: {images=}")
@@ -0,0 +1,290 @@
+"""
+Streamed image files and push progress.
+
+"""
+
+import os
+import time
+import uuid
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+from horey.h_logger import get_logger
+
+logger = get_logger()
+
+
+class ImageFile:
+    """
+    Image tarball on disk, optionally zstd compressed.
+    Written and read in chunks - the image is never held in memory.
+
+    """
+
+    CHUNK_SIZE = 1024 * 1024
+    ZSTD_MAGIC = b"\x28\xb5\x2f\xfd"
+    ZSTD_LEVEL = 3
+    ZSTD_SUFFIXES = (".zst", ".zstd")
+
+    def __init__(self, file_path, compression=None):
+        """
+
+        :param file_path:
+        :param compression: None or "zstd". Write: by default zstd for .zst/.zstd suffix. Read: detected from the file.
+        """
+
+        if compression not in (None, "zstd"):
+            raise ValueError(f"Unsupported compression: {compression}")
+
+        self.file_path = str(file_path)
+        self.compression = compression
+        self.bytes = 0
+        self.seconds = None
+
+    @staticmethod
+    def check_zstandard():
+        """
+        zstd compression is optional.
+
+        :return:
+        """
+
+        if zstandard is None:
+            raise RuntimeError("zstd compression requires 'zstandard' package: pip install zstandard")
+
+    def detect_compression(self):
+        """
+        Compression by the file magic bytes.
+
+        :return:
+        """
+
+        with open(self.file_path, "rb") as file_handler:
+            magic = file_handler.read(len(self.ZSTD_MAGIC))
+        return "zstd" if magic == self.ZSTD_MAGIC else None
+
+    def write(self, chunks):
+        """
+        Write chunks to a tmp file, then rename - a failed save does not leave a partial image.
+
+        :param chunks: Iterable of bytes, e.g. image.save()
+        :return: Uncompressed bytes written.
+        """
+
+        compression = self.compression
+        if compression is None and self.file_path.endswith(self.ZSTD_SUFFIXES):
+            compression = "zstd"
+        if compression == "zstd":
+            self.check_zstandard()
+
+        start_time = time.perf_counter()
+        tmp_file_path = f"{self.file_path}.{uuid.uuid4()}.tmp"
+        try:
+            with open(tmp_file_path, "wb") as file_handler:
+                if compression == "zstd":
+                    compressor = zstandard.ZstdCompressor(level=self.ZSTD_LEVEL, threads=-1)
+                    with compressor.stream_writer(file_handler, closefd=False) as writer:
+                        for chunk in chunks:
+                            writer.write(chunk)
+                            self.bytes += len(chunk)
+                else:
+                    for chunk in chunks:
+                        file_handler.write(chunk)
+                        self.bytes += len(chunk)
+            os.replace(tmp_file_path, self.file_path)
+        except BaseException:
+            if os.path.exists(tmp_file_path):
+                os.remove(tmp_file_path)
+            raise
+
+        self.seconds = time.perf_counter() - start_time
+        logger.info(self.generate_report("Saved"))
+        return self.bytes
+
+    def iter_chunks(self):
+        """
+        Uncompressed image chunks - passed as a streamed request body to images.load.
+
+        :return:
+        """
+
+        compression = self.compression or self.detect_compression()
+        if compression == "zstd":
+            self.check_zstandard()
+
+        start_time = time.perf_counter()
+        with open(self.file_path, "rb") as file_handler:
+            if compression == "zstd":
+                reader = zstandard.ZstdDecompressor().stream_reader(file_handler)
+            else:
+                reader = file_handler
+            for chunk in iter(lambda: reader.read(self.CHUNK_SIZE), b""):
+                self.bytes += len(chunk)
+                yield chunk
+
+        self.seconds = time.perf_counter() - start_time
+        logger.info(self.generate_report("Read"))
+
+    def generate_report(self, action):
+        """
+        Size and throughput line.
+
+        :param action:
+        :return:
+        """
+
+        file_size = os.path.getsize(self.file_path) if os.path.exists(self.file_path) else 0
+        bytes_per_second = self.bytes / self.seconds if self.seconds else 0.0
+        return (f"{action} image '{self.file_path}': {self.bytes} bytes ({file_size} on disk) "
+                f"in {self.seconds or 0:.2f} seconds: {bytes_per_second / 1024 / 1024:.2f} MB/s")
+
+
+class LayerProgress:
+    """
+    Single layer push progress.
+
+    """
+
+    def __init__(self, layer_id):
+        self.layer_id = layer_id
+        self.status = None
+        self.current = 0
+        self.total = None
+        self.start_time = None
+        self.end_time = None
+
+    @property
+    def pushed(self):
+        """
+        Uploaded by this push.
+
+        :return:
+        """
+
+        return self.status == "Pushed"
+
+    @property
+    def bytes(self):
+        """
+        Uploaded bytes.
+
+        :return:
+        """
+
+        if self.pushed and self.total:
+            return self.total
+        return self.current
+
+    @property
+    def seconds(self):
+        """
+        Upload time.
+
+        :return:
+        """
+
+        if self.start_time is None:
+            return None
+        return (self.end_time or time.perf_counter()) - self.start_time
+
+    @property
+    def bytes_per_second(self):
+        """
+        Upload throughput.
+
+        :return:
+        """
+
+        return self.bytes / self.seconds if self.seconds else 0.0
+
+
+class PushProgress:
+    """
+    Per layer progress and throughput extracted from the docker push stream.
+
+    """
+
+    FINAL_STATUSES = ("Pushed", "Layer already exists", "Mounted from")
+
+    def __init__(self, repository):
+        self.repository = repository
+        self.layers = {}
+        self.digest = None
+        self.start_time = time.perf_counter()
+        self.seconds = None
+
+    def update(self, log_line):
+        """
+        Update from push stream line.
+
+        :param log_line: Decoded push stream line.
+        :return: True for the progress lines - too frequent to be logged.
+        """
+
+        if "aux" in log_line:
+            self.digest = log_line["aux"].get("Digest", self.digest)
+            return False
+
+        layer_id = log_line.get("id")
+        status = log_line.get("status")
+        if layer_id is None or status is None:
+            return False
+
+        now = time.perf_counter()
+        layer = self.layers.get(layer_id)
+        if layer is None:
+            layer = self.layers[layer_id] = LayerProgress(layer_id)
+        layer.status = status
+
+        if status == "Pushing":
+            if layer.start_time is None:
+                layer.start_time = now
+            progress_detail = log_line.get("progressDetail") or {}
+            layer.current = progress_detail.get("current", layer.current)
+            layer.total = progress_detail.get("total", layer.total)
+            return True
+
+        if status.startswith(self.FINAL_STATUSES):
+            layer.end_time = now
+        return False
+
+    def finish(self):
+        """
+        Stop the clock.
+
+        :return:
+        """
+
+        self.seconds = time.perf_counter() - self.start_time
+        return self
+
+    @property
+    def bytes(self):
+        """
+        Uploaded bytes - all layers.
+
+        :return:
+        """
+
+        return sum(layer.bytes for layer in self.layers.values() if layer.start_time is not None)
+
+    def generate_report(self):
+        """
+        Summary and per layer throughput lines.
+
+        :return:
+        """
+
+        seconds = self.seconds if self.seconds is not None else time.perf_counter() - self.start_time
+        pushed = [layer for layer in self.layers.values() if layer.pushed]
+        bytes_per_second = self.bytes / seconds if seconds else 0.0
+        lines = [f"Pushed {self.repository} ({self.digest}) in {seconds:.2f} seconds: {len(pushed)} layers pushed, "
+                 f"{len(self.layers) - len(pushed)} existed, {self.bytes} bytes, "
+                 f"{bytes_per_second / 1024 / 1024:.2f} MB/s"]
+        for layer in pushed:
+            lines.append(f"  layer {layer.layer_id}: {layer.bytes} bytes in {layer.seconds or 0:.2f} seconds: "
+                         f"{layer.bytes_per_second / 1024 / 1024:.2f} MB/s")
+        return "\n".join(lines)
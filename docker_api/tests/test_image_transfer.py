@@ -0,0 +1,82 @@
+"""
+Test streamed image files and push progress.
+
+"""
+
+import os
+
+import pytest
+
+from horey.docker_api import image_transfer
+from horey.docker_api.image_transfer import ImageFile, PushProgress
+
+# pylint: disable= missing-function-docstring
+
+
+def generate_chunks(count=5, size=300 * 1024):
+    for index in range(count):
+        yield bytes([index]) * size
+
+
+@pytest.mark.done
+def test_image_file_write_iter_chunks(tmp_path):
+    file_path = tmp_path / "image.tar"
+    image_file = ImageFile(file_path)
+    assert image_file.write(generate_chunks()) == 5 * 300 * 1024
+    assert os.listdir(tmp_path) == ["image.tar"]
+
+    chunks = list(ImageFile(file_path).iter_chunks())
+    assert max(len(chunk) for chunk in chunks) <= ImageFile.CHUNK_SIZE
+    assert b"".join(chunks) == b"".join(generate_chunks())
+
+
+@pytest.mark.done
+def test_image_file_write_failure_keeps_old_file(tmp_path):
+    file_path = tmp_path / "image.tar"
+    file_path.write_bytes(b"old")
+
+    def broken_chunks():
+        yield b"new"
+        raise IOError("Connection lost")
+
+    with pytest.raises(IOError):
+        ImageFile(file_path).write(broken_chunks())
+    assert os.listdir(tmp_path) == ["image.tar"]
+    assert file_path.read_bytes() == b"old"
+
+
+@pytest.mark.done
+@pytest.mark.skipif(image_transfer.zstandard is None, reason="zstandard is not installed")
+def test_image_file_zstd(tmp_path):
+    file_path = tmp_path / "image.tar.zst"
+    ImageFile(file_path).write(generate_chunks())
+    assert ImageFile(file_path).detect_compression() == "zstd"
+    assert os.path.getsize(file_path) < 5 * 300 * 1024
+    assert b"".join(ImageFile(file_path).iter_chunks()) == b"".join(generate_chunks())
+
+
+@pytest.mark.done
+def test_push_progress():
+    push_progress = PushProgress("horey-test:latest")
+    log_lines = [{"status": "The push refers to repository [docker.io/library/horey-test]"},
+                 {"status": "Preparing", "progressDetail": {}, "id": "aaa"},
+                 {"status": "Preparing", "progressDetail": {}, "id": "bbb"},
+                 {"status": "Layer already exists", "progressDetail": {}, "id": "bbb"},
+                 {"status": "Pushing", "progressDetail": {"current": 512, "total": 2048}, "id": "aaa"},
+                 {"status": "Pushing", "progressDetail": {"current": 1536, "total": 2048}, "id": "aaa"},
+                 {"status": "Pushed", "progressDetail": {}, "id": "aaa"},
+                 {"status": "latest: digest: sha256:123 size: 528"},
+                 {"progressDetail": {}, "aux": {"Tag": "latest", "Digest": "sha256:123", "Size": 528}}]
+
+    logged = [log_line for log_line in log_lines if not push_progress.update(log_line)]
+    push_progress.finish()
+
+    assert len(logged) == len(log_lines) - 2
+    assert push_progress.digest == "sha256:123"
+    assert push_progress.layers["aaa"].pushed
+    assert push_progress.layers["aaa"].bytes == 2048
+    assert not push_progress.layers["bbb"].pushed
+    assert push_progress.bytes == 2048
+    report = push_progress.generate_report()
+    assert "1 layers pushed, 1 existed, 2048 bytes" in report
+    assert "layer aaa: 2048 bytes" in report
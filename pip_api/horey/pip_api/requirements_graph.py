@@ -0,0 +1,51 @@
+"""
+Requirements dependency graph.
+Standalone - no horey imports, used by standalone_methods before anything is installed.
+"""
+
+
+class RequirementsGraph:
+    """
+    Requirements by name and dependency edges: name -> names it depends on.
+    """
+
+    def __init__(self):
+        self.requirements = {}
+        self.dependencies = {}
+
+    def add_dependency(self, name, dependency_name):
+        """
+        name depends on dependency_name.
+
+        :param name:
+        :param dependency_name:
+        :return:
+        """
+
+        self.dependencies.setdefault(name, set()).add(dependency_name)
+
+    def generate_levels(self, names=None):
+        """
+        Topological levels: each level depends only on the previous ones,
+        requirements in the same level are independent.
+
+        :param names: Subgraph - dependencies outside of it are ignored. All requirements by default.
+        :return: Lists of names.
+        """
+
+        names = list(self.requirements) if names is None else list(names)
+        names_set = set(names)
+        pending = {name: {dependency for dependency in self.dependencies.get(name, set()) if
+                          dependency in names_set and dependency != name} for name in names}
+
+        levels = []
+        while pending:
+            level = [name for name in names if name in pending and not pending[name]]
+            if not level:
+                raise ValueError(f"Requirements dependency cycle: {sorted(pending)}")
+            for name in level:
+                del pending[name]
+            for dependencies in pending.values():
+                dependencies.difference_update(level)
+            levels.append(level)
+        return levels
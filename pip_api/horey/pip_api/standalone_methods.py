@@ -4,17 +4,21 @@ Methods which can be used without package installation.
 import importlib
 import json
 import os
+import re
 import uuid
 import subprocess
 import sys
 import shutil
 import platform
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 
 this_dir_name = os.path.abspath(os.path.dirname(__file__))
 sys.path.insert(0, this_dir_name)
 from requirement import Requirement
 from package import Package
+from wheel_cache import WheelCache
+from requirements_graph import RequirementsGraph
 pop_value = sys.path.pop(0)
 if pop_value != this_dir_name:
     raise ValueError(f"{pop_value} should be {this_dir_name}")
@@ -26,7 +30,12 @@ class StandaloneMethods:
     """
 
     INSTALLED_PACKAGES = None
+    INSTALLED_PACKAGES_INDEX = None
     SOURCE_CODE_PACKAGE_VERSIONS = {}
+    SOURCE_CODE_BUILD_MAX_WORKERS = 4
+    WHEEL_CACHES = {}
+    WHEEL_CACHE_MAX_SIZE_BYTES = 2 * 1024 ** 3
+    WHEEL_CACHE_MAX_AGE_SECONDS = 30 * 24 * 60 * 60
 
     logger = None
 
@@ -170,6 +179,40 @@ class StandaloneMethods:
             else:
                 requirements_aggregator[requirement.name] = requirement
 
+    def compose_requirements_graph(self, requirements, requirements_graph=None, parent_name=None):
+        """
+        Standard and multi-package source requirements with the dependency edges between them.
+
+        :param requirements:
+        :param requirements_graph:
+        :param parent_name: The requirement these requirements were read from.
+        :return:
+        """
+
+        if requirements_graph is None:
+            requirements_graph = RequirementsGraph()
+
+        for requirement in requirements:
+            if parent_name is not None:
+                requirements_graph.add_dependency(parent_name, requirement.name)
+
+            if requirement.name in requirements_graph.requirements:
+                self.update_existing_requirement(requirement, requirements_graph.requirements)
+                continue
+
+            requirements_graph.requirements[requirement.name] = requirement
+
+            for prefix, repo_path in self.multi_package_repo_to_prefix_map.items():
+                if requirement.name.startswith(prefix):
+                    requirement.multi_package_repo_prefix = prefix
+                    requirement.multi_package_repo_path = repo_path
+                    self.compose_requirements_graph(
+                        self.init_requirements_raw(self.get_requirements_file_path(repo_path, requirement.name.split(".")[-1])),
+                        requirements_graph, parent_name=requirement.name)
+                    break
+
+        return requirements_graph
+
     # pylint: disable= too-many-branches
     def update_existing_requirement(self, requirement: Requirement, requirements_aggregator: dict):
         """
@@ -308,20 +351,39 @@ class StandaloneMethods:
 
         self.logger.info(f"install_source_code_requirement '{requirement.name}'")
 
-        requirements_file_path = os.path.join(requirement.multi_package_repo_path, requirement.name[len(requirement.multi_package_repo_prefix):], "requirements.txt")
-        self.logger.info(f"Installing requirements from file: '{requirements_file_path}'")
-        requirements_aggregator = {requirement.name: requirement}
-        self.compose_requirements_recursive_from_file(requirements_file_path, requirements_aggregator)
-        self.logger.info(f"Aggregated: {requirements_aggregator}")
-        self.init_source_code_metadata(requirements_aggregator)
-        all_reversed = list(reversed(requirements_aggregator.values()))
-        for aggregated_requirement in all_reversed[:-1]:
-            if aggregated_requirement.multi_package_repo_path:
-                self.install_source_code_requirement_raw(aggregated_requirement, break_system_packages=break_system_packages)
-            else:
-                self.install_requirement_standard(aggregated_requirement, break_system_packages=break_system_packages)
+        requirements_graph = self.compose_requirements_graph([requirement])
+        return self.install_requirements_graph(requirements_graph, break_system_packages=break_system_packages)
 
-        self.install_source_code_requirement_raw(requirement, break_system_packages=break_system_packages)
+    def install_requirements_graph(self, requirements_graph: RequirementsGraph, break_system_packages=False):
+        """
+        All the standard requirements in a single pip call, then the source code requirements
+        level by level in the topological order.
+
+        :param requirements_graph:
+        :param break_system_packages:
+        :return:
+        """
+
+        self.logger.info(f"Aggregated: {requirements_graph.requirements}")
+        self.init_source_code_metadata(requirements_graph.requirements)
+
+        standard_requirements = [requirement for requirement in requirements_graph.requirements.values() if
+                                 not requirement.multi_package_repo_path]
+        source_code_names = [name for name, requirement in requirements_graph.requirements.items() if
+                             requirement.multi_package_repo_path]
+        if source_code_names and "setuptools" not in requirements_graph.requirements:
+            requirement_setup_tools = Requirement("horey_auto_generated", "setuptools")
+            requirement_setup_tools.force = False
+            standard_requirements.append(requirement_setup_tools)
+
+        self.install_requirements_standard_batch(standard_requirements, break_system_packages=break_system_packages)
+
+        for level in requirements_graph.generate_levels(source_code_names):
+            self.install_source_code_requirements([requirements_graph.requirements[name] for name in level],
+                                                  break_system_packages=break_system_packages)
+
+        for wheel_cache in self.WHEEL_CACHES.values():
+            self.logger.info(wheel_cache.generate_report())
 
         return True
 
@@ -432,17 +494,92 @@ class StandaloneMethods:
 
         objects = []
         for dict_package in lst_packages:
-            package = Package(dict_package)
+            package = self.init_installed_package(dict_package)
             self.logger.info(f"Existing package '{package.name=}'")
             objects.append(package)
-            for prefix, repo_path in self.multi_package_repo_to_prefix_map.items():
-                if package.name.startswith(prefix):
-                    package.multi_package_repo_prefix = prefix
-                    package.multi_package_repo_path = repo_path
 
         self.INSTALLED_PACKAGES = objects
+        self.INSTALLED_PACKAGES_INDEX = None
         return self.INSTALLED_PACKAGES
 
+    def init_installed_package(self, dict_package):
+        """
+        Init installed package with its multi package repo.
+
+        :param dict_package: {"name": str, "version": str}
+        :return:
+        """
+
+        package = Package(dict_package)
+        for prefix, repo_path in self.multi_package_repo_to_prefix_map.items():
+            if package.name.startswith(prefix):
+                package.multi_package_repo_prefix = prefix
+                package.multi_package_repo_path = repo_path
+        return package
+
+    @staticmethod
+    def normalize_package_name(name):
+        """
+        PEP 503 normalized name: horey.h_logger -> horey-h-logger
+
+        :param name:
+        :return:
+        """
+
+        return re.sub(r"[-_.]+", "-", name).lower()
+
+    def get_installed_packages_index(self):
+        """
+        Installed packages by normalized name.
+        Built from 'pip list' once, then updated from the pip install outputs.
+
+        :return:
+        """
+
+        if self.INSTALLED_PACKAGES_INDEX is None:
+            self.INSTALLED_PACKAGES_INDEX = {self.normalize_package_name(package.name): package for package in
+                                             self.get_installed_packages()}
+        return self.INSTALLED_PACKAGES_INDEX
+
+    def update_installed_packages(self, pip_install_output):
+        """
+        Update the installed packages from the 'Successfully installed name-version ...' line.
+        If there is no such line the installed packages are reloaded on the next use.
+
+        :param pip_install_output:
+        :return: Normalized names of the installed packages.
+        """
+
+        for line in reversed(pip_install_output.split("\n")):
+            line = line.strip("\r ")
+            if line.startswith("Successfully installed "):
+                break
+        else:
+            self.INSTALLED_PACKAGES = None
+            self.INSTALLED_PACKAGES_INDEX = None
+            return []
+
+        installed_names = []
+        for name_version in line[len("Successfully installed "):].split(" "):
+            if "-" not in name_version:
+                continue
+            name, version = name_version.rsplit("-", 1)
+            normalized_name = self.normalize_package_name(name)
+            installed_names.append(normalized_name)
+
+            if self.INSTALLED_PACKAGES is None:
+                continue
+
+            package = self.get_installed_packages_index().get(normalized_name)
+            if package is None:
+                package = self.init_installed_package({"name": name, "version": version})
+                self.INSTALLED_PACKAGES.append(package)
+                self.INSTALLED_PACKAGES_INDEX[normalized_name] = package
+            else:
+                package.version = version
+
+        return installed_names
+
     def install_requirements_from_file(self, src_file_path, force_reinstall=False):
         """
         For example requirements.txt
@@ -452,11 +589,12 @@ class StandaloneMethods:
         :return:
         """
 
-        with open(src_file_path, encoding="utf-8") as file_handler:
-            lines = file_handler.readlines()
+        requirements = self.init_requirements_raw(src_file_path)
+        for requirement in requirements:
+            requirement.force = force_reinstall
 
-        for line in lines:
-            self.install_requirement_from_string(src_file_path, line.strip("\n"), force_reinstall=force_reinstall)
+        requirements_graph = self.compose_requirements_graph(requirements)
+        return self.install_requirements_graph(requirements_graph)
 
     def install_requirement_from_string(self, src_file_path, str_src, force_reinstall=False, break_system_packages=False):
         """
@@ -495,23 +633,42 @@ class StandaloneMethods:
         :return:
         """
 
-        break_system_packages_command = "--break-system-packages " if break_system_packages else ""
-        if self.requirement_satisfied(requirement) and not requirement.force:
+        return self.install_requirements_standard_batch([requirement], break_system_packages=break_system_packages)
+
+    def install_requirements_standard_batch(self, requirements, break_system_packages=False):
+        """
+        Install all the missing requirements in a single pip call - pip resolves them together.
+
+        :param requirements:
+        :param break_system_packages:
+        :return:
+        """
+
+        requirements = [requirement for requirement in requirements if
+                        requirement.force or not self.requirement_satisfied(requirement)]
+        if not requirements:
             return True
-        self.INSTALLED_PACKAGES = None
-        requirement_string = requirement.generate_install_string()
-        if ">" in requirement_string:
-            requirement_string = requirement_string.replace(">", r"\>")
-        if "<" in requirement_string:
-            requirement_string = requirement_string.replace("<", r"\<")
 
+        requirement_strings = []
+        for requirement in requirements:
+            requirement_string = requirement.generate_install_string()
+            if ">" in requirement_string:
+                requirement_string = requirement_string.replace(">", r"\>")
+            if "<" in requirement_string:
+                requirement_string = requirement_string.replace("<", r"\<")
+            requirement_strings.append(requirement_string)
+
+        break_system_packages_command = "--break-system-packages " if break_system_packages else ""
         break_system = self.init_break_system_flag()
         ret = self.execute(
-            f"{self.python_interpreter_command} -m pip install {break_system_packages_command}--force-reinstall {break_system}{requirement_string}")
-
-        last_line = ret.get("stdout").strip("\r\n").split("\n")[-1]
-        if ret.get("stdout") and ("Successfully installed" not in last_line or requirement.name not in last_line):
-            raise ValueError(ret)
+            f"{self.python_interpreter_command} -m pip install {break_system_packages_command}--force-reinstall {break_system}{' '.join(requirement_strings)}")
+
+        installed_names = self.update_installed_packages(ret.get("stdout"))
+        if ret.get("stdout"):
+            missing = [requirement.name for requirement in requirements if
+                       self.normalize_package_name(requirement.name) not in installed_names]
+            if missing:
+                raise ValueError(f"Not installed: {missing}, {ret}")
         return True
 
     def install_source_code_requirement_raw(self, requirement, break_system_packages=False):
@@ -527,47 +684,162 @@ class StandaloneMethods:
         requirement_setup_tools.force = False
         self.install_requirement_standard(requirement_setup_tools, break_system_packages=break_system_packages)
 
-        if requirement.force or not self.requirement_satisfied(requirement):
+        return self.install_source_code_requirements([requirement], break_system_packages=break_system_packages)
+
+    def install_source_code_requirements(self, requirements, break_system_packages=False):
+        """
+        Install independent source code requirements:
+        build the changed packages in parallel and install all the wheels in a single pip call.
+
+        :param requirements:
+        :param break_system_packages:
+        :return:
+        """
+
+        wheel_cache_keys = {}
+        wheel_file_paths = {}
+        build_requirements = []
+        for requirement in requirements:
             package_lower_dir_name = requirement.name.split(".")[-1]
             package_upper_dir_name = requirement.name.split(".")[0]
-            self.build_and_install_package(requirement.multi_package_repo_path, package_upper_dir_name, package_lower_dir_name, break_system_packages=break_system_packages)
-            self.INSTALLED_PACKAGES = None
+            wheel_cache = self.get_wheel_cache(requirement.multi_package_repo_path)
+            wheel_cache_key = wheel_cache.generate_key(
+                os.path.join(requirement.multi_package_repo_path, package_lower_dir_name), package_upper_dir_name,
+                self.generate_resolved_dependencies(requirement.multi_package_repo_path, package_lower_dir_name))
+
+            if not requirement.force and self.requirement_satisfied(requirement) and \
+                    wheel_cache.check_installed(self.python_interpreter_command, requirement.name, wheel_cache_key):
+                self.logger.info(f"'{requirement.name}' source code did not change since installed, skipping")
+                continue
+
+            wheel_cache_keys[requirement.name] = wheel_cache_key
+            wheel_file_path = wheel_cache.get(wheel_cache_key)
+            if wheel_file_path is None:
+                build_requirements.append(requirement)
+            else:
+                self.logger.info(f"Using cached wheel: {wheel_file_path}")
+                wheel_file_paths[requirement.name] = wheel_file_path
+
+        if not wheel_cache_keys:
+            return True
+
+        if build_requirements:
+            with ThreadPoolExecutor(max_workers=min(self.SOURCE_CODE_BUILD_MAX_WORKERS, len(build_requirements)),
+                                    thread_name_prefix="build_wheel") as executor:
+                futures = {requirement.name: executor.submit(self.build_wheel, requirement.multi_package_repo_path,
+                                                             requirement.name.split(".")[0],
+                                                             requirement.name.split(".")[-1])
+                           for requirement in build_requirements}
+            for requirement in build_requirements:
+                wheel_file_paths[requirement.name] = self.get_wheel_cache(requirement.multi_package_repo_path).put(
+                    wheel_cache_keys[requirement.name], futures[requirement.name].result())
+
+        self.install_wheels(list(wheel_file_paths.values()), break_system_packages=break_system_packages)
+
+        for requirement in requirements:
+            if requirement.name in wheel_cache_keys:
+                self.get_wheel_cache(requirement.multi_package_repo_path).set_installed(
+                    self.python_interpreter_command, requirement.name, wheel_cache_keys[requirement.name])
+        return True
+
+    def get_wheel_cache(self, multi_package_repo_path):
+        """
+        Wheel cache per multi package repository.
+
+        :param multi_package_repo_path:
+        :return:
+        """
+
+        cache_dir_path = os.path.join(multi_package_repo_path, "build", "_build", "_wheel_cache")
+        if cache_dir_path not in self.WHEEL_CACHES:
+            StandaloneMethods.WHEEL_CACHES[cache_dir_path] = WheelCache(cache_dir_path,
+                                                                        max_size_bytes=self.WHEEL_CACHE_MAX_SIZE_BYTES,
+                                                                        max_age_seconds=self.WHEEL_CACHE_MAX_AGE_SECONDS)
+        return self.WHEEL_CACHES[cache_dir_path]
+
+    def generate_resolved_dependencies(self, multi_package_repo_path, package_lower_dir_name):
+        """
+        Package's requirements, source code requirements resolved to their source versions.
+
+        :param multi_package_repo_path:
+        :param package_lower_dir_name:
+        :return:
+        """
+
+        ret = []
+        for dependency in self.init_requirements_raw(self.get_requirements_file_path(multi_package_repo_path,
+                                                                                     package_lower_dir_name)):
+            source_code_version = self.SOURCE_CODE_PACKAGE_VERSIONS.get(dependency.name)
+            ret.append(f"{dependency.name}=={source_code_version}" if source_code_version else
+                       dependency.generate_install_string())
+        return ret
 
-    def build_and_install_package(self, multi_package_repo_path, package_upper_dir_name, package_lower_dir_name, break_system_packages=False):
+    # pylint: disable= too-many-arguments,too-many-positional-arguments
+    def build_and_install_package(self, multi_package_repo_path, package_upper_dir_name, package_lower_dir_name, break_system_packages=False,
+                                  wheel_cache_key=None):
         """
         Build the wheel and install it.
 
         :param multi_package_repo_path:
         :param package_upper_dir_name: in horey.h_logger is horey
         :param package_lower_dir_name: in horey.h_logger h_logger
+        :param wheel_cache_key: Reuse the cached wheel instead of building if set.
         :return:
         """
         self.logger.info(f"Building and installing package from source code {multi_package_repo_path} -> {package_lower_dir_name}")
 
+        wheel_cache = self.get_wheel_cache(multi_package_repo_path)
+        wheel_file_path = wheel_cache.get(wheel_cache_key) if wheel_cache_key else None
+        if wheel_file_path is None:
+            wheel_file_path = self.build_wheel(multi_package_repo_path, package_upper_dir_name, package_lower_dir_name)
+            if wheel_cache_key:
+                wheel_file_path = wheel_cache.put(wheel_cache_key, wheel_file_path)
+        else:
+            self.logger.info(f"Using cached wheel: {wheel_file_path}")
+
+        return self.install_wheels([wheel_file_path], break_system_packages=break_system_packages)
+
+    def build_wheel(self, multi_package_repo_path, package_upper_dir_name, package_lower_dir_name):
+        """
+        Build the wheel in a separate build dir - safe to run in parallel for different packages.
+
+        :param multi_package_repo_path:
+        :param package_upper_dir_name: in horey.h_logger is horey
+        :param package_lower_dir_name: in horey.h_logger h_logger
+        :return: Wheel file path.
+        """
+
         tmp_build_dir = os.path.join(multi_package_repo_path, "build", "_build")
         os.makedirs(tmp_build_dir, exist_ok=True)
 
         build_dir_path = os.path.join(tmp_build_dir, package_lower_dir_name)
 
         self.create_wheel(os.path.join(multi_package_repo_path, package_lower_dir_name), package_upper_dir_name, build_dir_path)
-        wheel_file_name = None
         dist_dir_path = os.path.join(build_dir_path, "dist")
         for wheel_file_name in os.listdir(dist_dir_path):
             if wheel_file_name.endswith(".whl"):
-                break
+                return os.path.join(dist_dir_path, wheel_file_name)
+        raise RuntimeError(f"Could not find wheel in {dist_dir_path}")
+
+    def install_wheels(self, wheel_file_paths, break_system_packages=False):
+        """
+        Install source code wheels in a single pip call.
+        Their requirements are installed before - no dependencies resolution.
+
+        :param wheel_file_paths:
+        :param break_system_packages:
+        :return:
+        """
 
         break_system_packages_command = "--break-system-packages " if break_system_packages else ""
         # todo: check break_system = self.init_break_system_flag()
-        command = f"{self.python_interpreter_command} -m pip install --force-reinstall {break_system_packages_command}{os.path.join(dist_dir_path, wheel_file_name)}"
+        command = f"{self.python_interpreter_command} -m pip install --force-reinstall --no-deps {break_system_packages_command}{' '.join(wheel_file_paths)}"
         response = self.execute(command)
 
-        lines = response["stdout"].split("\n")
-        index = -2 if "Leaving directory" in lines[-1] else -1
-        if lines[index] != f"done installing {package_upper_dir_name}" and "Successfully installed " not in lines[index]:
+        if not self.update_installed_packages(response["stdout"]):
             raise RuntimeError(
-                f"Could not install {package_upper_dir_name} from source code:\n {response}"
+                f"Could not install {wheel_file_paths} from source code:\n {response}"
             )
-        self.INSTALLED_PACKAGES = None
         return True
 
     def init_break_system_flag(self):
@@ -597,23 +869,21 @@ class StandaloneMethods:
         self.logger.info(f"Checking if requirement satisfied '{requirement.name}'")
         self.logger.info(f"self.SOURCE_CODE_PACKAGE_VERSIONS: '{self.SOURCE_CODE_PACKAGE_VERSIONS}'")
 
-        for package in self.get_installed_packages():
-            if package.name.lower().replace("_", "-") != requirement.name.lower().replace("_", "-"):
-                continue
-            self.logger.info(f"Found installed '{package.name=}'")
-
-            if not package.check_version_requirements(requirement):
-                self.logger.info(f"Installed version do not much requirement '{package.name=}'")
-                return False
+        package = self.get_installed_packages_index().get(self.normalize_package_name(requirement.name))
+        if package is None:
+            self.logger.info(f"Was not able to find installed package for requirement '{requirement.name=}'")
+            return False
+        self.logger.info(f"Found installed '{package.name=}'")
 
-            for source_code_package_name, source_code_version in self.SOURCE_CODE_PACKAGE_VERSIONS.items():
-                if package.name == source_code_package_name:
-                    self.logger.info(f"Comparing installed '{package.name}' package version '{package.version}' VS source code version {source_code_version}")
-                    return package.version == source_code_version
-            return True
+        if not package.check_version_requirements(requirement):
+            self.logger.info(f"Installed version do not much requirement '{package.name=}'")
+            return False
 
-        self.logger.info(f"Was not able to find installed package for requirement '{requirement.name=}'")
-        return False
+        for source_code_package_name, source_code_version in self.SOURCE_CODE_PACKAGE_VERSIONS.items():
+            if self.normalize_package_name(package.name) == self.normalize_package_name(source_code_package_name):
+                self.logger.info(f"Comparing installed '{package.name}' package version '{package.version}' VS source code version {source_code_version}")
+                return package.version == source_code_version
+        return True
 
     def create_wheel(self, source_code_path, package_upper_dir_name, build_dir_path):
         """
@@ -625,8 +895,6 @@ class StandaloneMethods:
         :return:
         """
 
-        old_cwd = os.getcwd()
-
         try:
             shutil.rmtree(build_dir_path)
         except FileNotFoundError:
@@ -635,15 +903,11 @@ class StandaloneMethods:
         shutil.copytree(os.path.join(source_code_path, package_upper_dir_name), os.path.join(build_dir_path, package_upper_dir_name))
         for file_name in ["LICENSE", "README.md", "setup.py"]:
             shutil.copy(os.path.join(source_code_path, file_name), build_dir_path)
-        os.chdir(build_dir_path)
-
-        try:
-            command = f"{self.python_interpreter_command} setup.py sdist bdist_wheel"
-            response = self.execute(command)
-        finally:
-            os.chdir(old_cwd)
 
-        return response
+        # No os.chdir - the process cwd is shared by the parallel builds.
+        change_dir_command = "cd /d" if platform.system().lower() == "windows" else "cd"
+        command = f'{change_dir_command} "{build_dir_path}" && {self.python_interpreter_command} setup.py sdist bdist_wheel'
+        return self.execute(command)
 
     def execute(self, command, ignore_on_error_callback=None, timeout=60 * 10, debug=True):
         """
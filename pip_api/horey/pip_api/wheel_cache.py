@@ -0,0 +1,205 @@
+"""
+Content addressed wheel cache for multi package repository source packages.
+Standalone - no horey imports, used by standalone_methods before anything is installed.
+"""
+
+import hashlib
+import json
+import os
+import shutil
+import time
+import uuid
+
+
+class WheelCache:
+    """
+    Wheels keyed by the package source tree hash plus its resolved dependencies.
+    Unchanged packages are neither rebuilt nor reinstalled: the key installed into each
+    python environment is recorded, so the install is skipped while it stays the same.
+    """
+
+    INSTALLED_DIR_NAME = "_installed"
+    IGNORED_DIR_NAMES = ("__pycache__", "build", "dist", "_build")
+
+    def __init__(self, cache_dir_path, max_size_bytes=2 * 1024 ** 3, max_age_seconds=30 * 24 * 60 * 60):
+        self.cache_dir_path = cache_dir_path
+        self.max_size_bytes = max_size_bytes
+        self.max_age_seconds = max_age_seconds
+        self.statistics = {"hits": 0, "misses": 0, "skipped_installs": 0, "evicted": 0}
+
+    def generate_key(self, source_code_path, package_upper_dir_name, dependencies):
+        """
+        Hash of the package sources, setup files and resolved dependencies.
+
+        :param source_code_path: Path to the directory with setup.py
+        :param package_upper_dir_name: in horey.h_logger is horey
+        :param dependencies: Resolved requirement strings, e.g. "requests>=2.0", "horey.h_logger==1.0.1"
+        :return:
+        """
+
+        sha256 = hashlib.sha256()
+        for file_name in ["LICENSE", "README.md", "setup.py", "requirements.txt"]:
+            self.update_hash_file(sha256, source_code_path, os.path.join(source_code_path, file_name))
+
+        for dir_path, dir_names, file_names in os.walk(os.path.join(source_code_path, package_upper_dir_name)):
+            dir_names[:] = sorted(dir_name for dir_name in dir_names if dir_name not in self.IGNORED_DIR_NAMES and
+                                  not dir_name.endswith(".egg-info"))
+            for file_name in sorted(file_names):
+                if not file_name.endswith(".pyc"):
+                    self.update_hash_file(sha256, source_code_path, os.path.join(dir_path, file_name))
+
+        sha256.update(json.dumps(sorted(dependencies)).encode("utf-8"))
+        return sha256.hexdigest()
+
+    @staticmethod
+    def update_hash_file(sha256, root_path, file_path):
+        """
+        Add file's relative path and content.
+
+        :param sha256:
+        :param root_path:
+        :param file_path:
+        :return:
+        """
+
+        if not os.path.isfile(file_path):
+            return
+        sha256.update(os.path.relpath(file_path, root_path).replace(os.sep, "/").encode("utf-8"))
+        sha256.update(b"\0")
+        with open(file_path, "rb") as file_handler:
+            for block in iter(lambda: file_handler.read(1024 * 1024), b""):
+                sha256.update(block)
+        sha256.update(b"\0")
+
+    def get(self, key):
+        """
+        Cached wheel path or None.
+
+        :param key:
+        :return:
+        """
+
+        key_dir_path = os.path.join(self.cache_dir_path, key)
+        if os.path.isdir(key_dir_path):
+            for file_name in os.listdir(key_dir_path):
+                if file_name.endswith(".whl"):
+                    # Last use time for the eviction.
+                    os.utime(key_dir_path)
+                    self.statistics["hits"] += 1
+                    return os.path.join(key_dir_path, file_name)
+
+        self.statistics["misses"] += 1
+        return None
+
+    def put(self, key, wheel_file_path):
+        """
+        Copy built wheel into the cache.
+
+        :param key:
+        :param wheel_file_path:
+        :return: Cached wheel path.
+        """
+
+        key_dir_path = os.path.join(self.cache_dir_path, key)
+        tmp_dir_path = f"{key_dir_path}.{uuid.uuid4()}.tmp"
+        os.makedirs(tmp_dir_path)
+        shutil.copy(wheel_file_path, tmp_dir_path)
+        try:
+            os.rename(tmp_dir_path, key_dir_path)
+        except OSError:
+            # Concurrent build of the same key.
+            shutil.rmtree(tmp_dir_path, ignore_errors=True)
+
+        self.evict(keep_keys=[key])
+        return os.path.join(key_dir_path, os.path.basename(wheel_file_path))
+
+    def evict(self, keep_keys=None):
+        """
+        Remove entries older than max_age_seconds, then the least recently used ones above max_size_bytes.
+
+        :param keep_keys:
+        :return:
+        """
+
+        keep_keys = set(keep_keys or [])
+        entries = []
+        for key in os.listdir(self.cache_dir_path):
+            key_dir_path = os.path.join(self.cache_dir_path, key)
+            if not os.path.isdir(key_dir_path) or key.endswith(".tmp") or key == self.INSTALLED_DIR_NAME:
+                continue
+            size = sum(os.path.getsize(os.path.join(key_dir_path, file_name)) for file_name in
+                       os.listdir(key_dir_path))
+            entries.append((os.path.getmtime(key_dir_path), key, size))
+
+        now = time.time()
+        total_size = sum(size for _, _, size in entries)
+        for last_used, key, size in sorted(entries):
+            if key in keep_keys:
+                continue
+            if now - last_used <= self.max_age_seconds and total_size <= self.max_size_bytes:
+                continue
+            shutil.rmtree(os.path.join(self.cache_dir_path, key), ignore_errors=True)
+            total_size -= size
+            self.statistics["evicted"] += 1
+
+    def get_installed_file_path(self, environment, package_name):
+        """
+        Installed key record - a file per environment and package, so parallel installs do not race.
+
+        :param environment: e.g. python interpreter command.
+        :param package_name:
+        :return:
+        """
+
+        environment_hash = hashlib.sha256(environment.encode("utf-8")).hexdigest()[:16]
+        return os.path.join(self.cache_dir_path, self.INSTALLED_DIR_NAME, environment_hash, package_name)
+
+    def check_installed(self, environment, package_name, key):
+        """
+        The key is already installed in the environment.
+
+        :param environment:
+        :param package_name:
+        :param key:
+        :return:
+        """
+
+        try:
+            with open(self.get_installed_file_path(environment, package_name), encoding="utf-8") as file_handler:
+                if file_handler.read() != key:
+                    return False
+        except FileNotFoundError:
+            return False
+
+        self.statistics["skipped_installs"] += 1
+        return True
+
+    def set_installed(self, environment, package_name, key):
+        """
+        Record installed key.
+
+        :param environment:
+        :param package_name:
+        :param key:
+        :return:
+        """
+
+        file_path = self.get_installed_file_path(environment, package_name)
+        os.makedirs(os.path.dirname(file_path), exist_ok=True)
+        tmp_file_path = f"{file_path}.{uuid.uuid4()}.tmp"
+        with open(tmp_file_path, "w", encoding="utf-8") as file_handler:
+            file_handler.write(key)
+        os.replace(tmp_file_path, file_path)
+
+    def generate_report(self):
+        """
+        Hits/misses report line.
+
+        :return:
+        """
+
+        requests_count = self.statistics["hits"] + self.statistics["misses"]
+        hit_rate = self.statistics["hits"] / requests_count * 100 if requests_count else 0.0
+        return (f"Wheel cache {self.cache_dir_path}: hits: {self.statistics['hits']}, "
+                f"misses: {self.statistics['misses']} ({hit_rate:.0f}% hit rate), "
+                f"skipped installs: {self.statistics['skipped_installs']}, evicted: {self.statistics['evicted']}")
@@ -0,0 +1,107 @@
+"""
+Requirements graph tests
+
+"""
+
+import logging
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(os.path.dirname(__file__)), "horey", "pip_api")))
+
+from requirements_graph import RequirementsGraph
+from standalone_methods import StandaloneMethods
+
+# pylint: disable= missing-function-docstring
+
+StandaloneMethods.logger = logging.getLogger(__name__)
+
+
+@pytest.fixture(name="standalone_methods")
+def standalone_methods_fixture(tmp_path):
+    for package_dir_name, lines in {"h_logger": [],
+                                    "common_utils": ["horey.h_logger", "requests>=2.0"],
+                                    "network": ["horey.h_logger"],
+                                    "aws_api": ["horey.common_utils", "horey.network", "requests>=2.1"]}.items():
+        (tmp_path / package_dir_name).mkdir()
+        (tmp_path / package_dir_name / "requirements.txt").write_text("".join(line + "\n" for line in lines))
+    return StandaloneMethods(None, {"horey.": str(tmp_path)})
+
+
+@pytest.mark.done
+def test_generate_levels():
+    requirements_graph = RequirementsGraph()
+    requirements_graph.requirements = {"a": None, "b": None, "c": None, "d": None}
+    requirements_graph.add_dependency("a", "b")
+    requirements_graph.add_dependency("a", "c")
+    requirements_graph.add_dependency("b", "d")
+    requirements_graph.add_dependency("c", "d")
+    assert requirements_graph.generate_levels() == [["d"], ["b", "c"], ["a"]]
+    assert requirements_graph.generate_levels(["a", "b"]) == [["b"], ["a"]]
+
+
+@pytest.mark.done
+def test_generate_levels_cycle():
+    requirements_graph = RequirementsGraph()
+    requirements_graph.requirements = {"a": None, "b": None}
+    requirements_graph.add_dependency("a", "b")
+    requirements_graph.add_dependency("b", "a")
+    with pytest.raises(ValueError):
+        requirements_graph.generate_levels()
+
+
+@pytest.mark.done
+def test_compose_requirements_graph(standalone_methods):
+    requirements_graph = standalone_methods.compose_requirements_graph(
+        [standalone_methods.init_requirement_from_string("requirements.txt", "horey.aws_api")])
+
+    assert requirements_graph.requirements["requests"].min_version == "2.1"
+    source_code_names = [name for name, requirement in requirements_graph.requirements.items() if
+                         requirement.multi_package_repo_path]
+    assert requirements_graph.generate_levels(source_code_names) == [["horey.h_logger"],
+                                                                     ["horey.common_utils", "horey.network"],
+                                                                     ["horey.aws_api"]]
+
+
+@pytest.mark.done
+def test_update_installed_packages(standalone_methods):
+    standalone_methods.INSTALLED_PACKAGES = [standalone_methods.init_installed_package({"name": "PyYAML",
+                                                                                       "version": "6.0"})]
+    installed_names = standalone_methods.update_installed_packages(
+        "Collecting requests\nSuccessfully installed PyYAML-6.0.1 horey.h-logger-1.0.2\n")
+
+    assert installed_names == ["pyyaml", "horey-h-logger"]
+    index = standalone_methods.get_installed_packages_index()
+    assert index["pyyaml"].version == "6.0.1"
+    assert index["horey-h-logger"].multi_package_repo_prefix == "horey."
+    assert len(standalone_methods.INSTALLED_PACKAGES) == 2
+
+    assert standalone_methods.update_installed_packages("Requirement already satisfied: requests") == []
+    assert standalone_methods.INSTALLED_PACKAGES is None
+
+
+@pytest.mark.done
+def test_install_requirements_standard_batch(standalone_methods):
+    commands = []
+
+    def execute(command):
+        commands.append(command)
+        if command.endswith("pip -V"):
+            return {"stdout": "pip 24.0 from /usr/lib/python3/dist-packages/pip (python 3.12)"}
+        return {"stdout": "Successfully installed requests-2.32.0 PyYAML-6.0.1"}
+
+    standalone_methods.execute = execute
+    standalone_methods.INSTALLED_PACKAGES = [standalone_methods.init_installed_package({"name": "urllib3",
+                                                                                       "version": "2.0.0"})]
+    requirements = [standalone_methods.init_requirement_from_string("requirements.txt", line) for line in
+                    ["requests>=2.1", "pyyaml", "urllib3>=1.0"]]
+
+    assert standalone_methods.install_requirements_standard_batch(requirements)
+    assert len(commands) == 2
+    assert commands[-1].endswith(r"requests\>=2.1 pyyaml")
+    assert standalone_methods.requirement_satisfied(requirements[0])
+
+    assert standalone_methods.install_requirements_standard_batch(requirements)
+    assert len(commands) == 2
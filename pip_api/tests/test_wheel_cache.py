@@ -0,0 +1,87 @@
+"""
+Wheel cache tests
+
+"""
+
+import os
+import sys
+import time
+
+import pytest
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(os.path.dirname(__file__)), "horey", "pip_api")))
+
+from wheel_cache import WheelCache
+
+# pylint: disable= missing-function-docstring
+
+
+@pytest.fixture(name="source_code_path")
+def source_code_path_fixture(tmp_path):
+    source_code_path = tmp_path / "h_logger"
+    (source_code_path / "horey" / "h_logger" / "__pycache__").mkdir(parents=True)
+    (source_code_path / "horey" / "h_logger" / "__init__.py").write_text('__version__ = "1.0.0"\n')
+    (source_code_path / "horey" / "h_logger" / "__pycache__" / "module.pyc").write_bytes(b"0")
+    (source_code_path / "setup.py").write_text("setup()\n")
+    return source_code_path
+
+
+def generate_wheel(tmp_path, size=10):
+    wheel_file_path = tmp_path / f"horey.h_logger-{size}-py3-none-any.whl"
+    wheel_file_path.write_bytes(b"0" * size)
+    return str(wheel_file_path)
+
+
+@pytest.mark.done
+def test_generate_key(source_code_path, tmp_path):
+    wheel_cache = WheelCache(str(tmp_path / "cache"))
+    key = wheel_cache.generate_key(str(source_code_path), "horey", ["requests>=2.0"])
+    assert key == wheel_cache.generate_key(str(source_code_path), "horey", ["requests>=2.0"])
+
+    (source_code_path / "horey" / "h_logger" / "__pycache__" / "module.pyc").write_bytes(b"1")
+    assert key == wheel_cache.generate_key(str(source_code_path), "horey", ["requests>=2.0"])
+
+    assert key != wheel_cache.generate_key(str(source_code_path), "horey", ["requests>=2.1"])
+
+    (source_code_path / "horey" / "h_logger" / "__init__.py").write_text('__version__ = "1.0.0"\n# change\n')
+    assert key != wheel_cache.generate_key(str(source_code_path), "horey", ["requests>=2.0"])
+
+
+@pytest.mark.done
+def test_get_put(tmp_path):
+    wheel_cache = WheelCache(str(tmp_path / "cache"))
+    assert wheel_cache.get("key") is None
+    cached_wheel_file_path = wheel_cache.put("key", generate_wheel(tmp_path))
+    assert wheel_cache.get("key") == cached_wheel_file_path
+    assert wheel_cache.statistics["hits"] == 1
+    assert wheel_cache.statistics["misses"] == 1
+    assert "hits: 1, misses: 1" in wheel_cache.generate_report()
+
+
+@pytest.mark.done
+def test_evict(tmp_path):
+    wheel_cache = WheelCache(str(tmp_path / "cache"), max_size_bytes=250, max_age_seconds=60)
+    wheel_cache.put("old", generate_wheel(tmp_path, 10))
+    old_time = time.time() - 120
+    os.utime(os.path.join(wheel_cache.cache_dir_path, "old"), (old_time, old_time))
+
+    for index in range(3):
+        wheel_cache.put(f"key_{index}", generate_wheel(tmp_path, 100))
+        time.sleep(0.01)
+
+    assert wheel_cache.get("old") is None
+    assert wheel_cache.get("key_0") is None
+    assert wheel_cache.get("key_1") is not None
+    assert wheel_cache.get("key_2") is not None
+    assert wheel_cache.statistics["evicted"] == 2
+
+
+@pytest.mark.done
+def test_check_installed(tmp_path):
+    wheel_cache = WheelCache(str(tmp_path / "cache"))
+    assert not wheel_cache.check_installed("python", "horey.h_logger", "key")
+    wheel_cache.set_installed("python", "horey.h_logger", "key")
+    assert wheel_cache.check_installed("python", "horey.h_logger", "key")
+    assert not wheel_cache.check_installed("python", "horey.h_logger", "new_key")
+    assert not wheel_cache.check_installed("/venv/bin/python", "horey.h_logger", "key")
+    assert wheel_cache.statistics["skipped_installs"] == 1